@@ -1,13 +1,17 @@
 import sqlite3
 import os
+import re
+import hashlib
 import platform
+from collections import OrderedDict
 from functools import lru_cache
 from datetime import datetime
 import threading
+import time
 import gc
 
 # 导入数据库配置
-from Sills.db_config import DATABASE_TYPE, SQLITE_PATH, PG_CONFIG, is_postgresql, is_sqlite
+from Sills.db_config import DATABASE_TYPE, SQLITE_PATH, PG_CONFIG, PG_PREPARE_THRESHOLD, is_postgresql, is_sqlite
 
 # 数据库路径（兼容旧代码）
 DB_PATH = SQLITE_PATH
@@ -22,6 +26,8 @@ _connection_lock = threading.Lock()
 # 连接池配置
 POOL_SIZE = 10
 POOL_TIMEOUT = 5.0
+POOL_MAX_OVERFLOW = 10     # 池满时额外允许的临时连接数（归还后直接关闭）
+POOL_RECYCLE = 3600        # 物理连接最长存活时间（秒），超时后关闭重建
 
 # PostgreSQL 连接池（延迟初始化）
 _pg_pool = None
@@ -34,11 +40,19 @@ def _init_pg_pool():
         try:
             import psycopg2
             from psycopg2 import pool
-            from psycopg2.extras import RealDictCursor
+            from psycopg2.extensions import connection as _pg_connection
+
+            class _PreparingConnection(_pg_connection):
+                """记录本会话已 PREPARE 的语句（预编译语句是会话级的）"""
+                def __init__(self, *args, **kwargs):
+                    super().__init__(*args, **kwargs)
+                    self.prepared = set()
+
+            # 使用默认元组游标，由 _DictCursorWrapper 包装为 _PgRow（比 RealDictCursor 省内存）
             _pg_pool = pool.ThreadedConnectionPool(
                 minconn=1,
                 maxconn=POOL_SIZE,
-                cursor_factory=RealDictCursor,
+                connection_factory=_PreparingConnection,
                 **PG_CONFIG
             )
             print(f"[DB] PostgreSQL 连接池已初始化: {PG_CONFIG['host']}:{PG_CONFIG['port']}/{PG_CONFIG['database']}")
@@ -117,8 +131,275 @@ def get_db_path():
     return DB_PATH
 
 
+class _SqlitePool:
+    """
+    SQLite 连接池
+
+    - 每个物理连接只在创建时执行一次 PRAGMA_OPTIMIZATIONS
+    - 借出/归还语义：close() 或退出 with 块时归还，未提交的事务会被回滚
+    - 线程亲和：优先把当前线程上次归还的连接再借给它，保持页缓存热度
+    - 有界：常驻 POOL_SIZE 个连接，高峰期最多再临时创建 POOL_MAX_OVERFLOW 个，
+      超出后等待归还，等待超过 POOL_TIMEOUT 抛出 sqlite3.OperationalError
+    """
+
+    def __init__(self, size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW,
+                 timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self._cond = threading.Condition(threading.Lock())
+        # 空闲连接栈，元素为 _PoolEntry，后进先出
+        self._idle = []
+        # close_all() 时递增，旧代的连接归还时直接关闭
+        self._generation = 0
+        self._total = 0        # 当前打开的物理连接数（空闲 + 借出）
+        self._in_use = 0
+        self._waiting = 0
+        self._created = 0
+        self._recycled = 0
+        self._checkouts = 0
+
+    def _connect(self, path):
+        conn = sqlite3.connect(path, timeout=POOL_TIMEOUT, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(PRAGMA_OPTIMIZATIONS)
+        return conn
+
+    def _is_stale(self, entry, path, now):
+        return (entry.path != path
+                or entry.generation != self._generation
+                or now - entry.created_at > self.recycle)
+
+    def _discard(self, entry):
+        """关闭物理连接（调用方需持有锁）"""
+        self._total -= 1
+        self._recycled += 1
+        with _connection_lock:
+            _active_connections.discard(entry.conn)
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _pop_idle(self, path):
+        """取出一个可用的空闲连接，优先当前线程上次使用的（调用方需持有锁）"""
+        now = time.monotonic()
+        thread_id = threading.get_ident()
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i].thread_id == thread_id:
+                self._idle.append(self._idle.pop(i))
+                break
+        while self._idle:
+            entry = self._idle.pop()
+            if self._is_stale(entry, path, now):
+                self._discard(entry)
+                continue
+            return entry
+        return None
+
+    def acquire(self):
+        path = get_db_path()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                entry = self._pop_idle(path)
+                if entry is not None:
+                    break
+                if self._total < self.size + self.max_overflow:
+                    # 先占位再在锁外建连接，避免阻塞其他线程
+                    self._total += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"SQLite 连接池已耗尽（{self._in_use} 个连接使用中，等待 {self.timeout} 秒超时）")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            self._checkouts += 1
+            generation = self._generation
+
+        if entry is None:
+            try:
+                conn = self._connect(path)
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            entry = _PoolEntry(conn, path, generation)
+            with self._cond:
+                self._created += 1
+
+        entry.thread_id = threading.get_ident()
+        with _connection_lock:
+            _active_connections.add(entry.conn)
+        return _PooledSqliteConnection(self, entry)
+
+    def release(self, entry):
+        healthy = True
+        try:
+            if entry.conn.in_transaction:
+                entry.conn.rollback()
+            if entry.conn.row_factory is not sqlite3.Row:
+                entry.conn.row_factory = sqlite3.Row
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if (healthy and len(self._idle) < self.size
+                    and not self._is_stale(entry, get_db_path(), time.monotonic())):
+                self._idle.append(entry)
+            else:
+                self._discard(entry)
+            self._cond.notify()
+
+    def close_all(self):
+        """关闭所有空闲连接；借出中的连接在归还时关闭"""
+        with self._cond:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            for entry in idle:
+                self._discard(entry)
+            self._cond.notify_all()
+        return len(idle)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "created": self._created,
+                "recycled": self._recycled,
+                "checkouts": self._checkouts,
+            }
+
+
+class _PoolEntry:
+    """池中的一个物理连接"""
+    __slots__ = ('conn', 'path', 'generation', 'created_at', 'thread_id')
+
+    def __init__(self, conn, path, generation):
+        self.conn = conn
+        self.path = path
+        self.generation = generation
+        self.created_at = time.monotonic()
+        self.thread_id = None
+
+
+class _PooledSqliteConnection:
+    """池化 SQLite 连接代理，接口同 sqlite3.Connection，close() 表示归还到池"""
+    __slots__ = ('_pool', '_entry', '_conn', '_dirty')
+
+    def __init__(self, pool, entry):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_entry', entry)
+        object.__setattr__(self, '_conn', entry.conn)
+        object.__setattr__(self, '_dirty', set())
+
+    def _raw(self):
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return conn
+
+    def _track_write(self, sql, conn):
+        table = _written_table(sql)
+        if table:
+            if conn.in_transaction:
+                self._dirty.add(table)
+            else:
+                bump_table_version(table)
+
+    def execute(self, sql, params=()):
+        conn = self._raw()
+        cur = conn.execute(sql, params)
+        self._track_write(sql, conn)
+        return cur
+
+    def executemany(self, sql, seq_of_params):
+        conn = self._raw()
+        cur = conn.executemany(sql, seq_of_params)
+        self._track_write(sql, conn)
+        return cur
+
+    def executescript(self, script):
+        cur = self._raw().executescript(script)
+        bump_table_version()
+        return cur
+
+    def commit(self):
+        self._raw().commit()
+        if self._dirty:
+            bump_table_version(*self._dirty)
+            self._dirty.clear()
+
+    def rollback(self):
+        self._raw().rollback()
+        self._dirty.clear()
+
+    def close(self):
+        """归还连接到池（重复调用无副作用）"""
+        entry = self._entry
+        if entry is None:
+            return
+        object.__setattr__(self, '_entry', None)
+        object.__setattr__(self, '_conn', None)
+        self._dirty.clear()
+        with _connection_lock:
+            _active_connections.discard(entry.conn)
+        self._pool.release(entry)
+
+    def __getattr__(self, name):
+        if name in _PooledSqliteConnection.__slots__:
+            raise AttributeError(name)
+        return getattr(self._raw(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw(), name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if self._conn is not None:
+                if exc_type is None:
+                    self.commit()
+                else:
+                    self.rollback()
+        finally:
+            self.close()
+        return False
+
+    def __del__(self):
+        # 兜底：忘记 close() 的连接在回收时归还
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+# SQLite 连接池（全局单例）
+_sqlite_pool = _SqlitePool()
+
+
 def get_db_connection():
-    """获取数据库连接，支持 SQLite 和 PostgreSQL"""
+    """获取数据库连接，支持 SQLite 和 PostgreSQL
+
+    SQLite 模式下返回池化连接，用法与 sqlite3.Connection 相同；
+    退出 with 块或调用 close() 时归还到连接池。
+    """
     if is_postgresql():
         # PostgreSQL 模式
         pool = _init_pg_pool()
@@ -129,13 +410,76 @@ def get_db_connection():
         return _PgConnectionWrapper(conn, pool)
     else:
         # SQLite 模式
-        conn = sqlite3.connect(get_db_path(), timeout=POOL_TIMEOUT, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        conn.executescript(PRAGMA_OPTIMIZATIONS)
-        # 追踪连接
-        with _connection_lock:
-            _active_connections.add(conn)
-        return conn
+        return _sqlite_pool.acquire()
+
+
+def get_pool_stats():
+    """获取连接池状态（使用中、等待中、已创建、已回收）"""
+    if is_postgresql():
+        pool = _pg_pool
+        if pool is None:
+            return {"backend": "postgresql", "initialized": False}
+        return {
+            "backend": "postgresql",
+            "initialized": True,
+            "size": pool.maxconn,
+            "in_use": len(pool._used),
+            "idle": len(pool._pool),
+        }
+    stats = _sqlite_pool.stats()
+    stats["backend"] = "sqlite"
+    return stats
+
+
+class _PgRow:
+    """
+    PostgreSQL 结果行（模拟 sqlite3.Row）
+
+    值保存在驱动返回的元组里，同一游标的所有行共享一个列名→下标映射，
+    支持 row[0]、row['col']、row.get('col') 和 dict(row)。
+    """
+    __slots__ = ('_values', '_index')
+
+    def __init__(self, values, index):
+        self._values = values
+        self._index = index
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, slice)):
+            return self._values[key]
+        return self._values[self._index[key]]
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        return default if i is None else self._values[i]
+
+    def keys(self):
+        return self._index.keys()
+
+    def values(self):
+        return [self._values[i] for i in self._index.values()]
+
+    def items(self):
+        return [(k, self._values[i]) for k, i in self._index.items()]
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __eq__(self, other):
+        if isinstance(other, (_PgRow, dict)):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"_PgRow({dict(self)!r})"
 
 
 class _DictCursorWrapper:
@@ -143,102 +487,396 @@ class _DictCursorWrapper:
     def __init__(self, cursor):
         self._cursor = cursor
         self._columns = None
+        self._index = None
 
     def _get_columns(self):
         if self._columns is None and self._cursor.description:
             self._columns = [desc[0] for desc in self._cursor.description]
         return self._columns
 
+    def _get_index(self):
+        """列名→下标映射，首次取行时创建，本游标所有行共享（重名列取最后一个，与字典行为一致）"""
+        if self._index is None:
+            self._index = {col: i for i, col in enumerate(self._get_columns() or [])}
+        return self._index
+
     def _wrap_row(self, row):
         """包装单行数据，支持数字索引和列名访问"""
         if row is None:
             return None
-
-        columns = self._get_columns()
-
-        # 获取值列表
+        if isinstance(row, tuple):
+            return _PgRow(row, self._get_index())
         if isinstance(row, dict):
-            values = list(row.values())
-            data = row.copy()
-        elif isinstance(row, (tuple, list)):
-            values = list(row)
-            data = {columns[i]: row[i] for i in range(len(columns))} if columns else {}
-        else:
-            return row
-
-        # 创建支持双重访问的 Row 对象
-        class _Row(dict):
-            def __init__(inner_self, d, vals):
-                super().__init__(d)
-                inner_self._values = vals
-
-            def __getitem__(inner_self, key):
-                if isinstance(key, int):
-                    if 0 <= key < len(inner_self._values):
-                        return inner_self._values[key]
-                    raise IndexError(f"index {key} out of range")
-                return super().__getitem__(key)
-
-        return _Row(data, values)
+            # 兼容 RealDictCursor 等字典游标
+            return _PgRow(tuple(row.values()), {k: i for i, k in enumerate(row)})
+        if isinstance(row, list):
+            return _PgRow(tuple(row), self._get_index())
+        return row
+
+    def _wrap_rows(self, rows):
+        if not rows:
+            return []
+        if isinstance(rows[0], tuple):
+            index = self._get_index()
+            return [_PgRow(r, index) for r in rows]
+        return [self._wrap_row(r) for r in rows]
 
     def fetchone(self):
         row = self._cursor.fetchone()
         return self._wrap_row(row)
 
     def fetchall(self):
-        rows = self._cursor.fetchall()
-        return [self._wrap_row(r) for r in rows] if rows else []
+        return self._wrap_rows(self._cursor.fetchall())
 
     def fetchmany(self, size=None):
         rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
-        return [self._wrap_row(r) for r in rows] if rows else []
+        return self._wrap_rows(rows)
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._wrap_row(row)
 
     def __getattr__(self, name):
         return getattr(self._cursor, name)
 
 
+_GROUP_CONCAT_RE = re.compile(r'GROUP_CONCAT\(([^)]+)\)', re.IGNORECASE)
+_ORDER_BY_RE = re.compile(r'\s+ORDER\s+BY\s+(.+)$', re.IGNORECASE)
+
+# 每个 PostgreSQL 会话最多保留的预编译语句数
+PG_MAX_PREPARED_PER_CONN = 200
+
+
+def _replace_group_concat(match):
+    content = match.group(1)
+    # 检查是否有 ORDER BY
+    order_match = _ORDER_BY_RE.search(content)
+    if order_match:
+        col = content[:order_match.start()].strip()
+        order_by = order_match.group(1)
+        return f"STRING_AGG({col}::text, ',' ORDER BY {order_by})"
+    else:
+        return f"STRING_AGG({content}::text, ',')"
+
+
+def _translate_sql(sql):
+    """将 SQLite 方言的 SQL 转换为 PostgreSQL 方言"""
+    # 将 ? 占位符转换为 %s
+    pg_sql = sql.replace('?', '%s')
+
+    # 转换 SQLite 特有函数为 PostgreSQL 兼容
+    # IFNULL -> COALESCE
+    pg_sql = pg_sql.replace('IFNULL', 'COALESCE')
+
+    # datetime('now', 'localtime') -> NOW()
+    pg_sql = pg_sql.replace("datetime('now', 'localtime')", 'NOW()')
+    pg_sql = pg_sql.replace('datetime("now", "localtime")', 'NOW()')
+
+    # GROUP_CONCAT(col ORDER BY x) -> STRING_AGG(col::text, ',' ORDER BY x)
+    return _GROUP_CONCAT_RE.sub(_replace_group_concat, pg_sql)
+
+
+class _TranslatedSql:
+    """一条 SQL 的翻译结果及其预编译信息"""
+    __slots__ = ('pg_sql', 'param_count', 'prepare_sql', 'name', 'uses', 'preparable')
+
+    def __init__(self, sql):
+        self.pg_sql = _translate_sql(sql)
+        self.param_count = sql.count('?')
+        self.uses = 0
+        self.name = None
+        self.prepare_sql = None
+        # 只预编译单条、参数全为 ? 占位且不含字面量 % 的语句
+        self.preparable = (
+            PG_PREPARE_THRESHOLD > 0
+            and self.param_count > 0
+            and '%' not in sql
+            and ';' not in sql.strip().rstrip(';')
+        )
+        if self.preparable:
+            parts = self.pg_sql.split('%s')
+            body = parts[0] + ''.join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+            self.name = "uni_" + hashlib.md5(sql.encode('utf-8')).hexdigest()[:16]
+            self.prepare_sql = f"PREPARE {self.name} AS {body}"
+
+
+class _SqlTranslationCache:
+    """SQLite→PostgreSQL SQL 翻译缓存（有界 LRU，按原始 SQL 文本缓存）"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, sql):
+        with self._lock:
+            entry = self._entries.get(sql)
+            if entry is not None:
+                self._entries.move_to_end(sql)
+                self.hits += 1
+                entry.uses += 1
+                return entry
+            self.misses += 1
+
+        entry = _TranslatedSql(sql)
+        entry.uses = 1
+        with self._lock:
+            self._entries[sql] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "prepare_threshold": PG_PREPARE_THRESHOLD,
+                "hot_statements": sum(
+                    1 for e in self._entries.values()
+                    if e.preparable and e.uses >= PG_PREPARE_THRESHOLD
+                ),
+            }
+
+
+_sql_cache = _SqlTranslationCache()
+
+
+def get_sql_cache_stats():
+    """获取 SQL 翻译缓存统计（命中、未命中、淘汰）"""
+    return _sql_cache.stats()
+
+
+# ==================== 表写版本与行数缓存 ====================
+# 每张表维护一个写版本号：连接上执行的 INSERT/UPDATE/DELETE 在提交后把对应表的版本 +1。
+# 列表页的 COUNT(*) 按 (规范化 SQL, 参数) 缓存，并记录查询涉及的所有表的版本，
+# 任一表版本变化即失效。绕过包装器的写入（原始游标、其他进程）由 COUNT_CACHE_TTL 兜底。
+
+_WRITE_SQL_RE = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+"?(\w+)',
+    re.IGNORECASE)
+_TABLE_REF_RE = re.compile(r'\b(?:FROM|JOIN)\s+"?([A-Za-z_]\w*)', re.IGNORECASE)
+
+_table_versions = {}
+_table_epoch = 0            # 全局版本：DDL、手动清缓存时 +1，使所有表失效
+_table_versions_lock = threading.Lock()
+
+
+@lru_cache(maxsize=2048)
+def _written_table(sql):
+    """返回写语句的目标表名，非写语句返回 None"""
+    match = _WRITE_SQL_RE.match(sql)
+    return match.group(1).lower() if match else None
+
+
+@lru_cache(maxsize=2048)
+def _referenced_tables(sql):
+    """返回查询中 FROM/JOIN 引用的表名（已排序）"""
+    return tuple(sorted({t.lower() for t in _TABLE_REF_RE.findall(sql)}))
+
+
+def bump_table_version(*tables):
+    """标记表已被修改；不传参数时使所有表失效"""
+    global _table_epoch
+    with _table_versions_lock:
+        if not tables:
+            _table_epoch += 1
+            return
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def get_table_versions(tables):
+    """获取一组表的当前写版本（含全局版本）"""
+    with _table_versions_lock:
+        return (_table_epoch,) + tuple(_table_versions.get(t, 0) for t in tables)
+
+
+COUNT_CACHE_TTL = 300           # 行数缓存最长有效期（秒）
+COUNT_APPROX_MIN_ROWS = int(os.getenv('COUNT_APPROX_MIN_ROWS', 100000))  # 无筛选列表达到该行数后用统计信息估算，0 表示关闭
+
+
+class _CountCache:
+    """COUNT(*) 结果缓存：(规范化 SQL, 参数) -> (表版本, 行数, 时间)"""
+
+    def __init__(self, maxsize=2048, ttl=COUNT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.approx = 0
+
+    def count(self, conn, count_sql, params=()):
+        sql = ' '.join(count_sql.split())
+        tables = _referenced_tables(sql)
+        key = (sql, tuple(params))
+        # 先取版本再计数：计数期间发生的写入会让这条缓存立即失效
+        versions = get_table_versions(tables)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions and now - entry[2] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        total = conn.execute(count_sql, params).fetchone()[0]
+
+        with self._lock:
+            self._entries[key] = (versions, total, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return total
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "approximate": self.approx,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_count_cache = _CountCache()
+
+
+def approximate_count(conn, table_name):
+    """
+    从统计信息估算表行数（PostgreSQL: pg_class.reltuples，SQLite: sqlite_stat1）
+    没有统计信息或低于 COUNT_APPROX_MIN_ROWS 时返回 None
+    """
+    if COUNT_APPROX_MIN_ROWS <= 0:
+        return None
+    try:
+        if is_postgresql():
+            row = conn.execute("SELECT reltuples FROM pg_class WHERE relname = ? AND relkind = 'r'", (table_name,)).fetchone()
+            estimate = int(row[0]) if row and row[0] is not None else -1
+        else:
+            # 每个索引一行，stat 第一个数为索引行数；部分索引偏小，取最大值
+            rows = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ?", (table_name,)).fetchall()
+            estimate = max((int(str(r[0]).split()[0]) for r in rows), default=-1)
+    except sqlite3.OperationalError:
+        # sqlite_stat1 在从未 ANALYZE 时不存在
+        return None
+    if estimate < COUNT_APPROX_MIN_ROWS:
+        return None
+    with _count_cache._lock:
+        _count_cache.approx += 1
+    return estimate
+
+
+def count_rows(conn, count_sql, params=(), approx_table=None):
+    """
+    列表总数：命中缓存直接返回，否则执行 COUNT(*) 并缓存
+    approx_table: 无筛选条件的列表传入主表名，大表直接使用统计信息估算的行数
+    """
+    if approx_table:
+        estimate = approximate_count(conn, approx_table)
+        if estimate is not None:
+            return estimate
+    return _count_cache.count(conn, count_sql, params)
+
+
+def get_count_cache_stats():
+    """获取行数缓存统计"""
+    return _count_cache.stats()
+
+
+def refresh_table_stats():
+    """刷新 SQLite 统计信息（sqlite_stat1），供估算行数和查询规划使用；PostgreSQL 由 autovacuum 维护"""
+    if is_postgresql():
+        return
+    with get_db_connection() as conn:
+        # 每个索引只抽样约 1000 行，大库上也只需毫秒级
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE")
+
+
 class _PgConnectionWrapper:
     """PostgreSQL 连接包装器，模拟 SQLite 接口"""
 
     def __init__(self, conn, pool):
         self._conn = conn
         self._pool = pool
+        self._dirty = set()
+
+    def _prepare(self, cur, entry):
+        """在当前会话预编译语句，失败时回滚到保存点并标记该语句不再尝试"""
+        prepared = getattr(self._conn, 'prepared', None)
+        if prepared is None:
+            return False
+        if entry.name in prepared:
+            return True
+        if len(prepared) >= PG_MAX_PREPARED_PER_CONN:
+            return False
+        cur.execute("SAVEPOINT uni_prepare")
+        try:
+            cur.execute(entry.prepare_sql)
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT uni_prepare")
+            entry.preparable = False
+            return False
+        finally:
+            cur.execute("RELEASE SAVEPOINT uni_prepare")
+        prepared.add(entry.name)
+        return True
 
     def execute(self, sql, params=None):
-        """执行 SQL，自动转换占位符和 SQLite 函数"""
-        import re
-
-        # 将 ? 占位符转换为 %s
-        pg_sql = sql.replace('?', '%s')
-
-        # 转换 SQLite 特有函数为 PostgreSQL 兼容
-        # IFNULL -> COALESCE
-        pg_sql = pg_sql.replace('IFNULL', 'COALESCE')
-
-        # datetime('now', 'localtime') -> NOW()
-        pg_sql = pg_sql.replace("datetime('now', 'localtime')", 'NOW()')
-        pg_sql = pg_sql.replace('datetime("now", "localtime")', 'NOW()')
-
-        # GROUP_CONCAT(col ORDER BY x) -> STRING_AGG(col::text, ',' ORDER BY x)
-        # 匹配 GROUP_CONCAT(字段 [ORDER BY ...])
-        def replace_group_concat(match):
-            content = match.group(1)
-            # 检查是否有 ORDER BY
-            order_match = re.search(r'\s+ORDER\s+BY\s+(.+)$', content, re.IGNORECASE)
-            if order_match:
-                col = content[:order_match.start()].strip()
-                order_by = order_match.group(1)
-                return f"STRING_AGG({col}::text, ',' ORDER BY {order_by})"
-            else:
-                return f"STRING_AGG({content}::text, ',')"
+        """执行 SQL，自动转换占位符和 SQLite 函数
 
-        pg_sql = re.sub(r'GROUP_CONCAT\(([^)]+)\)', replace_group_concat, pg_sql, flags=re.IGNORECASE)
+        翻译结果按原始 SQL 缓存；执行次数达到 PG_PREPARE_THRESHOLD 的语句
+        在每个会话中 PREPARE 一次，之后用 EXECUTE 调用，省去服务端解析和规划。
+        """
+        entry = _sql_cache.get(sql)
 
         cur = self._conn.cursor()
         if params:
-            cur.execute(pg_sql, params)
+            if (entry.preparable and entry.uses >= PG_PREPARE_THRESHOLD
+                    and isinstance(params, (list, tuple)) and len(params) == entry.param_count
+                    and self._prepare(cur, entry)):
+                placeholders = ', '.join(['%s'] * entry.param_count)
+                cur.execute(f"EXECUTE {entry.name} ({placeholders})", params)
+            else:
+                cur.execute(entry.pg_sql, params)
         else:
-            cur.execute(pg_sql)
+            cur.execute(entry.pg_sql)
+        table = _written_table(sql)
+        if table:
+            self._dirty.add(table)
+        return _DictCursorWrapper(cur)
+
+    def executemany(self, sql, seq_of_params):
+        """批量执行 SQL（翻译同 execute）"""
+        cur = self._conn.cursor()
+        cur.executemany(_sql_cache.get(sql).pg_sql, seq_of_params)
+        table = _written_table(sql)
+        if table:
+            self._dirty.add(table)
         return _DictCursorWrapper(cur)
 
     def executescript(self, script):
@@ -248,12 +886,17 @@ class _PgConnectionWrapper:
 
     def commit(self):
         self._conn.commit()
+        if self._dirty:
+            bump_table_version(*self._dirty)
+            self._dirty.clear()
 
     def rollback(self):
         self._conn.rollback()
+        self._dirty.clear()
 
     def close(self):
         """归还连接到池"""
+        self._dirty.clear()
         with _connection_lock:
             _active_connections.discard(self._conn)
         self._pool.putconn(self._conn)
@@ -341,32 +984,83 @@ def batch_execute(conn, sql, params_list):
     conn.executemany(sql, params_list)
 
 
-@lru_cache(maxsize=100)
-def get_cached_rate(currency_code):
-    """缓存汇率查询结果"""
-    with get_db_connection() as conn:
-        row = conn.execute(
-            "SELECT exchange_rate FROM uni_daily WHERE currency_code=? ORDER BY record_date DESC LIMIT 1",
-            (currency_code,)
-        ).fetchone()
-        return float(row[0]) if row else (180.0 if currency_code == 2 else 7.0)
+def bulk_insert(conn, table, columns, rows, page_size=1000):
+    """
+    批量插入多行（在调用方的事务中，不提交）
+    SQLite 使用 executemany；PostgreSQL 使用 psycopg2.extras.execute_values，
+    每 page_size 行拼成一条多值 INSERT，避免逐行往返
+    """
+    if not rows:
+        return 0
+    if isinstance(conn, _PgConnectionWrapper):
+        from psycopg2.extras import execute_values
+        cur = conn._conn.cursor()
+        execute_values(cur, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s", rows, page_size=page_size)
+        conn._dirty.add(table)
+    else:
+        placeholders = ', '.join(['?'] * len(columns))
+        conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+    return len(rows)
+
+
+def fetch_in(conn, sql, keys, chunk_size=500):
+    """
+    按一组键批量查询，sql 中用 {placeholders} 表示 IN 列表，例如
+    fetch_in(conn, "SELECT * FROM uni_quote WHERE quote_id IN ({placeholders})", ids)
+    键去重后分块查询（避免超出 SQLite 参数个数上限），返回全部行
+    """
+    keys = list(dict.fromkeys(k for k in keys if k is not None))
+    rows = []
+    for i in range(0, len(keys), chunk_size):
+        chunk = keys[i:i + chunk_size]
+        rows.extend(conn.execute(sql.format(placeholders=','.join(['?'] * len(chunk))), chunk).fetchall())
+    return rows
+
+
+_stream_seq = iter(range(1, 1 << 62))
 
 
-def get_exchange_rates():
-    """获取最新汇率，使用缓存"""
+def iter_rows(conn, sql, params=(), batch_size=2000):
+    """
+    逐批读取查询结果（生成器），用于大结果集导出，内存占用与结果行数无关
+    SQLite 游标本身按需取行；PostgreSQL 使用服务端命名游标，每次从服务器取 batch_size 行
+    """
+    if isinstance(conn, _PgConnectionWrapper):
+        cur = conn._conn.cursor(name=f"uni_stream_{next(_stream_seq)}")
+        cur.itersize = batch_size
+        cur.execute(_sql_cache.get(sql).pg_sql, params or None)
+        rows = _DictCursorWrapper(cur)
+    else:
+        cur = rows = conn.execute(sql, params)
     try:
-        return get_cached_rate(2), get_cached_rate(1)
-    except:
-        return 180.0, 7.0
+        while True:
+            batch = rows.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from batch
+    finally:
+        cur.close()
+
+
+def get_exchange_rates(as_of=None):
+    """获取汇率 (KRW, USD)，as_of 为空时为最新汇率（见 Sills/rate_service.py）"""
+    from Sills.rate_service import rates_as_of
+    return rates_as_of(as_of)
 
 
 def clear_cache():
     """清除所有缓存"""
-    get_cached_rate.cache_clear()
+    from Sills.rate_service import invalidate_rates
+    invalidate_rates()
+    _sql_cache.clear()
+    _count_cache.clear()
+    bump_table_version()
 
 
 def close_all_connections():
-    """关闭所有活跃的数据库连接"""
+    """关闭所有活跃的数据库连接（包括连接池中的空闲连接）"""
+    idle_count = _sqlite_pool.close_all()
+
     with _connection_lock:
         connections = list(_active_connections)
         _active_connections.clear()
@@ -379,15 +1073,13 @@ def close_all_connections():
 
     # 强制垃圾回收
     gc.collect()
-    print(f"[DB] 已关闭 {len(connections)} 个数据库连接")
+    print(f"[DB] 已关闭 {len(connections) + idle_count} 个数据库连接")
 
 
 def init_db():
-    """初始化数据库，支持 SQLite 和 PostgreSQL"""
-    if is_postgresql():
-        _init_db_postgresql()
-    else:
-        _init_db_sqlite()
+    """初始化数据库，支持 SQLite 和 PostgreSQL（按 schema_version 只执行未应用的迁移，见 Sills/db_migrations.py）"""
+    from Sills.db_migrations import run_migrations
+    run_migrations()
 
 
 def _init_db_postgresql():
@@ -871,7 +1563,7 @@ def _init_db_sqlite():
     CREATE INDEX IF NOT EXISTS idx_order_manager_cli ON uni_order_manager(cli_id);
     CREATE INDEX IF NOT EXISTS idx_order_manager_date ON uni_order_manager(order_date);
     CREATE INDEX IF NOT EXISTS idx_order_manager_rel_manager ON uni_order_manager_rel(manager_id);
-    CREATE INDEX IF NOT EXISTS idx_order_manager_rel_order ON uni_order_manager_rel(order_id);
+    CREATE INDEX IF NOT EXISTS idx_order_manager_rel_offer ON uni_order_manager_rel(offer_id);
 
     CREATE INDEX IF NOT EXISTS idx_daily_date ON uni_daily(record_date);
     CREATE INDEX IF NOT EXISTS idx_daily_currency ON uni_daily(currency_code);
@@ -894,6 +1586,15 @@ def _init_db_sqlite():
     CREATE INDEX IF NOT EXISTS idx_mail_filter_priority ON mail_filter_rule(priority DESC);
     CREATE INDEX IF NOT EXISTS idx_mail_folder_id ON uni_mail(folder_id);
 
+    -- 游标分页复合索引 (created_at DESC, 主键 DESC)
+    CREATE INDEX IF NOT EXISTS idx_cli_created_id ON uni_cli(created_at DESC, cli_id DESC);
+    CREATE INDEX IF NOT EXISTS idx_vendor_created_id ON uni_vendor(created_at DESC, vendor_id DESC);
+    CREATE INDEX IF NOT EXISTS idx_quote_created_id ON uni_quote(created_at DESC, quote_id DESC);
+    CREATE INDEX IF NOT EXISTS idx_offer_created_id ON uni_offer(created_at DESC, offer_id DESC);
+    CREATE INDEX IF NOT EXISTS idx_order_created_id ON uni_order(created_at DESC, order_id DESC);
+    CREATE INDEX IF NOT EXISTS idx_buy_created_id ON uni_buy(created_at DESC, buy_id DESC);
+    CREATE INDEX IF NOT EXISTS idx_mail_account_received_id ON uni_mail(account_id, is_sent, received_at DESC, id DESC);
+
     -- 联系人表（营销模块）
     CREATE TABLE IF NOT EXISTS uni_contact (
         contact_id TEXT PRIMARY KEY,
@@ -985,6 +1686,7 @@ def _init_db_sqlite():
     CREATE INDEX IF NOT EXISTS idx_contact_email ON uni_contact(email);
     CREATE INDEX IF NOT EXISTS idx_contact_country ON uni_contact(country);
     CREATE INDEX IF NOT EXISTS idx_contact_bounced ON uni_contact(is_bounced);
+    CREATE INDEX IF NOT EXISTS idx_contact_created_id ON uni_contact(created_at DESC, contact_id DESC);
 
     -- Email Task Manager 索引
     CREATE INDEX IF NOT EXISTS idx_task_status ON uni_email_task(status);
@@ -1209,27 +1911,91 @@ def _init_db_sqlite():
     clear_cache()
 
 
-def get_paginated_list(table_name, page=1, page_size=10, search_kwargs=None):
+# ==================== 游标（keyset）分页 ====================
+# 列表默认使用 LIMIT/OFFSET + COUNT(*)，越往后翻越慢。传入 after 参数时改用游标分页：
+#   after=""                     第一页
+#   after="<created_at>,<id>"    上一页返回的 next_cursor
+# 按 (排序列 DESC, 主键 DESC) 定位，配合同名复合索引，每页代价与翻到第几页无关；
+# 游标模式不统计总数，返回 next_cursor（没有更多数据时为 None）。
+
+def parse_keyset_cursor(after):
+    """解析游标 "<排序值>,<主键>"，空值表示第一页，返回 None 或 (sort_value, row_id)"""
+    if not after:
+        return None
+    sort_value, sep, row_id = str(after).partition(',')
+    if not sep or not row_id:
+        raise ValueError(f"无效的分页游标: {after}")
+    return sort_value, row_id
+
+
+def keyset_condition(sort_col, id_col, cursor):
+    """生成降序游标条件 (sort_col, id_col) < cursor，返回 (sql, params)"""
+    sort_value, row_id = cursor
+    # 先写 sort_col <= ? 让 SQLite/PostgreSQL 都能走复合索引的范围扫描
+    sql = f"{sort_col} <= ? AND ({sort_col} < ? OR {id_col} < ?)"
+    return sql, [sort_value, sort_value, row_id]
+
+
+def keyset_page(rows, page_size, sort_key, id_key):
+    """按 page_size + 1 条查询结果切出本页，返回 (rows, next_cursor)"""
+    rows = list(rows)
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, f"{last[sort_key]},{last[id_key]}"
+
+
+def get_paginated_list(table_name, page=1, page_size=10, search_kwargs=None, after=None, id_column=None):
     """
     Generic pagination and fuzzy search
     search_kwargs: {column_name: value}
+    after: 游标分页（见 parse_keyset_cursor），传入时忽略 page，返回 next_cursor 而不统计总数
+    id_column: 游标分页使用的主键列，默认 uni_xxx -> xxx_id
     """
     offset = (page - 1) * page_size
     query = f"SELECT * FROM {table_name}"
     params = []
+    conditions = []
 
     if search_kwargs:
-        conditions = []
         for col, val in search_kwargs.items():
             conditions.append(f"{col} LIKE ?")
             params.append(f"%{val}%")
+
+    if after is not None:
+        id_column = id_column or table_name.replace('uni_', '', 1) + '_id'
+        cursor = parse_keyset_cursor(after)
+        if cursor:
+            cond, cond_params = keyset_condition("created_at", id_column, cursor)
+            conditions.append(cond)
+            params.extend(cond_params)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY created_at DESC, {id_column} DESC LIMIT {page_size + 1}"
+
+        with get_db_connection() as conn:
+            items = conn.execute(query, params).fetchall()
+        items, next_cursor = keyset_page(items, page_size, 'created_at', id_column)
+
+        return {
+            "items": [
+                {k: ("" if v is None else v) for k, v in dict(row).items()}
+                for row in items
+            ],
+            "total_count": None,
+            "page_size": page_size,
+            "next_cursor": next_cursor
+        }
+
+    if conditions:
         query += " WHERE " + " AND ".join(conditions)
 
     count_query = f"SELECT COUNT(*) FROM ({query})"
     query += f" ORDER BY created_at DESC LIMIT {page_size} OFFSET {offset}"
 
     with get_db_connection() as conn:
-        total_count = conn.execute(count_query, params).fetchone()[0]
+        total_count = count_rows(conn, count_query, params, approx_table=None if conditions else table_name)
         items = conn.execute(query, params).fetchall()
 
     results = [
@@ -16,7 +16,8 @@ try:
 except ImportError:
     openpyxl = None
 
-from Sills.base import get_db_connection, get_exchange_rates
+from Sills.base import get_db_connection
+from Sills.rate_service import rate_as_of, CURRENCY_KRW
 
 
 # ============================================================
@@ -131,12 +132,14 @@ def get_total_style():
 # 核心函数
 # ============================================================
 
-def calculate_price_kwr(order, exchange_rate_krw):
-    """计算韩元价格"""
+def calculate_price_kwr(order, exchange_rate_krw=None):
+    """计算韩元价格，未指定汇率时使用订单日期当天的汇率"""
     price_kwr = order.get("price_kwr")
     if not price_kwr or float(price_kwr or 0) == 0:
         price_rmb = order.get("price_rmb")
         if price_rmb and float(price_rmb or 0) > 0:
+            if exchange_rate_krw is None:
+                exchange_rate_krw = rate_as_of(CURRENCY_KRW, order.get("order_date"))
             price_kwr = round(float(price_rmb) * exchange_rate_krw, 1)
         else:
             price_kwr = 0
@@ -239,9 +242,6 @@ def generate_ci_excel(orders, template_dir, output_path, invoice_no):
             if ws.row_dimensions[src_row].height:
                 ws.row_dimensions[dst_row].height = ws.row_dimensions[src_row].height
 
-    # 获取汇率
-    krw_val, _ = get_exchange_rates()
-
     # 填充数据
     total_qty = 0
     total_amount = 0
@@ -268,7 +268,7 @@ def generate_ci_excel(orders, template_dir, output_path, invoice_no):
         ws.cell(row=row, column=5).number_format = '#,##0'
         total_qty += qty
 
-        price_kwr = calculate_price_kwr(order, krw_val)
+        price_kwr = calculate_price_kwr(order)
         ws.cell(row=row, column=6).value = price_kwr
         ws.cell(row=row, column=6).number_format = '#,##0'
 
@@ -463,13 +463,11 @@ def generate_ci_kr_from_offers(offer_ids, output_base=None, template_dir=None):
     if not template_dir:
         template_dir = os.path.join(project_root, "templates", "ci_kr")
 
-    # 获取汇率
-    krw_val, _ = get_exchange_rates()
-
-    # 计算韩元价格
+    # 计算韩元价格（按报价日期的汇率）
     for offer in offers:
         price_rmb = offer.get("offer_price_rmb")
         if price_rmb and float(price_rmb or 0) > 0:
+            krw_val = rate_as_of(CURRENCY_KRW, offer.get("offer_date"))
             offer["price_kwr"] = round(float(price_rmb) * krw_val, 1)
         else:
             offer["price_kwr"] = 0
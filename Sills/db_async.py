@@ -0,0 +1,125 @@
+"""
+异步数据库访问层
+
+main.py 的路由都是 async def，直接调用同步的 Sills.db_* 函数会阻塞唯一的事件循环，
+一次大导入或慢查询会让所有用户一起等待。本模块把这些调用放到专用的有界线程池中执行：
+
+- query 线程池：列表页、详情等短查询
+- bulk 线程池：导入、批量转换、任意 SQL 等长任务，与查询隔离，避免大导入占满查询线程
+
+用法：
+    from Sills.db_async import run_db, run_db_bulk
+    results, total = await run_db(get_quote_list, page=page, page_size=page_size)
+    success_count, errors = await run_db_bulk(batch_import_quote_from_rows, rows_data)
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Sills.base import POOL_SIZE
+
+# 线程数：查询线程池不超过连接池常驻连接数，批量线程池保持很小
+DB_QUERY_WORKERS = int(os.getenv('DB_QUERY_WORKERS', max(2, POOL_SIZE - 2)))
+DB_BULK_WORKERS = int(os.getenv('DB_BULK_WORKERS', 2))
+
+
+class DbThreadPool:
+    """带排队统计的数据库线程池"""
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"db-{name}")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queued = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    def submit(self, func, *args, **kwargs):
+        """提交任务，返回 concurrent.futures.Future"""
+        enqueued_at = time.perf_counter()
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        def task():
+            started_at = time.perf_counter()
+            wait = started_at - enqueued_at
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            failed = False
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    if failed:
+                        self._failed += 1
+                    self._total_run += time.perf_counter() - started_at
+
+        return self._executor.submit(task)
+
+    async def run(self, func, *args, **kwargs):
+        """在线程池中执行同步函数并等待结果（不阻塞事件循环）"""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            done = self._completed or 1
+            started = self._completed + self._active or 1
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "max_queued": self._max_queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": round(self._total_wait / started * 1000, 2),
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "avg_run_ms": round(self._total_run / done * 1000, 2),
+            }
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait)
+
+
+query_pool = DbThreadPool("query", DB_QUERY_WORKERS)
+bulk_pool = DbThreadPool("bulk", DB_BULK_WORKERS)
+
+
+async def run_db(func, *args, **kwargs):
+    """在查询线程池中执行数据库函数"""
+    return await query_pool.run(func, *args, **kwargs)
+
+
+async def run_db_bulk(func, *args, **kwargs):
+    """在批量线程池中执行耗时的数据库函数（导入、批量转换等）"""
+    return await bulk_pool.run(func, *args, **kwargs)
+
+
+def get_db_executor_stats():
+    """获取各数据库线程池的排队统计"""
+    return {pool.name: pool.stats() for pool in (query_pool, bulk_pool)}
+
+
+def shutdown_db_executors(wait=False):
+    """关闭数据库线程池（应用退出时调用）"""
+    query_pool.shutdown(wait=wait)
+    bulk_pool.shutdown(wait=wait)
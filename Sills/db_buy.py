@@ -1,12 +1,19 @@
 import sqlite3
 import uuid
 from datetime import datetime
-from Sills.base import get_db_connection, get_exchange_rates
+from Sills.base import get_db_connection, get_exchange_rates, bulk_insert, fetch_in, count_rows, parse_keyset_cursor, keyset_condition, keyset_page
+from Sills.db_search import build_search_condition
+from Sills.db_mpn import normalize_mpn, with_mpn_norm
+from Sills.db_sequence import next_id, allocate_ids
+from Sills.entity_cache import entity_exists
 
-def get_buy_list(page=1, page_size=10, search_kw="", order_id="", start_date="", end_date="", cli_id="", is_shipped=""):
-    offset = (page - 1) * page_size
-
-    base_query = """
+def build_buy_list_query(search_kw="", order_id="", start_date="", end_date="", cli_id="", is_shipped=""):
+    """采购列表的 FROM/WHERE 子句和参数（列表页与按条件导出共用）"""
+    # 型号/单号走搜索索引，供应商名先在 uni_vendor 上匹配
+    search_sql, params = build_search_condition('uni_buy', 'b', search_kw, related=[
+        "SELECT buy_id FROM uni_buy WHERE vendor_id IN (SELECT vendor_id FROM uni_vendor WHERE vendor_name LIKE ?)",
+    ])
+    base_query = f"""
     FROM uni_buy b
     LEFT JOIN uni_order ord ON b.order_id = ord.order_id
     LEFT JOIN uni_vendor v ON b.vendor_id = v.vendor_id
@@ -14,9 +21,8 @@ def get_buy_list(page=1, page_size=10, search_kw="", order_id="", start_date="",
     LEFT JOIN uni_offer off ON ord.offer_id = off.offer_id
     LEFT JOIN uni_order_manager_rel rel ON rel.offer_id = off.offer_id
     LEFT JOIN uni_order_manager m ON rel.manager_id = m.manager_id
-    WHERE (b.buy_id LIKE ? OR b.buy_mpn LIKE ? OR v.vendor_name LIKE ?)
+    WHERE {search_sql}
     """
-    params = [f"%{search_kw}%", f"%{search_kw}%", f"%{search_kw}%"]
 
     if order_id:
         base_query += " AND b.order_id = ?"
@@ -33,20 +39,45 @@ def get_buy_list(page=1, page_size=10, search_kw="", order_id="", start_date="",
     if is_shipped in ('0', '1'):
         base_query += " AND b.is_shipped = ?"
         params.append(int(is_shipped))
+    return base_query, params
+
+
+def get_buy_list(page=1, page_size=10, search_kw="", order_id="", start_date="", end_date="", cli_id="", is_shipped="", after=None):
+    """
+    采购列表
+    after: 游标分页 "<created_at>,<buy_id>"（"" 为第一页），传入时返回 (results, next_cursor)
+    """
+    offset = (page - 1) * page_size
+    base_query, params = build_buy_list_query(search_kw, order_id, start_date, end_date, cli_id, is_shipped)
+
+    order_sql = "ORDER BY b.created_at DESC"
+    limit = page_size
+    if after is not None:
+        cursor = parse_keyset_cursor(after)
+        if cursor:
+            cond, cond_params = keyset_condition("b.created_at", "b.buy_id", cursor)
+            base_query += f" AND {cond}"
+            params.extend(cond_params)
+        order_sql = "ORDER BY b.created_at DESC, b.buy_id DESC"
+        limit, offset = page_size + 1, 0
 
     query = f"""
     SELECT b.*, ord.order_no, v.vendor_name, v.address as vendor_address, c.cli_id, c.cli_name, c.margin_rate, off.offer_price_rmb,
            off.inquiry_qty, off.date_code, off.delivery_date, m.customer_order_no, m.manager_id
     {base_query}
-    ORDER BY b.created_at DESC
+    {order_sql}
     LIMIT ? OFFSET ?
     """
     
     count_query = f"SELECT COUNT(*) {base_query}"
     
     with get_db_connection() as conn:
-        total = conn.execute(count_query, params).fetchone()[0]
-        items = conn.execute(query, params + [page_size, offset]).fetchall()
+        if after is None:
+            unfiltered = not any([search_kw, order_id, start_date, end_date, cli_id, is_shipped])
+            total = count_rows(conn, count_query, params, approx_table='uni_buy' if unfiltered else None)
+        items = conn.execute(query, params + [limit, offset]).fetchall()
+        if after is not None:
+            items, total = keyset_page(items, page_size, 'created_at', 'buy_id')
 
         results = []
         for row in items:
@@ -90,16 +121,7 @@ def add_buy(data, conn=None):
         try:
             if not buy_id:
                 # 生成递增的5位数采购编号
-                last_buy = conn.execute("SELECT buy_id FROM uni_buy WHERE buy_id LIKE 'c%' ORDER BY buy_id DESC LIMIT 1").fetchone()
-                if last_buy:
-                    try:
-                        last_num = int(last_buy['buy_id'][1:])  # 去掉前缀c，获取数字部分
-                        new_num = last_num + 1
-                    except:
-                        new_num = 1
-                else:
-                    new_num = 1
-                buy_id = f"c{new_num:05d}"  # 格式化为5位数，例如 c00001
+                buy_id = next_id('buy', conn)
 
             # Check uniqueness
             existing = conn.execute("SELECT buy_id FROM uni_buy WHERE buy_id = ?", (buy_id,)).fetchone()
@@ -121,10 +143,8 @@ def add_buy(data, conn=None):
                 vendor_id = None
             
             # Check Vendor
-            if vendor_id:
-                v_row = conn.execute("SELECT vendor_id FROM uni_vendor WHERE vendor_id = ?", (vendor_id,)).fetchone()
-                if not v_row:
-                    return False, f"供应商编号 {vendor_id} 不存在"
+            if vendor_id and not entity_exists('vendor', vendor_id, conn):
+                return False, f"供应商编号 {vendor_id} 不存在"
 
             buy_date = data.get('buy_date') or datetime.now().strftime("%Y-%m-%d")
             
@@ -144,13 +164,13 @@ def add_buy(data, conn=None):
             
             sql = """
             INSERT INTO uni_buy (
-                buy_id, buy_date, order_id, vendor_id, buy_mpn, buy_brand, buy_price_rmb, buy_qty,
+                buy_id, buy_date, order_id, vendor_id, buy_mpn, mpn_norm, buy_brand, buy_price_rmb, buy_qty,
                 sales_price_rmb, total_amount, is_source_confirmed, is_ordered, is_instock, is_shipped, remark
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
             params = (
                 buy_id, buy_date, order_id, vendor_id,
-                data.get('buy_mpn', ''), data.get('buy_brand', ''),
+                data.get('buy_mpn', ''), normalize_mpn(data.get('buy_mpn')), data.get('buy_brand', ''),
                 price, qty, sales_price, total_amount,
                 int(data.get('is_source_confirmed', 0)),
                 int(data.get('is_ordered', 0)),
@@ -212,51 +232,69 @@ def batch_import_buy(text):
             
     return success_count, errors
 
+_CONVERT_BUY_COLUMNS = (
+    'buy_id', 'buy_date', 'order_id', 'vendor_id', 'buy_mpn', 'mpn_norm', 'buy_brand', 'buy_price_rmb', 'buy_qty',
+    'sales_price_rmb', 'total_amount', 'is_source_confirmed', 'is_ordered', 'is_instock', 'is_shipped', 'remark'
+)
+
+
 def batch_convert_from_order(order_ids):
+    """
+    批量从销售订单转采购（集合操作，单事务）
+    一次联查取出订单、对应报价（供应商/数量/价格）和已存在的采购记录，
+    一次分配采购编号、批量插入，再批量回写订单的 is_transferred
+    """
     if not order_ids: return False, "未选中记录"
     try:
-        success_count = 0
         errors = []
         with get_db_connection() as conn:
-            placeholders = ','.join(['?'] * len(order_ids))
-            rows = conn.execute(f"SELECT * FROM uni_order WHERE order_id IN ({placeholders})", order_ids).fetchall()
-            
-            for row in rows:
-                order_data = dict(row)
-                existing = conn.execute("SELECT buy_id FROM uni_buy WHERE order_id = ?", (order_data['order_id'],)).fetchone()
-                if existing:
+            rows = fetch_in(conn, """
+                SELECT o.order_id, o.inquiry_mpn, o.inquiry_brand, o.remark,
+                       f.vendor_id, f.quoted_qty, f.offer_price_rmb, f.cost_price_rmb,
+                       v.vendor_id AS known_vendor_id, MIN(b.buy_id) AS existing_buy_id
+                FROM uni_order o
+                LEFT JOIN uni_offer f ON f.offer_id = o.offer_id
+                LEFT JOIN uni_vendor v ON v.vendor_id = f.vendor_id
+                LEFT JOIN uni_buy b ON b.order_id = o.order_id
+                WHERE o.order_id IN ({placeholders})
+                GROUP BY o.order_id, o.inquiry_mpn, o.inquiry_brand, o.remark,
+                         f.vendor_id, f.quoted_qty, f.offer_price_rmb, f.cost_price_rmb, v.vendor_id
+            """, order_ids)
+
+            todo = []
+            for order_data in rows:
+                if order_data['existing_buy_id']:
                     errors.append(f"{order_data['order_id']}: 已存在采购记录")
                     continue
-                
-                offer_info = conn.execute("SELECT * FROM uni_offer WHERE offer_id = ?", (order_data['offer_id'],)).fetchone()
-                
-                data = {
-                    "order_id": order_data['order_id'],
-                    "buy_mpn": order_data['inquiry_mpn'],
-                    "buy_brand": order_data['inquiry_brand'],
-                    "buy_qty": 0,
-                    "buy_price_rmb": 0.0,
-                    "sales_price_rmb": 0.0,
-                    "remark": order_data['remark']
-                }
-                
-                if offer_info:
-                    data['vendor_id'] = offer_info['vendor_id']
-                    data['buy_qty'] = offer_info['quoted_qty']
-                    data['sales_price_rmb'] = offer_info['offer_price_rmb']
-                    data['buy_price_rmb'] = offer_info['cost_price_rmb']
-
-                ok, msg = add_buy(data, conn=conn)
-                if ok: 
-                    success_count += 1
-                    # Update source order status
-                    conn.execute("UPDATE uni_order SET is_transferred = '已转' WHERE order_id = ?", (order_data['order_id'],))
-                else: 
-                    errors.append(msg)
-            
-            if success_count > 0:
+                vendor_id = order_data['vendor_id']
+                if vendor_id and str(vendor_id).strip() == "":
+                    vendor_id = None
+                if vendor_id and not order_data['known_vendor_id']:
+                    errors.append(f"{order_data['order_id']}: 供应商编号 {vendor_id} 不存在")
+                    continue
+                todo.append((order_data, vendor_id))
+
+            if todo:
+                buy_ids = allocate_ids('buy', len(todo), conn)
+                buy_date = datetime.now().strftime("%Y-%m-%d")
+                insert_data = []
+                for buy_id, (order_data, vendor_id) in zip(buy_ids, todo):
+                    price = float(order_data['cost_price_rmb'] or 0.0)
+                    qty = int(order_data['quoted_qty'] or 0)
+                    buy_mpn = order_data['inquiry_mpn'] or ''
+                    insert_data.append((
+                        buy_id, buy_date, order_data['order_id'], vendor_id,
+                        buy_mpn, normalize_mpn(buy_mpn), order_data['inquiry_brand'] or '',
+                        price, qty, float(order_data['offer_price_rmb'] or 0.0), round(price * qty, 2),
+                        0, 0, 0, 0, order_data['remark'] or ''
+                    ))
+                bulk_insert(conn, 'uni_buy', _CONVERT_BUY_COLUMNS, insert_data)
+                # Update source order status
+                conn.executemany("UPDATE uni_order SET is_transferred = '已转' WHERE order_id = ?",
+                                 [(order_data['order_id'],) for order_data, _ in todo])
                 conn.commit()
-                
+
+        success_count = len(todo)
         if success_count == 0 and errors:
             return False, errors[0]
         return True, f"成功转换 {success_count} 条记录" + (f" (失败 {len(errors)} 条)" if errors else "")
@@ -295,6 +333,7 @@ def update_buy(buy_id, data):
             data['vendor_id'] = None
         if 'order_id' in data and not str(data['order_id']).strip():
             data['order_id'] = None
+        with_mpn_norm('uni_buy', data)
 
         if 'buy_price_rmb' in data or 'buy_qty' in data:
             with get_db_connection() as conn:
@@ -1,5 +1,7 @@
 import sqlite3
 from Sills.base import get_db_connection
+from Sills.db_sequence import next_id
+from Sills.entity_cache import invalidate_entities
 
 
 def sync_cli_marketing_status(cli_id=None):
@@ -33,16 +35,20 @@ def sync_cli_marketing_status(cli_id=None):
                     (cli_id,)
                 ).fetchone()
 
+                flags = (1 if has_contact else 0, 1 if has_inquiry else 0, 1 if has_order else 0)
+                current = conn.execute(
+                    "SELECT is_contacted, has_inquiry, has_order FROM uni_cli WHERE cli_id = ?",
+                    (cli_id,)
+                ).fetchone()
+                # 状态未变化时不写 uni_cli：每次新增询价/订单/联系人都会调用，写入会使客户缓存整表重新载入
+                if current is None or tuple(current) == flags:
+                    return True, "状态同步成功"
+
                 conn.execute("""
                     UPDATE uni_cli
                     SET is_contacted = ?, has_inquiry = ?, has_order = ?
                     WHERE cli_id = ?
-                """, (
-                    1 if has_contact else 0,
-                    1 if has_inquiry else 0,
-                    1 if has_order else 0,
-                    cli_id
-                ))
+                """, flags + (cli_id,))
             else:
                 # 同步所有客户
                 # 设置 is_contacted
@@ -73,6 +79,8 @@ def sync_cli_marketing_status(cli_id=None):
                 """)
 
             conn.commit()
+
+            invalidate_entities('cli')
             return True, "状态同步成功"
     except Exception as e:
         return False, str(e)
@@ -99,6 +107,8 @@ def update_cli_domain_from_email():
                     updated += 1
 
             conn.commit()
+
+            invalidate_entities('cli')
             return True, f"更新了 {updated} 个客户的域名"
     except Exception as e:
         return False, str(e)
@@ -125,15 +135,9 @@ def get_cli_list(page=1, page_size=10, search_kw=""):
         ]
         return results, total
 
-def get_next_cli_id():
-    with get_db_connection() as conn:
-        row = conn.execute("SELECT MAX(cli_id) FROM uni_cli").fetchone()
-        if row and row[0]:
-            # Assuming format like C001
-            num_part = ''.join(filter(str.isdigit, row[0]))
-            next_num = int(num_part) + 1 if num_part else 1
-            return f"C{next_num:03d}"
-        return "C001"
+def get_next_cli_id(conn=None):
+    """分配下一个客户编号（C001 格式），已有写事务时传入 conn"""
+    return next_id('cli', conn)
 
 def add_cli(data):
     try:
@@ -166,6 +170,7 @@ def add_cli(data):
         with get_db_connection() as conn:
             conn.execute(sql, list(data.values()))
             conn.commit()
+            invalidate_entities('cli')
             return True, f"客户 {data['cli_id']} 添加成功"
     except Exception as e:
         return False, str(e)
@@ -210,6 +215,7 @@ def update_cli(cli_id, data):
         with get_db_connection() as conn:
             conn.execute(sql, params)
             conn.commit()
+            invalidate_entities('cli')
             return True, "更新成功"
     except Exception as e:
         return False, str(e)
@@ -219,6 +225,7 @@ def delete_cli(cli_id):
         with get_db_connection() as conn:
             conn.execute("DELETE FROM uni_cli WHERE cli_id = ?", (cli_id,))
             conn.commit()
+            invalidate_entities('cli')
             return True, "删除成功"
     except Exception as e:
         return False, str(e)
@@ -242,4 +249,6 @@ def batch_delete_cli(cli_ids):
 
         conn.commit()
 
+        invalidate_entities('cli')
+
     return deleted_count, failed_count, "批量删除完成"
@@ -27,6 +27,9 @@ PG_CONFIG = {
     'password': os.getenv('PG_PASSWORD', '')
 }
 
+# PostgreSQL 服务端预编译语句：同一条 SQL 执行次数达到该阈值后使用 PREPARE/EXECUTE，0 表示关闭
+PG_PREPARE_THRESHOLD = int(os.getenv('PG_PREPARE_THRESHOLD', 5))
+
 
 def get_db_type():
     """获取当前数据库类型"""
@@ -5,9 +5,9 @@
 import sqlite3
 import re
 from urllib.parse import unquote
-from Sills.base import get_db_connection
+from Sills.base import get_db_connection, count_rows, parse_keyset_cursor, keyset_condition, keyset_page
 from Sills.db_config import get_datetime_now
-from datetime import datetime
+from Sills.db_sequence import next_id
 
 
 def purify_email(email):
@@ -46,19 +46,16 @@ def extract_domain(email):
     return email.split('@')[-1].lower().strip()
 
 
-def get_next_contact_id():
-    """获取下一个联系人ID (CT+时间戳+随机数格式)"""
-    from datetime import datetime
-    import random
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    rand_suffix = random.randint(1000, 9999)
-    return f"CT{timestamp}{rand_suffix}"
+def get_next_contact_id(conn=None):
+    """获取下一个联系人ID (CT+时间戳+4位序号格式)"""
+    return next_id('contact', conn)
 
 
-def get_contact_list(page=1, page_size=20, search_kw="", filters=None):
+def get_contact_list(page=1, page_size=20, search_kw="", filters=None, after=None):
     """
     获取联系人列表
     filters: {cli_id, country, is_bounced, is_read, has_sent}
+    after: 游标分页 "<created_at>,<contact_id>"（"" 为第一页），传入时返回 (results, next_cursor)
     """
     offset = (page - 1) * page_size
 
@@ -89,6 +86,17 @@ def get_contact_list(page=1, page_size=20, search_kw="", filters=None):
             else:
                 where_clauses.append("c.send_count = 0")
 
+    order_sql = "ORDER BY c.created_at DESC"
+    limit = page_size
+    if after is not None:
+        cursor = parse_keyset_cursor(after)
+        if cursor:
+            cond, cond_params = keyset_condition("c.created_at", "c.contact_id", cursor)
+            where_clauses.append(cond)
+            params.extend(cond_params)
+        order_sql = "ORDER BY c.created_at DESC, c.contact_id DESC"
+        limit, offset = page_size + 1, 0
+
     where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
 
     # LEFT JOIN uni_cli（正式客户）和 uni_prospect（待开发客户）
@@ -100,7 +108,7 @@ def get_contact_list(page=1, page_size=20, search_kw="", filters=None):
     LEFT JOIN uni_cli cli ON c.cli_id = cli.cli_id
     LEFT JOIN uni_prospect p ON c.domain = p.domain AND p.status = 'pending'
     {where_sql}
-    ORDER BY c.created_at DESC
+    {order_sql}
     LIMIT ? OFFSET ?
     """
 
@@ -113,8 +121,11 @@ def get_contact_list(page=1, page_size=20, search_kw="", filters=None):
     """
 
     with get_db_connection() as conn:
-        total = conn.execute(count_query, params).fetchone()[0]
-        items = conn.execute(query, params + [page_size, offset]).fetchall()
+        if after is None:
+            total = count_rows(conn, count_query, params, approx_table=None if where_clauses else 'uni_contact')
+        items = conn.execute(query, params + [limit, offset]).fetchall()
+        if after is not None:
+            items, total = keyset_page(items, page_size, 'created_at', 'contact_id')
 
         results = [
             {k: ("" if v is None else v) for k, v in dict(row).items()}
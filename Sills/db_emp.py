@@ -1,6 +1,7 @@
 import sqlite3
 import hashlib
 from Sills.base import get_db_connection
+from Sills.entity_cache import invalidate_entities
 
 def hash_password(password):
     return hashlib.md5(password.encode()).hexdigest()
@@ -48,6 +49,7 @@ def add_employee(data):
         with get_db_connection() as conn:
             conn.execute(sql, list(data.values()))
             conn.commit()
+            invalidate_entities('emp')
             return True, f"员工 {emp_id} 添加成功"
     except Exception as e:
         return False, str(e)
@@ -90,6 +92,7 @@ def change_password(emp_id, new_password):
     with get_db_connection() as conn:
         conn.execute("UPDATE uni_emp SET password = ? WHERE emp_id = ?", (hash_password(new_password), emp_id))
         conn.commit()
+        invalidate_entities('emp')
         return True, "密码修改成功"
 
 def update_employee(emp_id, data):
@@ -106,6 +109,7 @@ def update_employee(emp_id, data):
         with get_db_connection() as conn:
             conn.execute(sql, params)
             conn.commit()
+            invalidate_entities('emp')
             return True, "更新成功"
     except Exception as e:
         return False, str(e)
@@ -115,6 +119,7 @@ def delete_employee(emp_id):
         with get_db_connection() as conn:
             conn.execute("DELETE FROM uni_emp WHERE emp_id = ?", (emp_id,))
             conn.commit()
+            invalidate_entities('emp')
             return True, "删除成功"
     except Exception as e:
         return False, str(e)
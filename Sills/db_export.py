@@ -0,0 +1,187 @@
+"""
+按筛选条件导出报价/销售订单/采购（CSV、XLSX）
+原有 /api/*/export_csv 需要前端传入全部 ID，并在内存中拼出整个文件。
+
+- 筛选条件与列表页相同（build_*_list_query），列与原 ID 导出一致
+- iter_rows 逐批读取（PostgreSQL 用服务端游标），CSV 每批编码后立即输出
+- XLSX 用 openpyxl 只写模式：行数据写入临时文件，保存后按块读出，内存占用与行数无关
+- KRW/USD 为空时按单据日期的汇率补算（与列表页一致），每个日期只查一次汇率
+"""
+import csv
+import io
+import tempfile
+
+from Sills.base import get_db_connection, get_exchange_rates, iter_rows
+from Sills.db_buy import build_buy_list_query
+from Sills.db_offer import build_offer_list_query
+from Sills.db_order import build_order_list_query
+
+BATCH_SIZE = 2000
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': "text/csv; charset=utf-8",
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _fill_foreign(price_rmb, kwr, usd, rates):
+    """KRW/USD 已有值时原样返回，为空或 0 时按汇率补算"""
+    krw_rate, usd_rate = rates
+    if not kwr or float(kwr) == 0:
+        if krw_rate > 10:
+            kwr = round(price_rmb * krw_rate, 1)
+        else:
+            kwr = round(price_rmb / krw_rate, 1) if krw_rate else 0
+    if not usd or float(usd) == 0:
+        usd = round(price_rmb * usd_rate, 2) if usd_rate else 0
+    return kwr, usd
+
+
+def _offer_row(r, rates):
+    price = float(r['offer_price_rmb'] or 0)
+    cost = float(r['cost_price_rmb'] or 0)
+    kwr, usd = _fill_foreign(price, r['price_kwr'], r['price_usd'], rates)
+    profit = round(price - cost, 3)
+    return [
+        r['offer_date'] or '', r['offer_id'], r['cli_name'] or '', r['quote_id'] or '',
+        r['inquiry_mpn'] or '', r['quoted_mpn'] or '', r['inquiry_brand'] or '', r['quoted_brand'] or '',
+        r['inquiry_qty'] or 0, r['quoted_qty'] or 0, cost, price, kwr, usd,
+        profit, int(round(profit * int(r['quoted_qty'] or 0), 0)),
+        r['vendor_name'] or '', r['date_code'] or '', r['delivery_date'] or '', r['emp_name'] or '',
+        r['is_transferred'] or '未转', (r['remark'] or '').replace('\n', ' '),
+    ]
+
+
+def _order_row(r, rates):
+    price = float(r['price_rmb'] or 0)
+    cost = float(r['cost_price_rmb'] or 0)
+    kwr, usd = _fill_foreign(price, r['price_kwr'], r['price_usd'], rates)
+    return [
+        r['order_date'] or '', r['order_no'] or r['order_id'], r['cli_name'] or '', r['offer_id'] or '',
+        r['inquiry_mpn'] or '', r['inquiry_brand'] or '', f"{price:.2f}", kwr, usd, f"{cost:.2f}",
+        round(price - cost, 3), r['inquiry_qty'] or '', r['quoted_qty'] or '',
+        r['vendor_name'] or '', r['date_code'] or '', r['delivery_date'] or '', r['return_status'] or '正常',
+        '已完结' if r['is_finished'] == 1 else '未完结', '已付款' if r['is_paid'] == 1 else '未付款',
+        r['paid_amount'] or 0, r['is_transferred'] or '未转', r['remark'] or '',
+    ]
+
+
+def _buy_row(r, rates):
+    price = float(r['buy_price_rmb'] or 0)
+    kwr, usd = _fill_foreign(price, None, None, rates)  # 采购表不保存 KRW/USD
+    return [
+        r['buy_date'] or '', r['buy_id'], r['order_no'] or '', r['cli_id'] or '', r['cli_name'] or '',
+        r['vendor_name'] or '', r['vendor_address'] or '', r['buy_mpn'] or '', r['buy_brand'] or '',
+        r['date_code'] or '', r['delivery_date'] or '', f"{price:.2f}", f"{float(r['sales_price_rmb'] or 0):.2f}",
+        kwr, usd, r['buy_qty'] or 0, r['total_amount'] or 0,
+        '是' if r['is_source_confirmed'] == 1 else '否', '是' if r['is_ordered'] == 1 else '否',
+        '是' if r['is_instock'] == 1 else '否', '是' if r['is_shipped'] == 1 else '否', r['remark'] or '',
+    ]
+
+
+# 表 -> (列表查询构造函数, SELECT 列, 排序, 日期列, 表头, 行格式化)
+EXPORTS = {
+    'offer': (
+        build_offer_list_query,
+        "SELECT o.*, v.vendor_name, e.emp_name, c.cli_name",
+        "ORDER BY o.offer_date DESC, o.created_at DESC",
+        'offer_date',
+        ['日期', '报价编号', '客户名称', '需求编号', '询价型号', '报价型号', '需求品牌', '报价品牌',
+         '需求数量(pcs)', '报价数量(pcs)', '成本价', '报价(RMB)', '报价(KWR)', '报价(USD)',
+         '利润', '总利润', '供应商', '批号(DC)', '交期(LT)', '负责人', '已转', '备注'],
+        _offer_row,
+    ),
+    'order': (
+        build_order_list_query,
+        """SELECT o.*, c.cli_name, off.inquiry_qty, off.quoted_qty, off.date_code, off.delivery_date,
+                  v.vendor_name""",
+        "ORDER BY o.order_date DESC, o.created_at DESC",
+        'order_date',
+        ['订单日期', '订单编号', '客户', '报价编号', '报价型号', '品牌', '报价(RMB)', '报价(KWR)', '报价(USD)',
+         '成本(RMB)', '利润', '需求数量(pcs)', '报价数量(pcs)', '供应商', '批号(DC)', '货期', '退货状态',
+         '完结', '付款', '已付金额', '已转', '备注'],
+        _order_row,
+    ),
+    'buy': (
+        build_buy_list_query,
+        """SELECT b.*, ord.order_no, v.vendor_name, v.address AS vendor_address, c.cli_id, c.cli_name,
+                  off.date_code, off.delivery_date""",
+        "ORDER BY b.created_at DESC",
+        'buy_date',
+        ['日期', '采购编号', '对应销售单', '客户ID', '客户名称', '供应商', '供应商地址', '型号', '品牌',
+         '批号(DC)', '货期', '采购单价(RMB)', '销售报价(RMB)', '采购单价(KWR)', '采购单价(USD)', '数量',
+         '总额(RMB)', '货源确认', '下单确认', '入库确认', '发货确认', '备注'],
+        _buy_row,
+    ),
+}
+
+
+def iter_export_rows(table, **filters):
+    """
+    按列表页筛选条件逐行生成导出数据（第一行为表头）
+    filters 为对应 build_*_list_query 的参数，例如 search_kw、start_date、cli_id
+    """
+    if table not in EXPORTS:
+        raise ValueError(f"不支持导出：{table}")
+    build_query, select_sql, order_sql, date_col, headers, format_row = EXPORTS[table]
+    from_sql, params = build_query(**filters)
+    yield headers
+    rates = {}
+    keys = None
+    with get_db_connection() as conn:
+        for row in iter_rows(conn, f"{select_sql} {from_sql} {order_sql}", params, BATCH_SIZE):
+            # sqlite3.Row 按列名取值每次都要查找列名，先按位置转成字典（重名列取最后一个）
+            if keys is None:
+                keys = list(row.keys())
+            r = dict(zip(keys, row[:]))
+            day = r[date_col] or None
+            if day not in rates:
+                rates[day] = get_exchange_rates(day)
+            yield format_row(r, rates[day])
+
+
+def _csv_chunks(rows):
+    """每 BATCH_SIZE 行编码一次（UTF-8 BOM，Excel 直接打开不乱码）"""
+    buf = io.StringIO()
+    buf.write('\ufeff')
+    writer = csv.writer(buf)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % BATCH_SIZE == 0:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+def _xlsx_chunks(rows, title):
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    for row in rows:
+        ws.append(row)
+    with tempfile.TemporaryFile() as f:
+        wb.save(f)
+        f.seek(0)
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def stream_export(table, fmt="csv", **filters):
+    """
+    返回 (字节块生成器, media_type)，供 StreamingResponse 使用
+    fmt: csv / xlsx；筛选条件同 iter_export_rows
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式：{fmt}")
+    if table not in EXPORTS:
+        raise ValueError(f"不支持导出：{table}")
+    rows = iter_export_rows(table, **filters)
+    chunks = _csv_chunks(rows) if fmt == 'csv' else _xlsx_chunks(rows, table)
+    return chunks, EXPORT_FORMATS[fmt]
@@ -1,14 +1,32 @@
 """
 历史客户订单Excel导入模块
 用于将历史订单数据从Excel批量导入到系统
+
+多年的历史数据一次可能有十万行，原先按订单分组后逐行查客户、查重复、逐条插入，现改为整批处理：
+- 日期、型号、数量、价格用 pandas 按列整理
+- 客户按名称（忽略大小写和空格）一次匹配，不存在的客户一次批量创建
+- 型号写入临时表，已有客户订单和已导入的型号各用一次关联查询找出
+- 客户订单、报价、关联在同一事务中批量写入（订单汇总由触发器同步）
+- 返回各阶段耗时
 """
 
+import random
+import time
 import pandas as pd
-import os
-import tempfile
-from datetime import datetime
-from Sills.base import get_db_connection, get_exchange_rates
-from Sills.db_cli import get_next_cli_id
+from datetime import date, datetime
+from Sills.base import get_db_connection, get_exchange_rates, bulk_insert
+from Sills.db_mpn import normalize_mpn
+from Sills.db_sequence import allocate_ids
+from Sills.entity_cache import ENTITIES, entity_name_map, normalize_name
+
+_OFFER_COLUMNS = (
+    'offer_id', 'offer_date', 'quote_id', 'inquiry_mpn', 'mpn_norm', 'quoted_mpn',
+    'inquiry_brand', 'quoted_brand', 'inquiry_qty', 'quoted_qty',
+    'cost_price_rmb', 'offer_price_rmb', 'price_kwr', 'price_usd',
+    'date_code', 'delivery_date', 'emp_id', 'remark', 'is_transferred',
+)
+
+_STAGING_TABLE = "tmp_history_import"
 
 
 def parse_excel(file_path):
@@ -25,49 +43,228 @@ def parse_excel(file_path):
         raise Exception(f"Excel解析失败: {str(e)}")
 
 
-def find_or_create_customer(cli_name, conn):
-    """
-    按名称查找客户，不存在则创建
-    返回 cli_id
-    """
-    if not cli_name or str(cli_name).strip() == "":
-        return None, "客户名称为空"
-
-    cli_name = str(cli_name).strip()
+def _text(df, col):
+    """文本列：空值为 ''，整数被读成浮点数时去掉 .0"""
+    if col not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    s = df[col]
+    if pd.api.types.is_float_dtype(s) and (s.dropna() % 1 == 0).all():
+        s = s.astype('Int64')
+    return s.astype('string').fillna('').str.strip().astype(object)
 
-    # 查找现有客户（忽略大小写和空格）
-    existing = conn.execute("""
-        SELECT cli_id FROM uni_cli
-        WHERE REPLACE(LOWER(cli_name), ' ', '') = REPLACE(LOWER(?), ' ', '')
-    """, (cli_name,)).fetchone()
 
-    if existing:
-        return existing['cli_id'], None
+def _number(df, col, default):
+    """数值列：返回 (数值, 格式错误掩码)，空值取 default"""
+    if col not in df.columns:
+        return pd.Series(default, index=df.index, dtype=float), pd.Series(False, index=df.index)
+    raw = df[col]
+    blank = raw.isna() | (raw.astype('string').str.strip() == '')
+    values = pd.to_numeric(raw.where(~blank), errors='coerce')
+    return values.fillna(default), values.isna() & ~blank
 
-    # 创建新客户
-    cli_id = get_next_cli_id()
-    conn.execute("""
-        INSERT INTO uni_cli (cli_id, cli_name, cli_full_name)
-        VALUES (?, ?, ?)
-    """, (cli_id, cli_name, cli_name))
-
-    return cli_id, None
 
+def _order_dates(values, today):
+    """
+    订单日期：文本按 YYYY-MM-DD 解析，Excel 日期单元格直接转换；数字、无法解析或为空时取当天
 
-def check_duplicate(manager_id, mpn, conn):
+    read_excel 对整列都是日期的单元格返回 datetime64 列，整列为空或为数字时返回浮点列，都不能用 .str
     """
-    检查是否重复（同一订单+型号）
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime('%Y-%m-%d').fillna(today)
+    dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    is_text = values.map(lambda v: isinstance(v, str)).astype(bool)
+    if is_text.any():
+        dates[is_text] = pd.to_datetime(values[is_text].astype(str).str.strip(), format='%Y-%m-%d', errors='coerce')
+    is_date = values.map(lambda v: isinstance(v, (datetime, date))).astype(bool)
+    if is_date.any():
+        dates[is_date] = pd.to_datetime(values[is_date], errors='coerce')
+    return dates.dt.strftime('%Y-%m-%d').fillna(today)
+
+
+def _new_manager_ids(conn, n):
+    """OM + 时间戳 + 4 位十六进制（与手工新建一致），同一批次内及与库中同一秒的编号不重复"""
+    stamp = f"OM{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    taken = {r[0] for r in conn.execute(
+        "SELECT manager_id FROM uni_order_manager WHERE manager_id LIKE ?", (f"{stamp}%",)).fetchall()}
+    width = 4 if n + len(taken) <= 0x10000 else 8
+    ids = []
+    for suffix in random.sample(range(16 ** width), n + len(taken)):
+        manager_id = f"{stamp}{suffix:0{width}X}"
+        if manager_id not in taken:
+            ids.append(manager_id)
+            if len(ids) == n:
+                break
+    return ids
+
+
+def import_history_frame(df, emp_id):
     """
-    if not manager_id or not mpn:
-        return False
-
-    existing = conn.execute("""
-        SELECT r.id FROM uni_order_manager_rel r
-        JOIN uni_offer o ON r.offer_id = o.offer_id
-        WHERE r.manager_id = ? AND (o.inquiry_mpn = ? OR o.quoted_mpn = ?)
-    """, (manager_id, mpn, mpn)).fetchone()
-
-    return existing is not None
+    导入已解析的历史订单数据
+    返回 {"success", "skip", "fail", "errors", "timings"}，timings 为各阶段耗时（秒）
+    """
+    timings = {}
+    errors = []
+    result = {"success": 0, "skip": 0, "fail": 0, "errors": errors, "timings": timings}
+    start = time.perf_counter()
+
+    if df.empty:
+        errors.append("Excel文件为空")
+        return result
+
+    # 检查必要列
+    required_cols = ['客户订单号', '客户名称', '型号']
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        errors.append(f"缺少必要列: {', '.join(missing_cols)}")
+        return result
+
+    # ---- 整理：按列清洗，每个客户订单取第一行的客户和日期 ----
+    today = datetime.now().strftime('%Y-%m-%d')
+    rows = pd.DataFrame({
+        'order_no': _text(df, '客户订单号'),
+        'cli_name': _text(df, '客户名称'),
+        'mpn': _text(df, '型号'),
+        'brand': _text(df, '品牌'),
+        'date_code': _text(df, '批号'),
+        'delivery_date': _text(df, '交期'),
+        'remark': _text(df, '备注'),
+        'line': df.index + 1,
+    })
+    qty, bad_qty = _number(df, '数量', 1)
+    rows['qty'] = qty.where(qty != 0, 1).astype(int)
+    rows['offer_price'], bad_price = _number(df, '单价(RMB)', 0)
+    rows['cost_price'], bad_cost = _number(df, '成本价(RMB)', 0)
+    rows['order_date'] = _order_dates(df['订单日期'], today) if '订单日期' in df.columns else today
+
+    no_order = rows['order_no'] == ''
+    for line in rows.loc[no_order, 'line']:
+        errors.append(f"第{line}行: 客户订单号为空")
+    result["skip"] += int(no_order.sum())
+    rows = rows[~no_order].sort_values('order_no', kind='stable')
+
+    orders = rows.groupby('order_no', sort=False).first()[['cli_name', 'order_date']]
+    no_cli = orders.index[orders['cli_name'] == '']
+    for order_no in no_cli:
+        errors.append(f"订单 {order_no}: 客户名称为空")
+    in_no_cli = rows['order_no'].isin(no_cli)
+    result["fail"] += int(in_no_cli.sum())
+    orders = orders.drop(no_cli)
+    rows = rows[~in_no_cli]
+
+    no_mpn = rows['mpn'] == ''
+    for order_no, line in rows.loc[no_mpn, ['order_no', 'line']].itertuples(index=False):
+        errors.append(f"订单 {order_no} 第{line}行: 型号为空")
+    result["skip"] += int(no_mpn.sum())
+    rows = rows[~no_mpn]
+
+    bad = (bad_qty | bad_price | bad_cost).reindex(rows.index)
+    for order_no, mpn in rows.loc[bad, ['order_no', 'mpn']].itertuples(index=False):
+        errors.append(f"订单 {order_no} 型号 {mpn}: 数量或价格格式错误")
+    result["fail"] += int(bad.sum())
+    rows = rows[~bad]
+    timings['normalize'] = round(time.perf_counter() - start, 3)
+
+    with get_db_connection() as conn:
+        try:
+            # ---- 匹配：客户、已有客户订单、已导入的型号 ----
+            phase = time.perf_counter()
+            known = {normalize_name(name): cli_id for name, cli_id in entity_name_map('cli').items()}
+            orders['cli_key'] = orders['cli_name'].map(normalize_name)
+            new_clis = orders.loc[~orders['cli_key'].isin(known)].drop_duplicates('cli_key')
+            cli_rows = list(zip(allocate_ids('cli', len(new_clis), conn), new_clis['cli_name']))
+            known.update((normalize_name(name), cli_id) for cli_id, name in cli_rows)
+            orders['cli_id'] = orders['cli_key'].map(known)
+
+            conn.execute(f"DROP TABLE IF EXISTS {_STAGING_TABLE}")
+            conn.execute(f"CREATE TEMP TABLE {_STAGING_TABLE} (order_no TEXT, mpn TEXT)")
+            # 每个订单一行 (订单号, NULL) 用于查已有订单（型号全部跳过的订单也照常建立），其余为待查重的型号
+            bulk_insert(conn, _STAGING_TABLE, ('order_no', 'mpn'),
+                        [(order_no, None) for order_no in orders.index]
+                        + list(rows[['order_no', 'mpn']].drop_duplicates().itertuples(index=False, name=None)))
+            existing = dict(r[:] for r in conn.execute(f"""
+                SELECT m.customer_order_no, m.manager_id FROM uni_order_manager m
+                WHERE m.customer_order_no IN (SELECT order_no FROM {_STAGING_TABLE})
+            """).fetchall())
+            imported = set(r[:] for r in conn.execute(f"""
+                SELECT DISTINCT s.order_no, s.mpn FROM {_STAGING_TABLE} s
+                JOIN uni_order_manager m ON m.customer_order_no = s.order_no
+                JOIN uni_order_manager_rel r ON r.manager_id = m.manager_id
+                JOIN uni_offer o ON o.offer_id = r.offer_id
+                WHERE o.inquiry_mpn = s.mpn OR o.quoted_mpn = s.mpn
+            """).fetchall())
+            conn.execute(f"DROP TABLE {_STAGING_TABLE}")
+
+            # 已导入过、或同一订单中重复的型号跳过
+            keys = list(zip(rows['order_no'], rows['mpn']))
+            dup = rows.duplicated(['order_no', 'mpn']) | pd.Series([k in imported for k in keys], index=rows.index)
+            for order_no, mpn in rows.loc[dup, ['order_no', 'mpn']].itertuples(index=False):
+                errors.append(f"订单 {order_no} 型号 {mpn}: 已存在，跳过")
+            result["skip"] += int(dup.sum())
+            rows = rows[~dup]
+
+            new_orders = orders.loc[~orders.index.isin(list(existing))]
+            existing.update(zip(new_orders.index, _new_manager_ids(conn, len(new_orders))))
+            timings['resolve'] = round(time.perf_counter() - phase, 3)
+
+            # ---- 写入：客户、客户订单、报价、关联 ----
+            phase = time.perf_counter()
+            bulk_insert(conn, ENTITIES['cli'][0], ('cli_id', 'cli_name', 'cli_full_name', 'emp_id'),
+                        [(cli_id, name, name, emp_id) for cli_id, name in cli_rows])
+            bulk_insert(conn, 'uni_order_manager', ('manager_id', 'customer_order_no', 'order_date', 'cli_id'),
+                        [(existing[order_no], order_no, order_date, cli_id) for order_no, order_date, cli_id
+                         in zip(new_orders.index, new_orders['order_date'], new_orders['cli_id'])])
+
+            # 按最新汇率计价（与新增报价相同的取整规则）
+            krw_val, usd_val = get_exchange_rates()
+            price = rows['offer_price']
+            if krw_val > 10:
+                price_kwr = (price * krw_val).round(1)
+            else:
+                price_kwr = (price / krw_val).round(1) if krw_val else price * 0.0
+            price_usd = (price * usd_val).round(2) if usd_val else price * 0.0
+            mpns = rows['mpn'].tolist()
+            norm = {mpn: normalize_mpn(mpn) for mpn in set(mpns)}
+            offer_ids = allocate_ids('offer', len(rows), conn)
+            qtys = rows['qty'].tolist()
+            brands = rows['brand'].tolist()
+            offers = list(zip(
+                offer_ids, [today] * len(rows), [None] * len(rows), mpns, [norm[m] for m in mpns], mpns,
+                brands, brands, qtys, qtys,
+                rows['cost_price'].tolist(), price.tolist(), price_kwr.tolist(), price_usd.tolist(),
+                rows['date_code'].tolist(), rows['delivery_date'].tolist(), [emp_id] * len(rows),
+                rows['remark'].tolist(), ['未转'] * len(rows),
+            ))
+            bulk_insert(conn, 'uni_offer', _OFFER_COLUMNS, offers)
+            bulk_insert(conn, 'uni_order_manager_rel', ('manager_id', 'offer_id'),
+                        [(existing[order_no], offer_id) for order_no, offer_id in zip(rows['order_no'], offer_ids)])
+            conn.commit()
+            timings['insert'] = round(time.perf_counter() - phase, 3)
+            result["success"] = len(offers)
+        except Exception as e:
+            conn.rollback()
+            errors.append(f"导入过程出错: {str(e)}")
+            result["fail"] += len(rows)
+
+    timings['total'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def import_history_file(file_path, emp_id):
+    """解析 Excel 并导入，返回同 import_history_frame（timings 含解析耗时）"""
+    start = time.perf_counter()
+    try:
+        df = parse_excel(file_path)
+    except Exception as e:
+        return {"success": 0, "skip": 0, "fail": 0, "errors": [str(e)], "timings": {}}
+    parse_s = round(time.perf_counter() - start, 3)
+    result = import_history_frame(df, emp_id)
+    result["timings"] = {"parse": parse_s, **result["timings"]}
+    result["timings"]["total"] = round(time.perf_counter() - start, 3)
+    t = result["timings"]
+    print(f"[DB] 历史订单导入：成功 {result['success']}，跳过 {result['skip']}，失败 {result['fail']}；"
+          f"耗时 解析 {t['parse']}s 整理 {t.get('normalize', 0)}s 匹配 {t.get('resolve', 0)}s "
+          f"写入 {t.get('insert', 0)}s 合计 {t['total']}s")
+    return result
 
 
 def import_history_orders(file_path, emp_id):
@@ -75,161 +272,5 @@ def import_history_orders(file_path, emp_id):
     主导入函数
     返回: (success_count, skip_count, fail_count, errors[])
     """
-    success_count = 0
-    skip_count = 0
-    fail_count = 0
-    errors = []
-
-    try:
-        # 解析Excel
-        df = parse_excel(file_path)
-
-        if df.empty:
-            return 0, 0, 0, ["Excel文件为空"]
-
-        # 检查必要列
-        required_cols = ['客户订单号', '客户名称', '型号']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            return 0, 0, 0, [f"缺少必要列: {', '.join(missing_cols)}"]
-
-        # 按客户订单号分组
-        grouped = df.groupby('客户订单号')
-
-        with get_db_connection() as conn:
-            for order_no, group in grouped:
-                try:
-                    # 开启事务
-                    order_date = None
-                    cli_id = None
-
-                    # 获取第一条记录的客户信息和日期
-                    first_row = group.iloc[0]
-                    cli_name = first_row.get('客户名称', '')
-
-                    # 查找或创建客户
-                    cli_id, err = find_or_create_customer(cli_name, conn)
-                    if err:
-                        errors.append(f"订单 {order_no}: {err}")
-                        fail_count += len(group)
-                        continue
-
-                    # 获取订单日期
-                    order_date_raw = first_row.get('订单日期', '')
-                    if pd.notna(order_date_raw) and str(order_date_raw).strip():
-                        try:
-                            # 尝试解析日期
-                            if isinstance(order_date_raw, str):
-                                order_date = datetime.strptime(order_date_raw.strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
-                            else:
-                                order_date = pd.to_datetime(order_date_raw).strftime('%Y-%m-%d')
-                        except:
-                            order_date = datetime.now().strftime('%Y-%m-%d')
-                    else:
-                        order_date = datetime.now().strftime('%Y-%m-%d')
-
-                    # 检查订单是否已存在
-                    existing_order = conn.execute(
-                        "SELECT manager_id FROM uni_order_manager WHERE customer_order_no = ?",
-                        (str(order_no),)
-                    ).fetchone()
-
-                    if existing_order:
-                        manager_id = existing_order['manager_id']
-                    else:
-                        # 创建客户订单
-                        manager_id = f"OM{datetime.now().strftime('%Y%m%d%H%M%S')}{os.urandom(2).hex().upper()}"
-                        conn.execute("""
-                            INSERT INTO uni_order_manager (manager_id, customer_order_no, order_date, cli_id)
-                            VALUES (?, ?, ?, ?)
-                        """, (manager_id, str(order_no), order_date, cli_id))
-
-                    # 遍历每行报价数据
-                    for idx, row in group.iterrows():
-                        try:
-                            mpn = str(row.get('型号', '')).strip()
-                            if not mpn:
-                                errors.append(f"订单 {order_no} 第{idx+1}行: 型号为空")
-                                skip_count += 1
-                                continue
-
-                            # 检查重复
-                            if check_duplicate(manager_id, mpn, conn):
-                                errors.append(f"订单 {order_no} 型号 {mpn}: 已存在，跳过")
-                                skip_count += 1
-                                continue
-
-                            # 准备报价数据
-                            brand = str(row.get('品牌', '')).strip()
-                            qty = int(row.get('数量', 1) or 1)
-                            offer_price = float(row.get('单价(RMB)', 0) or 0)
-                            cost_price = float(row.get('成本价(RMB)', 0) or 0)
-                            date_code = str(row.get('批号', '')).strip()
-                            delivery_date = str(row.get('交期', '')).strip()
-                            remark = str(row.get('备注', '')).strip()
-
-                            # 计算汇率价格
-                            krw_val, usd_val = get_exchange_rates()
-                            if krw_val > 10:
-                                price_kwr = round(offer_price * krw_val, 1)
-                            else:
-                                price_kwr = round(offer_price / krw_val, 1) if krw_val else 0.0
-                            price_usd = round(offer_price * usd_val, 2) if usd_val else 0.0
-
-                            # 生成报价ID
-                            last_offer = conn.execute(
-                                "SELECT offer_id FROM uni_offer WHERE offer_id LIKE 'b%' ORDER BY offer_id DESC LIMIT 1"
-                            ).fetchone()
-                            if last_offer:
-                                try:
-                                    last_num = int(last_offer['offer_id'][1:])
-                                    new_num = last_num + 1
-                                except:
-                                    new_num = 1
-                            else:
-                                new_num = 1
-                            offer_id = f"b{new_num:05d}"
-
-                            # 插入报价记录 (quote_id 为 None，因为是历史数据)
-                            conn.execute("""
-                                INSERT INTO uni_offer (
-                                    offer_id, offer_date, quote_id, inquiry_mpn, quoted_mpn,
-                                    inquiry_brand, quoted_brand, inquiry_qty, quoted_qty,
-                                    cost_price_rmb, offer_price_rmb, price_kwr, price_usd,
-                                    date_code, delivery_date, emp_id, remark, is_transferred
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                offer_id, datetime.now().strftime('%Y-%m-%d'), None,
-                                mpn, mpn, brand, brand, qty, qty,
-                                cost_price, offer_price, price_kwr, price_usd,
-                                date_code, delivery_date, emp_id, remark, '未转'
-                            ))
-
-                            # 建立关联
-                            conn.execute("""
-                                INSERT INTO uni_order_manager_rel (manager_id, offer_id)
-                                VALUES (?, ?)
-                            """, (manager_id, offer_id))
-
-                            success_count += 1
-
-                        except Exception as e:
-                            errors.append(f"订单 {order_no} 型号 {mpn}: {str(e)}")
-                            fail_count += 1
-
-                    # 提交当前订单的事务
-                    conn.commit()
-
-                    # 更新订单汇总
-                    from Sills.db_order_manager import recalculate_manager_totals
-                    recalculate_manager_totals(manager_id)
-
-                except Exception as e:
-                    errors.append(f"订单 {order_no}: {str(e)}")
-                    fail_count += len(group)
-                    conn.rollback()
-
-        return success_count, skip_count, fail_count, errors
-
-    except Exception as e:
-        return 0, 0, 0, [f"导入过程出错: {str(e)}"]
\ No newline at end of file
+    result = import_history_file(file_path, emp_id)
+    return result["success"], result["skip"], result["fail"], result["errors"]
@@ -14,6 +14,7 @@ from Sills.db_mail_core import (
     save_draft, get_draft_list, get_draft_by_id, update_draft, delete_draft, get_draft_count,
     create_mail_relation, get_mail_relations, remove_mail_relation, remove_mail_relations_by_ref,
     get_latest_mail_time, get_local_uids, get_local_message_ids,
+    get_pending_body_mails, update_mail_body, apply_flag_changes, unlink_folder_uids,
     cleanup_duplicate_emails, clear_account_emails
 )
 
@@ -30,6 +31,7 @@ from Sills.db_mail_sync import (
     get_sync_interval, set_sync_interval, get_sync_days, set_sync_days,
     get_undo_send_seconds, set_undo_send_seconds,
     get_folder_last_uid, update_folder_last_uid, get_all_folder_last_uids,
+    get_folder_sync_state, save_folder_sync_state,
     get_signature, set_signature,
     get_sync_date_range, set_sync_date_range, clear_sync_date_range,
     record_synced_uid, batch_record_synced_uids, get_synced_uids, is_uid_synced,
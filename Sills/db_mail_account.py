@@ -108,6 +108,9 @@ def update_mail_account(account_id: int, config: Dict[str, Any]) -> bool:
             'use_tls': config.get('use_tls'),
             'sync_batch_size': config.get('sync_batch_size'),
             'sync_pause_seconds': config.get('sync_pause_seconds'),
+            'sync_connections': config.get('sync_connections'),
+            'sync_headers_first': config.get('sync_headers_first'),
+            'sync_idle': config.get('sync_idle'),
         }
 
         for field, value in field_mapping.items():
@@ -3,8 +3,9 @@
 包含：邮件列表、保存/删除、草稿箱、关联关系
 """
 from typing import Optional, Dict, List, Any
-from Sills.base import get_db_connection
+from Sills.base import get_db_connection, count_rows, parse_keyset_cursor, keyset_condition, keyset_page
 from Sills.db_config import get_datetime_now
+from Sills.mail_blob import body_columns, load_mail_bodies
 
 
 def _clean_text(text):
@@ -19,7 +20,8 @@ def _clean_text(text):
 
 
 def get_mail_list(page: int = 1, limit: int = 20, is_sent: int = 0,
-                  search: str = None, account_id: int = None) -> Dict[str, Any]:
+                  search: str = None, account_id: int = None,
+                  after: Optional[str] = None) -> Dict[str, Any]:
     """
     获取邮件列表（分页）
 
@@ -29,9 +31,10 @@ def get_mail_list(page: int = 1, limit: int = 20, is_sent: int = 0,
         is_sent: 0=收件箱, 1=已发送
         search: 搜索关键词（主题/发件人/收件人）
         account_id: 账户ID（用户隔离）
+        after: 游标分页 "<received_at>,<id>"（"" 为第一页），传入时忽略 page、不统计总数
 
     Returns:
-        分页结果字典
+        分页结果字典（游标模式下 total_count 为 None，并带 next_cursor）
     """
     offset = (page - 1) * limit
     params = [is_sent]
@@ -71,12 +74,25 @@ def get_mail_list(page: int = 1, limit: int = 20, is_sent: int = 0,
         params.extend([search_param, search_param, search_param])
         count_params.extend([search_param, search_param, search_param])
 
-    query += " ORDER BY received_at DESC, id DESC LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
+    if after is not None:
+        cursor = parse_keyset_cursor(after)
+        if cursor:
+            received_at, mail_id = cursor
+            cond, cond_params = keyset_condition("received_at", "id", (received_at, int(mail_id)))
+            query += f" AND {cond}"
+            params.extend(cond_params)
+        query += " ORDER BY received_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+    else:
+        query += " ORDER BY received_at DESC, id DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
 
+    next_cursor = None
     with get_db_connection() as conn:
-        total_count = conn.execute(count_query, count_params).fetchone()[0]
+        total_count = count_rows(conn, count_query, count_params) if after is None else None
         rows = conn.execute(query, params).fetchall()
+    if after is not None:
+        rows, next_cursor = keyset_page(rows, limit, 'received_at', 'id')
 
     items = []
     for row in rows:
@@ -86,6 +102,14 @@ def get_mail_list(page: int = 1, limit: int = 20, is_sent: int = 0,
         item['body_truncated'] = False
         items.append(item)
 
+    if after is not None:
+        return {
+            "items": items,
+            "total_count": None,
+            "page_size": limit,
+            "next_cursor": next_cursor
+        }
+
     return {
         "items": items,
         "total_count": total_count,
@@ -99,8 +123,9 @@ def get_mail_by_id(mail_id: int) -> Optional[Dict[str, Any]]:
     """获取单封邮件详情"""
     with get_db_connection() as conn:
         row = conn.execute("SELECT * FROM uni_mail WHERE id = ?", (mail_id,)).fetchone()
-        if row:
-            return dict(row)
+    if row:
+        # 存为 blob 的超大正文读回
+        return load_mail_bodies(dict(row))
     return None
 
 
@@ -165,6 +190,10 @@ def save_email(mail_data: Dict[str, Any]) -> int:
     if message_id == '':
         message_id = None
 
+    # 超大正文、内嵌图片先写入 blob（在打开写事务之前，避免与 mail_blob 登记互相等待）
+    content, html_content, content_blob, html_blob = body_columns(
+        _clean_text(mail_data.get('content')), _clean_text(mail_data.get('html_content')))
+
     with get_db_connection() as conn:
         imap_uid = mail_data.get('imap_uid')
         imap_folder = mail_data.get('imap_folder')
@@ -191,7 +220,7 @@ def save_email(mail_data: Dict[str, Any]) -> int:
         # 检查2：通过message_id（同一封邮件可能在不同文件夹有相同message_id）
         if message_id:
             existing = conn.execute(
-                "SELECT id, is_sent, is_draft FROM uni_mail WHERE message_id = ?",
+                "SELECT id, is_sent, is_draft, imap_uid FROM uni_mail WHERE message_id = ?",
                 (message_id,)
             ).fetchone()
             if existing:
@@ -204,21 +233,28 @@ def save_email(mail_data: Dict[str, Any]) -> int:
                         (new_is_sent, new_is_draft, existing[0])
                     )
                     conn.commit()
+                # 已解除UID关联的邮件（服务器删除/移动、UIDVALIDITY 变化）重新关联到新的UID
+                if existing[3] is None and imap_uid and imap_folder and account_id:
+                    conn.execute(
+                        "UPDATE uni_mail SET imap_uid = ?, imap_folder = ? WHERE id = ? AND account_id = ?",
+                        (imap_uid, imap_folder, existing[0], account_id)
+                    )
+                    conn.commit()
                 return existing[0]
 
         cursor = conn.execute("""
             INSERT INTO uni_mail (subject, from_addr, from_name, to_addr, cc_addr, content, html_content,
                                   received_at, sent_at, is_sent, is_draft, message_id, sync_status, account_id,
-                                  imap_uid, imap_folder, folder_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                  imap_uid, imap_folder, folder_id, body_state, content_blob, html_blob)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             _clean_text(mail_data.get('subject')),
             _clean_text(mail_data.get('from_addr')),
             _clean_text(mail_data.get('from_name')),
             _clean_text(mail_data.get('to_addr')),
             _clean_text(mail_data.get('cc_addr')),
-            _clean_text(mail_data.get('content')),
-            _clean_text(mail_data.get('html_content')),
+            content,
+            html_content,
             _clean_text(mail_data.get('received_at')),
             _clean_text(mail_data.get('sent_at')),
             mail_data.get('is_sent', 0),
@@ -228,7 +264,10 @@ def save_email(mail_data: Dict[str, Any]) -> int:
             mail_data.get('account_id'),
             _clean_text(mail_data.get('imap_uid')),
             _clean_text(mail_data.get('imap_folder')),
-            mail_data.get('folder_id')
+            mail_data.get('folder_id'),
+            mail_data.get('body_state', 'full'),
+            content_blob,
+            html_blob
         ))
         conn.commit()
         return cursor.lastrowid
@@ -248,8 +287,10 @@ def batch_save_emails(emails_data: list) -> int:
         return 0
 
     saved_count = 0
+    # 超大正文、内嵌图片先写入 blob（在打开写事务之前）
+    bodies = [body_columns(_clean_text(m.get('content')), _clean_text(m.get('html_content'))) for m in emails_data]
     with get_db_connection() as conn:
-        for mail_data in emails_data:
+        for mail_data, body in zip(emails_data, bodies):
             # 将空字符串的message_id转为None
             message_id = mail_data.get('message_id')
             if message_id == '':
@@ -299,16 +340,16 @@ def batch_save_emails(emails_data: list) -> int:
             conn.execute("""
                 INSERT INTO uni_mail (subject, from_addr, from_name, to_addr, cc_addr, content, html_content,
                                       received_at, sent_at, is_sent, is_draft, message_id, sync_status, account_id,
-                                      imap_uid, imap_folder, folder_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                      imap_uid, imap_folder, folder_id, body_state, content_blob, html_blob)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 _clean_text(mail_data.get('subject')),
                 _clean_text(mail_data.get('from_addr')),
                 _clean_text(mail_data.get('from_name')),
                 _clean_text(mail_data.get('to_addr')),
                 _clean_text(mail_data.get('cc_addr')),
-                _clean_text(mail_data.get('content')),
-                _clean_text(mail_data.get('html_content')),
+                body[0],
+                body[1],
                 _clean_text(mail_data.get('received_at')),
                 _clean_text(mail_data.get('sent_at')),
                 mail_data.get('is_sent', 0),
@@ -318,7 +359,10 @@ def batch_save_emails(emails_data: list) -> int:
                 mail_data.get('account_id'),
                 _clean_text(mail_data.get('imap_uid')),
                 _clean_text(mail_data.get('imap_folder')),
-                mail_data.get('folder_id')
+                mail_data.get('folder_id'),
+                mail_data.get('body_state', 'full'),
+                body[2],
+                body[3]
             ))
             saved_count += 1
 
@@ -672,6 +716,97 @@ def get_local_uids(folder: str, account_id: int) -> set:
         return {row[0] for row in rows if row[0] is not None}
 
 
+def get_pending_body_mails(account_id: int, limit: int = 200) -> List[Dict[str, Any]]:
+    """
+    获取只同步了邮件头、正文待下载的邮件（先同步邮件头模式）
+
+    Returns:
+        [{id, imap_uid, imap_folder}, ...]，按接收时间倒序（最新的先补全）
+    """
+    with get_db_connection() as conn:
+        rows = conn.execute("""
+            SELECT id, imap_uid, imap_folder FROM uni_mail
+            WHERE account_id = ? AND body_state = 'pending' AND imap_uid IS NOT NULL
+            ORDER BY received_at DESC LIMIT ?
+        """, (account_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+
+def update_mail_body(mail_id: int, content: Optional[str], html_content: Optional[str],
+                     body_state: str = 'full') -> bool:
+    """
+    写入补全的正文
+
+    Args:
+        mail_id: 邮件ID
+        content/html_content: 正文（body_state='missing' 时可为 None，保持原值）
+        body_state: 'full' 已下载；'missing' 服务器上已找不到该邮件，不再重试
+    """
+    if body_state == 'full':
+        columns = body_columns(_clean_text(content), _clean_text(html_content))
+    with get_db_connection() as conn:
+        if body_state == 'full':
+            conn.execute(
+                "UPDATE uni_mail SET content = ?, html_content = ?, content_blob = ?, html_blob = ?, body_state = ? "
+                "WHERE id = ?",
+                columns + (body_state, mail_id)
+            )
+        else:
+            conn.execute("UPDATE uni_mail SET body_state = ? WHERE id = ?", (body_state, mail_id))
+        conn.commit()
+        return True
+
+
+def apply_flag_changes(account_id: int, folder: str, flags_by_uid: Dict[int, set]) -> int:
+    """
+    把服务器上的标记变化同步到本地（目前只有 \\Seen -> is_read）
+
+    Args:
+        flags_by_uid: {uid: 标记集合}
+
+    Returns:
+        更新的邮件数
+    """
+    if not flags_by_uid:
+        return 0
+    params = [(1 if '\\Seen' in flags else 0, account_id, folder, uid) for uid, flags in flags_by_uid.items()]
+    with get_db_connection() as conn:
+        conn.executemany(
+            "UPDATE uni_mail SET is_read = ? WHERE account_id = ? AND imap_folder = ? AND imap_uid = ?", params)
+        conn.commit()
+    return len(params)
+
+
+def unlink_folder_uids(account_id: int, folder: str, uids: list = None) -> int:
+    """
+    解除本地邮件与服务器UID的关联（邮件本身保留）
+
+    服务器已删除（EXPUNGE）这些UID，或文件夹 UIDVALIDITY 变化（uids=None，全部UID失效）时调用；
+    正文尚未下载的邮件标记为 missing，同时清除对应的已同步UID记录
+
+    Returns:
+        解除关联的邮件数
+    """
+    with get_db_connection() as conn:
+        if uids is None:
+            where, params = "account_id = ? AND imap_folder = ? AND imap_uid IS NOT NULL", [account_id, folder]
+            conn.execute("DELETE FROM uni_mail_synced_uid WHERE account_id = ? AND imap_folder = ?", (account_id, folder))
+        else:
+            if not uids:
+                return 0
+            placeholders = ','.join(['?'] * len(uids))
+            where, params = f"account_id = ? AND imap_folder = ? AND imap_uid IN ({placeholders})", [account_id, folder] + list(uids)
+            conn.execute(f"DELETE FROM uni_mail_synced_uid WHERE account_id = ? AND imap_folder = ? AND imap_uid IN ({placeholders})",
+                         params)
+        cursor = conn.execute(f"""
+            UPDATE uni_mail SET imap_uid = NULL,
+                body_state = CASE WHEN body_state = 'pending' THEN 'missing' ELSE body_state END
+            WHERE {where}
+        """, params)
+        conn.commit()
+        return cursor.rowcount
+
+
 def get_local_message_ids(account_id: int) -> set:
     """
     获取本地已存储的邮件Message-ID集合（备用方案）
@@ -300,6 +300,45 @@ def get_all_folder_last_uids(account_id: int) -> dict:
         return {row[0]: row[1] for row in rows}
 
 
+def get_folder_sync_state(account_id: int, folder_name: str) -> Optional[Dict[str, Any]]:
+    """
+    获取文件夹同步状态（上次同步时服务器的 UIDVALIDITY / UIDNEXT / HIGHESTMODSEQ / 邮件数）
+
+    Returns:
+        状态字典，未记录过时返回 None
+    """
+    with get_db_connection() as conn:
+        row = conn.execute("""
+            SELECT uid_validity, uid_next, highest_modseq, messages FROM mail_folder_sync_progress
+            WHERE account_id = ? AND folder_name = ?
+        """, (account_id, folder_name)).fetchone()
+        if row and row[0] is not None:
+            return {'uid_validity': row[0], 'uid_next': row[1], 'highest_modseq': row[2], 'messages': row[3]}
+        return None
+
+
+def save_folder_sync_state(account_id: int, folder_name: str, state: Dict[str, Any]) -> bool:
+    """
+    保存文件夹同步状态（folder_status() 的返回值）
+    """
+    dt_now = get_datetime_now()
+    with get_db_connection() as conn:
+        conn.execute(f"""
+            INSERT INTO mail_folder_sync_progress
+                (account_id, folder_name, uid_validity, uid_next, highest_modseq, messages, last_sync_at)
+            VALUES (?, ?, ?, ?, ?, ?, {dt_now})
+            ON CONFLICT(account_id, folder_name) DO UPDATE SET
+                uid_validity = excluded.uid_validity,
+                uid_next = excluded.uid_next,
+                highest_modseq = excluded.highest_modseq,
+                messages = excluded.messages,
+                last_sync_at = excluded.last_sync_at
+        """, (account_id, folder_name, state.get('uid_validity'), state.get('uid_next'),
+              state.get('highest_modseq'), state.get('messages')))
+        conn.commit()
+        return True
+
+
 def get_signature() -> str:
     """获取邮件签名"""
     with get_db_connection() as conn:
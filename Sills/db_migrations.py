@@ -0,0 +1,254 @@
+"""
+数据库版本迁移
+原先每次启动都要执行整段建表脚本和几十次 ALTER TABLE 尝试（PostgreSQL 上每列一次 information_schema 查询），
+迁移越多启动越慢。现在改为：
+
+- schema_version 表记录已应用的迁移版本
+- MIGRATIONS 为有序迁移列表，只执行版本号大于当前版本的迁移，每条执行后立即记录
+- 数据库已是最新版本时，启动只需一次 SELECT MAX(version)
+
+新增迁移：在 MIGRATIONS 末尾追加 (版本号, 说明, 函数)，函数需可重复执行（多 worker 同时启动时可能重入）。
+"""
+import time
+
+from Sills.base import get_db_connection, clear_cache
+from Sills.db_config import is_postgresql
+
+# 最近一次启动的耗时统计（/api/server/db_pool 与 tests/benchmark_startup.py 使用）
+_startup_stats = {}
+
+# PostgreSQL 多 worker 同时启动时串行执行迁移
+_PG_MIGRATION_LOCK_ID = 0x756e6901
+
+
+def _add_missing_columns(conn, table, columns):
+    """SQLite：按 PRAGMA table_info 补齐缺失的列"""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    for col_name, col_def in columns:
+        if col_name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_def}")
+            print(f"[DB] 迁移完成：{table} 添加 {col_name} 列")
+
+
+def _m001_baseline():
+    """基线：原 init_db 的建表脚本与历史迁移（可重复执行）"""
+    from Sills.base import _init_db_sqlite, _init_db_postgresql
+    if is_postgresql():
+        _init_db_postgresql()
+    else:
+        _init_db_sqlite()
+
+
+def _m002_sqlite_missing_columns():
+    """SQLite 新库：建表脚本缺少的列（原 ALTER 在建表前执行，新库上静默失败）"""
+    if is_postgresql():
+        return  # PG_SCHEMA 已包含这些列
+    with get_db_connection() as conn:
+        _add_missing_columns(conn, 'uni_quote', [
+            ("actual_qty", "INTEGER"),
+        ])
+        _add_missing_columns(conn, 'uni_mail', [
+            ("is_draft", "INTEGER DEFAULT 0 CHECK(is_draft IN (0,1))"),
+            ("is_blacklisted", "INTEGER DEFAULT 0 CHECK(is_blacklisted IN (0,1))"),
+            ("mail_type", "INTEGER DEFAULT 0"),
+            ("original_recipient", "TEXT"),
+        ])
+        try:
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_mail_uid_folder_account "
+                         "ON uni_mail(imap_uid, imap_folder, account_id) WHERE imap_uid IS NOT NULL")
+        except Exception as e:
+            print(f"[DB] 迁移警告：{e}")  # 已有重复数据时保持原状
+        conn.commit()
+
+
+def _m003_search_indexes():
+    from Sills.db_search import ensure_search_indexes
+    ensure_search_indexes()
+
+
+def _m004_mpn_norm():
+    from Sills.db_mpn import ensure_mpn_columns
+    ensure_mpn_columns()
+
+
+def _m005_sequences():
+    from Sills.db_sequence import sync_sequences
+    sync_sequences()
+
+
+def _m006_manager_totals():
+    from Sills.db_order_manager import ensure_manager_totals_triggers, recalculate_all_managers
+    ensure_manager_totals_triggers()
+    recalculate_all_managers()
+
+
+def _m007_sales_cube():
+    from Sills.db_sales_cube import ensure_sales_cube, rebuild_sales_cube
+    ensure_sales_cube()
+    rebuild_sales_cube()
+
+
+def _m008_mail_sync_connections():
+    """mail_config 增加每个账户同步时的并发 IMAP 连接数"""
+    with get_db_connection() as conn:
+        if is_postgresql():
+            conn.execute("ALTER TABLE mail_config ADD COLUMN IF NOT EXISTS sync_connections INTEGER DEFAULT 4")
+        else:
+            _add_missing_columns(conn, 'mail_config', [("sync_connections", "INTEGER DEFAULT 4")])
+        conn.commit()
+
+
+def _m009_mail_body_state():
+    """先同步邮件头：uni_mail.body_state（full / pending / missing）与账户开关 mail_config.sync_headers_first"""
+    with get_db_connection() as conn:
+        if is_postgresql():
+            conn.execute("ALTER TABLE uni_mail ADD COLUMN IF NOT EXISTS body_state TEXT DEFAULT 'full'")
+            conn.execute("ALTER TABLE mail_config ADD COLUMN IF NOT EXISTS sync_headers_first INTEGER DEFAULT 1")
+        else:
+            _add_missing_columns(conn, 'uni_mail', [("body_state", "TEXT DEFAULT 'full'")])
+            _add_missing_columns(conn, 'mail_config', [("sync_headers_first", "INTEGER DEFAULT 1")])
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_mail_body_pending ON uni_mail(account_id, body_state)")
+        conn.commit()
+
+
+def _m010_mail_folder_state():
+    """文件夹同步状态：UIDVALIDITY / UIDNEXT / HIGHESTMODSEQ / 邮件数"""
+    with get_db_connection() as conn:
+        if is_postgresql():
+            for col_def in ("uid_validity BIGINT", "uid_next BIGINT", "highest_modseq BIGINT", "messages INTEGER"):
+                conn.execute(f"ALTER TABLE mail_folder_sync_progress ADD COLUMN IF NOT EXISTS {col_def}")
+        else:
+            _add_missing_columns(conn, 'mail_folder_sync_progress', [
+                ("uid_validity", "INTEGER"),
+                ("uid_next", "INTEGER"),
+                ("highest_modseq", "INTEGER"),
+                ("messages", "INTEGER"),
+            ])
+        conn.commit()
+
+
+def _m011_mail_idle():
+    """账户开关 mail_config.sync_idle：后台保持 IDLE 连接，收件箱有新邮件时立即同步"""
+    with get_db_connection() as conn:
+        if is_postgresql():
+            conn.execute("ALTER TABLE mail_config ADD COLUMN IF NOT EXISTS sync_idle INTEGER DEFAULT 1")
+        else:
+            _add_missing_columns(conn, 'mail_config', [("sync_idle", "INTEGER DEFAULT 1")])
+        conn.commit()
+
+
+def _m012_mail_blob():
+    """内嵌图片、超大正文转存磁盘（见 Sills/mail_blob.py）：mail_blob 表与 uni_mail.content_blob / html_blob"""
+    with get_db_connection() as conn:
+        created_at = "TIMESTAMP DEFAULT CURRENT_TIMESTAMP" if is_postgresql() else "DATETIME"
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS mail_blob (
+                hash TEXT PRIMARY KEY,
+                content_type TEXT,
+                size INTEGER,
+                created_at {created_at}
+            )
+        """)
+        if is_postgresql():
+            for col in ("content_blob", "html_blob"):
+                conn.execute(f"ALTER TABLE uni_mail ADD COLUMN IF NOT EXISTS {col} TEXT")
+        else:
+            _add_missing_columns(conn, 'uni_mail', [("content_blob", "TEXT"), ("html_blob", "TEXT")])
+        conn.commit()
+
+
+def _m013_search_index_keys():
+    """搜索索引改为按映射表编号对应（业务表隐式 rowid 在 VACUUM 后可能变化），旧版 FTS 表删除后重建"""
+    from Sills.db_search import ensure_search_indexes
+    ensure_search_indexes()
+
+
+# 有序迁移列表：(版本号, 说明, 函数)
+MIGRATIONS = [
+    (1, "基线表结构", _m001_baseline),
+    (2, "SQLite 补齐缺失列", _m002_sqlite_missing_columns),
+    (3, "列表搜索索引", _m003_search_indexes),
+    (4, "规范型号列 mpn_norm", _m004_mpn_norm),
+    (5, "单据编号序列", _m005_sequences),
+    (6, "客户订单汇总触发器", _m006_manager_totals),
+    (7, "销售汇总表", _m007_sales_cube),
+    (8, "邮件同步并发连接数", _m008_mail_sync_connections),
+    (9, "邮件正文延迟下载", _m009_mail_body_state),
+    (10, "邮件文件夹同步状态", _m010_mail_folder_state),
+    (11, "IMAP IDLE 推送开关", _m011_mail_idle),
+    (12, "邮件内容寻址存储", _m012_mail_blob),
+    (13, "搜索索引映射表", _m013_search_index_keys),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT,
+    duration_ms REAL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def get_schema_version(conn):
+    """返回已应用的最高版本，schema_version 表不存在时返回 0"""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+        return row[0] or 0
+    except Exception:
+        conn.rollback()  # PostgreSQL 查询失败后需回滚才能继续使用连接
+        return 0
+
+
+def run_migrations():
+    """执行未应用的迁移（init_db 调用），返回本次应用的版本列表"""
+    start = time.perf_counter()
+    applied = []
+    with get_db_connection() as conn:
+        current = get_schema_version(conn)
+        if current < SCHEMA_VERSION:
+            conn.execute(_VERSION_TABLE_SQL)
+            if is_postgresql():
+                conn.execute("SELECT pg_advisory_lock(?)", (_PG_MIGRATION_LOCK_ID,))
+            conn.commit()
+            try:
+                # 拿到锁后重新读取，其他 worker 可能已经完成迁移
+                current = get_schema_version(conn)
+                for version, name, func in MIGRATIONS:
+                    if version <= current:
+                        continue
+                    step_start = time.perf_counter()
+                    func()
+                    duration_ms = round((time.perf_counter() - step_start) * 1000, 1)
+                    conn.execute(
+                        "INSERT INTO schema_version (version, name, duration_ms) VALUES (?, ?, ?) "
+                        "ON CONFLICT(version) DO NOTHING", (version, name, duration_ms))
+                    conn.commit()
+                    applied.append(version)
+                    print(f"[DB] 迁移 {version:03d} {name} 完成，耗时 {duration_ms} ms")
+            finally:
+                if is_postgresql():
+                    conn.execute("SELECT pg_advisory_unlock(?)", (_PG_MIGRATION_LOCK_ID,))
+                    conn.commit()
+
+    if applied:
+        clear_cache()
+        # 新建了索引，刷新统计信息让查询规划器使用
+        from Sills.base import refresh_table_stats
+        refresh_table_stats()
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    _startup_stats.update({
+        'schema_version': SCHEMA_VERSION,
+        'applied': applied,
+        'init_db_ms': elapsed_ms,
+    })
+    print(f"[DB] 数据库初始化完成（schema 版本 {SCHEMA_VERSION}，本次迁移 {len(applied)} 项），耗时 {elapsed_ms} ms")
+    return applied
+
+
+def get_startup_stats():
+    """返回最近一次 init_db 的耗时统计"""
+    return dict(_startup_stats)
@@ -0,0 +1,143 @@
+"""
+型号（MPN）规范化与精确查找
+同一型号会以 LM317T、lm317-t、LM317 T/NOPB 等写法进入系统，原先只能 LIKE 模糊匹配。
+
+- 询价/报价/销售订单/采购表各增加 mpn_norm 列：大写字母数字，去掉包装后缀
+- 新增/修改记录时由业务函数写入，历史数据由 backfill_mpn_norm() 分批回填
+- (mpn_norm, created_at DESC) 索引，lookup_mpn() 按规范型号精确查找全部历史业务
+"""
+import re
+
+from Sills.base import get_db_connection
+from Sills.db_config import is_postgresql
+
+# 表 -> (主键, 型号来源列)
+MPN_NORM_SOURCES = {
+    'uni_quote': ('quote_id', 'inquiry_mpn'),
+    'uni_offer': ('offer_id', 'inquiry_mpn'),
+    'uni_order': ('order_id', 'inquiry_mpn'),
+    'uni_buy': ('buy_id', 'buy_mpn'),
+}
+
+# 以分隔符（- 空格 _ .）附在末尾的包装/环保后缀，例如 -TR、 REEL、_NOPB
+PACKAGING_SUFFIXES = ('TRPBF', 'TR', 'T&R', 'REEL', 'REEL7', 'REEL13', 'PBF', 'NOPB', 'CT', 'ND')
+
+_CUT_RE = re.compile(r'[/#,(]')
+_SUFFIX_RE = re.compile(r'[-\s_.](?:' + '|'.join(re.escape(s) for s in PACKAGING_SUFFIXES) + r')$')
+_NON_ALNUM_RE = re.compile(r'[^0-9A-Z]')
+
+
+def normalize_mpn(mpn):
+    """
+    规范化型号：大写，截掉 / # , ( 之后的内容，去掉分隔的包装后缀，只保留字母数字
+    LM317T、lm317-t、LM317 T/NOPB -> LM317T
+    """
+    if not mpn:
+        return ''
+    s = _CUT_RE.split(str(mpn).upper(), 1)[0].strip()
+    while True:
+        stripped = _SUFFIX_RE.sub('', s).strip()
+        if stripped == s:
+            break
+        s = stripped
+    return _NON_ALNUM_RE.sub('', s)
+
+
+def with_mpn_norm(table, data):
+    """修改记录时，如果型号列有变化，同步写入 mpn_norm（原地修改并返回 data）"""
+    col = MPN_NORM_SOURCES[table][1]
+    if col in data:
+        data['mpn_norm'] = normalize_mpn(data[col])
+    return data
+
+
+def ensure_mpn_columns():
+    """添加 mpn_norm 列和查找索引（init_db 调用，可重复执行）"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        for table in MPN_NORM_SOURCES:
+            if is_postgresql():
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS mpn_norm TEXT")
+            else:
+                cols = [r[1] for r in cur.execute(f"PRAGMA table_info({table})").fetchall()]
+                if 'mpn_norm' not in cols:
+                    cur.execute(f"ALTER TABLE {table} ADD COLUMN mpn_norm TEXT")
+                    print(f"[DB] 迁移完成：{table} 添加 mpn_norm 列")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table[4:]}_mpn_norm ON {table}(mpn_norm, created_at DESC)")
+        conn.commit()
+
+
+def backfill_mpn_norm(batch_size=5000):
+    """
+    为 mpn_norm 为空的记录回填规范型号，每批单独提交，返回回填行数
+    启动时在后台执行，自动备份任务每轮也会调用
+    """
+    total = 0
+    with get_db_connection() as conn:
+        for table, (key, col) in MPN_NORM_SOURCES.items():
+            try:
+                while True:
+                    rows = conn.execute(
+                        f"SELECT {key}, {col} FROM {table} WHERE mpn_norm IS NULL LIMIT ?", (batch_size,)).fetchall()
+                    if not rows:
+                        break
+                    conn.executemany(
+                        f"UPDATE {table} SET mpn_norm = ? WHERE {key} = ?",
+                        [(normalize_mpn(r[1]), r[0]) for r in rows])
+                    conn.commit()
+                    total += len(rows)
+            except Exception as e:
+                conn.rollback()
+                print(f"[DB] {table} mpn_norm 回填失败: {e}")
+    if total:
+        print(f"[DB] mpn_norm 回填完成：{total} 行")
+    return total
+
+
+# 查找结果中每张表返回的列
+_LOOKUP_SQL = {
+    'quote': """
+        SELECT q.quote_id, q.quote_date, q.cli_id, c.cli_name, q.inquiry_mpn, q.quoted_mpn, q.inquiry_brand,
+               q.inquiry_qty, q.target_price_rmb, q.cost_price_rmb, q.status, q.created_at
+        FROM uni_quote q LEFT JOIN uni_cli c ON q.cli_id = c.cli_id
+        WHERE q.mpn_norm = ? ORDER BY q.created_at DESC LIMIT ?
+    """,
+    'offer': """
+        SELECT o.offer_id, o.offer_date, o.quote_id, o.cli_id, o.inquiry_mpn, o.quoted_mpn, o.quoted_brand,
+               o.quoted_qty, o.cost_price_rmb, o.offer_price_rmb, o.vendor_id, v.vendor_name, o.status, o.created_at
+        FROM uni_offer o LEFT JOIN uni_vendor v ON o.vendor_id = v.vendor_id
+        WHERE o.mpn_norm = ? ORDER BY o.created_at DESC LIMIT ?
+    """,
+    'order': """
+        SELECT d.order_id, d.order_date, d.cli_id, c.cli_name, d.offer_id, d.inquiry_mpn, d.inquiry_brand,
+               d.price_rmb, d.cost_price_rmb, d.created_at
+        FROM uni_order d LEFT JOIN uni_cli c ON d.cli_id = c.cli_id
+        WHERE d.mpn_norm = ? ORDER BY d.created_at DESC LIMIT ?
+    """,
+    'buy': """
+        SELECT b.buy_id, b.buy_date, b.order_id, b.vendor_id, v.vendor_name, b.buy_mpn, b.buy_brand,
+               b.buy_price_rmb, b.buy_qty, b.created_at
+        FROM uni_buy b LEFT JOIN uni_vendor v ON b.vendor_id = v.vendor_id
+        WHERE b.mpn_norm = ? ORDER BY b.created_at DESC LIMIT ?
+    """,
+}
+
+
+def lookup_mpn(mpn, limit=50):
+    """按规范型号精确查找询价/报价/销售订单/采购记录，每类按创建时间倒序最多 limit 条"""
+    norm = normalize_mpn(mpn)
+    result = {'mpn': mpn, 'mpn_norm': norm}
+    if not norm:
+        result.update({name: [] for name in _LOOKUP_SQL})
+        return result
+    with get_db_connection() as conn:
+        for name, sql in _LOOKUP_SQL.items():
+            rows = conn.execute(sql, (norm, limit)).fetchall()
+            result[name] = [{k: ("" if v is None else v) for k, v in dict(r).items()} for r in rows]
+    return result
+
+
+if __name__ == "__main__":
+    from Sills.base import init_db
+    init_db()
+    backfill_mpn_norm()
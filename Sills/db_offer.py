@@ -3,20 +3,31 @@ import uuid
 import csv
 import io
 from datetime import datetime
-from Sills.base import get_db_connection, get_exchange_rates
-
-def get_offer_list(page=1, page_size=10, search_kw="", start_date="", end_date="", cli_id="", is_transferred="", status=""):
-    offset = (page - 1) * page_size
-
-    base_query = """
+from Sills.base import get_db_connection, get_exchange_rates, bulk_insert, fetch_in, count_rows, parse_keyset_cursor, keyset_condition, keyset_page
+from Sills.db_search import build_search_condition
+from Sills.db_mpn import normalize_mpn, with_mpn_norm
+from Sills.db_sequence import next_id, allocate_ids
+from Sills.entity_cache import entity_exists, entity_name_map
+
+def build_offer_list_query(search_kw="", start_date="", end_date="", cli_id="", is_transferred="", status=""):
+    """报价列表的 FROM/WHERE 子句和参数（列表页与按条件导出共用）"""
+    # 型号/单号走搜索索引；供应商、负责人、客户名先在小表上匹配，再按外键索引取回报价
+    # 客户取 COALESCE(o.cli_id, q.cli_id)：报价自身未指定客户时才看对应需求的客户
+    search_sql, params = build_search_condition('uni_offer', 'o', search_kw, related=[
+        "SELECT offer_id FROM uni_offer WHERE vendor_id IN (SELECT vendor_id FROM uni_vendor WHERE vendor_name LIKE ?)",
+        "SELECT offer_id FROM uni_offer WHERE emp_id IN (SELECT emp_id FROM uni_emp WHERE emp_name LIKE ?)",
+        "SELECT offer_id FROM uni_offer WHERE cli_id IN (SELECT cli_id FROM uni_cli WHERE cli_name LIKE ?)",
+        """SELECT offer_id FROM uni_offer WHERE cli_id IS NULL AND quote_id IN
+           (SELECT quote_id FROM uni_quote WHERE cli_id IN (SELECT cli_id FROM uni_cli WHERE cli_name LIKE ?))""",
+    ])
+    base_query = f"""
     FROM uni_offer o
     LEFT JOIN uni_vendor v ON o.vendor_id = v.vendor_id
     LEFT JOIN uni_emp e ON o.emp_id = e.emp_id
     LEFT JOIN uni_quote q ON o.quote_id = q.quote_id
     LEFT JOIN uni_cli c ON COALESCE(o.cli_id, q.cli_id) = c.cli_id
-    WHERE (o.inquiry_mpn LIKE ? OR o.offer_id LIKE ? OR v.vendor_name LIKE ? OR e.emp_name LIKE ? OR c.cli_name LIKE ?)
+    WHERE {search_sql}
     """
-    params = [f"%{search_kw}%", f"%{search_kw}%", f"%{search_kw}%", f"%{search_kw}%", f"%{search_kw}%"]
 
     if start_date:
         base_query += " AND o.offer_date >= ?"
@@ -33,6 +44,27 @@ def get_offer_list(page=1, page_size=10, search_kw="", start_date="", end_date="
     if status:
         base_query += " AND o.status = ?"
         params.append(status)
+    return base_query, params
+
+
+def get_offer_list(page=1, page_size=10, search_kw="", start_date="", end_date="", cli_id="", is_transferred="", status="", after=None):
+    """
+    报价列表
+    after: 游标分页 "<created_at>,<offer_id>"（"" 为第一页），传入时按 created_at 排序并返回 (results, next_cursor)
+    """
+    offset = (page - 1) * page_size
+    base_query, params = build_offer_list_query(search_kw, start_date, end_date, cli_id, is_transferred, status)
+
+    order_sql = "ORDER BY o.offer_date DESC, o.created_at DESC"
+    limit = page_size
+    if after is not None:
+        cursor = parse_keyset_cursor(after)
+        if cursor:
+            cond, cond_params = keyset_condition("o.created_at", "o.offer_id", cursor)
+            base_query += f" AND {cond}"
+            params.extend(cond_params)
+        order_sql = "ORDER BY o.created_at DESC, o.offer_id DESC"
+        limit, offset = page_size + 1, 0
 
     query = f"""
     SELECT o.*, v.vendor_name, e.emp_name, c.cli_name, COALESCE(o.cli_id, c.cli_id) as cli_id, c.margin_rate,
@@ -49,15 +81,19 @@ def get_offer_list(page=1, page_size=10, search_kw="", start_date="", end_date="
             ROUND(CAST(o.offer_price_rmb - o.cost_price_rmb AS numeric), 3) as profit,
             CAST(ROUND(CAST((o.offer_price_rmb - o.cost_price_rmb) * o.quoted_qty AS numeric), 0) AS INTEGER) as total_profit
     {base_query}
-    ORDER BY o.offer_date DESC, o.created_at DESC
+    {order_sql}
     LIMIT ? OFFSET ?
     """
 
     count_query = f"SELECT COUNT(*) {base_query}"
 
     with get_db_connection() as conn:
-        total = conn.execute(count_query, params).fetchone()[0]
-        items = conn.execute(query, params + [page_size, offset]).fetchall()
+        if after is None:
+            unfiltered = not any([search_kw, start_date, end_date, cli_id, is_transferred, status])
+            total = count_rows(conn, count_query, params, approx_table='uni_offer' if unfiltered else None)
+        items = conn.execute(query, params + [limit, offset]).fetchall()
+        if after is not None:
+            items, total = keyset_page(items, page_size, 'created_at', 'offer_id')
 
         results = []
         for row in items:
@@ -92,17 +128,100 @@ def get_offer_list(page=1, page_size=10, search_kw="", start_date="", end_date="
 
         return results, total
 
+# 批量插入的列顺序（与 _offer_row 返回值一致）
+_OFFER_COLUMNS = (
+    'offer_id', 'offer_date', 'quote_id', 'cli_id', 'inquiry_mpn', 'mpn_norm', 'quoted_mpn', 'inquiry_brand', 'quoted_brand',
+    'inquiry_qty', 'actual_qty', 'quoted_qty', 'cost_price_rmb', 'offer_price_rmb',
+    'price_kwr', 'price_usd', 'platform',
+    'vendor_id', 'date_code', 'delivery_date', 'emp_id', 'offer_statement', 'remark', 'status', 'target_price_rmb', 'is_transferred'
+)
+
+
+def _blank_to_none(value):
+    if value and str(value).strip() == "":
+        return None
+    return value
+
+
+def _offer_row(offer_id, data, emp_id, margin, rates):
+    """
+    按 add_offer 的规则把一条报价数据换算成插入行（数量默认值、按利润率计算报价、KRW/USD 价格）
+    margin: 客户利润率（%），rates: 报价日期的 (KRW, USD) 汇率
+    """
+    offer_date = data.get('offer_date') or datetime.now().strftime("%Y-%m-%d")
+
+    # Numerical normalization
+    inquiry_qty = 0
+    try: inquiry_qty = int(data.get('inquiry_qty') or 0)
+    except: pass
+
+    actual_qty = data.get('actual_qty')
+    if not actual_qty or str(actual_qty).strip() == "" or str(actual_qty) == "0":
+        actual_qty = inquiry_qty
+    else:
+        try: actual_qty = int(actual_qty)
+        except: actual_qty = inquiry_qty
+
+    # quoted_qty: 优先使用 quoted_qty，如果没有则使用 actual_qty（从需求管理转报价时）
+    quoted_qty = data.get('quoted_qty')
+    if not quoted_qty or str(quoted_qty).strip() == "" or str(quoted_qty) == "0":
+        # 从需求管理转报价时，actual_qty 就是报价数量
+        if actual_qty and str(actual_qty) != "0":
+            quoted_qty = actual_qty
+        else:
+            quoted_qty = inquiry_qty
+    else:
+        try: quoted_qty = int(quoted_qty)
+        except: quoted_qty = inquiry_qty
+
+    cost_price = 0.0
+    try: cost_price = float(data.get('cost_price_rmb') or 0.0)
+    except: pass
+
+    offer_price = 0.0
+    try: offer_price = float(data.get('offer_price_rmb') or 0.0)
+    except: pass
+
+    # Handle auto-calc based on margin (只有当报价未提供时才自动计算)
+    if offer_price == 0.0 and cost_price > 0:
+        offer_price = cost_price * (1 + margin / 100.0)
+
+    krw_val, usd_val = rates
+    if krw_val > 10: price_kwr = round(offer_price * krw_val, 1)
+    else: price_kwr = round(offer_price / krw_val, 1) if krw_val else 0.0
+
+    # USD汇率表示 1 RMB = ? USD，直接乘
+    price_usd = round(offer_price * usd_val, 2) if usd_val else 0.0
+
+    inquiry_mpn = data.get('inquiry_mpn', '')
+    quoted_mpn = data.get('quoted_mpn', '')
+    if not quoted_mpn: quoted_mpn = inquiry_mpn
+
+    inquiry_brand = data.get('inquiry_brand', '')
+    quoted_brand = data.get('quoted_brand', '')
+    if not quoted_brand: quoted_brand = inquiry_brand
+
+    return (
+        offer_id, offer_date, _blank_to_none(data.get('quote_id')), data.get('cli_id'),
+        inquiry_mpn, normalize_mpn(inquiry_mpn), quoted_mpn,
+        inquiry_brand, quoted_brand,
+        inquiry_qty, actual_qty, quoted_qty,
+        cost_price, offer_price,
+        price_kwr, price_usd,
+        data.get('platform', ''),
+        _blank_to_none(data.get('vendor_id')), data.get('date_code', ''),
+        data.get('delivery_date', ''), emp_id,
+        data.get('offer_statement', ''), data.get('remark', ''),
+        data.get('status', '询价中'), data.get('target_price_rmb', None),
+        data.get('is_transferred', '未转')
+    )
+
+
 def add_offer(data, emp_id, conn=None):
     try:
         offer_date = data.get('offer_date') or datetime.now().strftime("%Y-%m-%d")
-
-        quote_id = data.get('quote_id')
-        if quote_id and str(quote_id).strip() == "":
-            quote_id = None
-
-        vendor_id = data.get('vendor_id')
-        if vendor_id and str(vendor_id).strip() == "":
-            vendor_id = None
+        quote_id = _blank_to_none(data.get('quote_id'))
+        vendor_id = _blank_to_none(data.get('vendor_id'))
 
         # Validation Logic
         must_close = False
@@ -111,21 +230,8 @@ def add_offer(data, emp_id, conn=None):
             must_close = True
 
         try:
-            # 生成递增的5位数报价编号
-            last_offer = conn.execute("SELECT offer_id FROM uni_offer WHERE offer_id LIKE 'b%' ORDER BY offer_id DESC LIMIT 1").fetchone()
-            if last_offer:
-                try:
-                    last_num = int(last_offer['offer_id'][1:])  # 去掉前缀b，获取数字部分
-                    new_num = last_num + 1
-                except:
-                    new_num = 1
-            else:
-                new_num = 1
-            offer_id = f"b{new_num:05d}"  # 格式化为5位数，例如 b00001
-
             # 1. Emp Check
-            emp = conn.execute("SELECT emp_id FROM uni_emp WHERE emp_id = ?", (emp_id,)).fetchone()
-            if not emp:
+            if not entity_exists('emp', emp_id, conn):
                 return False, f"员工编号 {emp_id} 不存在"
 
             # 2. Quote Check
@@ -140,91 +246,20 @@ def add_offer(data, emp_id, conn=None):
                     return False, f"该需求 {quote_id} 已转换过报价 ({existing['offer_id']})"
 
             # 3. Vendor Check
-            if vendor_id:
-                v_row = conn.execute("SELECT vendor_id FROM uni_vendor WHERE vendor_id = ?", (vendor_id,)).fetchone()
-                if not v_row:
-                    return False, f"供应商编号 {vendor_id} 不存在"
-
-            # Numerical normalization
-            inquiry_qty = 0
-            try: inquiry_qty = int(data.get('inquiry_qty') or 0)
-            except: pass
-
-            actual_qty = data.get('actual_qty')
-            if not actual_qty or str(actual_qty).strip() == "" or str(actual_qty) == "0":
-                actual_qty = inquiry_qty
-            else:
-                try: actual_qty = int(actual_qty)
-                except: actual_qty = inquiry_qty
-
-            # quoted_qty: 优先使用 quoted_qty，如果没有则使用 actual_qty（从需求管理转报价时）
-            quoted_qty = data.get('quoted_qty')
-            if not quoted_qty or str(quoted_qty).strip() == "" or str(quoted_qty) == "0":
-                # 从需求管理转报价时，actual_qty 就是报价数量
-                if actual_qty and str(actual_qty) != "0":
-                    quoted_qty = actual_qty
-                else:
-                    quoted_qty = inquiry_qty
-            else:
-                try: quoted_qty = int(quoted_qty)
-                except: quoted_qty = inquiry_qty
+            if vendor_id and not entity_exists('vendor', vendor_id, conn):
+                return False, f"供应商编号 {vendor_id} 不存在"
 
-            cost_price = 0.0
-            try: cost_price = float(data.get('cost_price_rmb') or 0.0)
-            except: pass
-
-            offer_price = 0.0
-            try: offer_price = float(data.get('offer_price_rmb') or 0.0)
-            except: pass
-
-            # Handle auto-calc based on margin (只有当报价未提供时才自动计算)
-            if offer_price == 0.0 and cost_price > 0:
-                margin = 0.0
-                if quote_id:
-                    margin_row = conn.execute("SELECT margin_rate FROM uni_cli c JOIN uni_quote q ON c.cli_id = q.cli_id WHERE q.quote_id = ?", (quote_id,)).fetchone()
-                    if margin_row: margin = float(margin_row[0] or 0.0)
-                offer_price = cost_price * (1 + margin / 100.0)
-
-            # 使用缓存的汇率
-            krw_val, usd_val = get_exchange_rates()
-
-            if krw_val > 10: price_kwr = round(offer_price * krw_val, 1)
-            else: price_kwr = round(offer_price / krw_val, 1) if krw_val else 0.0
-
-            # USD汇率表示 1 RMB = ? USD，直接乘
-            price_usd = round(offer_price * usd_val, 2) if usd_val else 0.0
-
-            inquiry_mpn = data.get('inquiry_mpn', '')
-            quoted_mpn = data.get('quoted_mpn', '')
-            if not quoted_mpn: quoted_mpn = inquiry_mpn
-
-            inquiry_brand = data.get('inquiry_brand', '')
-            quoted_brand = data.get('quoted_brand', '')
-            if not quoted_brand: quoted_brand = inquiry_brand
-            
-            sql = """
-            INSERT INTO uni_offer (
-                offer_id, offer_date, quote_id, cli_id, inquiry_mpn, quoted_mpn, inquiry_brand, quoted_brand,
-                inquiry_qty, actual_qty, quoted_qty, cost_price_rmb, offer_price_rmb,
-                price_kwr, price_usd, platform,
-                vendor_id, date_code, delivery_date, emp_id, offer_statement, remark, status, target_price_rmb, is_transferred
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            params = (
-                offer_id, offer_date, quote_id, data.get('cli_id'),
-                inquiry_mpn, quoted_mpn,
-                inquiry_brand, quoted_brand,
-                inquiry_qty, actual_qty, quoted_qty,
-                cost_price, offer_price,
-                price_kwr, price_usd,
-                data.get('platform', ''),
-                vendor_id, data.get('date_code', ''),
-                data.get('delivery_date', ''), emp_id,
-                data.get('offer_statement', ''), data.get('remark', ''),
-                data.get('status', '询价中'), data.get('target_price_rmb', None),
-                data.get('is_transferred', '未转')
-            )
-            conn.execute(sql, params)
+            margin = 0.0
+            if quote_id:
+                margin_row = conn.execute("SELECT margin_rate FROM uni_cli c JOIN uni_quote q ON c.cli_id = q.cli_id WHERE q.quote_id = ?", (quote_id,)).fetchone()
+                if margin_row: margin = float(margin_row[0] or 0.0)
+
+            # 生成递增的5位数报价编号（校验通过后再分配）
+            offer_id = next_id('offer', conn)
+            # 按报价日期的汇率计价
+            params = _offer_row(offer_id, data, emp_id, margin, get_exchange_rates(offer_date))
+            placeholders = ', '.join(['?'] * len(_OFFER_COLUMNS))
+            conn.execute(f"INSERT INTO uni_offer ({', '.join(_OFFER_COLUMNS)}) VALUES ({placeholders})", params)
             if must_close:
                 conn.commit()
             return True, f"报价单 {offer_id} 创建成功"
@@ -234,10 +269,68 @@ def add_offer(data, emp_id, conn=None):
     except Exception as e:
         return False, f"数据库错误: {str(e)}"
 
+
+def _insert_offers(conn, items, emp_id):
+    """
+    批量创建报价（在调用方的事务中，不提交）
+    被引用的需求（含客户利润率）、已转报价各用一次 IN 查询预先载入，员工和供应商查主数据缓存，
+    汇率按不同报价日期各取一次，校验和计价都在内存中完成，最后一条批量 INSERT 写入
+
+    items: [(label, data)]，label 用于错误信息
+    返回 (创建的 [(offer_id, data)], errors)
+    """
+    if not items:
+        return [], []
+    if not entity_exists('emp', emp_id, conn):
+        return [], [f"员工编号 {emp_id} 不存在"]
+
+    quote_ids = [_blank_to_none(data.get('quote_id')) for _, data in items]
+    vendor_ids = [_blank_to_none(data.get('vendor_id')) for _, data in items]
+    margins = {r['quote_id']: float(r['margin_rate'] or 0.0) for r in fetch_in(
+        conn, "SELECT q.quote_id, c.margin_rate FROM uni_quote q LEFT JOIN uni_cli c ON c.cli_id = q.cli_id "
+              "WHERE q.quote_id IN ({placeholders})", quote_ids)}
+    converted = {r['quote_id']: r['offer_id'] for r in fetch_in(
+        conn, "SELECT quote_id, offer_id FROM uni_offer WHERE quote_id IN ({placeholders})", quote_ids)}
+
+    errors = []
+    valid = []
+    in_batch = set()  # 同一批次中重复的需求只转一次
+    for (label, data), quote_id, vendor_id in zip(items, quote_ids, vendor_ids):
+        if quote_id:
+            if quote_id not in margins:
+                errors.append(f"{label}: 需求编号 {quote_id} 不存在")
+                continue
+            if quote_id in converted:
+                errors.append(f"{label}: 该需求 {quote_id} 已转换过报价 ({converted[quote_id]})")
+                continue
+            if quote_id in in_batch:
+                errors.append(f"{label}: 该需求 {quote_id} 在同一批次中重复")
+                continue
+            in_batch.add(quote_id)
+        if vendor_id and not entity_exists('vendor', vendor_id, conn):
+            errors.append(f"{label}: 供应商编号 {vendor_id} 不存在")
+            continue
+        valid.append(data)
+
+    if not valid:
+        return [], errors
+
+    # 按报价日期的汇率计价，每个日期只取一次
+    today = datetime.now().strftime("%Y-%m-%d")
+    rates = {d: get_exchange_rates(d) for d in {data.get('offer_date') or today for data in valid}}
+    offer_ids = allocate_ids('offer', len(valid), conn)
+    rows = [_offer_row(offer_id, data, emp_id, margins.get(_blank_to_none(data.get('quote_id')), 0.0),
+                       rates[data.get('offer_date') or today])
+            for offer_id, data in zip(offer_ids, valid)]
+    bulk_insert(conn, 'uni_offer', _OFFER_COLUMNS, rows)
+    return list(zip(offer_ids, valid)), errors
+
+
 def update_offer(offer_id, data):
     try:
         if 'emp_id' in data:
             del data['emp_id'] # Prevent changing owner post-creation
+        with_mpn_norm('uni_offer', data)
 
         # 检查是否更新了价格字段，需要同步更新关联订单
         price_fields = ['offer_price_rmb', 'price_kwr', 'price_usd']
@@ -326,7 +419,6 @@ def batch_import_offer_text(text, emp_id):
     f = io.StringIO(text.strip())
     reader = csv.reader(f)
     rows = list(reader)
-    success_count = 0
     errors = []
 
     if not rows: return 0, []
@@ -337,6 +429,10 @@ def batch_import_offer_text(text, emp_id):
     if len(first_row) > 0 and ('日期' in first_row[0] or '型号' in first_row[0] or 'MPN' in first_row[0].upper()):
         start_idx = 1
 
+    # 客户名称 -> 客户编号（主数据缓存）
+    cli_name_to_id = entity_name_map('cli')
+
+    items = []
     # 新模板列索引：
     # 0: 日期, 1: 询价型号, 2: 报价型号, 3: 询价品牌, 4: 报价品牌,
     # 5: 询价数量, 6: 报价数量, 7: 目标价, 8: 成本价, 9: 报价,
@@ -393,48 +489,42 @@ def batch_import_offer_text(text, emp_id):
 
             # 通过客户名称自动匹配客户编号
             cli_name = parts[10] if len(parts) > 10 and parts[10].strip() else ""
-            if cli_name:
-                with get_db_connection() as conn:
-                    cli_row = conn.execute(
-                        "SELECT cli_id FROM uni_cli WHERE cli_name = ?", (cli_name,)
-                    ).fetchone()
-                    if cli_row:
-                        data["cli_id"] = cli_row['cli_id']
-                    # 如果找不到匹配，cli_id 保持为 None，不影响导入
+            # 如果找不到匹配，cli_id 保持为 None，不影响导入
+            data["cli_id"] = cli_name_to_id.get(cli_name)
 
             if not data["inquiry_mpn"] and not data["quoted_mpn"]:
                 errors.append(f"第 {i} 行: 缺少型号信息")
                 continue
 
-            ok, msg = add_offer(data, emp_id)
-            if ok: success_count += 1
-            else: errors.append(f"第 {i} 行 ({data.get('inquiry_mpn') or data.get('quoted_mpn')}): {msg}")
+            items.append((f"第 {i} 行 ({data.get('inquiry_mpn') or data.get('quoted_mpn')})", data))
         except Exception as e:
             errors.append(f"第 {i} 行: 数据格式解析失败 ({str(e)})")
 
-    return success_count, errors
+    # 全部行解析完成后一次性校验、写入
+    try:
+        with get_db_connection() as conn:
+            created, insert_errors = _insert_offers(conn, items, emp_id)
+            conn.commit()
+    except Exception as e:
+        return 0, errors + [f"数据库错误: {str(e)}"]
+    return len(created), errors + insert_errors
 
 def batch_convert_from_quote(quote_ids, emp_id):
     if not quote_ids: return False, "未选中记录"
     try:
-        success_count = 0
-        errors = []
         with get_db_connection() as conn:
             # Get data from uni_quote
-            placeholders = ','.join(['?'] * len(quote_ids))
-            rows = conn.execute(f"SELECT * FROM uni_quote WHERE quote_id IN ({placeholders})", quote_ids).fetchall()
-
-            for row in rows:
-                data = dict(row)
-                # Pass connection to add_offer to stay in same transaction
-                ok, msg = add_offer(data, emp_id, conn=conn)
-                if ok:
-                    success_count += 1
-                    # Update source quote status and transferred flag
-                    conn.execute("UPDATE uni_quote SET is_transferred = '已转', status = '已报价' WHERE quote_id = ?", (data['quote_id'],))
-            if success_count > 0:
+            rows = fetch_in(conn, "SELECT * FROM uni_quote WHERE quote_id IN ({placeholders})", quote_ids)
+            items = [(row['quote_id'], dict(row)) for row in rows]
+
+            # 同一事务内批量创建报价，并回写需求状态
+            created, errors = _insert_offers(conn, items, emp_id)
+            conn.executemany("UPDATE uni_quote SET is_transferred = '已转', status = '已报价' WHERE quote_id = ?",
+                             [(data['quote_id'],) for _, data in created])
+            if created:
                 conn.commit()
 
+        success_count = len(created)
         if success_count == 0 and errors:
             return False, errors[0]
         return True, f"成功转换 {success_count} 条记录" + (f" (失败 {len(errors)} 条)" if errors else "")
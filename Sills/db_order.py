@@ -1,7 +1,11 @@
 import sqlite3
 import uuid
 from datetime import datetime
-from Sills.base import get_db_connection, get_exchange_rates
+from Sills.base import get_db_connection, get_exchange_rates, bulk_insert, fetch_in, count_rows, parse_keyset_cursor, keyset_condition, keyset_page
+from Sills.db_search import build_search_condition
+from Sills.db_mpn import normalize_mpn, with_mpn_norm
+from Sills.db_sequence import next_id, allocate_ids
+from Sills.entity_cache import get_entity
 
 def generate_order_no():
     """生成格式为 d + 5位递增数字的订单编号"""
@@ -17,17 +21,20 @@ def generate_order_no():
             new_num = 1
         return f"d{new_num:05d}"  # 格式化为5位数，例如 d00001
 
-def get_order_list(page=1, page_size=10, search_kw="", cli_id="", start_date="", end_date="", is_finished="", is_transferred=""):
-    offset = (page - 1) * page_size
-    query = """
+def build_order_list_query(search_kw="", cli_id="", start_date="", end_date="", is_finished="", is_transferred=""):
+    """销售订单列表的 FROM/WHERE 子句和参数（列表页与按条件导出共用）"""
+    # 型号/单号走搜索索引，客户名先在 uni_cli 上匹配
+    search_sql, params = build_search_condition('uni_order', 'o', search_kw, related=[
+        "SELECT order_id FROM uni_order WHERE cli_id IN (SELECT cli_id FROM uni_cli WHERE cli_name LIKE ?)",
+    ])
+    query = f"""
     FROM uni_order o
     JOIN uni_cli c ON o.cli_id = c.cli_id
     LEFT JOIN uni_offer off ON o.offer_id = off.offer_id
     LEFT JOIN uni_vendor v ON off.vendor_id = v.vendor_id
     LEFT JOIN uni_quote q ON off.quote_id = q.quote_id
-    WHERE (o.inquiry_mpn LIKE ? OR o.order_id LIKE ? OR c.cli_name LIKE ?)
+    WHERE {search_sql}
     """
-    params = [f"%{search_kw}%", f"%{search_kw}%", f"%{search_kw}%"]
 
     if cli_id:
         query += " AND o.cli_id = ?"
@@ -44,18 +51,43 @@ def get_order_list(page=1, page_size=10, search_kw="", cli_id="", start_date="",
     if is_transferred:
         query += " AND o.is_transferred = ?"
         params.append(is_transferred)
+    return query, params
+
+
+def get_order_list(page=1, page_size=10, search_kw="", cli_id="", start_date="", end_date="", is_finished="", is_transferred="", after=None):
+    """
+    销售订单列表
+    after: 游标分页 "<created_at>,<order_id>"（"" 为第一页），传入时按 created_at 排序并返回 (results, next_cursor)
+    """
+    offset = (page - 1) * page_size
+    query, params = build_order_list_query(search_kw, cli_id, start_date, end_date, is_finished, is_transferred)
+
+    order_sql = "ORDER BY o.order_date DESC, o.created_at DESC"
+    limit = page_size
+    if after is not None:
+        cursor = parse_keyset_cursor(after)
+        if cursor:
+            cond, cond_params = keyset_condition("o.created_at", "o.order_id", cursor)
+            query += f" AND {cond}"
+            params.extend(cond_params)
+        order_sql = "ORDER BY o.created_at DESC, o.order_id DESC"
+        limit, offset = page_size + 1, 0
 
     count_sql = "SELECT COUNT(*) " + query
     data_sql = """SELECT o.*, c.cli_name, c.margin_rate,
         off.quoted_mpn, off.offer_price_rmb, off.cost_price_rmb AS source_cost,
         off.inquiry_qty, off.quoted_qty, off.date_code, off.delivery_date,
         v.vendor_name
-        """ + query + " ORDER BY o.order_date DESC, o.created_at DESC LIMIT ? OFFSET ?"
-    params_with_limit = params + [page_size, offset]
+        """ + query + f" {order_sql} LIMIT ? OFFSET ?"
+    params_with_limit = params + [limit, offset]
 
     with get_db_connection() as conn:
-        total = conn.execute(count_sql, params).fetchone()[0]
+        if after is None:
+            unfiltered = not any([search_kw, cli_id, start_date, end_date, is_finished, is_transferred])
+            total = count_rows(conn, count_sql, params, approx_table='uni_order' if unfiltered else None)
         rows = conn.execute(data_sql, params_with_limit).fetchall()
+        if after is not None:
+            rows, total = keyset_page(rows, page_size, 'created_at', 'order_id')
 
         results = [dict(r) for r in rows]
         krw_val, usd_val = get_exchange_rates()
@@ -97,16 +129,7 @@ def add_order(data, conn=None):
         try:
             if not order_id:
                 # 生成递增的5位数销售订单编号
-                last_order = conn.execute("SELECT order_id FROM uni_order WHERE order_id LIKE 'd%' ORDER BY order_id DESC LIMIT 1").fetchone()
-                if last_order:
-                    try:
-                        last_num = int(last_order['order_id'][1:])  # 去掉前缀d，获取数字部分
-                        new_num = last_num + 1
-                    except:
-                        new_num = 1
-                else:
-                    new_num = 1
-                order_id = f"d{new_num:05d}"  # 格式化为5位数，例如 d00001
+                order_id = next_id('order', conn)
 
             existing = conn.execute("SELECT order_id FROM uni_order WHERE order_id = ?", (order_id,)).fetchone()
             if existing:
@@ -116,7 +139,7 @@ def add_order(data, conn=None):
             if not cli_id or str(cli_id).strip() == "":
                 return False, "缺少客户编号"
 
-            cli = conn.execute("SELECT cli_name FROM uni_cli WHERE cli_id = ?", (cli_id,)).fetchone()
+            cli = get_entity('cli', cli_id, conn)
             if not cli:
                 return False, f"客户编号 {cli_id} 在数据库中不存在"
             cli_name = cli['cli_name']
@@ -136,13 +159,13 @@ def add_order(data, conn=None):
 
             sql = """
             INSERT INTO uni_order (
-                order_id, order_no, order_date, cli_id, offer_id, inquiry_mpn, inquiry_brand,
+                order_id, order_no, order_date, cli_id, offer_id, inquiry_mpn, mpn_norm, inquiry_brand,
                 price_rmb, price_kwr, price_usd, cost_price_rmb, is_finished, is_paid, paid_amount, return_status, remark, is_transferred
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """
             params = (
                 order_id, order_no, order_date, cli_id, offer_id,
-                data.get('inquiry_mpn'), data.get('inquiry_brand'),
+                data.get('inquiry_mpn'), normalize_mpn(data.get('inquiry_mpn')), data.get('inquiry_brand'),
                 data.get('price_rmb'), data.get('price_kwr'), data.get('price_usd'),
                 data.get('cost_price_rmb'),
                 int(data.get('is_finished', 0)),
@@ -183,7 +206,7 @@ def batch_import_order(text, cli_id):
             start_idx = 1
 
         with get_db_connection() as conn:
-            cli = conn.execute("SELECT cli_name FROM uni_cli WHERE cli_id = ?", (cli_id,)).fetchone()
+            cli = get_entity('cli', cli_id, conn)
             if not cli:
                 return 0, [f"客户编号 {cli_id} 不存在"]
             cli_name = cli['cli_name']
@@ -196,7 +219,8 @@ def batch_import_order(text, cli_id):
                     order_date_input = row[0] if len(row) > 0 and row[0] else ""
                     import re
                     if order_date_input and re.match(r'^\d{4}-\d{1,2}-\d{1,2}$', order_date_input):
-                        order_date = order_date_input
+                        # 补零为 YYYY-MM-DD（销售汇总表按日期字符串分组）
+                        order_date = datetime.strptime(order_date_input, "%Y-%m-%d").strftime("%Y-%m-%d")
                     else:
                         # 如果日期格式错误或为空，使用当前日期并记录错误
                         if order_date_input and not re.match(r'^\d{4}-\d{1,2}-\d{1,2}$', order_date_input):
@@ -215,32 +239,22 @@ def batch_import_order(text, cli_id):
                     if not offer_id and not inquiry_mpn:
                         continue
 
-                    # 生成递增的5位数销售订单编号
-                    last_order = conn.execute("SELECT order_id FROM uni_order WHERE order_id LIKE 'd%' ORDER BY order_id DESC LIMIT 1").fetchone()
-                    if last_order:
-                        try:
-                            last_num = int(last_order['order_id'][1:])
-                            new_num = last_num + 1
-                        except:
-                            new_num = 1
-                    else:
-                        new_num = 1
-                    order_id = f"d{new_num:05d}"
-                    order_no = order_id  # order_no 使用与 order_id 相同的值
-
                     insert_data.append((
-                        order_id, order_no, order_date, cli_id, offer_id,
-                        inquiry_mpn, inquiry_brand, 0, 0, 0, 0, 0, 0, 0.0, '正常', remark, '未转'
+                        order_date, cli_id, offer_id,
+                        inquiry_mpn, normalize_mpn(inquiry_mpn), inquiry_brand, 0, 0, 0, 0, 0, 0, 0.0, '正常', remark, '未转'
                     ))
                 except Exception as e:
                     errors.append(f"行解析失败：{str(e)}")
 
             if insert_data:
+                # 一次分配全部销售订单编号，order_no 使用与 order_id 相同的值
+                order_ids = allocate_ids('order', len(insert_data), conn)
+                insert_data = [(oid, oid) + row for oid, row in zip(order_ids, insert_data)]
                 sql = """
                 INSERT INTO uni_order (
-                    order_id, order_no, order_date, cli_id, offer_id, inquiry_mpn, inquiry_brand,
+                    order_id, order_no, order_date, cli_id, offer_id, inquiry_mpn, mpn_norm, inquiry_brand,
                     price_rmb, price_kwr, price_usd, cost_price_rmb, is_finished, is_paid, paid_amount, return_status, remark, is_transferred
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """
                 conn.executemany(sql, insert_data)
                 conn.commit()
@@ -251,66 +265,66 @@ def batch_import_order(text, cli_id):
 
     return success_count, errors
 
+_CONVERT_ORDER_COLUMNS = (
+    'order_id', 'order_no', 'order_date', 'cli_id', 'offer_id', 'inquiry_mpn', 'mpn_norm', 'inquiry_brand',
+    'price_rmb', 'price_kwr', 'price_usd', 'cost_price_rmb', 'is_finished', 'is_paid', 'paid_amount',
+    'return_status', 'remark', 'is_transferred'
+)
+
+
 def batch_convert_from_offer(offer_ids, cli_id=None):
-    """批量从报价转订单，优化：单事务"""
+    """
+    批量从报价转订单（集合操作，单事务）
+    一次联查取出报价、需求对应的客户和已存在的销售订单，内存中逐行判定，
+    一次分配订单编号、批量插入，再批量回写报价的 is_transferred
+    """
     if not offer_ids: return False, "未选中记录"
     try:
-        success_count = 0
         errors = []
         with get_db_connection() as conn:
-            placeholders = ','.join(['?'] * len(offer_ids))
-            rows = conn.execute(f"SELECT * FROM uni_offer WHERE offer_id IN ({placeholders})", offer_ids).fetchall()
-
-            for row in rows:
-                offer_data = dict(row)
-                existing = conn.execute("SELECT order_id FROM uni_order WHERE offer_id = ?", (offer_data['offer_id'],)).fetchone()
-                if existing:
+            rows = fetch_in(conn, """
+                SELECT f.offer_id, f.quoted_mpn, f.inquiry_mpn, f.quoted_brand, f.inquiry_brand,
+                       f.offer_price_rmb, f.price_kwr, f.price_usd, f.cost_price_rmb, f.remark,
+                       q.cli_id AS quote_cli_id, MIN(ord.order_id) AS existing_order_id
+                FROM uni_offer f
+                LEFT JOIN uni_quote q ON q.quote_id = f.quote_id
+                LEFT JOIN uni_order ord ON ord.offer_id = f.offer_id
+                WHERE f.offer_id IN ({placeholders})
+                GROUP BY f.offer_id, f.quoted_mpn, f.inquiry_mpn, f.quoted_brand, f.inquiry_brand,
+                         f.offer_price_rmb, f.price_kwr, f.price_usd, f.cost_price_rmb, f.remark, q.cli_id
+            """, offer_ids)
+
+            todo = []
+            for offer_data in rows:
+                if offer_data['existing_order_id']:
                     errors.append(f"{offer_data['offer_id']}: 已存在销售订单")
                     continue
-
-                final_cli_id = cli_id
-                if not final_cli_id:
-                    quote_info = conn.execute("SELECT cli_id FROM uni_quote WHERE quote_id = ?", (offer_data['quote_id'],)).fetchone()
-                    if quote_info:
-                        final_cli_id = quote_info['cli_id']
-
+                final_cli_id = cli_id or offer_data['quote_cli_id']
                 if not final_cli_id:
                     errors.append(f"{offer_data['offer_id']}: 无法确定客户 ID")
                     continue
-
-                # 生成递增的5位数销售订单编号
-                last_order = conn.execute("SELECT order_id FROM uni_order WHERE order_id LIKE 'd%' ORDER BY order_id DESC LIMIT 1").fetchone()
-                if last_order:
-                    try:
-                        last_num = int(last_order['order_id'][1:])
-                        new_num = last_num + 1
-                    except:
-                        new_num = 1
-                else:
-                    new_num = 1
-                order_id = f"d{new_num:05d}"
-                order_no = order_id  # order_no 使用与 order_id 相同的值
-
-                sql = """
-                INSERT INTO uni_order (
-                    order_id, order_no, order_date, cli_id, offer_id, inquiry_mpn, inquiry_brand,
-                    price_rmb, price_kwr, price_usd, cost_price_rmb, is_finished, is_paid, paid_amount, return_status, remark, is_transferred
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                params = (
-                    order_id, order_no, datetime.now().strftime("%Y-%m-%d"), final_cli_id, offer_data['offer_id'],
-                    offer_data['quoted_mpn'] or offer_data['inquiry_mpn'],
-                    offer_data['quoted_brand'] or offer_data['inquiry_brand'],
-                    offer_data['offer_price_rmb'], offer_data['price_kwr'], offer_data['price_usd'],
-                    offer_data['cost_price_rmb'], 0, 0, 0.0, '正常', offer_data.get('remark', ''), '未转'
-                )
-                conn.execute(sql, params)
-                conn.execute("UPDATE uni_offer SET is_transferred = '已转' WHERE offer_id = ?", (offer_data['offer_id'],))
-                success_count += 1
-
-            if success_count > 0:
+                todo.append((offer_data, final_cli_id))
+
+            if todo:
+                # 一次分配全部销售订单编号，order_no 使用与 order_id 相同的值
+                order_ids = allocate_ids('order', len(todo), conn)
+                order_date = datetime.now().strftime("%Y-%m-%d")
+                insert_data = []
+                for order_id, (offer_data, final_cli_id) in zip(order_ids, todo):
+                    order_mpn = offer_data['quoted_mpn'] or offer_data['inquiry_mpn']
+                    insert_data.append((
+                        order_id, order_id, order_date, final_cli_id, offer_data['offer_id'],
+                        order_mpn, normalize_mpn(order_mpn),
+                        offer_data['quoted_brand'] or offer_data['inquiry_brand'],
+                        offer_data['offer_price_rmb'], offer_data['price_kwr'], offer_data['price_usd'],
+                        offer_data['cost_price_rmb'], 0, 0, 0.0, '正常', offer_data['remark'] or '', '未转'
+                    ))
+                bulk_insert(conn, 'uni_order', _CONVERT_ORDER_COLUMNS, insert_data)
+                conn.executemany("UPDATE uni_offer SET is_transferred = '已转' WHERE offer_id = ?",
+                                 [(offer_data['offer_id'],) for offer_data, _ in todo])
                 conn.commit()
 
+        success_count = len(todo)
         if success_count == 0 and errors:
             return False, errors[0]
         return True, f"成功转换 {success_count} 条记录" + (f" (失败 {len(errors)} 条)" if errors else "")
@@ -345,6 +359,7 @@ def update_order_status(order_id, field, value):
 
 def update_order(order_id, data):
     try:
+        with_mpn_norm('uni_order', data)
         set_cols = []
         params = []
         for k, v in data.items():
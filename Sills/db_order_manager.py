@@ -8,6 +8,10 @@ uni_order_attachment - 客户订单附件表
 import uuid
 from datetime import datetime
 from Sills.base import get_db_connection, get_exchange_rates
+from Sills.db_config import is_postgresql
+from Sills.db_mpn import normalize_mpn
+from Sills.db_sequence import next_id
+from Sills.entity_cache import entity_exists, entity_name_map
 
 
 def generate_customer_order_no():
@@ -116,8 +120,7 @@ def add_manager(data):
             if not cli_id:
                 return False, "缺少客户编号"
 
-            cli = conn.execute("SELECT cli_id FROM uni_cli WHERE cli_id = ?", (cli_id,)).fetchone()
-            if not cli:
+            if not entity_exists('cli', cli_id, conn):
                 return False, f"客户编号 {cli_id} 不存在"
 
             order_date = data.get('order_date') or datetime.now().strftime("%Y-%m-%d")
@@ -217,12 +220,10 @@ def add_offer_to_manager(manager_id, offer_id):
                 return False, "该报价订单已关联到此客户订单"
 
             # 添加关联
+            # 添加关联（汇总字段由触发器同步）
             conn.execute("INSERT INTO uni_order_manager_rel (manager_id, offer_id) VALUES (?, ?)", (manager_id, offer_id))
             conn.commit()
 
-            # 重新计算汇总
-            recalculate_manager_totals(manager_id)
-
         return True, "关联成功"
     except Exception as e:
         return False, f"数据库错误：{str(e)}"
@@ -237,58 +238,152 @@ def remove_offer_from_manager(manager_id, offer_id):
                 return False, "关联记录不存在"
             conn.commit()
 
-            # 重新计算汇总
-            recalculate_manager_totals(manager_id)
-
         return True, "移除成功"
     except Exception as e:
         return False, f"数据库错误：{str(e)}"
 
 
-def recalculate_manager_totals(manager_id):
-    """重新计算客户订单的汇总字段"""
+# ==================== 汇总字段 ====================
+# total_price_rmb/kwr/usd、total_cost_rmb、profit_rmb、model_count、total_qty 由触发器增量维护：
+# - 关联表新增/删除：加上/减去该报价的贡献
+# - 报价的价格、成本或数量修改：减去旧值、加上新值
+# - 报价删除（级联删除关联前）：减去旧值
+# 每条报价的贡献：单价 × 数量（数量为空或 0 时按 1 计），与原 recalculate_manager_totals 一致。
+# recalculate_all_managers() 用一条分组 UPDATE 重算全部客户订单，用于修复。
+
+_TOTAL_COLUMNS = ('total_price_rmb', 'total_price_kwr', 'total_price_usd', 'total_cost_rmb', 'profit_rmb', 'model_count', 'total_qty')
+
+
+def _contribution_sql(p):
+    """报价（列前缀 p，如 'o.'、'NEW.'）对客户订单汇总的贡献：price_rmb, price_kwr, price_usd, cost_rmb, qty"""
+    qty = f"(CASE WHEN COALESCE({p}quoted_qty, 0) = 0 THEN 1 ELSE {p}quoted_qty END)"
+    return (f"COALESCE({p}offer_price_rmb, 0) * {qty} AS price_rmb, COALESCE({p}price_kwr, 0) * {qty} AS price_kwr, "
+            f"COALESCE({p}price_usd, 0) * {qty} AS price_usd, COALESCE({p}cost_price_rmb, 0) * {qty} AS cost_rmb, "
+            f"{qty} AS qty")
+
+
+def _round_sql(expr):
+    if is_postgresql():
+        return f"ROUND(CAST({expr} AS NUMERIC), 2)"
+    return f"ROUND({expr}, 2)"
+
+
+def _apply_delta_sql(sign, source_sql, where_sql):
+    """生成按 source_sql（每行一条报价贡献）增减客户订单汇总的 UPDATE"""
+    m = "uni_order_manager."
+    return f"""
+        UPDATE uni_order_manager SET ({', '.join(_TOTAL_COLUMNS)}) = (
+            SELECT {_round_sql(f"COALESCE({m}total_price_rmb, 0) {sign} COALESCE(SUM(d.price_rmb), 0)")},
+                   {_round_sql(f"COALESCE({m}total_price_kwr, 0) {sign} COALESCE(SUM(d.price_kwr), 0)")},
+                   {_round_sql(f"COALESCE({m}total_price_usd, 0) {sign} COALESCE(SUM(d.price_usd), 0)")},
+                   {_round_sql(f"COALESCE({m}total_cost_rmb, 0) {sign} COALESCE(SUM(d.cost_rmb), 0)")},
+                   {_round_sql(f"COALESCE({m}profit_rmb, 0) {sign} COALESCE(SUM(d.price_rmb - d.cost_rmb), 0)")},
+                   COALESCE({m}model_count, 0) {sign} COUNT(*),
+                   COALESCE({m}total_qty, 0) {sign} COALESCE(SUM(d.qty), 0)
+            FROM ({source_sql}) d
+        )
+        WHERE {where_sql}"""
+
+
+def _trigger_statements(row):
+    """触发器内执行的语句（row 为 'NEW'/'OLD'）"""
+    rel_source = f"SELECT {_contribution_sql('o.')} FROM uni_offer o WHERE o.offer_id = {row}.offer_id"
+    offer_source = f"SELECT {_contribution_sql(row + '.')}"
+    offer_managers = f"manager_id IN (SELECT manager_id FROM uni_order_manager_rel WHERE offer_id = {row}.offer_id)"
+    return {
+        'rel': _apply_delta_sql('+' if row == 'NEW' else '-', rel_source, f"manager_id = {row}.manager_id"),
+        'offer': _apply_delta_sql('+' if row == 'NEW' else '-', offer_source, offer_managers),
+    }
+
+
+_PRICE_COLUMNS = ('offer_price_rmb', 'price_kwr', 'price_usd', 'cost_price_rmb', 'quoted_qty')
+
+
+def ensure_manager_totals_triggers():
+    """创建（或重建）维护客户订单汇总的触发器，可重复执行"""
+    new, old = _trigger_statements('NEW'), _trigger_statements('OLD')
+    changed = ' OR '.join(f"OLD.{c} IS DISTINCT FROM NEW.{c}" if is_postgresql() else f"OLD.{c} IS NOT NEW.{c}"
+                          for c in _PRICE_COLUMNS)
     with get_db_connection() as conn:
-        # 查询所有关联的报价订单
-        rows = conn.execute("""
-            SELECT o.offer_price_rmb as price_rmb, o.price_kwr, o.price_usd, o.cost_price_rmb,
-                   COALESCE(o.quoted_qty, 1) as qty
-            FROM uni_order_manager_rel r
-            JOIN uni_offer o ON r.offer_id = o.offer_id
-            WHERE r.manager_id = ?
-        """, (manager_id,)).fetchall()
+        if is_postgresql():
+            conn.execute(f"""
+                CREATE OR REPLACE FUNCTION trg_manager_rel_totals() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP = 'INSERT' THEN
+                        {new['rel']};
+                        RETURN NEW;
+                    END IF;
+                    {old['rel']};
+                    RETURN OLD;
+                END $$ LANGUAGE plpgsql""")
+            conn.execute(f"""
+                CREATE OR REPLACE FUNCTION trg_manager_offer_totals() RETURNS trigger AS $$
+                BEGIN
+                    {old['offer']};
+                    IF TG_OP = 'UPDATE' THEN
+                        {new['offer']};
+                        RETURN NEW;
+                    END IF;
+                    RETURN OLD;
+                END $$ LANGUAGE plpgsql""")
+            for name, table in [('manager_rel_totals', 'uni_order_manager_rel'), ('manager_offer_totals_au', 'uni_offer'),
+                                ('manager_offer_totals_bd', 'uni_offer')]:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+            conn.execute("""CREATE TRIGGER manager_rel_totals AFTER INSERT OR DELETE ON uni_order_manager_rel
+                            FOR EACH ROW EXECUTE PROCEDURE trg_manager_rel_totals()""")
+            conn.execute(f"""CREATE TRIGGER manager_offer_totals_au AFTER UPDATE OF {', '.join(_PRICE_COLUMNS)} ON uni_offer
+                             FOR EACH ROW WHEN ({changed}) EXECUTE PROCEDURE trg_manager_offer_totals()""")
+            conn.execute("""CREATE TRIGGER manager_offer_totals_bd BEFORE DELETE ON uni_offer
+                            FOR EACH ROW EXECUTE PROCEDURE trg_manager_offer_totals()""")
+        else:
+            for name in ('manager_rel_totals_ai', 'manager_rel_totals_ad', 'manager_offer_totals_au', 'manager_offer_totals_bd'):
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(f"""CREATE TRIGGER manager_rel_totals_ai AFTER INSERT ON uni_order_manager_rel BEGIN
+                             {new['rel']}; END""")
+            # 报价删除时关联行被级联删除，此时已查不到报价，贡献由 manager_offer_totals_bd 减去
+            conn.execute(f"""CREATE TRIGGER manager_rel_totals_ad AFTER DELETE ON uni_order_manager_rel BEGIN
+                             {old['rel']}; END""")
+            conn.execute(f"""CREATE TRIGGER manager_offer_totals_au AFTER UPDATE OF {', '.join(_PRICE_COLUMNS)} ON uni_offer
+                             WHEN {changed} BEGIN
+                             {old['offer']};
+                             {new['offer']}; END""")
+            conn.execute(f"""CREATE TRIGGER manager_offer_totals_bd BEFORE DELETE ON uni_offer BEGIN
+                             {old['offer']}; END""")
+        conn.commit()
 
-        total_price_rmb = 0.0
-        total_price_kwr = 0.0
-        total_price_usd = 0.0
-        total_cost_rmb = 0.0
-        total_qty = 0
 
-        for r in rows:
-            qty = int(r['qty'] or 1)
-            price_rmb = float(r['price_rmb'] or 0)
-            price_kwr = float(r['price_kwr'] or 0)
-            price_usd = float(r['price_usd'] or 0)
-            cost_rmb = float(r['cost_price_rmb'] or 0)
-
-            # 价格 × 数量 = 总价
-            total_price_rmb += price_rmb * qty
-            total_price_kwr += price_kwr * qty
-            total_price_usd += price_usd * qty
-            total_cost_rmb += cost_rmb * qty
-            total_qty += qty
-
-        model_count = len(rows)
-        profit_rmb = total_price_rmb - total_cost_rmb
-
-        # 更新客户订单
-        conn.execute("""
-            UPDATE uni_order_manager SET
-                total_price_rmb = ?, total_price_kwr = ?, total_price_usd = ?,
-                total_cost_rmb = ?, profit_rmb = ?, model_count = ?, total_qty = ?
-            WHERE manager_id = ?
-        """, (round(total_price_rmb, 2), round(total_price_kwr, 2), round(total_price_usd, 2),
-              round(total_cost_rmb, 2), round(profit_rmb, 2), model_count, total_qty, manager_id))
+def recalculate_all_managers(manager_id=None):
+    """
+    用一条分组 UPDATE 重算客户订单汇总（修复用，正常情况下由触发器维护）
+    manager_id 为空时重算全部客户订单
+    """
+    totals = f"""
+        SELECT r.manager_id, SUM(d.price_rmb) AS price_rmb, SUM(d.price_kwr) AS price_kwr, SUM(d.price_usd) AS price_usd,
+               SUM(d.cost_rmb) AS cost_rmb, COUNT(*) AS model_count, SUM(d.qty) AS qty
+        FROM uni_order_manager_rel r
+        JOIN (SELECT o.offer_id, {_contribution_sql('o.')} FROM uni_offer o) d ON d.offer_id = r.offer_id
+        GROUP BY r.manager_id"""
+    sql = f"""
+        UPDATE uni_order_manager SET ({', '.join(_TOTAL_COLUMNS)}) = (
+            SELECT {_round_sql('COALESCE(t.price_rmb, 0)')}, {_round_sql('COALESCE(t.price_kwr, 0)')},
+                   {_round_sql('COALESCE(t.price_usd, 0)')}, {_round_sql('COALESCE(t.cost_rmb, 0)')},
+                   {_round_sql('COALESCE(t.price_rmb, 0) - COALESCE(t.cost_rmb, 0)')},
+                   COALESCE(t.model_count, 0), COALESCE(t.qty, 0)
+            FROM (SELECT 1) one LEFT JOIN ({totals}) t ON t.manager_id = uni_order_manager.manager_id
+        )"""
+    params = ()
+    if manager_id:
+        sql += " WHERE manager_id = ?"
+        params = (manager_id,)
+    with get_db_connection() as conn:
+        count = conn.execute(sql, params).rowcount
         conn.commit()
+    return count
+
+
+def recalculate_manager_totals(manager_id):
+    """重新计算单个客户订单的汇总字段"""
+    recalculate_all_managers(manager_id)
 
 
 def get_manager_offers(manager_id):
@@ -374,11 +469,8 @@ def batch_import_manager_from_rows(rows_data, cli_id=None):
             start_idx = 1
 
         with get_db_connection() as conn:
-            # 构建客户名到客户编号的映射
-            cli_name_to_id = {}
-            cli_rows = conn.execute("SELECT cli_id, cli_name FROM uni_cli").fetchall()
-            for cli_row in cli_rows:
-                cli_name_to_id[cli_row['cli_name']] = cli_row['cli_id']
+            # 客户名到客户编号的映射
+            cli_name_to_id = entity_name_map('cli')
 
             for row in rows_data[start_idx:]:
                 if not row or len(row) < 1:
@@ -415,8 +507,7 @@ def batch_import_manager_from_rows(rows_data, cli_id=None):
                             errors.append(f"{customer_order_no}: 缺少客户编号")
                             continue
 
-                        cli = conn.execute("SELECT cli_id FROM uni_cli WHERE cli_id = ?", (row_cli_id,)).fetchone()
-                        if not cli:
+                        if not entity_exists('cli', row_cli_id, conn):
                             errors.append(f"{customer_order_no}: 客户不存在")
                             continue
 
@@ -626,17 +717,17 @@ def batch_convert_offers_to_manager(offer_ids, manager_id):
                 if existing_order:
                     # 检查是否已关联到此客户订单
                     existing_rel = conn.execute(
-                        "SELECT id FROM uni_order_manager_rel WHERE manager_id = ? AND order_id = ?",
-                        (manager_id, existing_order['order_id'])
+                        "SELECT id FROM uni_order_manager_rel WHERE manager_id = ? AND offer_id = ?",
+                        (manager_id, offer_data['offer_id'])
                     ).fetchone()
                     if existing_rel:
                         errors.append(f"{offer_data['offer_id']}: 已存在关联的销售订单")
                         continue
                     # 已有销售订单但未关联，建立关联
                     conn.execute("""
-                        INSERT INTO uni_order_manager_rel (manager_id, order_id)
+                        INSERT INTO uni_order_manager_rel (manager_id, offer_id)
                         VALUES (?, ?)
-                    """, (manager_id, existing_order['order_id']))
+                    """, (manager_id, offer_data['offer_id']))
                     conn.execute("UPDATE uni_offer SET manager_id = ?, is_transferred = '已转' WHERE offer_id = ?",
                                 (manager_id, offer_data['offer_id']))
                     success_count += 1
@@ -649,28 +740,20 @@ def batch_convert_offers_to_manager(offer_ids, manager_id):
                     continue
 
                 # 生成递增的5位数销售订单编号
-                last_order = conn.execute("SELECT order_id FROM uni_order WHERE order_id LIKE 'd%' ORDER BY order_id DESC LIMIT 1").fetchone()
-                if last_order:
-                    try:
-                        last_num = int(last_order['order_id'][1:])
-                        new_num = last_num + 1
-                    except:
-                        new_num = 1
-                else:
-                    new_num = 1
-                order_id = f"d{new_num:05d}"
+                order_id = next_id('order', conn)
 
                 # 创建销售订单
                 conn.execute("""
                     INSERT INTO uni_order (
                         order_id, order_no, order_date, cli_id, offer_id,
-                        inquiry_mpn, inquiry_brand, price_rmb, price_kwr, price_usd,
+                        inquiry_mpn, mpn_norm, inquiry_brand, price_rmb, price_kwr, price_usd,
                         cost_price_rmb, is_finished, is_paid, paid_amount, return_status,
                         remark, is_transferred
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     order_id, order_id, order_date, manager_cli_id, offer_data['offer_id'],
                     offer_data['quoted_mpn'] or offer_data['inquiry_mpn'],
+                    normalize_mpn(offer_data['quoted_mpn'] or offer_data['inquiry_mpn']),
                     offer_data['quoted_brand'] or offer_data['inquiry_brand'],
                     offer_data['offer_price_rmb'], offer_data['price_kwr'], offer_data['price_usd'],
                     offer_data['cost_price_rmb'], 0, 0, 0.0, '正常',
@@ -679,9 +762,9 @@ def batch_convert_offers_to_manager(offer_ids, manager_id):
 
                 # 建立客户订单与销售订单的关联
                 conn.execute("""
-                    INSERT INTO uni_order_manager_rel (manager_id, order_id)
+                    INSERT INTO uni_order_manager_rel (manager_id, offer_id)
                     VALUES (?, ?)
-                """, (manager_id, order_id))
+                """, (manager_id, offer_data['offer_id']))
 
                 # 更新报价状态
                 conn.execute("""
@@ -3,8 +3,8 @@
 用于潜在客户管理和转化
 """
 import sqlite3
-from datetime import datetime
 from Sills.base import get_db_connection
+from Sills.db_sequence import next_id
 
 
 # 公共邮箱域名列表
@@ -23,12 +23,9 @@ def is_public_domain(domain):
     return domain.lower() in PUBLIC_DOMAINS
 
 
-def get_next_prospect_id():
-    """获取下一个Prospect ID (PK+时间戳+随机数格式)"""
-    import random
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    rand_suffix = random.randint(1000, 9999)
-    return f"PK{timestamp}{rand_suffix}"
+def get_next_prospect_id(conn=None):
+    """获取下一个Prospect ID (PK+时间戳+4位序号格式)"""
+    return next_id('prospect', conn)
 
 
 def count_contacts_by_domain(domain):
@@ -254,7 +251,7 @@ def import_prospects(data_list):
                     skipped_count += 1
                     continue
 
-                prospect_id = get_next_prospect_id()
+                prospect_id = get_next_prospect_id(conn)
                 is_public = 1 if is_public_domain(domain) else 0
 
                 conn.execute("""
@@ -325,16 +322,16 @@ def convert_prospect_to_cli(prospect_id):
             """, (cli_id, prospect_id))
             conn.commit()
 
-        # 更新关联联系人的cli_id（支持www前缀模糊匹配）
-        if prospect['domain']:
-            domain = prospect['domain'].lower().strip()
-            clean_domain = domain.replace('www.', '') if domain.startswith('www.') else domain
-            conn.execute("""
-                UPDATE uni_contact
-                SET cli_id = ?
-                WHERE (LOWER(domain) = ? OR LOWER(domain) = ?) AND (cli_id IS NULL OR cli_id = '')
-            """, (cli_id, domain, clean_domain))
-            conn.commit()
+            # 更新关联联系人的cli_id（支持www前缀模糊匹配）
+            if prospect['domain']:
+                domain = prospect['domain'].lower().strip()
+                clean_domain = domain.replace('www.', '') if domain.startswith('www.') else domain
+                conn.execute("""
+                    UPDATE uni_contact
+                    SET cli_id = ?
+                    WHERE (LOWER(domain) = ? OR LOWER(domain) = ?) AND (cli_id IS NULL OR cli_id = '')
+                """, (cli_id, domain, clean_domain))
+                conn.commit()
 
         return True, f"转化成功，CLI ID: {cli_id}"
     except Exception as e:
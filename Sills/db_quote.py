@@ -1,21 +1,16 @@
+import re
 import sqlite3
 import uuid
 from datetime import datetime
-from Sills.base import get_db_connection
+from Sills.base import get_db_connection, bulk_insert, count_rows, parse_keyset_cursor, keyset_condition, keyset_page
+from Sills.db_search import build_search_condition
+from Sills.db_mpn import normalize_mpn, with_mpn_norm
+from Sills.db_sequence import next_id, allocate_ids
+from Sills.entity_cache import entity_exists, entity_name_map
 
-def generate_quote_id():
-    """生成递增的5位数需求编号，格式：x00001"""
-    with get_db_connection() as conn:
-        last_quote = conn.execute("SELECT quote_id FROM uni_quote WHERE quote_id LIKE 'x%' ORDER BY quote_id DESC LIMIT 1").fetchone()
-        if last_quote:
-            try:
-                last_num = int(last_quote['quote_id'][1:])  # 去掉前缀x，获取数字部分
-                new_num = last_num + 1
-            except:
-                new_num = 1
-        else:
-            new_num = 1
-        return f"x{new_num:05d}"  # 格式化为5位数，例如 x00001
+def generate_quote_id(conn=None):
+    """生成递增的5位数需求编号，格式：x00001（已有写事务时传入 conn）"""
+    return next_id('quote', conn)
 
 def get_default_date_code():
     """获取默认批号：3年内"""
@@ -28,15 +23,22 @@ def get_default_delivery():
     """获取默认交期：1~3days"""
     return "1~3days"
 
-def get_quote_list(page=1, page_size=10, search_kw="", start_date="", end_date="", cli_id="", status="", is_transferred=""):
+def get_quote_list(page=1, page_size=10, search_kw="", start_date="", end_date="", cli_id="", status="", is_transferred="", after=None):
+    """
+    询价列表
+    after: 游标分页 "<created_at>,<quote_id>"（"" 为第一页），传入时返回 (results, next_cursor)
+    """
     offset = (page - 1) * page_size
     
-    base_query = """
+    # 型号/单号走搜索索引，客户名先在 uni_cli 上匹配
+    search_sql, params = build_search_condition('uni_quote', 'q', search_kw, related=[
+        "SELECT quote_id FROM uni_quote WHERE cli_id IN (SELECT cli_id FROM uni_cli WHERE cli_name LIKE ?)",
+    ])
+    base_query = f"""
     FROM uni_quote q
     LEFT JOIN uni_cli c ON q.cli_id = c.cli_id
-    WHERE (q.inquiry_mpn LIKE ? OR q.quote_id LIKE ? OR c.cli_name LIKE ?)
+    WHERE {search_sql}
     """
-    params = [f"%{search_kw}%", f"%{search_kw}%", f"%{search_kw}%"]
     
     if start_date:
         base_query += " AND q.quote_date >= ?"
@@ -53,22 +55,37 @@ def get_quote_list(page=1, page_size=10, search_kw="", start_date="", end_date="
     if is_transferred:
         base_query += " AND q.is_transferred = ?"
         params.append(is_transferred)
-        
+
+    order_sql = "ORDER BY q.created_at DESC"
+    limit = page_size
+    if after is not None:
+        cursor = parse_keyset_cursor(after)
+        if cursor:
+            cond, cond_params = keyset_condition("q.created_at", "q.quote_id", cursor)
+            base_query += f" AND {cond}"
+            params.extend(cond_params)
+        order_sql = "ORDER BY q.created_at DESC, q.quote_id DESC"
+        limit, offset = page_size + 1, 0
+
     query = f"""
     SELECT q.*, c.cli_name,
            (COALESCE(q.quoted_mpn, '') || ' | ' ||
             COALESCE(q.inquiry_brand, '') || ' | ' ||
             COALESCE(CAST(q.inquiry_qty AS TEXT), '') || ' pcs') as combined_info
     {base_query}
-    ORDER BY q.created_at DESC
+    {order_sql}
     LIMIT ? OFFSET ?
     """
     
     count_query = f"SELECT COUNT(*) {base_query}"
     
     with get_db_connection() as conn:
-        total = conn.execute(count_query, params).fetchone()[0]
-        items = conn.execute(query, params + [page_size, offset]).fetchall()
+        if after is None:
+            unfiltered = not any([search_kw, start_date, end_date, cli_id, status, is_transferred])
+            total = count_rows(conn, count_query, params, approx_table='uni_quote' if unfiltered else None)
+        items = conn.execute(query, params + [limit, offset]).fetchall()
+        if after is not None:
+            items, total = keyset_page(items, page_size, 'created_at', 'quote_id')
         
         results = [
             {k: ("" if v is None else v) for k, v in dict(row).items()}
@@ -88,14 +105,15 @@ def add_quote(data):
         default_delivery = get_default_delivery()
 
         sql = """
-        INSERT INTO uni_quote (quote_id, quote_date, cli_id, inquiry_mpn, quoted_mpn, inquiry_brand, inquiry_qty, actual_qty, target_price_rmb, cost_price_rmb, date_code, delivery_date, status, remark, is_transferred)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, '未转')
+        INSERT INTO uni_quote (quote_id, quote_date, cli_id, inquiry_mpn, mpn_norm, quoted_mpn, inquiry_brand, inquiry_qty, actual_qty, target_price_rmb, cost_price_rmb, date_code, delivery_date, status, remark, is_transferred)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, '未转')
         """
         params = (
             quote_id,
             quote_date,
             data.get('cli_id'),
             inquiry_mpn,
+            normalize_mpn(inquiry_mpn),
             data.get('quoted_mpn') or inquiry_mpn,  # 报价型号默认等于询价型号
             data.get('inquiry_brand', ''),
             inquiry_qty,
@@ -121,6 +139,109 @@ def add_quote(data):
     except Exception as e:
         return False, str(e)
 
+# 批量插入的列顺序（与 add_quote 相同）
+_QUOTE_COLUMNS = ('quote_id', 'quote_date', 'cli_id', 'inquiry_mpn', 'mpn_norm', 'quoted_mpn', 'inquiry_brand',
+                  'inquiry_qty', 'actual_qty', 'target_price_rmb', 'cost_price_rmb', 'date_code', 'delivery_date',
+                  'status', 'remark', 'is_transferred')
+
+_DATE_RE = re.compile(r'^\d{4}-\d{1,2}-\d{1,2}$')
+
+
+def _parse_quote_parts(parts, cli_name_to_id):
+    """
+    解析一行导入数据为需求字典
+    新格式：日期,客户名,询价型号,报价型号,询价品牌,询价数量,目标价,成本价,批号,交期,状态,备注
+    旧格式：客户编号,询价型号,报价型号,询价品牌,询价数量,目标价,成本价,批号,交期,状态,备注
+    """
+    def col(i, default=""):
+        return parts[i] if len(parts) > i else default
+
+    # 第一个字段是日期 (仅接受 YYYY-MM-DD) 则是新格式，其余列后移一列
+    if _DATE_RE.match(parts[0]):
+        cli_field = col(1)
+        # 尝试通过客户名查找客户编号，找不到时假设输入的是客户编号
+        data = {"quote_date": parts[0], "cli_id": cli_name_to_id.get(cli_field, cli_field)}
+        offset = 2
+    else:
+        data = {"cli_id": parts[0]}
+        offset = 1
+    data.update({
+        "inquiry_mpn": col(offset),
+        "quoted_mpn": col(offset + 1),
+        "inquiry_brand": col(offset + 2),
+        "inquiry_qty": int(float(col(offset + 3))) if col(offset + 3) else 0,
+        "target_price_rmb": float(col(offset + 4)) if col(offset + 4) else 0.0,
+        "cost_price_rmb": float(col(offset + 5)) if col(offset + 5) else 0.0,
+        "date_code": col(offset + 6),
+        "delivery_date": col(offset + 7),
+        "status": col(offset + 8, "询价中"),
+        "remark": col(offset + 9),
+    })
+    return data
+
+
+def _insert_quotes(items):
+    """
+    批量创建需求：内存中校验 -> 一次分配编号 -> 单条批量 INSERT（单事务）-> 每个客户同步一次营销状态
+    与 add_quote 的默认值规则相同（需求日期为当天，报价型号/数量默认等于询价型号/数量，批号/交期默认值）
+
+    返回 (success_count, errors, created_ids)
+    """
+    errors = []
+    valid = []
+    if not items:
+        return 0, errors, []
+
+    with get_db_connection() as conn:
+        for item in items:
+            if not entity_exists('cli', item.get('cli_id'), conn):
+                errors.append(f"{item.get('inquiry_mpn')}: 客户编号 {item.get('cli_id')} 不存在")
+            else:
+                valid.append(item)
+        if not valid:
+            return 0, errors, []
+
+        quote_date = datetime.now().strftime("%Y-%m-%d")
+        default_date_code = get_default_date_code()
+        default_delivery = get_default_delivery()
+        quote_ids = allocate_ids('quote', len(valid), conn)
+        rows = []
+        for quote_id, data in zip(quote_ids, valid):
+            inquiry_mpn = data.get('inquiry_mpn', '')
+            inquiry_qty = data.get('inquiry_qty', 0)
+            rows.append((
+                quote_id,
+                quote_date,
+                data.get('cli_id'),
+                inquiry_mpn,
+                normalize_mpn(inquiry_mpn),
+                data.get('quoted_mpn') or inquiry_mpn,
+                data.get('inquiry_brand', ''),
+                inquiry_qty,
+                data.get('actual_qty') or inquiry_qty,
+                data.get('target_price_rmb', 0.0),
+                data.get('cost_price_rmb', 0.0),
+                data.get('date_code') or default_date_code,
+                data.get('delivery_date') or default_delivery,
+                data.get('status', '询价中'),
+                data.get('remark', ''),
+                '未转',
+            ))
+        try:
+            bulk_insert(conn, 'uni_quote', _QUOTE_COLUMNS, rows)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            return 0, errors + [f"批量写入失败：{str(e)}"], []
+
+    # 同步客户营销状态（每个客户一次）
+    from Sills.db_cli import sync_cli_marketing_status
+    for cli_id in dict.fromkeys(item['cli_id'] for item in valid):
+        sync_cli_marketing_status(cli_id)
+
+    return len(rows), errors, quote_ids
+
+
 def batch_import_quote_from_rows(rows_data):
     """批量导入需求（从已解析的行数据）
 
@@ -129,8 +250,9 @@ def batch_import_quote_from_rows(rows_data):
 
     新格式：日期,客户名,询价型号,报价型号,询价品牌,询价数量,目标价,成本价,批号,交期,状态,备注
     旧格式：客户编号,询价型号,报价型号,询价品牌,询价数量,目标价,成本价,批号,交期,状态,备注
+
+    全部行先在内存中解析校验，再一次性写入（见 _insert_quotes）
     """
-    success_count = 0
     errors = []
 
     if not rows_data:
@@ -140,158 +262,41 @@ def batch_import_quote_from_rows(rows_data):
     if rows_data and ('日期' in str(rows_data[0][0]) or '客户名' in str(rows_data[0][0]) or '客户编号' in str(rows_data[0][0])):
         rows_data = rows_data[1:]
 
-    # 构建客户名到客户编号的映射
-    cli_name_to_id = {}
-    with get_db_connection() as conn:
-        rows = conn.execute("SELECT cli_id, cli_name FROM uni_cli").fetchall()
-        for row in rows:
-            cli_name_to_id[row['cli_name']] = row['cli_id']
+    # 客户名到客户编号的映射
+    cli_name_to_id = entity_name_map('cli')
 
+    items = []
     for row in rows_data:
         parts = [str(p).strip() if p is not None else "" for p in row]
         if len(parts) < 1: continue
 
         try:
-            first_field = parts[0]
-            is_new_format = False
-
-            # 检测是否为日期格式 (仅接受 YYYY-MM-DD)
-            import re
-            if re.match(r'^\d{4}-\d{1,2}-\d{1,2}$', first_field):
-                is_new_format = True
-
-            if is_new_format:
-                # 新格式：日期,客户名,询价型号,...
-                cli_field = parts[1] if len(parts) > 1 else ""
-                # 尝试通过客户名查找客户编号
-                cli_id = cli_name_to_id.get(cli_field, cli_field)  # 如果找不到，假设输入的是客户编号
-
-                data = {
-                    "quote_date": parts[0] if len(parts) > 0 else "",
-                    "cli_id": cli_id,
-                    "inquiry_mpn": parts[2] if len(parts) > 2 else "",
-                    "quoted_mpn": parts[3] if len(parts) > 3 else "",
-                    "inquiry_brand": parts[4] if len(parts) > 4 else "",
-                    "inquiry_qty": int(float(parts[5])) if len(parts) > 5 and parts[5] else 0,
-                    "target_price_rmb": float(parts[6]) if len(parts) > 6 and parts[6] else 0.0,
-                    "cost_price_rmb": float(parts[7]) if len(parts) > 7 and parts[7] else 0.0,
-                    "date_code": parts[8] if len(parts) > 8 else "",
-                    "delivery_date": parts[9] if len(parts) > 9 else "",
-                    "status": parts[10] if len(parts) > 10 else "询价中",
-                    "remark": parts[11] if len(parts) > 11 else ""
-                }
-            else:
-                # 旧格式：客户编号,询价型号,...
-                data = {
-                    "cli_id": parts[0],
-                    "inquiry_mpn": parts[1] if len(parts) > 1 else "",
-                    "quoted_mpn": parts[2] if len(parts) > 2 else "",
-                    "inquiry_brand": parts[3] if len(parts) > 3 else "",
-                    "inquiry_qty": int(float(parts[4])) if len(parts) > 4 and parts[4] else 0,
-                    "target_price_rmb": float(parts[5]) if len(parts) > 5 and parts[5] else 0.0,
-                    "cost_price_rmb": float(parts[6]) if len(parts) > 6 and parts[6] else 0.0,
-                    "date_code": parts[7] if len(parts) > 7 else "",
-                    "delivery_date": parts[8] if len(parts) > 8 else "",
-                    "status": parts[9] if len(parts) > 9 else "询价中",
-                    "remark": parts[10] if len(parts) > 10 else ""
-                }
-
+            data = _parse_quote_parts(parts, cli_name_to_id)
             if not data["cli_id"] or not data["inquiry_mpn"]:
                 errors.append(f"{','.join(parts)}: 缺少必填的客户或型号")
                 continue
-
-            ok, msg = add_quote(data)
-            if ok: success_count += 1
-            else: errors.append(f"{data['inquiry_mpn']}: {msg}")
+            items.append(data)
         except Exception as e:
             errors.append(f"{','.join(parts)}: 数据格式解析失败 ({str(e)})")
 
-    return success_count, errors
+    success_count, insert_errors, _ = _insert_quotes(items)
+    return success_count, errors + insert_errors
 
 
 def batch_import_quote_text(text):
     lines = text.strip().split('\n')
-    success_count = 0
-    errors = []
 
     # 跳过标题行（如果第一行包含"日期"或"客户名"等关键字）
     if lines and ('日期' in lines[0] or '客户名' in lines[0] or '客户编号' in lines[0]):
         lines = lines[1:]
+    if not lines:
+        return 0, []
 
-    # 构建客户名到客户编号的映射
-    cli_name_to_id = {}
-    with get_db_connection() as conn:
-        rows = conn.execute("SELECT cli_id, cli_name FROM uni_cli").fetchall()
-        for row in rows:
-            cli_name_to_id[row['cli_name']] = row['cli_id']
-
-    for line in lines:
-        parts = [p.strip() for p in line.split(',')]
-        if len(parts) < 1: continue
-
-        try:
-            # 新格式：日期,客户名,询价型号,报价型号,询价品牌,询价数量,目标价,成本价,批号,交期,状态,备注
-            # 旧格式：客户编号,询价型号,报价型号,询价品牌,询价数量,目标价,成本价,批号,交期,状态,备注
-            # 检测格式：如果第一个字段是日期格式，则是新格式
-
-            first_field = parts[0]
-            is_new_format = False
-
-            # 检测是否为日期格式 (仅接受 YYYY-MM-DD)
-            import re
-            if re.match(r'^\d{4}-\d{1,2}-\d{1,2}$', first_field):
-                is_new_format = True
-
-            if is_new_format:
-                # 新格式：日期,客户名,询价型号,...
-                cli_field = parts[1] if len(parts) > 1 else ""
-                # 尝试通过客户名查找客户编号
-                cli_id = cli_name_to_id.get(cli_field, cli_field)  # 如果找不到，假设输入的是客户编号
-
-                data = {
-                    "quote_date": parts[0] if len(parts) > 0 else "",
-                    "cli_id": cli_id,
-                    "inquiry_mpn": parts[2] if len(parts) > 2 else "",
-                    "quoted_mpn": parts[3] if len(parts) > 3 else "",
-                    "inquiry_brand": parts[4] if len(parts) > 4 else "",
-                    "inquiry_qty": int(parts[5]) if len(parts) > 5 and parts[5] else 0,
-                    "target_price_rmb": float(parts[6]) if len(parts) > 6 and parts[6] else 0.0,
-                    "cost_price_rmb": float(parts[7]) if len(parts) > 7 and parts[7] else 0.0,
-                    "date_code": parts[8] if len(parts) > 8 else "",
-                    "delivery_date": parts[9] if len(parts) > 9 else "",
-                    "status": parts[10] if len(parts) > 10 else "询价中",
-                    "remark": parts[11] if len(parts) > 11 else ""
-                }
-            else:
-                # 旧格式：客户编号,询价型号,...
-                data = {
-                    "cli_id": parts[0],
-                    "inquiry_mpn": parts[1] if len(parts) > 1 else "",
-                    "quoted_mpn": parts[2] if len(parts) > 2 else "",
-                    "inquiry_brand": parts[3] if len(parts) > 3 else "",
-                    "inquiry_qty": int(parts[4]) if len(parts) > 4 and parts[4] else 0,
-                    "target_price_rmb": float(parts[5]) if len(parts) > 5 and parts[5] else 0.0,
-                    "cost_price_rmb": float(parts[6]) if len(parts) > 6 and parts[6] else 0.0,
-                    "date_code": parts[7] if len(parts) > 7 else "",
-                    "delivery_date": parts[8] if len(parts) > 8 else "",
-                    "status": parts[9] if len(parts) > 9 else "询价中",
-                    "remark": parts[10] if len(parts) > 10 else ""
-                }
-
-            if not data["cli_id"] or not data["inquiry_mpn"]:
-                errors.append(f"{line}: 缺少必填的客户或型号")
-                continue
-
-            ok, msg = add_quote(data)
-            if ok: success_count += 1
-            else: errors.append(f"{data['inquiry_mpn']}: {msg}")
-        except Exception as e:
-            errors.append(f"{line}: 数据格式解析失败 ({str(e)})")
-
-    return success_count, errors
+    return batch_import_quote_from_rows([line.split(',') for line in lines])
 
 def update_quote(quote_id, data):
     try:
+        with_mpn_norm('uni_quote', data)
         set_cols = []
         params = []
         for k, v in data.items():
@@ -339,17 +344,18 @@ def batch_copy_quote(quote_ids):
             for q_id in quote_ids:
                 row = conn.execute("SELECT * FROM uni_quote WHERE quote_id=?", (q_id,)).fetchone()
                 if row:
-                    new_id = generate_quote_id()
+                    new_id = generate_quote_id(conn)
                     d = dict(row)
                     sql = """
-                    INSERT INTO uni_quote (quote_id, quote_date, cli_id, inquiry_mpn, quoted_mpn, inquiry_brand, inquiry_qty, actual_qty, target_price_rmb, cost_price_rmb, date_code, delivery_date, status, remark, is_transferred)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO uni_quote (quote_id, quote_date, cli_id, inquiry_mpn, mpn_norm, quoted_mpn, inquiry_brand, inquiry_qty, actual_qty, target_price_rmb, cost_price_rmb, date_code, delivery_date, status, remark, is_transferred)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """
                     params = (
                         new_id,
                         datetime.now().strftime("%Y-%m-%d"),
                         d.get('cli_id'),
                         d.get('inquiry_mpn'),
+                        d.get('mpn_norm') or normalize_mpn(d.get('inquiry_mpn')),
                         d.get('quoted_mpn'),
                         d.get('inquiry_brand'),
                         d.get('inquiry_qty'),
@@ -387,29 +393,18 @@ def batch_add_quotes(items):
     返回:
         (success_count, errors, created_ids)
     """
-    success_count = 0
     errors = []
-    created_ids = []
+    valid = []
 
     for item in items:
-        try:
-            # 必填字段检查
-            if not item.get('cli_id'):
-                errors.append(f"缺少客户ID")
-                continue
-            if not item.get('inquiry_mpn'):
-                errors.append(f"缺少询价型号")
-                continue
-
-            ok, msg = add_quote(item)
-            if ok:
-                success_count += 1
-                # 获取新创建的ID (从msg中提取)
-                if '需求' in msg and '创建成功' in msg:
-                    created_ids.append(msg.split('需求 ')[1].split(' ')[0])
-            else:
-                errors.append(f"{item.get('inquiry_mpn', 'unknown')}: {msg}")
-        except Exception as e:
-            errors.append(f"{item.get('inquiry_mpn', 'unknown')}: {str(e)}")
-
-    return success_count, errors, created_ids
+        # 必填字段检查
+        if not item.get('cli_id'):
+            errors.append(f"缺少客户ID")
+            continue
+        if not item.get('inquiry_mpn'):
+            errors.append(f"缺少询价型号")
+            continue
+        valid.append(item)
+
+    success_count, insert_errors, created_ids = _insert_quotes(valid)
+    return success_count, errors + insert_errors, created_ids
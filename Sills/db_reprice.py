@@ -0,0 +1,137 @@
+"""
+批量重算价格
+price_kwr / price_usd 在新增报价时按当时汇率写入，汇率变化后原先只能逐条修改（/api/offer/batch_price_increase 也是逐行 UPDATE）。
+
+- reprice() 对筛选出的报价或销售订单，用一条 UPDATE 按指定日期的汇率重算 KRW/USD，
+  可选按成本价加利润率重算 RMB 报价（只处理成本价 > 0 的记录）
+- dry_run=True 时不写入，只返回会变化的记录数、金额变化合计和前若干条差异，计算表达式与 UPDATE 完全相同
+- 只更新价格确实变化的行，客户订单汇总、销售汇总表的触发器只为这些行触发
+- 取整规则与 add_offer 一致：KRW 保留 1 位小数，USD 保留 2 位小数
+"""
+from Sills.base import get_db_connection, get_exchange_rates
+from Sills.db_config import is_postgresql
+
+# 表 -> (表名, 主键, RMB 价格列, 日期列)
+REPRICE_TABLES = {
+    'offer': ('uni_offer', 'offer_id', 'offer_price_rmb', 'offer_date'),
+    'order': ('uni_order', 'order_id', 'price_rmb', 'order_date'),
+}
+
+PREVIEW_LIMIT = 100
+
+
+def _round(expr, digits):
+    if is_postgresql():
+        return f"ROUND(CAST({expr} AS NUMERIC), {digits})"
+    return f"ROUND({expr}, {digits})"
+
+
+def _differs(a, b):
+    return f"{a} IS DISTINCT FROM {b}" if is_postgresql() else f"{a} IS NOT {b}"
+
+
+def _price_exprs(price_col, margin_pct, krw, usd):
+    """返回 (rmb, kwr, usd) 三个新值表达式及各自的参数"""
+    if margin_pct is None:
+        rmb, rmb_params = f"COALESCE({price_col}, 0)", []
+    else:
+        rmb, rmb_params = "(COALESCE(cost_price_rmb, 0) * ?)", [1 + float(margin_pct) / 100.0]
+    # 与 add_offer 相同：汇率大于 10 视为 1 RMB = ? KRW，否则视为 1 KRW = ? RMB
+    if krw > 10:
+        kwr = _round(f"{rmb} * ?", 1)
+    else:
+        kwr = _round(f"{rmb} / ?", 1) if krw else "0"
+    usd_expr = _round(f"{rmb} * ?", 2) if usd else "0"
+    return [
+        (rmb, rmb_params),
+        (kwr, rmb_params + ([krw] if krw else [])),
+        (usd_expr, rmb_params + ([usd] if usd else [])),
+    ]
+
+
+def _filter_sql(key, date_col, ids, start_date, end_date, cli_id, is_transferred, margin_pct):
+    where, params = [], []
+    if ids:
+        where.append(f"{key} IN ({','.join(['?'] * len(ids))})")
+        params.extend(ids)
+    if start_date:
+        where.append(f"{date_col} >= ?")
+        params.append(start_date)
+    if end_date:
+        where.append(f"{date_col} <= ?")
+        params.append(end_date)
+    if cli_id:
+        where.append("cli_id = ?")
+        params.append(cli_id)
+    if is_transferred:
+        where.append("is_transferred = ?")
+        params.append(is_transferred)
+    if margin_pct is not None:
+        where.append("COALESCE(cost_price_rmb, 0) > 0")
+    return where, params
+
+
+def reprice(table, ids=None, start_date="", end_date="", cli_id="", is_transferred="",
+            margin_pct=None, as_of=None, dry_run=True, preview_limit=PREVIEW_LIMIT):
+    """
+    批量重算报价（table='offer'）或销售订单（table='order'）的价格
+
+    筛选：ids、日期范围（报价日期/订单日期）、客户、是否已转
+    margin_pct: 不为 None 时 RMB 价格 = 成本价 × (1 + margin_pct/100)
+    as_of: 使用该日期的汇率，为空时使用最新汇率
+
+    返回 {"changed": 变化行数, "rates": {...}, "delta": {列: 合计变化}, "preview": [差异], "dry_run": bool}
+    """
+    if table not in REPRICE_TABLES:
+        raise ValueError(f"不支持的表：{table}")
+    if ids is not None and not ids:
+        raise ValueError("未选择任何记录")
+    tbl, key, price_col, date_col = REPRICE_TABLES[table]
+    krw, usd = get_exchange_rates(as_of)
+    (rmb, rmb_p), (kwr, kwr_p), (usd_expr, usd_p) = _price_exprs(price_col, margin_pct, krw, usd)
+
+    where, where_params = _filter_sql(key, date_col, ids, start_date, end_date, cli_id, is_transferred, margin_pct)
+    changed = [_differs("price_kwr", kwr), _differs("price_usd", usd_expr)]
+    changed_params = kwr_p + usd_p
+    if margin_pct is not None:
+        changed.append(_differs(price_col, rmb))
+        changed_params = changed_params + rmb_p
+    where.append(f"({' OR '.join(changed)})")
+    where_sql = ' AND '.join(where)
+    params = where_params + changed_params
+
+    result = {"rates": {"krw": krw, "usd": usd}, "dry_run": dry_run}
+    with get_db_connection() as conn:
+        summary = conn.execute(f"""
+            SELECT COUNT(*), SUM({rmb} - COALESCE({price_col}, 0)), SUM({kwr} - COALESCE(price_kwr, 0)),
+                   SUM({usd_expr} - COALESCE(price_usd, 0))
+            FROM {tbl} WHERE {where_sql}
+        """, rmb_p + kwr_p + usd_p + params).fetchone()
+        result["changed"] = summary[0]
+        result["delta"] = {
+            "price_rmb": round(summary[1] or 0, 2),
+            "price_kwr": round(summary[2] or 0, 1),
+            "price_usd": round(summary[3] or 0, 2),
+        }
+        rows = conn.execute(f"""
+            SELECT {key} AS id, {price_col} AS old_rmb, price_kwr AS old_kwr, price_usd AS old_usd,
+                   {rmb} AS new_rmb, {kwr} AS new_kwr, {usd_expr} AS new_usd
+            FROM {tbl} WHERE {where_sql}
+            ORDER BY {key} LIMIT ?
+        """, rmb_p + kwr_p + usd_p + params + [preview_limit]).fetchall()
+        result["preview"] = [dict(r) for r in rows]
+        for r in result["preview"]:
+            for k in ('new_rmb', 'new_kwr', 'new_usd'):
+                r[k] = float(r[k]) if r[k] is not None else None
+
+        if not dry_run and result["changed"]:
+            set_sql = f"price_kwr = {kwr}, price_usd = {usd_expr}"
+            set_params = kwr_p + usd_p
+            if margin_pct is not None:
+                set_sql = f"{price_col} = {rmb}, " + set_sql
+                set_params = rmb_p + set_params
+            cur = conn.execute(f"UPDATE {tbl} SET {set_sql} WHERE {where_sql}", set_params + params)
+            result["changed"] = cur.rowcount
+            conn.commit()
+            print(f"[DB] 批量重算价格：{tbl} 更新 {result['changed']} 行（KRW {krw}, USD {usd}）")
+    return result
@@ -0,0 +1,212 @@
+"""
+销售汇总表（日 × 客户 × 员工）
+控制台和管理报表原先只能现查 uni_order/uni_offer 聚合，数据多了每次加载都要全表扫描。
+
+- uni_sales_cube：每天、每个客户、每个员工一行，记录销售额（RMB/KRW/USD）、成本、毛利、数量、订单数
+- 销售订单的新增/修改/删除、关联报价的数量或负责员工修改时，由触发器增量更新（与客户订单汇总相同的做法）
+- 数量取关联报价的 quoted_qty（为空或 0 时按 1 计），员工取关联报价的 emp_id（没有关联报价时为空）
+- query_sales_cube() 按时间段汇总并按 日/月/年/客户/员工 分组，rebuild_sales_cube() 全量重建（修复用）
+"""
+from Sills.base import get_db_connection, fetch_in
+from Sills.db_config import is_postgresql
+
+_MEASURES = ('revenue_rmb', 'revenue_kwr', 'revenue_usd', 'cost_rmb', 'profit_rmb', 'qty', 'order_count')
+
+_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS uni_sales_cube (
+    day TEXT NOT NULL,
+    cli_id TEXT NOT NULL,
+    emp_id TEXT NOT NULL DEFAULT '',
+    revenue_rmb {real} DEFAULT 0,
+    revenue_kwr {real} DEFAULT 0,
+    revenue_usd {real} DEFAULT 0,
+    cost_rmb {real} DEFAULT 0,
+    profit_rmb {real} DEFAULT 0,
+    qty INTEGER DEFAULT 0,
+    order_count INTEGER DEFAULT 0,
+    PRIMARY KEY (day, cli_id, emp_id)
+)
+"""
+
+# 可分组的维度 -> SQL 表达式
+GROUP_BY = {
+    'day': "s.day",
+    'month': "substr(s.day, 1, 7)",
+    'year': "substr(s.day, 1, 4)",
+    'cli': "s.cli_id",
+    'emp': "s.emp_id",
+}
+
+_ORDER_COLUMNS = ('order_date', 'cli_id', 'offer_id', 'price_rmb', 'price_kwr', 'price_usd', 'cost_price_rmb')
+_OFFER_COLUMNS = ('quoted_qty', 'emp_id')
+
+
+def _fact_sql(o, f, from_sql):
+    """
+    每条销售订单对汇总表的贡献
+    o: 订单列前缀（'NEW.'、'o.'），f: 报价列前缀（'f.'、'OLD.'），from_sql: FROM 子句
+    """
+    qty = f"(CASE WHEN COALESCE({f}quoted_qty, 0) = 0 THEN 1 ELSE {f}quoted_qty END)"
+    day = f"COALESCE(NULLIF(substr({o}order_date, 1, 10), ''), substr(CAST({o}created_at AS TEXT), 1, 10))"
+    return f"""
+        SELECT {day} AS day, {o}cli_id AS cli_id, COALESCE({f}emp_id, '') AS emp_id,
+               COALESCE({o}price_rmb, 0) * {qty} AS revenue_rmb,
+               COALESCE({o}price_kwr, 0) * {qty} AS revenue_kwr,
+               COALESCE({o}price_usd, 0) * {qty} AS revenue_usd,
+               COALESCE({o}cost_price_rmb, 0) * {qty} AS cost_rmb,
+               {qty} AS qty
+        {from_sql}"""
+
+
+def _upsert_sql(sign, source_sql):
+    """把 source_sql 的贡献按维度汇总后加到（sign='-' 时减去）汇总表"""
+    sums = ', '.join(f"{sign}SUM(d.{m})" for m in ('revenue_rmb', 'revenue_kwr', 'revenue_usd', 'cost_rmb'))
+    updates = ', '.join(f"{m} = uni_sales_cube.{m} + excluded.{m}" for m in _MEASURES)
+    return f"""
+        INSERT INTO uni_sales_cube (day, cli_id, emp_id, {', '.join(_MEASURES)})
+        SELECT d.day, d.cli_id, d.emp_id, {sums}, {sign}SUM(d.revenue_rmb - d.cost_rmb), {sign}SUM(d.qty), {sign}COUNT(*)
+        FROM ({source_sql}) d
+        WHERE d.day IS NOT NULL
+        GROUP BY d.day, d.cli_id, d.emp_id
+        ON CONFLICT (day, cli_id, emp_id) DO UPDATE SET {updates}"""
+
+
+def _order_fact(row):
+    return _fact_sql(f"{row}.", "f.", f"FROM (SELECT 1 AS one) x LEFT JOIN uni_offer f ON f.offer_id = {row}.offer_id")
+
+
+def _offer_fact(row):
+    return _fact_sql("o.", f"{row}.", f"FROM uni_order o WHERE o.offer_id = {row}.offer_id")
+
+
+def _changed_sql(columns):
+    if is_postgresql():
+        return ' OR '.join(f"OLD.{c} IS DISTINCT FROM NEW.{c}" for c in columns)
+    return ' OR '.join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)
+
+
+def ensure_sales_cube():
+    """创建汇总表和维护触发器（可重复执行）"""
+    order_changed = _changed_sql(_ORDER_COLUMNS)
+    offer_changed = _changed_sql(_OFFER_COLUMNS)
+    with get_db_connection() as conn:
+        if is_postgresql():
+            conn.execute(_TABLE_SQL.format(real="DOUBLE PRECISION"))
+            conn.execute(f"""
+                CREATE OR REPLACE FUNCTION trg_sales_cube_order() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        {_upsert_sql('-', _order_fact('OLD'))};
+                    END IF;
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        {_upsert_sql('', _order_fact('NEW'))};
+                    END IF;
+                    RETURN NULL;
+                END $$ LANGUAGE plpgsql""")
+            conn.execute(f"""
+                CREATE OR REPLACE FUNCTION trg_sales_cube_offer() RETURNS trigger AS $$
+                BEGIN
+                    {_upsert_sql('-', _offer_fact('OLD'))};
+                    {_upsert_sql('', _offer_fact('NEW'))};
+                    RETURN NULL;
+                END $$ LANGUAGE plpgsql""")
+            for name, table in [('sales_cube_order_aid', 'uni_order'), ('sales_cube_order_au', 'uni_order'),
+                                ('sales_cube_offer_au', 'uni_offer')]:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+            conn.execute("""CREATE TRIGGER sales_cube_order_aid AFTER INSERT OR DELETE ON uni_order
+                            FOR EACH ROW EXECUTE PROCEDURE trg_sales_cube_order()""")
+            conn.execute(f"""CREATE TRIGGER sales_cube_order_au AFTER UPDATE OF {', '.join(_ORDER_COLUMNS)} ON uni_order
+                             FOR EACH ROW WHEN ({order_changed}) EXECUTE PROCEDURE trg_sales_cube_order()""")
+            conn.execute(f"""CREATE TRIGGER sales_cube_offer_au AFTER UPDATE OF {', '.join(_OFFER_COLUMNS)} ON uni_offer
+                             FOR EACH ROW WHEN ({offer_changed}) EXECUTE PROCEDURE trg_sales_cube_offer()""")
+        else:
+            conn.execute(_TABLE_SQL.format(real="REAL"))
+            for name in ('sales_cube_order_ai', 'sales_cube_order_ad', 'sales_cube_order_au', 'sales_cube_offer_au'):
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute(f"""CREATE TRIGGER sales_cube_order_ai AFTER INSERT ON uni_order BEGIN
+                             {_upsert_sql('', _order_fact('NEW'))}; END""")
+            conn.execute(f"""CREATE TRIGGER sales_cube_order_ad AFTER DELETE ON uni_order BEGIN
+                             {_upsert_sql('-', _order_fact('OLD'))}; END""")
+            conn.execute(f"""CREATE TRIGGER sales_cube_order_au AFTER UPDATE OF {', '.join(_ORDER_COLUMNS)} ON uni_order
+                             WHEN {order_changed} BEGIN
+                             {_upsert_sql('-', _order_fact('OLD'))};
+                             {_upsert_sql('', _order_fact('NEW'))}; END""")
+            conn.execute(f"""CREATE TRIGGER sales_cube_offer_au AFTER UPDATE OF {', '.join(_OFFER_COLUMNS)} ON uni_offer
+                             WHEN {offer_changed} BEGIN
+                             {_upsert_sql('-', _offer_fact('OLD'))};
+                             {_upsert_sql('', _offer_fact('NEW'))}; END""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_cube_cli ON uni_sales_cube(cli_id, day)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_cube_emp ON uni_sales_cube(emp_id, day)")
+        conn.commit()
+
+
+def rebuild_sales_cube():
+    """清空后按全部销售订单重建汇总表，返回汇总行数"""
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM uni_sales_cube")
+        conn.execute(_upsert_sql('', _fact_sql("o.", "f.", "FROM uni_order o LEFT JOIN uni_offer f ON f.offer_id = o.offer_id")))
+        count = conn.execute("SELECT COUNT(*) FROM uni_sales_cube").fetchone()[0]
+        conn.commit()
+    print(f"[DB] 销售汇总表已重建：{count} 行")
+    return count
+
+
+def query_sales_cube(start_date="", end_date="", group_by="month", cli_id="", emp_id=""):
+    """
+    按时间段汇总销售额/成本/毛利/数量/订单数
+    group_by: 逗号分隔的维度（day, month, year, cli, emp），为空时只返回总计
+    返回 {"rows": [...], "total": {...}}；金额保留两位小数
+    """
+    dims = [g.strip() for g in (group_by or "").split(',') if g.strip()]
+    unknown = [g for g in dims if g not in GROUP_BY]
+    if unknown:
+        raise ValueError(f"不支持的分组维度：{', '.join(unknown)}")
+
+    where, params = [], []
+    if start_date:
+        where.append("s.day >= ?")
+        params.append(start_date)
+    if end_date:
+        where.append("s.day <= ?")
+        params.append(end_date)
+    if cli_id:
+        where.append("s.cli_id = ?")
+        params.append(cli_id)
+    if emp_id:
+        where.append("s.emp_id = ?")
+        params.append(emp_id)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    select = [f"{GROUP_BY[g]} AS {g}" for g in dims]
+    select += [f"SUM(s.{m}) AS {m}" for m in _MEASURES]
+    group_sql = f"GROUP BY {', '.join(GROUP_BY[g] for g in dims)}" if dims else ""
+    # 没有 GROUP BY 时不能用 HAVING（SQLite 3.39 之前报语法错误），总计行在下面按订单数过滤
+    having_sql = "HAVING SUM(s.order_count) <> 0" if dims else ""
+    sql = f"""
+        SELECT {', '.join(select)} FROM uni_sales_cube s {where_sql} {group_sql}
+        {having_sql}
+        ORDER BY {', '.join(GROUP_BY[g] for g in dims) if dims else 1}
+    """
+    with get_db_connection() as conn:
+        rows = [dict(r) for r in conn.execute(sql, params).fetchall()]
+        if not dims:
+            rows = [r for r in rows if r['order_count']]
+        names = {}
+        if 'cli' in dims:
+            names['cli'] = {r['cli_id']: r['cli_name'] for r in fetch_in(
+                conn, "SELECT cli_id, cli_name FROM uni_cli WHERE cli_id IN ({placeholders})", [r['cli'] for r in rows])}
+        if 'emp' in dims:
+            names['emp'] = {r['emp_id']: r['emp_name'] for r in fetch_in(
+                conn, "SELECT emp_id, emp_name FROM uni_emp WHERE emp_id IN ({placeholders})", [r['emp'] for r in rows])}
+
+    total = {m: 0 for m in _MEASURES}
+    for row in rows:
+        for m in _MEASURES:
+            row[m] = round(row[m] or 0, 2) if m not in ('qty', 'order_count') else int(row[m] or 0)
+            total[m] += row[m]
+        if 'cli' in dims:
+            row['cli_name'] = names['cli'].get(row['cli'], '')
+        if 'emp' in dims:
+            row['emp_name'] = names['emp'].get(row['emp'], '')
+    total = {m: round(v, 2) for m, v in total.items()}
+    return {"rows": rows, "total": total}
@@ -0,0 +1,199 @@
+"""
+列表搜索索引
+询价/报价/销售订单/采购列表的搜索框原先对型号、单号、客户名等列做 LIKE '%kw%'，每次都全表扫描。
+
+- SQLite：每张表一个 FTS5 trigram 虚拟表，由触发器保持同步。业务表是 TEXT 主键，隐式 rowid 在 VACUUM 后可能重新编号，
+  所以索引不按业务表 rowid 对应，而是按 {表}_fts_key（INTEGER PRIMARY KEY -> 主键）映射表的编号；
+  FTS5 的外部内容为映射表与业务表关联的视图 {表}_fts_src
+- PostgreSQL：pg_trgm GIN 索引，LIKE '%kw%' 直接走索引
+
+列表函数通过 build_search_condition() 生成 "主键 IN (匹配主键的 UNION)" 条件：
+本表文本列走上面的索引，关联表名称（客户名、供应商名等）先在小表上匹配，再按外键索引取回主键。
+"""
+from Sills.base import get_db_connection, get_db_path
+from Sills.db_config import is_postgresql
+
+# 表 -> 主键与需要搜索的本表文本列
+SEARCH_INDEXES = {
+    'uni_quote': {'key': 'quote_id', 'columns': ('quote_id', 'inquiry_mpn')},
+    'uni_offer': {'key': 'offer_id', 'columns': ('offer_id', 'inquiry_mpn')},
+    'uni_order': {'key': 'order_id', 'columns': ('order_id', 'inquiry_mpn')},
+    'uni_buy': {'key': 'buy_id', 'columns': ('buy_id', 'buy_mpn')},
+}
+
+# 关联名称匹配所需的外键索引（部分列由迁移添加，所以不放在建表脚本中）
+SEARCH_SUPPORT_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_offer_quote ON uni_offer(quote_id)",
+    "CREATE INDEX IF NOT EXISTS idx_offer_cli ON uni_offer(cli_id)",
+    "CREATE INDEX IF NOT EXISTS idx_offer_emp ON uni_offer(emp_id)",
+]
+
+# trigram 至少需要 3 个字符
+FTS_MIN_KEYWORD_LEN = 3
+
+# 已就绪的 FTS 表：{(数据库路径, 表名): bool}
+_fts_ready = {}
+
+
+def _fts_table(table):
+    return f"{table}_fts"
+
+
+def _sqlite_object_exists(conn, obj_type, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (obj_type, name)).fetchone() is not None
+
+
+def _drop_fts(conn, table):
+    """删除 FTS5 表、触发器、视图和映射表"""
+    fts = _fts_table(table)
+    conn.executescript(f"""
+    DROP TRIGGER IF EXISTS {fts}_ai;
+    DROP TRIGGER IF EXISTS {fts}_ad;
+    DROP TRIGGER IF EXISTS {fts}_au;
+    DROP TABLE IF EXISTS {fts};
+    DROP VIEW IF EXISTS {fts}_src;
+    DROP TABLE IF EXISTS {fts}_key;
+    """)
+
+
+def _create_fts(conn, table):
+    """创建映射表、FTS5 表和同步触发器，返回是否为新建（新建时需要回填）"""
+    fts = _fts_table(table)
+    key = SEARCH_INDEXES[table]['key']
+    cols = SEARCH_INDEXES[table]['columns']
+    col_list = ', '.join(cols)
+    new_vals = ', '.join(f"new.{c}" for c in cols)
+    old_vals = ', '.join(f"old.{c}" for c in cols)
+
+    if _sqlite_object_exists(conn, 'table', fts) and not _sqlite_object_exists(conn, 'table', f"{fts}_key"):
+        # 旧版索引按业务表 rowid 对应，重建为映射表编号
+        _drop_fts(conn, table)
+    existed = _sqlite_object_exists(conn, 'table', fts)
+    src_cols = ', '.join(f"t.{c}" for c in cols)
+    conn.executescript(f"""
+    CREATE TABLE IF NOT EXISTS {fts}_key (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE);
+    CREATE VIEW IF NOT EXISTS {fts}_src AS
+        SELECT m.id, {src_cols} FROM {fts}_key m JOIN {table} t ON t.{key} = m.key;
+    CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+        {col_list}, content='{fts}_src', content_rowid='id', tokenize='trigram');
+    CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+        INSERT OR IGNORE INTO {fts}_key(key) VALUES (new.{key});
+        INSERT INTO {fts}(rowid, {col_list}) SELECT id, {new_vals} FROM {fts}_key WHERE key = new.{key};
+    END;
+    CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, {col_list}) SELECT 'delete', id, {old_vals} FROM {fts}_key WHERE key = old.{key};
+        DELETE FROM {fts}_key WHERE key = old.{key};
+    END;
+    CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col_list} ON {table} BEGIN
+        INSERT INTO {fts}({fts}, rowid, {col_list}) SELECT 'delete', id, {old_vals} FROM {fts}_key WHERE key = old.{key};
+        UPDATE {fts}_key SET key = new.{key} WHERE key = old.{key};
+        INSERT INTO {fts}(rowid, {col_list}) SELECT id, {new_vals} FROM {fts}_key WHERE key = new.{key};
+    END;
+    """)
+    return not existed
+
+
+def ensure_search_indexes():
+    """创建搜索索引（init_db 调用，可重复执行）"""
+    if is_postgresql():
+        _ensure_pg_trgm_indexes()
+        return
+
+    with get_db_connection() as conn:
+        for sql in SEARCH_SUPPORT_INDEXES:
+            conn.execute(sql)
+        for table in SEARCH_INDEXES:
+            try:
+                if _create_fts(conn, table):
+                    _rebuild_fts(conn, table)
+                    print(f"[DB] 搜索索引已建立：{_fts_table(table)}")
+                _fts_ready[(get_db_path(), table)] = True
+            except Exception as e:
+                # 没有 FTS5 或 trigram（SQLite < 3.34）时退回 LIKE
+                print(f"[DB] 搜索索引不可用 ({table}): {e}")
+                _fts_ready[(get_db_path(), table)] = False
+
+
+def _ensure_pg_trgm_indexes():
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        for sql in SEARCH_SUPPORT_INDEXES:
+            cur.execute(sql)
+        cur.execute("SAVEPOINT uni_trgm")
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except Exception as e:
+            # 需要数据库管理员安装扩展；没有时 LIKE 仍然可用，只是不走索引
+            cur.execute("ROLLBACK TO SAVEPOINT uni_trgm")
+            print(f"[DB] pg_trgm 扩展不可用，搜索将不使用索引: {e}")
+            return
+        finally:
+            cur.execute("RELEASE SAVEPOINT uni_trgm")
+        for table, spec in SEARCH_INDEXES.items():
+            for col in spec['columns']:
+                cur.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table[4:]}_{col}_trgm "
+                    f"ON {table} USING gin ({col} gin_trgm_ops)")
+
+
+def _rebuild_fts(conn, table):
+    """按业务表补齐映射表并重建 FTS 表"""
+    fts = _fts_table(table)
+    key = SEARCH_INDEXES[table]['key']
+    conn.execute(f"DELETE FROM {fts}_key WHERE key NOT IN (SELECT {key} FROM {table})")
+    conn.execute(f"INSERT OR IGNORE INTO {fts}_key(key) SELECT {key} FROM {table} ORDER BY rowid")
+    conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def rebuild_search_index(table=None):
+    """重建 FTS 索引（绕过触发器批量写入业务表之后使用；映射表编号不受 VACUUM 影响，整理数据库后不需要重建）"""
+    if is_postgresql():
+        return
+    tables = [table] if table else list(SEARCH_INDEXES)
+    with get_db_connection() as conn:
+        for t in tables:
+            _rebuild_fts(conn, t)
+
+
+def _fts_available(table):
+    key = (get_db_path(), table)
+    ready = _fts_ready.get(key)
+    if ready is None:
+        with get_db_connection() as conn:
+            ready = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (_fts_table(table),)).fetchone() is not None
+        _fts_ready[key] = ready
+    return ready
+
+
+def text_match_sql(table, kw):
+    """
+    返回本表文本列包含 kw 的主键子查询 (sql, params)
+    SQLite 且关键词可用 trigram 时走 FTS5，否则为 LIKE（PostgreSQL 上由 GIN 索引加速）
+    """
+    spec = SEARCH_INDEXES[table]
+    key = spec['key']
+    if (not is_postgresql() and len(kw) >= FTS_MIN_KEYWORD_LEN
+            and '%' not in kw and '_' not in kw and _fts_available(table)):
+        fts = _fts_table(table)
+        phrase = '"' + kw.replace('"', '""') + '"'
+        return (f"SELECT key FROM {fts}_key WHERE id IN "
+                f"(SELECT rowid FROM {fts} WHERE {fts} MATCH ?)"), [phrase]
+    conds = ' OR '.join(f"{c} LIKE ?" for c in spec['columns'])
+    return f"SELECT {key} FROM {table} WHERE {conds}", [f"%{kw}%"] * len(spec['columns'])
+
+
+def build_search_condition(table, alias, kw, related=()):
+    """
+    生成列表搜索条件 (sql, params)，kw 为空时不过滤
+    related: 按关联名称匹配的主键子查询，每条包含一个 ? 占位符（传入 %kw%），例如
+        "SELECT quote_id FROM uni_quote WHERE cli_id IN (SELECT cli_id FROM uni_cli WHERE cli_name LIKE ?)"
+    """
+    if not kw:
+        return "1=1", []
+    sql, params = text_match_sql(table, kw)
+    parts = [sql] + list(related)
+    params = params + [f"%{kw}%"] * len(related)
+    return f"{alias}.{SEARCH_INDEXES[table]['key']} IN ({' UNION '.join(parts)})", params
@@ -0,0 +1,118 @@
+"""
+单据编号分配
+原先每次插入前都要 SELECT … ORDER BY xxx_id DESC LIMIT 1 取最大编号再 +1，多一次查询，并发时还会分到重复编号。
+
+- SQLite：uni_sequence 表（name -> 已分配的最大值），在调用方的事务中 UPDATE，回滚时编号一起回滚
+- PostgreSQL：原生序列 seq_<name>，nextval 不受事务影响
+- allocate_ids(name, n) 一次分配 n 个编号，供批量操作使用；编号格式保持不变（x00001、b00001、d00001 …）
+"""
+from datetime import datetime
+
+from Sills.base import get_db_connection, get_db_path
+from Sills.db_config import is_postgresql
+
+# 序列名 -> (表, 主键, 前缀, 数字位数)
+SEQUENCES = {
+    'quote': ('uni_quote', 'quote_id', 'x', 5),
+    'offer': ('uni_offer', 'offer_id', 'b', 5),
+    'order': ('uni_order', 'order_id', 'd', 5),
+    'buy': ('uni_buy', 'buy_id', 'c', 5),
+    'cli': ('uni_cli', 'cli_id', 'C', 3),
+}
+
+# 时间戳格式的编号（CT/PK + 时间戳 + 4 位序号），序号取序列值的后 4 位，同一秒内不重复
+TIMESTAMP_SEQUENCES = {
+    'contact': 'CT',
+    'prospect': 'PK',
+}
+
+_SQLITE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS uni_sequence (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+_sqlite_ready = set()   # 已确认存在 uni_sequence 表的数据库路径
+
+
+def _table_max(conn, name):
+    """按原来的方式取表中当前最大编号的数字部分"""
+    if name not in SEQUENCES:
+        return 0
+    table, key, prefix, _ = SEQUENCES[name]
+    row = conn.execute(
+        f"SELECT {key} FROM {table} WHERE {key} LIKE ? ORDER BY {key} DESC LIMIT 1", (f"{prefix}%",)).fetchone()
+    if not row:
+        return 0
+    digits = ''.join(filter(str.isdigit, row[0]))
+    return int(digits) if digits else 0
+
+
+def _seed(conn, name):
+    """创建序列并按表中现有最大编号对齐（不会把序列往回调）"""
+    current = _table_max(conn, name)
+    if is_postgresql():
+        seq = f"seq_{name}"
+        conn.execute(f"CREATE SEQUENCE IF NOT EXISTS {seq}")
+        if current > 0:
+            conn.execute(f"SELECT setval('{seq}', GREATEST(?, (SELECT last_value FROM {seq})))", (current,))
+    else:
+        conn.execute(_SQLITE_TABLE_SQL)
+        _sqlite_ready.add(get_db_path())
+        conn.execute("INSERT OR IGNORE INTO uni_sequence (name, value) VALUES (?, 0)", (name,))
+        conn.execute("UPDATE uni_sequence SET value = MAX(value, ?) WHERE name = ?", (current, name))
+
+
+def sync_sequences():
+    """
+    创建全部序列并与表中最大编号对齐（迁移时调用，启动后台任务也会调用）
+    用于修正绕过分配器、直接写入编号的记录（如指定 order_id 的导入）
+    """
+    with get_db_connection() as conn:
+        for name in list(SEQUENCES) + list(TIMESTAMP_SEQUENCES):
+            _seed(conn, name)
+        conn.commit()
+
+
+def _allocate(conn, name, n):
+    """分配 n 个序列值，返回升序列表"""
+    if is_postgresql():
+        rows = conn.execute(f"SELECT nextval('seq_{name}') FROM generate_series(1, ?)", (n,)).fetchall()
+        return sorted(r[0] for r in rows)
+    if get_db_path() not in _sqlite_ready:
+        conn.execute(_SQLITE_TABLE_SQL)
+        _sqlite_ready.add(get_db_path())
+    cur = conn.execute("UPDATE uni_sequence SET value = value + ? WHERE name = ?", (n, name))
+    if cur.rowcount == 0:
+        _seed(conn, name)
+        conn.execute("UPDATE uni_sequence SET value = value + ? WHERE name = ?", (n, name))
+    last = conn.execute("SELECT value FROM uni_sequence WHERE name = ?", (name,)).fetchone()[0]
+    return list(range(last - n + 1, last + 1))
+
+
+def _format(name, value):
+    if name in TIMESTAMP_SEQUENCES:
+        return f"{TIMESTAMP_SEQUENCES[name]}{datetime.now().strftime('%Y%m%d%H%M%S')}{value % 10000:04d}"
+    _, _, prefix, width = SEQUENCES[name]
+    return f"{prefix}{value:0{width}d}"
+
+
+def allocate_ids(name, n, conn=None):
+    """
+    分配 n 个编号，返回编号列表
+    SQLite 上已有写事务时必须传入 conn（在同一事务中分配，避免另开连接等待写锁）
+    """
+    if n <= 0:
+        return []
+    if conn is not None:
+        return [_format(name, v) for v in _allocate(conn, name, n)]
+    with get_db_connection() as own:
+        values = _allocate(own, name, n)
+        own.commit()
+    return [_format(name, v) for v in values]
+
+
+def next_id(name, conn=None):
+    """分配一个编号，例如 next_id('quote') -> 'x00042'"""
+    return allocate_ids(name, 1, conn)[0]
@@ -1,5 +1,6 @@
 import sqlite3
 from Sills.base import get_db_connection
+from Sills.entity_cache import invalidate_entities
 
 def get_vendor_list(page=1, page_size=20, search_kw=""):
     """分页查询供应商列表"""
@@ -34,6 +35,7 @@ def add_vendor(data):
         with get_db_connection() as conn:
             conn.execute(sql, list(data.values()))
             conn.commit()
+            invalidate_entities('vendor')
             return True, f"供应商 {data['vendor_id']} 添加成功"
     except Exception as e:
         return False, str(e)
@@ -74,6 +76,7 @@ def update_vendor(vendor_id, data):
         with get_db_connection() as conn:
             conn.execute(sql, params)
             conn.commit()
+            invalidate_entities('vendor')
             return True, "更新成功"
     except Exception as e:
         return False, str(e)
@@ -83,6 +86,7 @@ def delete_vendor(vendor_id):
         with get_db_connection() as conn:
             conn.execute("DELETE FROM uni_vendor WHERE vendor_id = ?", (vendor_id,))
             conn.commit()
+            invalidate_entities('vendor')
             return True, "删除成功"
     except Exception as e:
         return False, str(e)
@@ -18,6 +18,7 @@ except ImportError:
     openpyxl = None
 
 from Sills.base import get_db_connection, get_exchange_rates
+from Sills.rate_service import rate_as_of, CURRENCY_KRW
 
 
 # ============================================================
@@ -1316,13 +1317,11 @@ def generate_koquote(offer_ids, output_base=None, template_dir=None):
     output_filename = f"유니콘_전자부품견적서_{time_str}.xlsx"
     output_path = os.path.join(output_dir, output_filename)
 
-    # 获取汇率
-    krw_val, _ = get_exchange_rates()
-
-    return _generate_koquote_excel(offers, template_dir, output_path, krw_val)
+    # 不指定汇率：每条报价按报价日期的汇率计价
+    return _generate_koquote_excel(offers, template_dir, output_path)
 
 
-def _generate_koquote_excel(offers, template_dir, output_path, exchange_rate_krw):
+def _generate_koquote_excel(offers, template_dir, output_path, exchange_rate_krw=None):
     """
     生成韩文报价单 Excel 文件 - 使用双模板方案
 
@@ -1465,7 +1464,7 @@ def _generate_koquote_excel(offers, template_dir, output_path, exchange_rate_krw
         # 单价: offer_price_rmb * 汇率
         price_rmb = offer.get("offer_price_rmb")
         if price_rmb and float(price_rmb or 0) > 0:
-            price_kwr = float(price_rmb) * exchange_rate_krw
+            price_kwr = float(price_rmb) * (exchange_rate_krw or rate_as_of(CURRENCY_KRW, offer.get("offer_date")))
         else:
             price_kwr = 0
         price_cell = ws1.cell(row, 7)
@@ -1547,7 +1546,7 @@ def _generate_koquote_excel(offers, template_dir, output_path, exchange_rate_krw
     }
 
 
-def _generate_koquote_excel_legacy(offers, template_path, output_path, exchange_rate_krw):
+def _generate_koquote_excel_legacy(offers, template_path, output_path, exchange_rate_krw=None):
     """旧模板生成逻辑 - 兼容旧版本模板"""
     data_count = len(offers)
     first_offer = offers[0]
@@ -1597,7 +1596,7 @@ def _generate_koquote_excel_legacy(offers, template_path, output_path, exchange_
 
         price_kwr = offer.get("offer_price_rmb")
         if price_kwr and float(price_kwr or 0) > 0:
-            price_kwr = round(float(price_kwr) * exchange_rate_krw, 1)
+            price_kwr = round(float(price_kwr) * (exchange_rate_krw or rate_as_of(CURRENCY_KRW, offer.get("offer_date"))), 1)
         else:
             price_kwr = 0
         ws.cell(row, 9).value = price_kwr
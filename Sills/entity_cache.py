@@ -0,0 +1,132 @@
+"""
+主数据缓存（客户、供应商、员工）
+导入和转换流程原先每次调用都重新查这几张小表：需求导入载入全部客户名称，新增报价逐条查员工和供应商，
+历史订单导入每行按名称查一次客户。
+
+- 首次使用时把 uni_cli / uni_vendor / uni_emp 整表载入内存：编号 -> 行、名称 -> 编号、
+  规范化名称（去空格、小写）-> 编号；重名时取编号最大的一条
+- Sills.db_cli / db_vendor / db_emp 写入后调用 invalidate_entities()；其他途径写入时按表写版本失效，
+  另有 ENTITY_CACHE_TTL 兜底（多 worker 时其他进程的修改）
+- 缓存只反映已提交的数据：在同一事务中刚插入的记录、其他进程刚写入尚未失效的记录查不到；
+  get_entity / entity_exists 传入调用方的连接时，未命中会在该连接上按编号再查一次
+- get_entity_cache_stats() 返回各表的命中次数、载入次数和命中率
+"""
+import threading
+import time
+
+from Sills.base import get_db_connection, get_db_path, get_table_versions
+
+# 类型 -> (表名, 编号列, 名称列)
+ENTITIES = {
+    'cli': ('uni_cli', 'cli_id', 'cli_name'),
+    'vendor': ('uni_vendor', 'vendor_id', 'vendor_name'),
+    'emp': ('uni_emp', 'emp_id', 'emp_name'),
+}
+
+ENTITY_CACHE_TTL = 300  # 秒
+
+_lock = threading.Lock()
+_tables = {}        # kind -> (key, loaded_at, rows, by_name, by_key)
+_generation = {kind: 0 for kind in ENTITIES}
+_stats = {kind: {'hits': 0, 'loads': 0} for kind in ENTITIES}
+
+
+def normalize_name(name):
+    """名称比较键：去掉空格并转小写（与历史导入的 REPLACE(LOWER(name), ' ', '') 一致）"""
+    return str(name).replace(' ', '').lower() if name is not None else ''
+
+
+def _load(kind):
+    table, id_col, name_col = ENTITIES[kind]
+    rows, by_name, by_key = {}, {}, {}
+    with get_db_connection() as conn:
+        for row in conn.execute(f"SELECT * FROM {table} ORDER BY {id_col}").fetchall():
+            r = dict(row)
+            r.pop('password', None)  # 员工密码不进缓存
+            rows[r[id_col]] = r
+            name = r.get(name_col)
+            if name:
+                by_name[name] = r[id_col]
+                by_key[normalize_name(name)] = r[id_col]
+    return rows, by_name, by_key
+
+
+def _get(kind):
+    if kind not in ENTITIES:
+        raise ValueError(f"未知的主数据类型：{kind}")
+    now = time.monotonic()
+    with _lock:
+        # 载入前取键：载入期间有写入时键已变化，下次查询会重新载入
+        key = (get_db_path(), get_table_versions((ENTITIES[kind][0],)), _generation[kind])
+        cached = _tables.get(kind)
+        if cached is not None and cached[0] == key and now - cached[1] < ENTITY_CACHE_TTL:
+            _stats[kind]['hits'] += 1
+            return cached[2:]
+        _stats[kind]['loads'] += 1
+    loaded = _load(kind)
+    with _lock:
+        _tables[kind] = (key, now) + loaded
+    return loaded
+
+
+def invalidate_entities(*kinds):
+    """主数据表被修改后调用，下次查询重新载入；不传参数时全部失效"""
+    with _lock:
+        for kind in kinds or ENTITIES:
+            _tables.pop(kind, None)
+            _generation[kind] += 1
+
+
+def _query_entity(kind, entity_id, conn):
+    table, id_col, _ = ENTITIES[kind]
+    row = conn.execute(f"SELECT * FROM {table} WHERE {id_col} = ?", (entity_id,)).fetchone()
+    if row is None:
+        return None
+    r = dict(row)
+    r.pop('password', None)
+    return r
+
+
+def get_entity(kind, entity_id, conn=None):
+    """
+    按编号取整行（字典，只读），不存在时返回 None
+
+    传入 conn 时缓存未命中会在该连接上按编号查一次（同一事务中刚插入、或缓存尚未失效的记录）
+    """
+    row = _get(kind)[0].get(entity_id)
+    if row is None and conn is not None and entity_id not in (None, ''):
+        row = _query_entity(kind, entity_id, conn)
+    return row
+
+
+def entity_exists(kind, entity_id, conn=None):
+    """编号是否存在；conn 的作用同 get_entity"""
+    return get_entity(kind, entity_id, conn) is not None
+
+
+def find_entity_id(kind, name, loose=False):
+    """按名称查编号；loose=True 时忽略空格和大小写。找不到返回 None"""
+    if name is None:
+        return None
+    _, by_name, by_key = _get(kind)
+    return by_key.get(normalize_name(name)) if loose else by_name.get(name)
+
+
+def entity_name_map(kind):
+    """名称 -> 编号（只读）"""
+    return _get(kind)[1]
+
+
+def get_entity_cache_stats():
+    with _lock:
+        stats = {}
+        for kind, s in _stats.items():
+            lookups = s['hits'] + s['loads']
+            cached = _tables.get(kind)
+            stats[kind] = {
+                'hits': s['hits'],
+                'loads': s['loads'],
+                'rows': len(cached[2]) if cached else 0,
+                'hit_rate': round(s['hits'] / lookups, 4) if lookups else 0.0,
+            }
+        return stats
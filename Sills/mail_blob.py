@@ -0,0 +1,218 @@
+"""
+邮件内容寻址存储（内嵌图片、超大正文）
+
+内嵌图片原先以 base64 data URI 写进 uni_mail.html_content，一封邮件可达数 MB，拖慢备份和所有读取邮件表的查询。
+现在图片和超过 MAIL_BODY_BLOB_THRESHOLD 的正文按 SHA-256 存为磁盘文件（相同内容只存一份，跨邮件去重）：
+
+- 文件位于 blob 目录（环境变量 MAIL_BLOB_PATH，默认数据库文件旁的 mail_blobs/）下 <hash[:2]>/<hash>
+- mail_blob 表记录 hash 的内容类型和大小，/api/mail/blob/{hash} 按此返回文件：
+  只有位图图片（INLINE_IMAGE_TYPES）在页面中直接显示，其余（SVG、正文等）一律作为附件下载
+- blob 目录随数据库一起备份和恢复（备份目录下的 mail_blobs/）
+- 内嵌图片在 HTML 中替换为 /api/mail/blob/{hash}；超大正文存 uni_mail.content_blob / html_blob，
+  原字段留空，get_mail_by_id 读取时还原
+- 旧邮件由 migrate_mail_blobs() 在启动后台按 id 断点续跑转存一次
+"""
+
+import base64
+import hashlib
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import Sills.base as base
+from Sills.base import get_db_connection
+from Sills.db_config import get_datetime_now
+
+# 正文（UTF-8 字节数）超过此大小时存入 blob
+MAIL_BODY_BLOB_THRESHOLD = 64 * 1024
+
+BLOB_URL_PREFIX = '/api/mail/blob/'
+
+# 可在页面中直接显示的图片类型（SVG 可含脚本，不在其中）
+INLINE_IMAGE_TYPES = {
+    'image/png', 'image/jpeg', 'image/jpg', 'image/pjpeg', 'image/gif', 'image/webp',
+    'image/bmp', 'image/x-ms-bmp', 'image/avif', 'image/x-icon', 'image/vnd.microsoft.icon',
+}
+
+_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+_DATA_URI_RE = re.compile(r'(src=["\'])data:(image/[\w.+-]+);base64,([A-Za-z0-9+/=\s]+)(["\'])', re.IGNORECASE)
+
+
+def blob_dir() -> str:
+    """blob 根目录（未设置 MAIL_BLOB_PATH 时跟随当前数据库文件位置）"""
+    return os.environ.get('MAIL_BLOB_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(base.DB_PATH)), 'mail_blobs')
+
+
+def blob_path(blob_hash: str) -> str:
+    return os.path.join(blob_dir(), blob_hash[:2], blob_hash)
+
+
+def blob_url(blob_hash: str) -> str:
+    return BLOB_URL_PREFIX + blob_hash
+
+
+def is_inline_image(content_type: Optional[str]) -> bool:
+    """blob 是否可以按原类型在页面中显示"""
+    return (content_type or '').split(';')[0].strip().lower() in INLINE_IMAGE_TYPES
+
+
+def put_blob(data: bytes, content_type: str) -> str:
+    """
+    写入 blob（已存在则跳过），返回 SHA-256
+
+    先写临时文件再改名，并发写入同一内容时也不会读到半个文件
+    """
+    blob_hash = hashlib.sha256(data).hexdigest()
+    path = blob_path(blob_hash)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{id(data)}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    dt_now = get_datetime_now()
+    with get_db_connection() as conn:
+        conn.execute(f"""
+            INSERT INTO mail_blob (hash, content_type, size, created_at) VALUES (?, ?, ?, {dt_now})
+            ON CONFLICT(hash) DO NOTHING
+        """, (blob_hash, content_type, len(data)))
+        conn.commit()
+    return blob_hash
+
+
+def get_blob(blob_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    查找 blob
+
+    Returns:
+        {"path", "content_type", "size"}，hash 格式不对、未登记或文件缺失时返回 None
+    """
+    if not blob_hash or not _HASH_RE.match(blob_hash):
+        return None
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT content_type, size FROM mail_blob WHERE hash = ?", (blob_hash,)).fetchone()
+    path = blob_path(blob_hash)
+    if not row or not os.path.exists(path):
+        return None
+    return {'path': path, 'content_type': row[0] or 'application/octet-stream', 'size': row[1]}
+
+
+def read_blob_text(blob_hash: str) -> str:
+    """读取存为 blob 的正文，文件缺失时返回空字符串"""
+    blob = get_blob(blob_hash)
+    if not blob:
+        print(f"[Mail] 正文 blob 缺失: {blob_hash}")
+        return ''
+    with open(blob['path'], 'rb') as f:
+        return f.read().decode('utf-8', errors='replace')
+
+
+def store_body(text: Optional[str], content_type: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    超过阈值的正文存入 blob
+
+    Returns:
+        (保存到 uni_mail 的正文, blob hash)；未超过阈值时原样返回、hash 为 None
+    """
+    if not text:
+        return text, None
+    data = text.encode('utf-8')
+    if len(data) <= MAIL_BODY_BLOB_THRESHOLD:
+        return text, None
+    return '', put_blob(data, f"{content_type}; charset=utf-8")
+
+
+def body_columns(content: Optional[str], html_content: Optional[str]) -> Tuple[Any, Any, Any, Any]:
+    """save_email / update_mail_body 使用：返回 (content, html_content, content_blob, html_blob)"""
+    content, content_blob = store_body(content, 'text/plain')
+    html_content, html_blob = store_body(externalize_data_uris(html_content), 'text/html')
+    return content, html_content, content_blob, html_blob
+
+
+def externalize_data_uris(html: Optional[str]) -> Optional[str]:
+    """把 HTML 中 src="data:image/...;base64,..." 的图片转存为 blob 并替换为 blob 地址"""
+    if not html or 'data:image/' not in html.lower():
+        return html
+
+    def replace(match):
+        try:
+            data = base64.b64decode(re.sub(r'\s+', '', match.group(3)))
+        except (ValueError, TypeError):
+            return match.group(0)
+        return f"{match.group(1)}{blob_url(put_blob(data, match.group(2).lower()))}{match.group(4)}"
+
+    return _DATA_URI_RE.sub(replace, html)
+
+
+def load_mail_bodies(mail: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """把存为 blob 的正文读回 content / html_content（就地修改并返回）"""
+    if not mail:
+        return mail
+    if mail.get('content_blob'):
+        mail['content'] = read_blob_text(mail['content_blob'])
+    if mail.get('html_blob'):
+        mail['html_content'] = read_blob_text(mail['html_blob'])
+    return mail
+
+
+def migrate_mail_blobs(batch_size: int = 200) -> int:
+    """
+    旧邮件转存：内嵌图片 data URI 和超大正文写入 blob
+
+    启动时在后台执行；按 id 分批提交并在 global_settings.mail_blob_backfill 记录进度，
+    中断后从断点继续，全部完成后记为 done，之后启动不再扫描邮件表。
+
+    Returns:
+        转存的邮件数
+    """
+    dt_now = get_datetime_now()
+    total = 0
+    with get_db_connection() as conn:
+        row = conn.execute("SELECT value FROM global_settings WHERE key = 'mail_blob_backfill'").fetchone()
+        if row and row[0] == 'done':
+            return 0
+        last_id = int(row[0]) if row and row[0] else 0
+
+        def save_progress(value):
+            conn.execute(f"""
+                INSERT INTO global_settings (key, value, updated_at)
+                VALUES ('mail_blob_backfill', ?, {dt_now})
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    updated_at = excluded.updated_at
+            """, (value,))
+            conn.commit()
+
+        try:
+            while True:
+                rows = conn.execute("""
+                    SELECT id, content, html_content FROM uni_mail
+                    WHERE id > ? AND content_blob IS NULL AND html_blob IS NULL
+                    ORDER BY id LIMIT ?
+                """, (last_id, batch_size)).fetchall()
+                if not rows:
+                    save_progress('done')
+                    break
+
+                updates = []
+                for mail_id, content, html_content in (r[:] for r in rows):
+                    columns = body_columns(content, html_content)
+                    if columns != (content, html_content, None, None):
+                        updates.append(columns + (mail_id,))
+                if updates:
+                    conn.executemany("""
+                        UPDATE uni_mail SET content = ?, html_content = ?, content_blob = ?, html_blob = ?
+                        WHERE id = ?
+                    """, updates)
+                total += len(updates)
+                last_id = rows[-1][0]
+                save_progress(str(last_id))
+        except Exception as e:
+            conn.rollback()
+            print(f"[Mail] 邮件 blob 转存中断（下次启动从 id {last_id} 继续）: {e}")
+
+    if total:
+        print(f"[Mail] 邮件 blob 转存完成：{total} 封")
+    return total
@@ -0,0 +1,198 @@
+"""
+IMAP IDLE 推送监听
+
+每个开启了 sync_idle 的账户一个后台线程，保持一条长连接在收件箱上 IDLE；
+服务器推送 EXISTS 时在同一连接上只同步收件箱的新UID（fetch_inbox_updates），不再重新连接、列文件夹、扫描全部UID。
+连接断开后按指数退避重连，重连成功先补同步断线期间的新邮件。
+服务器不支持 IDLE 时线程退出（状态 unsupported），仍由页面的定时同步兜底。
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from Sills.db_mail import get_all_mail_accounts, get_mail_account_by_id, get_folder_sync_state
+from Sills.mail_service import IMAPClient, fetch_inbox_updates
+
+# RFC 2177：服务器可在 30 分钟无活动后断开，29 分钟内需重新发起 IDLE
+IDLE_RENEW_SECONDS = 25 * 60
+RECONNECT_MIN_SECONDS = 5
+RECONNECT_MAX_SECONDS = 300
+
+# 账户ID -> IdleWatcher
+_watchers: Dict[int, 'IdleWatcher'] = {}
+_watchers_lock = threading.Lock()
+
+
+def uses_idle(config: Dict[str, Any]) -> bool:
+    """账户是否开启 IDLE 推送（mail_config.sync_idle，默认开启）"""
+    return bool(config.get('imap_server')) and config.get('sync_idle') != 0
+
+
+def _now() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class IdleWatcher:
+    """
+    单个账户的 IDLE 监听线程
+
+    state：connecting（连接中）/ idle（等待推送）/ fetching（同步新邮件）/ reconnecting（等待重连）/
+    unsupported（服务器不支持 IDLE）/ disabled（账户已关闭开关或已删除）/ stopped（已停止）
+    """
+
+    def __init__(self, account_id: int, renew_seconds: float = IDLE_RENEW_SECONDS,
+                 min_backoff: float = RECONNECT_MIN_SECONDS, max_backoff: float = RECONNECT_MAX_SECONDS):
+        self.account_id = account_id
+        self.renew_seconds = renew_seconds
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.state = 'connecting'
+        self.error = None
+        self.connected_at = None
+        self.last_event_at = None
+        self.new_count = 0  # 推送触发同步的新邮件累计数
+        self.reconnects = 0
+        self._backoff = min_backoff
+        self._client: Optional[IMAPClient] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f'imap-idle-{account_id}')
+
+    def start(self) -> 'IdleWatcher':
+        self._thread.start()
+        return self
+
+    def stop(self, wait: float = 5):
+        """停止监听：结束 IDLE 并等待线程退出"""
+        self._stop.set()
+        client = self._client
+        if client:
+            try:
+                client.idle_done()
+            except Exception:
+                pass
+        if wait and self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join(wait)
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'account_id': self.account_id,
+            'state': self.state,
+            'error': self.error,
+            'connected_at': self.connected_at,
+            'last_event_at': self.last_event_at,
+            'new_count': self.new_count,
+            'reconnects': self.reconnects,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._watch()
+                break  # 正常返回：已停止、服务器不支持或账户已关闭
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.state = 'reconnecting'
+                self.error = str(e)
+                self.reconnects += 1
+                print(f"[Mail] IDLE 连接断开（账户 {self.account_id}），{self._backoff:g} 秒后重连: {e}")
+                self._stop.wait(self._backoff)
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+            finally:
+                client, self._client = self._client, None
+                if client:
+                    client.disconnect()
+        if self.state not in ('unsupported', 'disabled'):
+            self.state = 'stopped'
+
+    def _watch(self):
+        config = get_mail_account_by_id(self.account_id)
+        if not config or not uses_idle(config):
+            self.state = 'disabled'
+            return
+
+        self.state = 'connecting'
+        client = IMAPClient(config)
+        client.connect()
+        self._client = client
+        if not client.has_idle():
+            print(f"[Mail] 邮件服务器不支持 IDLE（账户 {self.account_id}），使用定时同步")
+            self.state = 'unsupported'
+            return
+
+        self.connected_at = _now()
+        self.error = None
+        self._backoff = self.min_backoff
+
+        # 补同步连接建立前（含断线期间）到达的新邮件
+        self._fetch(client, config)
+        refetched = False
+        while not self._stop.is_set():
+            status, data = client.client.select('INBOX')
+            if status != 'OK':
+                raise ConnectionError("无法选择收件箱")
+            # 上次同步之后、IDLE 开始之前到达的邮件不会再推送，按 SELECT 返回的邮件数补同步一次
+            exists = int(data[0]) if data and data[0] else 0
+            state = get_folder_sync_state(self.account_id, 'INBOX')
+            if not refetched and state and exists > (state['messages'] or 0):
+                refetched = True
+                self._fetch(client, config)
+                continue
+            refetched = False
+            self.state = 'idle'
+            events = client.idle(self.renew_seconds, self._stop)
+            if self._stop.is_set():
+                break
+            if any(event.endswith('EXISTS') for event in events):
+                self.last_event_at = _now()
+                self._fetch(client, config)
+
+    def _fetch(self, client: IMAPClient, config: Dict[str, Any]):
+        self.state = 'fetching'
+        self.new_count += fetch_inbox_updates(client, config)
+
+
+def start_idle_watchers(restart_account_id: int = None) -> Dict[int, IdleWatcher]:
+    """
+    按账户开关启动/停止 IDLE 监听（应用启动、账户配置变化后调用）
+
+    Args:
+        restart_account_id: 配置有变化的账户，已有监听时用新配置重新连接
+
+    Returns:
+        当前的 {账户ID: IdleWatcher}
+    """
+    wanted = set()
+    for account in get_all_mail_accounts():
+        config = get_mail_account_by_id(account['id'])
+        if config and uses_idle(config):
+            wanted.add(account['id'])
+
+    with _watchers_lock:
+        for account_id in list(_watchers):
+            watcher = _watchers[account_id]
+            if account_id not in wanted or account_id == restart_account_id or not watcher.is_alive():
+                watcher.stop(wait=0)
+                del _watchers[account_id]
+        for account_id in wanted - set(_watchers):
+            _watchers[account_id] = IdleWatcher(account_id).start()
+        return dict(_watchers)
+
+
+def stop_idle_watchers():
+    """停止全部 IDLE 监听（应用关闭时调用）"""
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+    for watcher in watchers:
+        watcher.stop()
+
+
+def get_idle_status(account_id: int) -> Optional[Dict[str, Any]]:
+    """账户的 IDLE 监听状态，未启动监听时返回 None"""
+    watcher = _watchers.get(account_id)
+    return watcher.status() if watcher else None
@@ -19,11 +19,14 @@ from datetime import datetime
 from typing import Dict, Any, List, Optional
 import uuid
 import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 
 from Sills.db_mail import (
     save_email, get_mail_config, acquire_sync_lock,
     release_sync_lock, update_mail_sync_status, recover_orphaned_syncs,
-    update_sync_progress, get_sync_days, get_sync_date_range
+    update_sync_progress, get_sync_days, get_sync_date_range,
+    get_mail_account_by_id, get_pending_body_mails, update_mail_body
 )
 
 # 全局取消同步标志（使用线程锁保证线程安全）
@@ -45,6 +48,10 @@ def reset_cancel_flag():
     _cancel_sync_flag.clear()
 
 
+# 先同步邮件头时获取的字段（其余内容在补全正文时下载）
+HEADER_FIELDS = 'FROM TO CC SUBJECT DATE MESSAGE-ID'
+
+
 class IMAPClient:
     """IMAP 邮件接收客户端"""
 
@@ -57,6 +64,8 @@ class IMAPClient:
         """
         self.config = config or get_mail_config()
         self.client = None
+        self._idle_lock = threading.Lock()
+        self._idle_open = False  # 已发送 IDLE、尚未发送 DONE
 
     def connect(self) -> bool:
         """建立 IMAP 连接"""
@@ -551,6 +560,191 @@ class IMAPClient:
             print(f"[Mail] 获取新UID失败: {e}")
             return []
 
+    def has_condstore(self) -> bool:
+        """服务器是否支持 CONDSTORE（RFC 7162），支持时可按 MODSEQ 只取标记有变化的邮件"""
+        return bool(self.client) and 'CONDSTORE' in (self.client.capabilities or ())
+
+    def folder_status(self, folder: str) -> Optional[Dict[str, int]]:
+        """
+        用 STATUS 获取文件夹状态（不需要 SELECT，一次往返）
+
+        Returns:
+            {"messages", "uid_next", "uid_validity", "highest_modseq"(支持 CONDSTORE 时)}，失败返回 None
+        """
+        if not self.client:
+            raise ConnectionError("Not connected to IMAP server")
+
+        import re
+        items = 'MESSAGES UIDNEXT UIDVALIDITY' + (' HIGHESTMODSEQ' if self.has_condstore() else '')
+        try:
+            status, data = self.client.status(folder, f'({items})')
+        except Exception as e:
+            print(f"[Mail] 获取文件夹状态失败 '{folder}': {e}")
+            return None
+        if status != 'OK' or not data or not data[0]:
+            return None
+
+        text = data[0].decode() if isinstance(data[0], bytes) else str(data[0])
+        result = {}
+        for item, key in (('MESSAGES', 'messages'), ('UIDNEXT', 'uid_next'),
+                          ('UIDVALIDITY', 'uid_validity'), ('HIGHESTMODSEQ', 'highest_modseq')):
+            match = re.search(rf'{item} (\d+)', text)
+            if match:
+                result[key] = int(match.group(1))
+        if 'uid_next' not in result or 'uid_validity' not in result:
+            return None
+        return result
+
+    def search_uids(self, folder: str, criteria: str) -> List[int]:
+        """选择文件夹并执行 UID SEARCH，返回UID列表（失败时抛出异常，由调用方决定是否完整对比）"""
+        if not self.client:
+            raise ConnectionError("Not connected to IMAP server")
+
+        status, data = self.client.select(folder)
+        if status != 'OK':
+            raise ConnectionError(f"无法选择文件夹 '{folder}'")
+        status, messages = self.client.uid('search', None, criteria)
+        if status != 'OK':
+            raise ConnectionError(f"UID SEARCH 失败 '{folder}': {messages}")
+        return [int(uid) for uid in messages[0].split()] if messages and messages[0] else []
+
+    def fetch_flag_changes(self, folder: str, since_modseq: int) -> Dict[int, set]:
+        """
+        获取 MODSEQ 大于 since_modseq 的邮件标记（CONDSTORE：UID FETCH 1:* (FLAGS) (CHANGEDSINCE n)）
+
+        Returns:
+            {uid: 标记集合}
+        """
+        if not self.client:
+            raise ConnectionError("Not connected to IMAP server")
+
+        import re
+        status, data = self.client.select(folder)
+        if status != 'OK':
+            raise ConnectionError(f"无法选择文件夹 '{folder}'")
+        status, data = self.client.uid('fetch', '1:*', f'(FLAGS) (CHANGEDSINCE {since_modseq})')
+        if status != 'OK':
+            raise ConnectionError(f"获取标记变化失败 '{folder}': {data}")
+
+        changes = {}
+        for item in data:
+            if isinstance(item, tuple):
+                item = item[0]
+            if not item:
+                continue
+            response = item.decode() if isinstance(item, bytes) else str(item)
+            uid_match = re.search(r'UID (\d+)', response)
+            flags_match = re.search(r'FLAGS \(([^)]*)\)', response)
+            if uid_match and flags_match:
+                changes[int(uid_match.group(1))] = set(flags_match.group(1).split())
+        return changes
+
+    def has_idle(self) -> bool:
+        """服务器是否支持 IDLE（RFC 2177）推送"""
+        return bool(self.client) and 'IDLE' in (self.client.capabilities or ())
+
+    def idle(self, timeout: float, stop: threading.Event = None) -> List[str]:
+        """
+        在当前选择的文件夹上 IDLE，等待服务器推送
+
+        收到 EXISTS / EXPUNGE / FETCH 推送、超过 timeout 秒或其他线程调用 idle_done() 时结束 IDLE；
+        stop 已设置时进入 IDLE 后立即结束（避免停止请求早于 IDLE 发出而被错过）。
+        连接断开（读取超时、BYE）时抛出 ConnectionError。
+
+        Returns:
+            收到的推送（如 ["3 EXISTS"]），超时或被结束时为空列表
+        """
+        if not self.client:
+            raise ConnectionError("Not connected to IMAP server")
+
+        import re
+        conn = self.client
+        tag = conn._new_tag()
+        self._idle_open = True
+        conn.send(tag + b' IDLE\r\n')
+        line = conn.readline()
+        if not line.startswith(b'+'):
+            self._idle_open = False
+            raise ConnectionError(f"IDLE 被拒绝: {line.strip()!r}")
+        if stop is not None and stop.is_set():
+            self.idle_done()
+
+        events = []
+        timer = threading.Timer(timeout, self.idle_done)
+        timer.daemon = True
+        timer.start()
+        # 超时后会发送 DONE，正常情况下很快收到应答；仍读不到说明连接已断开
+        previous_timeout = conn.sock.gettimeout()
+        conn.sock.settimeout(timeout + 60)
+        try:
+            while True:
+                line = conn.readline()
+                if not line:
+                    raise ConnectionError("IMAP 连接已断开")
+                text = line.decode('utf-8', errors='replace').strip()
+                if text.startswith(tag.decode()):
+                    if ' OK' not in text.upper():
+                        raise ConnectionError(f"IDLE 失败: {text}")
+                    return events
+                if text.upper().startswith('* BYE'):
+                    raise ConnectionError(f"服务器断开连接: {text}")
+                match = re.match(r'\* (\d+) (EXISTS|EXPUNGE|FETCH)', text, re.IGNORECASE)
+                if match:
+                    events.append(f"{match.group(1)} {match.group(2).upper()}")
+                    self.idle_done()
+        except OSError as e:
+            raise ConnectionError(f"IDLE 连接中断: {e}")
+        finally:
+            timer.cancel()
+            self._idle_open = False
+            try:
+                conn.sock.settimeout(previous_timeout)
+            except OSError:
+                pass
+
+    def idle_done(self):
+        """结束正在进行的 IDLE（发送 DONE，可从其他线程调用）"""
+        with self._idle_lock:
+            if self._idle_open and self.client:
+                self._idle_open = False
+                self.client.send(b'DONE\r\n')
+
+    def _uid_fetch(self, folder: str, uids: List[int], items: str, batch_size: int = 50, strict: bool = False):
+        """
+        按UID分批执行 UID FETCH，逐封返回 (uid, 原始数据)
+
+        Args:
+            folder: 邮箱文件夹
+            uids: UID列表
+            items: FETCH 数据项，如 '(RFC822)'
+            batch_size: 每批UID数量
+            strict: SELECT 或 FETCH 未返回 OK 时抛出 ConnectionError（默认打印后跳过），
+                    调用方据此区分“服务器上没有这封邮件”和“这次没取到”
+        """
+        import re
+        status, data = self.client.select(folder)
+        if status != 'OK':
+            if strict:
+                raise ConnectionError(f"无法选择文件夹 '{folder}': {data}")
+            print(f"[Mail] 无法选择文件夹 '{folder}'")
+            return
+
+        for i in range(0, len(uids), batch_size):
+            # 构建UID范围
+            uid_range = ','.join(str(uid) for uid in uids[i:i + batch_size])
+            status, msg_data = self.client.uid('fetch', uid_range, items)
+            if status != 'OK':
+                if strict:
+                    raise ConnectionError(f"UID FETCH 失败（文件夹 '{folder}'）: {msg_data}")
+                continue
+
+            # 解析返回的邮件数据：每封邮件为 (响应头, 数据) 元组
+            for item in msg_data:
+                if isinstance(item, tuple) and len(item) >= 2:
+                    response = item[0].decode() if isinstance(item[0], bytes) else str(item[0])
+                    uid_match = re.search(r'UID (\d+)', response)
+                    yield (int(uid_match.group(1)) if uid_match else None), item[1]
+
     def fetch_emails_by_uid(self, folder: str, uids: List[int]) -> List[Dict[str, Any]]:
         """
         根据UID列表获取邮件
@@ -571,51 +765,82 @@ class IMAPClient:
         emails = []
 
         try:
-            status, data = self.client.select(folder)
-            if status != 'OK':
-                print(f"[Mail] 无法选择文件夹 '{folder}'")
-                return emails
+            # 批量获取邮件（每批50封），使用UID FETCH命令
+            for uid, raw_email in self._uid_fetch(folder, uids, '(RFC822)'):
+                email_data = self._parse_email(raw_email)
+                if email_data:
+                    email_data['folder'] = folder
+                    email_data['imap_uid'] = uid
+                    emails.append(email_data)
 
-            # 批量获取邮件（每批50封）
-            batch_size = 50
-            for i in range(0, len(uids), batch_size):
-                batch_uids = uids[i:i + batch_size]
-                # 构建UID范围
-                uid_range = ','.join(str(uid) for uid in batch_uids)
+            print(f"[Mail] 根据UID获取到 {len(emails)} 封邮件")
+            return emails
 
-                # 使用UID FETCH命令
-                status, msg_data = self.client.uid('fetch', uid_range, '(RFC822)')
-                if status != 'OK':
-                    continue
+        except Exception as e:
+            print(f"[Mail] 根据UID获取邮件失败: {e}")
+            import traceback
+            traceback.print_exc()
+            return emails
 
-                # 解析返回的邮件数据
-                j = 0
-                while j < len(msg_data):
-                    item = msg_data[j]
-                    if isinstance(item, tuple) and len(item) >= 2:
-                        raw_email = item[1]
-                        # 解析UID
-                        response = item[0].decode() if isinstance(item[0], bytes) else str(item[0])
-                        import re
-                        uid_match = re.search(r'UID (\d+)', response)
-                        uid = int(uid_match.group(1)) if uid_match else None
+    def fetch_headers_by_uid(self, folder: str, uids: List[int]) -> List[Dict[str, Any]]:
+        """
+        只获取邮件头（先显示在列表中，正文稍后下载）
 
-                        email_data = self._parse_email(raw_email)
-                        if email_data:
-                            email_data['folder'] = folder
-                            email_data['imap_uid'] = uid
-                            emails.append(email_data)
-                    j += 1
+        使用 BODY.PEEK 不改变已读状态；返回的邮件 body_state='pending'，content/html_content 为空
 
-            print(f"[Mail] 根据UID获取到 {len(emails)} 封邮件")
+        Args:
+            folder: 邮箱文件夹
+            uids: UID列表
+
+        Returns:
+            邮件数据列表
+        """
+        if not self.client:
+            raise ConnectionError("Not connected to IMAP server")
+
+        if not uids:
+            return []
+
+        emails = []
+
+        try:
+            # 邮件头只有几百字节，每批500封
+            items = f'(BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])'
+            for uid, raw_header in self._uid_fetch(folder, uids, items, batch_size=500):
+                email_data = self._parse_email(raw_header)
+                if email_data:
+                    email_data['folder'] = folder
+                    email_data['imap_uid'] = uid
+                    email_data['body_state'] = 'pending'
+                    emails.append(email_data)
+
+            print(f"[Mail] 根据UID获取到 {len(emails)} 封邮件头")
             return emails
 
         except Exception as e:
-            print(f"[Mail] 根据UID获取邮件失败: {e}")
+            print(f"[Mail] 根据UID获取邮件头失败: {e}")
             import traceback
             traceback.print_exc()
             return emails
 
+    def fetch_bodies_by_uid(self, folder: str, uids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        下载完整邮件用于补全正文（BODY.PEEK[]，不改变已读状态）
+
+        SELECT / FETCH 失败时抛出 ConnectionError，不返回部分结果
+
+        Returns:
+            {uid: 邮件数据}；服务器返回了但解析失败的邮件值为 None，服务器上没有的UID不在结果中
+        """
+        if not self.client:
+            raise ConnectionError("Not connected to IMAP server")
+
+        bodies = {}
+        for uid, raw_email in self._uid_fetch(folder, uids, '(BODY.PEEK[])', strict=True):
+            if uid:
+                bodies[uid] = self._parse_email(raw_email)
+        return bodies
+
     def _parse_email(self, raw_email: bytes) -> Optional[Dict[str, Any]]:
         """解析原始邮件"""
         try:
@@ -675,19 +900,18 @@ class IMAPClient:
                 return payload.decode('utf-8', errors='replace')
 
             if msg.is_multipart():
-                # 先收集所有内嵌图片
-                embedded_images = {}  # cid -> base64 data
+                # 先收集所有内嵌图片（写入 blob 存储，HTML 中引用 blob 地址，不再内联 base64）
+                from Sills.mail_blob import put_blob, blob_url
+                embedded_images = {}  # cid -> blob 地址
                 for part in msg.walk():
                     content_type = part.get_content_type()
                     content_id = part.get('Content-ID', '')
                     if content_id and content_type.startswith('image/'):
                         payload = part.get_payload(decode=True)
                         if payload:
-                            import base64
-                            b64_data = base64.b64encode(payload).decode('ascii')
                             # 移除cid两端的尖括号
                             cid = content_id.strip('<>')
-                            embedded_images[cid] = f"data:{content_type};base64,{b64_data}"
+                            embedded_images[cid] = blob_url(put_blob(payload, content_type))
 
                 # 再解析正文
                 for part in msg.walk():
@@ -701,7 +925,7 @@ class IMAPClient:
                         if payload:
                             html_content += decode_payload(payload, part)
 
-                # 替换HTML中的cid引用为base64数据
+                # 替换HTML中的cid引用为blob地址
                 import re
                 for cid, data_url in embedded_images.items():
                     html_content = re.sub(
@@ -871,6 +1095,208 @@ class SMTPClient:
             }
 
 
+# 每个账户同时打开的 IMAP 连接数（mail_config.sync_connections 可按账户设置）
+# 多数邮箱限制单账户并发连接（网易约 10 个、Gmail 15 个），这里最多开 MAIL_SYNC_MAX_CONNECTIONS 个
+MAIL_SYNC_CONNECTIONS = 4
+MAIL_SYNC_MAX_CONNECTIONS = 8
+# 等待空闲连接时每隔这么久检查一次连接是否已全部断开
+MAIL_SYNC_ACQUIRE_POLL_SECONDS = 1
+
+# 写库串行：同一封邮件可能出现在多个文件夹，按 message_id 去重需要先查后插
+_save_lock = threading.Lock()
+
+
+class FolderSyncPool:
+    """
+    按账户的 IMAP 连接池：各文件夹作为独立任务，由多个连接并发同步
+
+    - open() 建立第一个连接（self.client），用于列文件夹等控制操作；其余连接在任务需要时才建立
+    - 一个连接同一时间只服务一个文件夹（SELECT 状态属于连接）
+    - 新连接被服务器拒绝（超出并发连接数）时，等待已有连接空闲后继续
+    - map() 中单个文件夹出错只影响该文件夹，出错的连接断开丢弃
+    - 连接已全部断开且重新连接失败（网络中断）时，等待中的任务抛出 ConnectionError，不再无限等待
+    """
+
+    def __init__(self, config: Dict[str, Any], size: int = None):
+        self.config = config
+        size = size or config.get('sync_connections') or MAIL_SYNC_CONNECTIONS
+        self.size = max(1, min(int(size), MAIL_SYNC_MAX_CONNECTIONS))
+        self.client = None
+        self._idle = queue.LifoQueue()
+        self._clients = []
+        self._connect_error = None  # 最近一次新建连接失败的异常，连接成功后清空
+        self._lock = threading.Lock()
+
+    def open(self) -> 'IMAPClient':
+        """建立控制连接并返回"""
+        self.client = self._connect()
+        self._idle.put(self.client)
+        return self.client
+
+    def close(self):
+        """断开全部连接（可重复调用）"""
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.disconnect()
+
+    def _connect(self) -> 'IMAPClient':
+        client = IMAPClient(self.config)
+        try:
+            client.connect()
+        except ConnectionError as e:
+            self._connect_error = e
+            raise
+        with self._lock:
+            self._clients.append(client)
+            self._connect_error = None
+        return client
+
+    def _acquire(self) -> 'IMAPClient':
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = len(self._clients) < self.size
+        if can_open:
+            try:
+                return self._connect()
+            except ConnectionError as e:
+                print(f"[Mail] 新建 IMAP 连接失败，等待已有连接: {e}")
+        while True:
+            try:
+                return self._idle.get(timeout=MAIL_SYNC_ACQUIRE_POLL_SECONDS)
+            except queue.Empty:
+                pass
+            # 没有任何连接（都已出错丢弃）且新建连接失败过：不会再有连接归还
+            with self._lock:
+                error = self._connect_error if not self._clients else None
+            if error is not None:
+                raise ConnectionError(f"没有可用的 IMAP 连接: {error}")
+
+    def _discard(self, client: 'IMAPClient'):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+            last = not self._clients
+        client.disconnect()
+        if last:
+            # 没有可用连接时补一个，避免其他任务一直等待
+            try:
+                self._idle.put(self._connect())
+            except ConnectionError as e:
+                print(f"[Mail] 重新连接 IMAP 失败: {e}")
+
+    def map(self, fn, jobs: list) -> list:
+        """
+        对每个任务调用 fn(client, job)，返回与 jobs 同序的结果列表
+        已取消的任务结果为 None，出错的任务结果为异常对象
+        """
+        def run(job):
+            if is_sync_cancelled():
+                return None
+            try:
+                client = self._acquire()
+            except ConnectionError as e:
+                print(f"[Mail] 同步任务 {job[0] if isinstance(job, tuple) else job} 失败: {e}")
+                return e
+            try:
+                result = fn(client, job)
+            except Exception as e:
+                print(f"[Mail] 同步任务 {job[0] if isinstance(job, tuple) else job} 失败: {e}")
+                import traceback
+                traceback.print_exc()
+                self._discard(client)
+                return e
+            self._idle.put(client)
+            return result
+
+        if not jobs:
+            return []
+        workers = min(self.size, len(jobs))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='imap-sync') as executor:
+            return list(executor.map(run, jobs))
+
+
+class SyncProgress:
+    """多个连接共同汇报进度：累计已处理数，按 [start, end] 区间换算百分比写入同步进度"""
+
+    def __init__(self, total: int, start: int = 30, end: int = 95):
+        self.total = total
+        self.done = 0
+        self.start = start
+        self.end = end
+        self._lock = threading.Lock()
+
+    def advance(self, count: int, label: str):
+        with self._lock:
+            self.done += count
+            percent = int(self.start + (self.done / self.total) * (self.end - self.start)) if self.total else self.end
+            update_sync_progress(percent, 100, f"同步{label} {self.done}/{self.total}", synced_emails=self.done)
+
+
+def scan_folder_changes(client: 'IMAPClient', account_id: int, folder: str) -> Dict[str, Any]:
+    """
+    按上次保存的文件夹状态做增量扫描
+
+    先发一条 STATUS：UIDVALIDITY 不变且 UIDNEXT / 邮件数 / HIGHESTMODSEQ 都没变化时不再 SELECT，
+    没有变化的文件夹只需一次往返；有变化时只搜索 UIDNEXT 之后的新UID，支持 CONDSTORE 时按
+    HIGHESTMODSEQ 取标记变化（已读状态），邮件数少于预期时说明服务器删除了邮件，解除对应本地邮件的UID关联。
+
+    Returns:
+        {"new_uids": 新UID列表（None 表示没有可用状态，需要完整对比）, "status": 本次 STATUS 结果,
+         "flags": 更新已读状态的邮件数, "expunged": 解除关联的邮件数}
+    """
+    from Sills.db_mail import (get_folder_sync_state, get_local_uids, apply_flag_changes,
+                               unlink_folder_uids, update_folder_last_uid)
+
+    result = {"new_uids": None, "status": None, "flags": 0, "expunged": 0}
+    status = client.folder_status(folder)
+    if not status:
+        return result
+    result['status'] = status
+
+    state = get_folder_sync_state(account_id, folder)
+    if not state:
+        return result
+    if state['uid_validity'] != status['uid_validity']:
+        # UIDVALIDITY 变化：服务器重建了UID，本地记录的UID全部失效
+        print(f"[Mail] {folder}: UIDVALIDITY {state['uid_validity']} -> {status['uid_validity']}，重新完整同步")
+        result['expunged'] = unlink_folder_uids(account_id, folder)
+        update_folder_last_uid(account_id, folder, 0)
+        return result
+
+    modseq_changed = (status.get('highest_modseq') is not None
+                      and status.get('highest_modseq') != state.get('highest_modseq'))
+    if (status['uid_next'] == state['uid_next'] and status['messages'] == state['messages']
+            and not modseq_changed):
+        result['new_uids'] = []
+        return result
+
+    old_next = state['uid_next'] or 1
+    new_uids = []
+    if status['uid_next'] > old_next:
+        # n:* 在没有更大UID时会返回最大的已有UID，需要再过滤
+        new_uids = [uid for uid in client.search_uids(folder, f'UID {old_next}:*') if uid >= old_next]
+    result['new_uids'] = new_uids
+
+    if modseq_changed and state.get('highest_modseq') is not None:
+        changes = client.fetch_flag_changes(folder, state['highest_modseq'])
+        changes = {uid: flags for uid, flags in changes.items() if uid < old_next}
+        result['flags'] = apply_flag_changes(account_id, folder, changes)
+
+    if status['messages'] < (state['messages'] or 0) + len(new_uids):
+        # 邮件数少于「原有 + 新增」：有邮件被删除，对比原有UID找出已删除的
+        server_uids = set(client.search_uids(folder, 'ALL'))
+        vanished = [uid for uid in get_local_uids(folder, account_id) if uid < old_next and uid not in server_uids]
+        result['expunged'] = unlink_folder_uids(account_id, folder, vanished)
+
+    if result['flags'] or result['expunged']:
+        print(f"[Mail] {folder}: 标记变化 {result['flags']} 封，服务器已删除 {result['expunged']} 封")
+    return result
+
+
 def sync_inbox(background_tasks=None) -> Dict[str, Any]:
     """
     同步邮件（收件箱和发件箱）
@@ -890,6 +1316,7 @@ def sync_inbox(background_tasks=None) -> Dict[str, Any]:
     if not acquire_sync_lock(lock_id):
         return {"status": "already_running", "message": "Sync already in progress"}
 
+    pool = None
     try:
         config = get_mail_config()
         if not config or not config.get('imap_server'):
@@ -927,8 +1354,8 @@ def sync_inbox(background_tasks=None) -> Dict[str, Any]:
             synced_emails=0
         )
 
-        imap_client = IMAPClient(config)
-        imap_client.connect()
+        pool = FolderSyncPool(config)
+        imap_client = pool.open()
 
         # 自动检测发件箱和垃圾邮件文件夹
         update_sync_progress(5, 100, "检测邮箱文件夹...")
@@ -1032,150 +1459,102 @@ def sync_inbox(background_tasks=None) -> Dict[str, Any]:
 
         total_saved = 0
         total_updated = 0
-        total_processed = 0
 
         # === 流式处理：分批获取并立即写入数据库，避免内存溢出 ===
-        from Sills.db_mail import get_local_uids, get_db_connection
+        # 各文件夹由连接池中的多个连接并发处理，进度按全部文件夹累计
+        from Sills.db_mail import get_local_uids, batch_save_emails, batch_record_synced_uids
         import gc
         import time
 
-        # 第一遍：统计所有文件夹的新邮件总数（不下载内容，不存储UID列表）
-        grand_total_new = 0
+        uid_range = date_range if date_range[0] and date_range[1] else None
 
-        for folder_name, is_sent, is_draft, folder_label, local_folder_id in folders_to_sync:
-            try:
-                update_sync_progress(5, 100, f"扫描{folder_label}UID...")
-
-                # Step 1: 获取服务器UID列表（轻量操作）
-                server_uids = imap_client.get_uid_list(
-                    folder=folder_name,
-                    days=sync_days,
-                    date_range=date_range if date_range[0] and date_range[1] else None
-                )
-
-                if not server_uids:
-                    print(f"[Mail] {folder_label}: 无邮件")
-                    continue
+        # 第一遍：统计所有文件夹的新邮件总数（不下载内容，不存储UID列表）
+        def count_new(client, job):
+            folder_name, is_sent, is_draft, folder_label, local_folder_id = job
+            update_sync_progress(5, 100, f"扫描{folder_label}UID...")
 
-                # Step 2: 获取本地已有UID（仅此文件夹）
-                local_uids = get_local_uids(folder_name, current_account_id)
+            # Step 1: 获取服务器UID列表（轻量操作）
+            server_uids = client.get_uid_list(folder=folder_name, days=sync_days, date_range=uid_range)
+            if not server_uids:
+                print(f"[Mail] {folder_label}: 无邮件")
+                return 0
 
-                # Step 3: 计算需要获取的UID数量（不存储列表）
-                new_count = len(set(server_uids) - local_uids)
-                print(f"[Mail] {folder_label}: 服务器 {len(server_uids)} 封, 本地 {len(local_uids)} 封, 新增 {new_count} 封")
+            # Step 2: 获取本地已有UID（仅此文件夹）
+            local_uids = get_local_uids(folder_name, current_account_id)
 
-                if new_count > 0:
-                    grand_total_new += new_count
+            # Step 3: 计算需要获取的UID数量（不存储列表）
+            new_count = len(set(server_uids) - local_uids)
+            print(f"[Mail] {folder_label}: 服务器 {len(server_uids)} 封, 本地 {len(local_uids)} 封, 新增 {new_count} 封")
+            return new_count
 
-                # 释放内存
-                del server_uids
-                del local_uids
-                gc.collect()
-
-            except Exception as e:
-                print(f"[Mail] 扫描 {folder_name} 失败: {e}")
-                import traceback
-                traceback.print_exc()
+        grand_total_new = sum(n for n in pool.map(count_new, folders_to_sync) if isinstance(n, int))
+        gc.collect()
 
         print(f"[Mail] 总计 {grand_total_new} 封新邮件待同步")
         update_sync_progress(10, 100, f"共发现 {grand_total_new} 封新邮件", total_emails=grand_total_new)
 
-        # 第二遍：流式处理 - 逐文件夹处理，避免内存累积
+        # 第二遍：流式处理 - 每个文件夹分批获取，每批获取后立即写库
         fetch_batch_size = 500  # IMAP 每批获取数量
+        headers_first = uses_headers_first(config)
+        fetch = IMAPClient.fetch_headers_by_uid if headers_first else IMAPClient.fetch_emails_by_uid
+        progress = SyncProgress(grand_total_new, start=10, end=95)
+
+        def sync_folder(client, job):
+            folder_name, is_sent, is_draft, folder_label, local_folder_id = job
+            # 重新获取此文件夹的UID（流式处理，不保留）
+            server_uids = client.get_uid_list(folder=folder_name, days=sync_days, date_range=uid_range)
+            if not server_uids:
+                return 0
+            local_uids = get_local_uids(folder_name, current_account_id)
+            new_uids = [uid for uid in server_uids if uid not in local_uids]
+            del server_uids, local_uids
+
+            saved = 0
+            for batch_start in range(0, len(new_uids), fetch_batch_size):
+                # 检查取消
+                if is_sync_cancelled():
+                    break
 
-        for folder_name, is_sent, is_draft, folder_label, local_folder_id in folders_to_sync:
-            try:
-                # 重新获取此文件夹的UID（流式处理，不保留）
-                server_uids = imap_client.get_uid_list(
-                    folder=folder_name,
-                    days=sync_days,
-                    date_range=date_range if date_range[0] and date_range[1] else None
-                )
-                if not server_uids:
-                    continue
-
-                local_uids = get_local_uids(folder_name, current_account_id)
-                new_uids = [uid for uid in server_uids if uid not in local_uids]
-
-                # 释放内存
-                del server_uids
-                del local_uids
-                gc.collect()
-
-                if not new_uids:
-                    continue
-
-                # 分批获取邮件
-                for batch_start in range(0, len(new_uids), fetch_batch_size):
-                    batch_uids = new_uids[batch_start:batch_start + fetch_batch_size]
-
-                    # 检查取消
-                    if is_sync_cancelled():
-                        update_sync_progress(0, 100, "同步已取消")
-                        return {"status": "cancelled", "message": "同步已取消"}
-
-                    update_sync_progress(
-                        int(10 + (total_processed / grand_total_new) * 85) if grand_total_new > 0 else 50,
-                        100,
-                        f"获取{folder_label}邮件 {total_processed + 1}-{min(total_processed + fetch_batch_size, grand_total_new)}/{grand_total_new}",
-                        synced_emails=total_processed
-                    )
+                # 获取一批邮件（先同步邮件头时只取邮件头）
+                emails = fetch(client, folder_name, new_uids[batch_start:batch_start + fetch_batch_size])
 
-                    # 获取一批邮件
-                    emails = imap_client.fetch_emails_by_uid(folder_name, batch_uids)
-
-                    # 为每封邮件添加元数据
-                    for email_data in emails:
-                        email_data['is_sent'] = is_sent
-                        email_data['is_draft'] = is_draft
-                        email_data['folder_label'] = folder_label
-                        email_data['imap_folder'] = folder_name
-                        email_data['account_id'] = current_account_id
-                        if local_folder_id:
-                            email_data['folder_id'] = local_folder_id
-
-                    # 批量保存邮件（一次事务，更高效）
-                    from Sills.db_mail import batch_save_emails, batch_record_synced_uids
-                    saved_in_batch = batch_save_emails(emails)
-                    total_saved += saved_in_batch
-                    total_processed += len(emails)
-
-                    # 记录已同步的 UID
-                    if emails:
-                        uid_folder_pairs = [(e.get('imap_uid'), e.get('imap_folder')) for e in emails if e.get('imap_uid')]
-                        if uid_folder_pairs:
-                            batch_record_synced_uids(current_account_id, uid_folder_pairs)
-
-                    # 更新进度
-                    percent = int(10 + (total_processed / grand_total_new) * 85) if grand_total_new > 0 else 50
-                    update_sync_progress(
-                        percent, 100,
-                        f"同步{folder_label} {total_processed}/{grand_total_new}",
-                        synced_emails=total_processed
-                    )
+                # 为每封邮件添加元数据
+                for email_data in emails:
+                    email_data['is_sent'] = is_sent
+                    email_data['is_draft'] = is_draft
+                    email_data['folder_label'] = folder_label
+                    email_data['imap_folder'] = folder_name
+                    email_data['account_id'] = current_account_id
+                    if local_folder_id:
+                        email_data['folder_id'] = local_folder_id
 
-                    # 释放内存
-                    emails.clear()
-                    del emails
-                    del batch_uids
-                    gc.collect()
+                # 批量保存邮件（一次事务，更高效），并记录已同步的 UID
+                uid_folder_pairs = [(e.get('imap_uid'), folder_name) for e in emails if e.get('imap_uid')]
+                with _save_lock:
+                    saved += batch_save_emails(emails)
+                    if uid_folder_pairs:
+                        batch_record_synced_uids(current_account_id, uid_folder_pairs)
+                progress.advance(len(emails), folder_label)
+                emails.clear()
 
-                    # 批次间暂停，让系统喘息
-                    time.sleep(pause_seconds)
+                # 批次间暂停，让系统喘息
+                time.sleep(pause_seconds)
+            return saved
 
-                # 文件夹处理完毕，释放UID列表
-                del new_uids
-                gc.collect()
+        results = pool.map(sync_folder, folders_to_sync)
+        total_saved = sum(n for n in results if isinstance(n, int))
+        gc.collect()
 
-            except Exception as e:
-                print(f"[Mail] 处理文件夹 {folder_name} 失败: {e}")
-                import traceback
-                traceback.print_exc()
+        if is_sync_cancelled():
+            update_sync_progress(0, 100, "同步已取消")
+            return {"status": "cancelled", "message": "同步已取消"}
 
         update_sync_progress(95, 100, "断开连接...")
-        imap_client.disconnect()
+        pool.close()
 
         update_sync_progress(100, 100, f"完成！新增 {total_saved} 封，更新 {total_updated} 封")
+        if headers_first and total_saved:
+            start_body_download(current_account_id)
 
         return {
             "status": "completed",
@@ -1187,6 +1566,8 @@ def sync_inbox(background_tasks=None) -> Dict[str, Any]:
         return {"status": "error", "message": str(e)}
 
     finally:
+        if pool:
+            pool.close()
         release_sync_lock()
 
 
@@ -1203,14 +1584,18 @@ def sync_inbox_async() -> Dict[str, Any]:
     return {"status": "started"}
 
 
-def sync_new_emails(background_tasks=None) -> Dict[str, Any]:
+def sync_new_emails(background_tasks=None, exclude_inbox: bool = False) -> Dict[str, Any]:
     """
     增量同步：对比服务器UID和本地UID，只获取本地没有的邮件
 
+    Args:
+        exclude_inbox: 跳过收件箱（收件箱由 IDLE 推送同步时，定时同步只轮询其他文件夹）
+
     Returns:
         {"status": "completed", "new_count": int}
     """
-    from Sills.db_mail import get_local_uids, get_sync_deleted_setting, get_synced_uids, batch_record_synced_uids, get_sync_date_range
+    from Sills.db_mail import (get_local_uids, get_sync_deleted_setting, get_synced_uids, batch_record_synced_uids,
+                               get_sync_date_range, save_folder_sync_state)
     from datetime import datetime
 
     # 重置取消标志
@@ -1225,6 +1610,7 @@ def sync_new_emails(background_tasks=None) -> Dict[str, Any]:
     if not acquire_sync_lock(lock_id):
         return {"status": "already_running", "message": "Sync already in progress"}
 
+    pool = None
     try:
         config = get_mail_config()
         if not config or not config.get('imap_server'):
@@ -1242,8 +1628,8 @@ def sync_new_emails(background_tasks=None) -> Dict[str, Any]:
             update_sync_progress(0, 100, "同步已取消")
             return {"status": "cancelled", "message": "同步已取消"}
 
-        imap_client = IMAPClient(config)
-        imap_client.connect()
+        pool = FolderSyncPool(config)
+        imap_client = pool.open()
 
         # 自动检测发件箱、垃圾邮件、草稿箱
         update_sync_progress(10, 100, "检测邮箱文件夹...")
@@ -1268,7 +1654,7 @@ def sync_new_emails(background_tasks=None) -> Dict[str, Any]:
         # 同步收件箱、发件箱、垃圾邮件、草稿箱、其他文件夹
         # (文件夹名, is_sent, is_draft, 显示标签, 本地folder_id)
         # 已发送通过is_sent=1区分，草稿箱通过is_draft=1区分，都不需要folder_id
-        folders_to_sync = [('INBOX', 0, 0, '收件箱', None)]
+        folders_to_sync = [] if exclude_inbox else [('INBOX', 0, 0, '收件箱', None)]
         if sent_folder:
             print(f"[Mail] 添加发件箱到同步列表: {sent_folder}")
             folders_to_sync.append((sent_folder, 1, 0, '发件箱', None))
@@ -1290,58 +1676,69 @@ def sync_new_emails(background_tasks=None) -> Dict[str, Any]:
         # 获取分批处理配置
         batch_size = config.get('sync_batch_size') or 100
         pause_seconds = config.get('sync_pause_seconds') or 0.1
+        sync_deleted_enabled = get_sync_deleted_setting()
+        uid_range = date_range if date_range[0] and date_range[1] else None
 
-        # 收集所有需要同步的UID
+        # 收集所有需要同步的UID（各文件夹并发扫描）
         update_sync_progress(20, 100, "扫描服务器UID...")
-        all_uids_to_fetch = []  # [(folder_name, is_sent, is_draft, folder_label, local_folder_id, uid), ...]
-
-        for folder_name, is_sent, is_draft, folder_label, local_folder_id in folders_to_sync:
-            # 检查取消
-            if is_sync_cancelled():
-                update_sync_progress(0, 100, "同步已取消")
-                imap_client.disconnect()
-                return {"status": "cancelled", "message": "同步已取消", "new_count": total_saved}
-
-            try:
-                print(f"[Mail] 检查文件夹: {folder_name}")
-                # 获取服务器上的UID列表（轻量操作，使用用户设置的日期范围）
-                server_uids = imap_client.get_uid_list(
-                    folder=folder_name,
-                    date_range=date_range if date_range[0] and date_range[1] else None
-                )
-                if not server_uids:
-                    print(f"[Mail] {folder_label}: 无邮件")
-                    continue
-
-                # 获取本地已存储的UID
-                local_uids = get_local_uids(folder_name, current_account_id)
+        folder_states = {}  # 文件夹名 -> 本次 STATUS 结果，文件夹同步完成后保存
+
+        def save_state(folder_name):
+            if folder_states.get(folder_name):
+                save_folder_sync_state(current_account_id, folder_name, folder_states[folder_name])
+
+        def scan_folder(client, job):
+            folder_name, is_sent, is_draft, folder_label, local_folder_id = job
+            print(f"[Mail] 检查文件夹: {folder_name}")
+            if not uid_range:
+                # 按上次的文件夹状态增量扫描，没有状态时再完整对比
+                changes = scan_folder_changes(client, current_account_id, folder_name)
+                folder_states[folder_name] = changes['status']
+                if changes['new_uids'] is not None:
+                    new_uids = set(changes['new_uids']) - get_local_uids(folder_name, current_account_id)
+                    print(f"[Mail] {folder_label}: 新增{len(new_uids)}封")
+                    if not new_uids:
+                        save_state(folder_name)
+                    return sorted(new_uids)
+
+            # 获取服务器上的UID列表（轻量操作，使用用户设置的日期范围）
+            server_uids = client.get_uid_list(folder=folder_name, date_range=uid_range)
+            if not server_uids:
+                print(f"[Mail] {folder_label}: 无邮件")
+                save_state(folder_name)
+                return []
 
-                # 计算差集：需要同步的新UID
-                new_uids = set(server_uids) - local_uids
+            # 获取本地已存储的UID
+            local_uids = get_local_uids(folder_name, current_account_id)
 
-                # 如果"同步已删除邮件"开关关闭，排除已同步过但已删除的邮件
-                sync_deleted_enabled = get_sync_deleted_setting()
-                if not sync_deleted_enabled:
-                    # 获取已同步过的UID记录
-                    synced_uids = get_synced_uids(current_account_id, folder_name)
-                    # 只保留从未同步过的UID
-                    new_uids = new_uids - synced_uids
-                    print(f"[Mail] {folder_label}: 已同步过{len(synced_uids)}封, 开关关闭，跳过已删除邮件")
+            # 计算差集：需要同步的新UID
+            new_uids = set(server_uids) - local_uids
 
-                print(f"[Mail] {folder_label}: 服务器{len(server_uids)}封, 本地{len(local_uids)}封, 新增{len(new_uids)}封")
+            # 如果"同步已删除邮件"开关关闭，排除已同步过但已删除的邮件
+            if not sync_deleted_enabled:
+                # 获取已同步过的UID记录
+                synced_uids = get_synced_uids(current_account_id, folder_name)
+                # 只保留从未同步过的UID
+                new_uids = new_uids - synced_uids
+                print(f"[Mail] {folder_label}: 已同步过{len(synced_uids)}封, 开关关闭，跳过已删除邮件")
 
-                for uid in new_uids:
-                    all_uids_to_fetch.append((folder_name, is_sent, is_draft, folder_label, local_folder_id, uid))
+            print(f"[Mail] {folder_label}: 服务器{len(server_uids)}封, 本地{len(local_uids)}封, 新增{len(new_uids)}封")
+            if not new_uids:
+                save_state(folder_name)
+            return sorted(new_uids)
 
-            except Exception as e:
-                print(f"[Mail] 扫描 {folder_name} 失败: {e}")
+        scanned = pool.map(scan_folder, folders_to_sync)
+        if is_sync_cancelled():
+            update_sync_progress(0, 100, "同步已取消")
+            return {"status": "cancelled", "message": "同步已取消", "new_count": total_saved}
 
-        grand_total_emails = len(all_uids_to_fetch)
+        # (文件夹信息, 新UID列表)
+        uids_by_folder = [(job, uids) for job, uids in zip(folders_to_sync, scanned) if isinstance(uids, list) and uids]
+        grand_total_emails = sum(len(uids) for _, uids in uids_by_folder)
         print(f"[Mail] 总计 {grand_total_emails} 封新邮件待同步")
 
         if grand_total_emails == 0:
             update_sync_progress(100, 100, "完成！无新邮件")
-            imap_client.disconnect()
             return {"status": "completed", "new_count": 0, "message": "无新邮件"}
 
         # 设置同步日期范围
@@ -1354,40 +1751,27 @@ def sync_new_emails(background_tasks=None) -> Dict[str, Any]:
                            sync_start_date=sync_start, sync_end_date=sync_end,
                            total_emails=grand_total_emails, synced_emails=0)
 
-        # 按文件夹分组，批量获取邮件
+        # 按文件夹并发获取邮件（先同步邮件头时只取邮件头）
         import time
-        from collections import defaultdict
-        uids_by_folder = defaultdict(list)
-        for folder_name, is_sent, is_draft, folder_label, local_folder_id, uid in all_uids_to_fetch:
-            uids_by_folder[(folder_name, is_sent, is_draft, folder_label, local_folder_id)].append(uid)
-
-        processed_count = 0
-        for (folder_name, is_sent, is_draft, folder_label, local_folder_id), uids in uids_by_folder.items():
-            # 检查取消
-            if is_sync_cancelled():
-                update_sync_progress(0, 100, "同步已取消")
-                imap_client.disconnect()
-                return {"status": "cancelled", "message": "同步已取消", "new_count": total_saved}
+        progress = SyncProgress(grand_total_emails)
+        headers_first = uses_headers_first(config)
+        fetch = IMAPClient.fetch_headers_by_uid if headers_first else IMAPClient.fetch_emails_by_uid
 
+        def fetch_folder(client, item):
+            (folder_name, is_sent, is_draft, folder_label, local_folder_id), uids = item
             print(f"[Mail] 同步 {folder_label} 的 {len(uids)} 封邮件...")
 
-            # 批量获取邮件
-            batch_uids = []
-            for uid in uids:
-                batch_uids.append(uid)
-
-            # 使用 fetch_emails_by_uid 批量获取
-            emails = imap_client.fetch_emails_by_uid(folder_name, batch_uids)
+            # 批量获取
+            emails = fetch(client, folder_name, uids)
 
             # 收集已同步的UID用于记录
             synced_uid_pairs = []
+            saved = 0
 
             for email_data in emails:
                 # 检查取消
                 if is_sync_cancelled():
-                    update_sync_progress(0, 100, "同步已取消")
-                    imap_client.disconnect()
-                    return {"status": "cancelled", "message": "同步已取消", "new_count": total_saved}
+                    break
 
                 email_data['is_sent'] = is_sent
                 email_data['is_draft'] = is_draft
@@ -1398,35 +1782,45 @@ def sync_new_emails(background_tasks=None) -> Dict[str, Any]:
                     email_data['folder_id'] = local_folder_id
 
                 # 保存邮件
-                save_email(email_data)
-                total_saved += 1
-                processed_count += 1
+                with _save_lock:
+                    save_email(email_data)
+                saved += 1
 
                 # 收集UID用于记录
                 if email_data.get('imap_uid'):
                     synced_uid_pairs.append((email_data['imap_uid'], folder_name))
 
                 # 更新进度
-                percent = int(30 + (processed_count / grand_total_emails) * 65)
-                update_sync_progress(
-                    percent, 100,
-                    f"{folder_label} {processed_count}/{grand_total_emails}",
-                    synced_emails=processed_count
-                )
+                progress.advance(1, folder_label)
 
             # 批量记录已同步的UID
             if synced_uid_pairs:
-                batch_record_synced_uids(current_account_id, synced_uid_pairs)
+                with _save_lock:
+                    batch_record_synced_uids(current_account_id, synced_uid_pairs)
+
+            # 全部保存后才记录文件夹状态，否则下次仍从上次的状态扫描
+            if saved == len(uids):
+                save_state(folder_name)
 
             # 分批暂停
             if len(uids) >= batch_size:
                 print(f"[Mail] 批次完成，暂停 {pause_seconds} 秒...")
                 time.sleep(pause_seconds)
+            return saved
+
+        results = pool.map(fetch_folder, uids_by_folder)
+        total_saved = sum(n for n in results if isinstance(n, int))
+
+        if is_sync_cancelled():
+            update_sync_progress(0, 100, "同步已取消")
+            return {"status": "cancelled", "message": "同步已取消", "new_count": total_saved}
 
         update_sync_progress(95, 100, "断开连接...")
-        imap_client.disconnect()
+        pool.close()
 
         update_sync_progress(100, 100, f"完成！新增 {total_saved} 封邮件")
+        if headers_first and total_saved:
+            start_body_download(current_account_id)
 
         return {
             "status": "completed",
@@ -1439,14 +1833,16 @@ def sync_new_emails(background_tasks=None) -> Dict[str, Any]:
         return {"status": "error", "message": str(e)}
 
     finally:
+        if pool:
+            pool.close()
         release_sync_lock()
 
 
-def sync_new_emails_async() -> Dict[str, Any]:
+def sync_new_emails_async(exclude_inbox: bool = False) -> Dict[str, Any]:
     """
     异步增量同步（启动后台线程）
     """
-    thread = threading.Thread(target=sync_new_emails)
+    thread = threading.Thread(target=sync_new_emails, kwargs={'exclude_inbox': exclude_inbox})
     thread.daemon = True
     thread.start()
     return {"status": "started"}
@@ -1459,7 +1855,8 @@ def refresh_emails(background_tasks=None) -> Dict[str, Any]:
     Returns:
         {"status": "completed", "new_count": int, "message": "..."}
     """
-    from Sills.db_mail import get_folder_last_uid, update_folder_last_uid, get_local_uids, batch_record_synced_uids
+    from Sills.db_mail import (get_folder_last_uid, update_folder_last_uid, get_local_uids, batch_record_synced_uids,
+                               save_folder_sync_state)
     from datetime import datetime
 
     # 重置取消标志
@@ -1471,6 +1868,7 @@ def refresh_emails(background_tasks=None) -> Dict[str, Any]:
     if not acquire_sync_lock(lock_id):
         return {"status": "already_running", "message": "同步任务正在进行中"}
 
+    pool = None
     try:
         config = get_mail_config()
         if not config or not config.get('imap_server'):
@@ -1486,8 +1884,8 @@ def refresh_emails(background_tasks=None) -> Dict[str, Any]:
 
         update_sync_progress(0, 100, "连接邮件服务器...")
 
-        imap_client = IMAPClient(config)
-        imap_client.connect()
+        pool = FolderSyncPool(config)
+        imap_client = pool.open()
 
         # 检测文件夹
         update_sync_progress(10, 100, "检测邮箱文件夹...")
@@ -1519,86 +1917,81 @@ def refresh_emails(background_tasks=None) -> Dict[str, Any]:
             last_uids[folder_name] = last_uid
             print(f"[Mail] {folder_label} last_uid = {last_uid}")
 
-        # 获取新邮件UID
+        # 获取新邮件UID（各文件夹并发扫描）
         update_sync_progress(20, 100, "扫描新邮件...")
-        all_uids_to_fetch = []  # [(folder_name, is_sent, is_draft, folder_label, local_folder_id, uid), ...]
-
-        for folder_name, is_sent, is_draft, folder_label, local_folder_id in folders_to_sync:
-            if is_sync_cancelled():
-                update_sync_progress(0, 100, "同步已取消")
-                imap_client.disconnect()
-                return {"status": "cancelled", "message": "同步已取消"}
-
-            try:
-                last_uid = last_uids.get(folder_name, 0)
-
-                # 使用日期范围过滤获取UID
-                if date_range[0] and date_range[1]:
-                    # 有日期范围设置，使用日期过滤
-                    folder_uids = imap_client.get_uid_list(
-                        folder=folder_name,
-                        date_range=date_range
-                    )
-                    # 如果有last_uid，过滤掉小于等于last_uid的UID（增量同步）
-                    if last_uid > 0:
-                        folder_uids = [uid for uid in folder_uids if uid > last_uid]
-                    new_uids = folder_uids
-                    print(f"[Mail] {folder_label}: 使用日期范围 {date_range[0]} 至 {date_range[1]}")
+        folder_states = {}  # 文件夹名 -> 本次 STATUS 结果，文件夹同步完成后保存
+
+        def save_state(folder_name):
+            if folder_states.get(folder_name):
+                save_folder_sync_state(current_account_id, folder_name, folder_states[folder_name])
+
+        def scan_folder(client, job):
+            folder_name, is_sent, is_draft, folder_label, local_folder_id = job
+            last_uid = last_uids.get(folder_name, 0)
+
+            # 使用日期范围过滤获取UID
+            if date_range[0] and date_range[1]:
+                # 有日期范围设置，使用日期过滤
+                folder_uids = client.get_uid_list(folder=folder_name, date_range=date_range)
+                # 如果有last_uid，过滤掉小于等于last_uid的UID（增量同步）
+                if last_uid > 0:
+                    folder_uids = [uid for uid in folder_uids if uid > last_uid]
+                new_uids = folder_uids
+                print(f"[Mail] {folder_label}: 使用日期范围 {date_range[0]} 至 {date_range[1]}")
+            else:
+                # 无日期范围设置，按上次的文件夹状态增量扫描，没有状态时使用UID增量方式
+                changes = scan_folder_changes(client, current_account_id, folder_name)
+                folder_states[folder_name] = changes['status']
+                if changes['new_uids'] is not None:
+                    new_uids = changes['new_uids']
                 else:
-                    # 无日期范围设置，使用UID增量方式
-                    new_uids = imap_client.get_uids_after(folder_name, last_uid)
+                    new_uids = client.get_uids_after(folder_name, get_folder_last_uid(current_account_id, folder_name))
 
-                # 过滤掉本地已存在的UID（防止重复）
-                local_uids = get_local_uids(folder_name, current_account_id)
-                new_uids = [uid for uid in new_uids if uid not in local_uids]
+            # 过滤掉本地已存在的UID（防止重复）
+            local_uids = get_local_uids(folder_name, current_account_id)
+            new_uids = [uid for uid in new_uids if uid not in local_uids]
 
-                print(f"[Mail] {folder_label}: 发现 {len(new_uids)} 封新邮件")
+            print(f"[Mail] {folder_label}: 发现 {len(new_uids)} 封新邮件")
+            if not new_uids:
+                save_state(folder_name)
+            return new_uids
 
-                for uid in new_uids:
-                    all_uids_to_fetch.append((folder_name, is_sent, is_draft, folder_label, local_folder_id, uid))
-
-            except Exception as e:
-                print(f"[Mail] 扫描 {folder_name} 失败: {e}")
+        scanned = pool.map(scan_folder, folders_to_sync)
+        if is_sync_cancelled():
+            update_sync_progress(0, 100, "同步已取消")
+            return {"status": "cancelled", "message": "同步已取消"}
 
-        grand_total = len(all_uids_to_fetch)
+        # (文件夹信息, 新UID列表)
+        uids_by_folder = [(job, uids) for job, uids in zip(folders_to_sync, scanned) if isinstance(uids, list) and uids]
+        grand_total = sum(len(uids) for _, uids in uids_by_folder)
 
         if grand_total == 0:
             update_sync_progress(100, 100, "完成！没有新邮件")
-            imap_client.disconnect()
-            release_sync_lock()
             return {"status": "completed", "new_count": 0, "message": "没有新邮件"}
 
         update_sync_progress(30, 100, f"发现 {grand_total} 封新邮件", total_emails=grand_total)
 
-        # 按文件夹分组获取邮件
+        # 按文件夹并发获取邮件（先同步邮件头时只取邮件头）
         import time
-        from collections import defaultdict
-        uids_by_folder = defaultdict(list)
-        for folder_name, is_sent, is_draft, folder_label, local_folder_id, uid in all_uids_to_fetch:
-            uids_by_folder[(folder_name, is_sent, is_draft, folder_label, local_folder_id)].append(uid)
-
-        processed_count = 0
-        folder_max_uids = {}  # 记录每个文件夹的最大UID
-
-        for (folder_name, is_sent, is_draft, folder_label, local_folder_id), uids in uids_by_folder.items():
-            if is_sync_cancelled():
-                update_sync_progress(0, 100, "同步已取消")
-                imap_client.disconnect()
-                return {"status": "cancelled", "message": "同步已取消"}
+        progress = SyncProgress(grand_total)
+        headers_first = uses_headers_first(config)
+        fetch = IMAPClient.fetch_headers_by_uid if headers_first else IMAPClient.fetch_emails_by_uid
 
+        def fetch_folder(client, item):
+            (folder_name, is_sent, is_draft, folder_label, local_folder_id), uids = item
             print(f"[Mail] 同步 {folder_label} 的 {len(uids)} 封邮件, is_sent={is_sent}, is_draft={is_draft}")
 
+            saved = 0
+            max_uid = 0  # 此文件夹已保存的最大UID
+
             # 批量获取邮件
             batch_size = 50
             for i in range(0, len(uids), batch_size):
                 # 检查取消标志
                 if is_sync_cancelled():
-                    update_sync_progress(0, 100, "同步已取消")
-                    imap_client.disconnect()
-                    return {"status": "cancelled", "message": "同步已取消"}
+                    break
 
-                batch_uids = uids[i:i + batch_size]
-                emails = imap_client.fetch_emails_by_uid(folder_name, batch_uids)
+                emails = fetch(client, folder_name, uids[i:i + batch_size])
 
                 for email_data in emails:
                     email_data['is_sent'] = is_sent
@@ -1609,33 +2002,39 @@ def refresh_emails(background_tasks=None) -> Dict[str, Any]:
                     if local_folder_id:
                         email_data['folder_id'] = local_folder_id
 
-                    # 调试日志
-                    if total_saved < 3:
-                        print(f"[DEBUG] Saving email: folder={folder_name}, is_sent={is_sent}, is_draft={is_draft}, label={folder_label}, subject={email_data.get('subject', 'N/A')[:30]}")
-
-                    save_email(email_data)
-                    total_saved += 1
-                    processed_count += 1
+                    with _save_lock:
+                        save_email(email_data)
+                    saved += 1
 
                     # 记录最大UID
                     uid = email_data.get('imap_uid')
-                    if uid:
-                        if folder_name not in folder_max_uids or uid > folder_max_uids[folder_name]:
-                            folder_max_uids[folder_name] = uid
+                    if uid and uid > max_uid:
+                        max_uid = uid
 
                 # 更新进度
-                percent = int(30 + (processed_count / grand_total) * 65)
-                update_sync_progress(percent, 100, f"同步中 {processed_count}/{grand_total}", synced_emails=processed_count)
+                progress.advance(len(emails), folder_label)
 
                 time.sleep(0.1)  # 短暂暂停
 
             # 更新文件夹的最后同步UID
-            if folder_name in folder_max_uids:
-                update_folder_last_uid(current_account_id, folder_name, folder_max_uids[folder_name])
-                print(f"[Mail] 更新 {folder_label} last_uid = {folder_max_uids[folder_name]}")
+            if max_uid:
+                update_folder_last_uid(current_account_id, folder_name, max_uid)
+                print(f"[Mail] 更新 {folder_label} last_uid = {max_uid}")
+            if saved == len(uids):
+                save_state(folder_name)
+            return saved
+
+        results = pool.map(fetch_folder, uids_by_folder)
+        total_saved = sum(n for n in results if isinstance(n, int))
 
-        imap_client.disconnect()
+        if is_sync_cancelled():
+            update_sync_progress(0, 100, "同步已取消")
+            return {"status": "cancelled", "message": "同步已取消"}
+
+        pool.close()
         update_sync_progress(100, 100, f"完成！新增 {total_saved} 封邮件")
+        if headers_first and total_saved:
+            start_body_download(current_account_id)
 
         return {
             "status": "completed",
@@ -1650,6 +2049,8 @@ def refresh_emails(background_tasks=None) -> Dict[str, Any]:
         return {"status": "error", "message": str(e)}
 
     finally:
+        if pool:
+            pool.close()
         release_sync_lock()
 
 
@@ -1663,6 +2064,165 @@ def refresh_emails_async() -> Dict[str, Any]:
     return {"status": "started"}
 
 
+def fetch_inbox_updates(client: 'IMAPClient', config: Dict[str, Any]) -> int:
+    """
+    只同步收件箱的新邮件（IDLE 收到推送后调用，复用推送所在的连接）
+
+    按文件夹同步状态找出新UID（没有状态时按 last_uid 增量），不列文件夹、不扫描其他文件夹。
+
+    Returns:
+        新保存的邮件数
+    """
+    from Sills.db_mail import (get_folder_last_uid, update_folder_last_uid, get_local_uids,
+                               batch_record_synced_uids, save_folder_sync_state)
+
+    account_id = config.get('id')
+    changes = scan_folder_changes(client, account_id, 'INBOX')
+    if changes['new_uids'] is not None:
+        new_uids = changes['new_uids']
+    else:
+        new_uids = client.get_uids_after('INBOX', get_folder_last_uid(account_id, 'INBOX'))
+    local_uids = get_local_uids('INBOX', account_id)
+    new_uids = sorted(uid for uid in set(new_uids) if uid not in local_uids)
+
+    headers_first = uses_headers_first(config)
+    fetch = IMAPClient.fetch_headers_by_uid if headers_first else IMAPClient.fetch_emails_by_uid
+    emails = fetch(client, 'INBOX', new_uids) if new_uids else []
+    for email_data in emails:
+        email_data.update({'is_sent': 0, 'is_draft': 0, 'folder_label': '收件箱',
+                           'imap_folder': 'INBOX', 'account_id': account_id})
+        with _save_lock:
+            save_email(email_data)
+
+    saved_uids = [e['imap_uid'] for e in emails if e.get('imap_uid')]
+    if saved_uids:
+        with _save_lock:
+            batch_record_synced_uids(account_id, [(uid, 'INBOX') for uid in saved_uids])
+        update_folder_last_uid(account_id, 'INBOX', max(saved_uids))
+    if changes['status'] and len(emails) == len(new_uids):
+        save_folder_sync_state(account_id, 'INBOX', changes['status'])
+
+    if emails:
+        print(f"[Mail] 收件箱推送：新增 {len(emails)} 封邮件")
+        if headers_first:
+            start_body_download(account_id)
+    return len(emails)
+
+
+def uses_headers_first(config: Dict[str, Any]) -> bool:
+    """账户是否先同步邮件头、正文稍后下载（mail_config.sync_headers_first，默认开启）"""
+    return config.get('sync_headers_first') != 0
+
+
+# 后台补全正文每批邮件数
+BODY_DOWNLOAD_BATCH = 50
+
+_body_download_lock = threading.Lock()
+
+
+def download_pending_bodies(account_id: int = None, limit: int = None) -> int:
+    """
+    补全正文：下载 body_state='pending' 的邮件正文（新邮件优先）
+
+    同一时间只运行一个下载任务；FETCH 成功但响应中没有该UID（服务器上已删除）的邮件标记为 missing，不再重试。
+    选择文件夹或 FETCH 失败时本次中止，邮件保持 pending 下次重试；解析失败的邮件本次跳过
+
+    Args:
+        account_id: 账户ID（默认当前账户）
+        limit: 最多补全数量（默认全部）
+
+    Returns:
+        本次处理的邮件数
+    """
+    if not _body_download_lock.acquire(blocking=False):
+        return 0
+
+    done = 0
+    skipped = set()  # 解析失败的邮件ID，本次不再重试
+    try:
+        config = get_mail_account_by_id(account_id) if account_id else get_mail_config()
+        if not config or not config.get('imap_server'):
+            return 0
+        account_id = config.get('id')
+
+        imap_client = IMAPClient(config)
+        imap_client.connect()
+        try:
+            while limit is None or done < limit:
+                rows = get_pending_body_mails(account_id, BODY_DOWNLOAD_BATCH + len(skipped))
+                rows = [row for row in rows if row['id'] not in skipped][:BODY_DOWNLOAD_BATCH]
+                if not rows:
+                    break
+
+                by_folder = {}
+                for row in rows:
+                    by_folder.setdefault(row['imap_folder'], []).append(row)
+
+                for folder_name, items in by_folder.items():
+                    bodies = imap_client.fetch_bodies_by_uid(folder_name, [int(r['imap_uid']) for r in items])
+                    for row in items:
+                        uid = int(row['imap_uid'])
+                        if uid not in bodies:
+                            update_mail_body(row['id'], None, None, body_state='missing')
+                        elif bodies[uid]:
+                            update_mail_body(row['id'], bodies[uid]['content'], bodies[uid]['html_content'])
+                        else:
+                            print(f"[Mail] 邮件 {row['id']} 正文解析失败，稍后重试")
+                            skipped.add(row['id'])
+                            continue
+                        done += 1
+        finally:
+            imap_client.disconnect()
+
+        print(f"[Mail] 已补全 {done} 封邮件正文")
+        return done
+
+    except Exception as e:
+        print(f"[Mail] 补全邮件正文失败: {e}")
+        return done
+
+    finally:
+        _body_download_lock.release()
+
+
+def start_body_download(account_id: int = None) -> Dict[str, Any]:
+    """
+    后台补全正文（启动后台线程）
+    """
+    thread = threading.Thread(target=download_pending_bodies, args=(account_id,))
+    thread.daemon = True
+    thread.start()
+    return {"status": "started"}
+
+
+def ensure_mail_body(mail: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    打开邮件时正文尚未下载则立即下载
+
+    下载失败时返回原数据（正文为空），由后台任务稍后重试
+    """
+    if not mail or mail.get('body_state') != 'pending' or not mail.get('imap_uid'):
+        return mail
+
+    uid = int(mail['imap_uid'])
+    config = get_mail_account_by_id(mail['account_id']) if mail.get('account_id') else get_mail_config()
+    try:
+        imap_client = IMAPClient(config)
+        imap_client.connect()
+        try:
+            body = imap_client.fetch_bodies_by_uid(mail['imap_folder'], [uid]).get(uid)
+        finally:
+            imap_client.disconnect()
+    except Exception as e:
+        print(f"[Mail] 下载邮件 {mail.get('id')} 正文失败: {e}")
+        return mail
+
+    if body:
+        update_mail_body(mail['id'], body['content'], body['html_content'])
+        mail.update(content=body['content'], html_content=body['html_content'], body_state='full')
+    return mail
+
+
 def send_email_now(to: str, subject: str, body: str,
                    html_body: str = None, cc: str = None) -> Dict[str, Any]:
     """
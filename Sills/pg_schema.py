@@ -410,6 +410,15 @@ CREATE INDEX IF NOT EXISTS idx_mail_filter_priority ON mail_filter_rule(priority
 CREATE INDEX IF NOT EXISTS idx_mail_folder_id ON uni_mail(folder_id);
 CREATE INDEX IF NOT EXISTS idx_mail_type ON uni_mail(mail_type);
 
+-- 游标分页复合索引 (created_at DESC, 主键 DESC)
+CREATE INDEX IF NOT EXISTS idx_cli_created_id ON uni_cli(created_at DESC, cli_id DESC);
+CREATE INDEX IF NOT EXISTS idx_vendor_created_id ON uni_vendor(created_at DESC, vendor_id DESC);
+CREATE INDEX IF NOT EXISTS idx_quote_created_id ON uni_quote(created_at DESC, quote_id DESC);
+CREATE INDEX IF NOT EXISTS idx_offer_created_id ON uni_offer(created_at DESC, offer_id DESC);
+CREATE INDEX IF NOT EXISTS idx_order_created_id ON uni_order(created_at DESC, order_id DESC);
+CREATE INDEX IF NOT EXISTS idx_buy_created_id ON uni_buy(created_at DESC, buy_id DESC);
+CREATE INDEX IF NOT EXISTS idx_mail_account_received_id ON uni_mail(account_id, is_sent, received_at DESC, id DESC);
+
 -- 联系人表（营销模块）
 CREATE TABLE IF NOT EXISTS uni_contact (
     contact_id TEXT PRIMARY KEY,
@@ -457,6 +466,7 @@ CREATE INDEX IF NOT EXISTS idx_contact_domain ON uni_contact(domain);
 CREATE INDEX IF NOT EXISTS idx_contact_email ON uni_contact(email);
 CREATE INDEX IF NOT EXISTS idx_contact_country ON uni_contact(country);
 CREATE INDEX IF NOT EXISTS idx_contact_bounced ON uni_contact(is_bounced);
+CREATE INDEX IF NOT EXISTS idx_contact_created_id ON uni_contact(created_at DESC, contact_id DESC);
 
 -- 营销邮件索引
 CREATE INDEX IF NOT EXISTS idx_marketing_contact ON uni_marketing_email(contact_id);
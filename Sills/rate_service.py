@@ -0,0 +1,116 @@
+"""
+汇率服务
+原先 base.get_cached_rate 是只会返回“最新汇率”的 lru_cache，修改汇率后要到下次 init_db 才失效，
+导出和单据也无法按订单/报价日期的汇率计价。
+
+- 首次使用时把 uni_daily 整张表按币种载入内存（日期升序的时间序列）
+- Sills.db_daily 写入后调用 invalidate_rates()；其他途径写 uni_daily 时按表写版本失效，
+  另有 RATE_CACHE_TTL 兜底（多 worker 时其他进程的修改）
+- rate_as_of(币种, 日期) 二分查找该日期当天或之前最近一条汇率
+"""
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime
+
+from Sills.base import get_db_connection, get_db_path, get_table_versions
+
+# 币种代码（uni_daily.currency_code）
+CURRENCY_USD = 1
+CURRENCY_KRW = 2
+
+# 没有汇率记录时的默认值（与原 get_cached_rate 一致）
+DEFAULT_RATES = {CURRENCY_USD: 7.0, CURRENCY_KRW: 180.0}
+
+RATE_CACHE_TTL = 300  # 秒
+
+_lock = threading.Lock()
+_series = None          # {currency_code: (dates, rates)}
+_series_key = None      # (数据库路径, uni_daily 写版本, 失效次数)
+_loaded_at = 0.0
+_generation = 0
+
+
+def _date_key(value):
+    """把日期统一成 YYYY-MM-DD（兼容 2026-1-5、带时间的字符串、date/datetime）"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    parts = str(value).strip()[:10].split('-')
+    if len(parts) != 3:
+        return None
+    try:
+        return f"{int(parts[0]):04d}-{int(parts[1]):02d}-{int(parts[2][:2]):02d}"
+    except ValueError:
+        return None
+
+
+def _load():
+    series = {}
+    with get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT currency_code, record_date, exchange_rate FROM uni_daily "
+            "ORDER BY currency_code, record_date, id").fetchall()
+    for currency, record_date, rate in rows:
+        key = _date_key(record_date)
+        if key is None or rate is None:
+            continue
+        dates, rates = series.setdefault(int(currency), ([], []))
+        if dates and dates[-1] == key:
+            rates[-1] = float(rate)  # 同一天多条取最后一条
+        elif dates and key < dates[-1]:
+            # 补零后顺序可能变化（2026-1-5 与 2026-01-10），插入到正确位置
+            idx = bisect_right(dates, key)
+            dates.insert(idx, key)
+            rates.insert(idx, float(rate))
+        else:
+            dates.append(key)
+            rates.append(float(rate))
+    return series
+
+
+def _get_series():
+    global _series, _series_key, _loaded_at
+    now = time.monotonic()
+    with _lock:
+        # 载入前取键：载入期间有写入时键已变化，下次查询会重新载入
+        key = (get_db_path(), get_table_versions(('uni_daily',)), _generation)
+        if _series is not None and _series_key == key and now - _loaded_at < RATE_CACHE_TTL:
+            return _series
+    series = _load()
+    with _lock:
+        _series, _series_key, _loaded_at = series, key, now
+    return series
+
+
+def invalidate_rates():
+    """汇率表被修改后调用，下次查询重新载入"""
+    global _series, _generation
+    with _lock:
+        _series = None
+        _generation += 1
+
+
+def rate_as_of(currency_code, as_of=None):
+    """
+    返回 as_of 当天或之前最近的汇率；as_of 为空时返回最新汇率
+    早于第一条记录的日期使用最早的汇率，没有任何记录时返回默认值
+    """
+    try:
+        dates, rates = _get_series().get(int(currency_code), ((), ()))
+    except Exception as e:
+        print(f"[汇率] 读取失败，使用默认值: {e}")
+        dates, rates = (), ()
+    if not rates:
+        return DEFAULT_RATES.get(int(currency_code), 1.0)
+    key = _date_key(as_of)
+    if key is None:
+        return rates[-1]
+    idx = bisect_right(dates, key)
+    return rates[idx - 1] if idx else rates[0]
+
+
+def rates_as_of(as_of=None):
+    """返回 (KRW 汇率, USD 汇率)，与 get_exchange_rates() 顺序一致"""
+    return rate_as_of(CURRENCY_KRW, as_of), rate_as_of(CURRENCY_USD, as_of)
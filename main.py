@@ -39,6 +39,14 @@ from Sills.db_mail import (
     auto_classify_emails, classify_mails
 )
 from Sills.mail_service import sync_inbox, sync_inbox_async, send_email_now
+from Sills.mail_idle import start_idle_watchers, stop_idle_watchers, get_idle_status
+from Sills.mail_blob import blob_dir, get_blob, is_inline_image, migrate_mail_blobs
+from Sills.db_async import run_db, run_db_bulk, shutdown_db_executors, bulk_pool
+from Sills.db_mpn import normalize_mpn, lookup_mpn, backfill_mpn_norm
+from Sills.db_sequence import next_id, sync_sequences
+from Sills.db_sales_cube import query_sales_cube
+from Sills.db_reprice import reprice
+from Sills.db_export import stream_export
 from Sills.ai_service import intent_recognizer, smart_replier
 from Sills.db_config import is_postgresql, is_sqlite, get_pg_config, get_sqlite_path
 from utils.price_engine import PriceEngine
@@ -90,9 +98,19 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # Startup
     init_db()
+    # 历史数据的规范型号在后台回填，不阻塞启动
+    bulk_pool.submit(backfill_mpn_norm)
+    # 编号序列与表中最大编号对齐（修正直接写入编号的记录）
+    bulk_pool.submit(sync_sequences)
+    # 旧邮件的内嵌图片和超大正文转存到 blob 目录（完成后不再执行）
+    bulk_pool.submit(migrate_mail_blobs)
     start_auto_backup()
+    # 收件箱 IDLE 推送监听（每个账户一个后台线程）
+    bulk_pool.submit(start_idle_watchers)
     yield
-    # Shutdown (如果需要清理资源，可以在这里添加)
+    # Shutdown
+    stop_idle_watchers()
+    shutdown_db_executors()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -209,6 +227,11 @@ def do_backup():
         static_dst = os.path.join(backup_dir, "static")
         shutil.copytree(static_src, static_dst, dirs_exist_ok=True)
 
+    # 邮件图片和超大正文存在 blob 目录，数据库中只有 hash
+    blob_src = blob_dir()
+    if os.path.exists(blob_src):
+        shutil.copytree(blob_src, os.path.join(backup_dir, "mail_blobs"), dirs_exist_ok=True)
+
     return backup_count, backup_dir
 
 def cleanup_old_backups(backup_root, days=3):
@@ -249,6 +272,14 @@ def auto_backup_task():
                 print(f"[自动备份] 已清理 {deleted} 个过期备份")
         except Exception as e:
             print(f"[自动备份] 失败: {str(e)}")
+        try:
+            # 顺便刷新统计信息，保持列表估算总数准确
+            from Sills.base import refresh_table_stats
+            refresh_table_stats()
+            # 补上未经业务函数写入的记录（导入脚本等）的规范型号
+            backfill_mpn_norm()
+        except Exception as e:
+            print(f"[自动备份] 刷新统计信息失败: {str(e)}")
         # 每30分钟执行一次
         threading.Event().wait(1800)
 
@@ -287,16 +318,24 @@ async def login_required(request: Request, current_user: dict = Depends(get_curr
         raise HTTPException(status_code=303, headers={"Location": "/login"})
     return current_user
 
+def _dashboard_counts():
+    with get_db_connection() as conn:
+        cli_count = conn.execute("SELECT COUNT(*) FROM uni_cli").fetchone()[0]
+        emp_count = conn.execute("SELECT COUNT(*) FROM uni_emp").fetchone()[0]
+    return cli_count, emp_count
+
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request, current_user: dict = Depends(get_current_user)):
     if not current_user:
         return RedirectResponse(url="/login", status_code=303)
         
-    with get_db_connection() as conn:
-        cli_count = conn.execute("SELECT COUNT(*) FROM uni_cli").fetchone()[0]
-        emp_count = conn.execute("SELECT COUNT(*) FROM uni_emp").fetchone()[0]
-        order_sum = conn.execute("SELECT COALESCE(SUM(paid_amount), 0) FROM uni_order").fetchone()[0]
-        
+    cli_count, emp_count = await run_db(_dashboard_counts)
+    # 本月销售额、毛利取自销售汇总表，不再扫描 uni_order
+    # 非管理员只统计自己的订单（与 /api/report/sales 一致）
+    own_emp_id = current_user['emp_id'] if current_user['rule'] not in ['3', '0'] else ""
+    month_total = (await run_db(query_sales_cube, start_date=datetime.now().strftime("%Y-%m-01"), group_by="",
+                                emp_id=own_emp_id))["total"]
+
     return templates.TemplateResponse("dashboard.html", {
         "request": request, 
         "active_page": "dashboard",
@@ -304,7 +343,8 @@ async def index(request: Request, current_user: dict = Depends(get_current_user)
         "stats": {
             "cli_count": cli_count,
             "emp_count": emp_count,
-            "order_sum": order_sum
+            "order_sum": month_total["revenue_rmb"],
+            "profit_sum": month_total["profit_rmb"]
         }
     })
 
@@ -553,10 +593,10 @@ async def cli_page(request: Request, page: int = 1, page_size: int = 20, search:
     # 限制每页最多100条
     page_size = min(max(1, page_size), 100)
     search_kwargs = {"cli_name": search} if search else None
-    result = get_paginated_list("uni_cli", page=page, page_size=page_size, search_kwargs=search_kwargs)
+    result = await run_db(get_paginated_list, "uni_cli", page=page, page_size=page_size, search_kwargs=search_kwargs)
 
     # Needs employees for dropdown
-    employees, _ = get_emp_list(page=1, page_size=1000)
+    employees, _ = await run_db(get_emp_list, page=1, page_size=1000)
 
     return templates.TemplateResponse("cli.html", {
         "request": request, "active_page": "cli", "current_user": current_user,
@@ -726,12 +766,65 @@ async def cli_list_api(current_user: dict = Depends(get_current_user)):
     return {"success": True, "items": items, "total": total}
 
 @app.get("/api/order/list")
-async def order_list_api(current_user: dict = Depends(get_current_user)):
-    """获取订单列表API（用于邮件关联选择器）"""
+async def order_list_api(page_size: int = 1000, search: str = "", after: str = None, current_user: dict = Depends(get_current_user)):
+    """获取订单列表API（用于邮件关联选择器）；传 after 使用游标分页"""
     if not current_user:
         return {"success": False, "message": "未登录", "items": []}
-    items, total = get_order_list(page=1, page_size=1000)
-    return {"success": True, "items": items, "total": total}
+    return await _keyset_list_response(get_order_list, page_size, after, search_kw=search)
+
+
+@app.get("/api/quote/list")
+async def quote_list_api(page_size: int = 50, search: str = "", cli_id: str = "", after: str = "", current_user: dict = Depends(login_required)):
+    """询价列表API（游标分页，after 为上一页返回的 next_cursor）"""
+    return await _keyset_list_response(get_quote_list, page_size, after, search_kw=search, cli_id=cli_id)
+
+
+@app.get("/api/offer/list")
+async def offer_list_api(page_size: int = 50, search: str = "", cli_id: str = "", after: str = "", current_user: dict = Depends(login_required)):
+    """报价列表API（游标分页，after 为上一页返回的 next_cursor）"""
+    return await _keyset_list_response(get_offer_list, page_size, after, search_kw=search, cli_id=cli_id)
+
+
+@app.get("/api/buy/list")
+async def buy_list_api(page_size: int = 50, search: str = "", order_id: str = "", after: str = "", current_user: dict = Depends(login_required)):
+    """采购列表API（游标分页，after 为上一页返回的 next_cursor）"""
+    return await _keyset_list_response(get_buy_list, page_size, after, search_kw=search, order_id=order_id)
+
+
+async def _keyset_list_response(list_func, page_size, after, **filters):
+    """调用 Sills 列表函数；after 为 None 时返回第一页和总数，否则返回游标分页结果"""
+    page_size = max(1, min(1000, page_size))
+    try:
+        items, extra = await run_db(list_func, page=1, page_size=page_size, after=after, **filters)
+    except ValueError as e:
+        return {"success": False, "message": str(e), "items": []}
+    if after is None:
+        return {"success": True, "items": items, "total": extra}
+    return {"success": True, "items": items, "next_cursor": extra}
+
+
+@app.get("/api/mpn/lookup")
+async def mpn_lookup_api(mpn: str, limit: int = 50, current_user: dict = Depends(login_required)):
+    """按规范型号精确查找历史询价/报价/销售订单/采购记录（LM317T、lm317-t、LM317 T/NOPB 视为同一型号）"""
+    if not normalize_mpn(mpn):
+        return {"success": False, "message": "型号不能为空"}
+    result = await run_db(lookup_mpn, mpn, max(1, min(500, limit)))
+    return {"success": True, **result}
+
+@app.get("/api/report/sales")
+async def sales_report_api(start_date: str = "", end_date: str = "", group_by: str = "month",
+                           cli_id: str = "", emp_id: str = "", current_user: dict = Depends(login_required)):
+    """
+    销售/毛利报表（读取销售汇总表 uni_sales_cube）
+    group_by: 逗号分隔的 day, month, year, cli, emp；非管理员只能查看自己的数据
+    """
+    if current_user['rule'] not in ['3', '0']:
+        emp_id = current_user['emp_id']
+    try:
+        result = await run_db(query_sales_cube, start_date, end_date, group_by, cli_id, emp_id)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    return {"success": True, **result}
 
 # ---------------- Quote Module ----------------
 @app.get("/api/price/query")
@@ -782,9 +875,9 @@ async def quote_page(request: Request, current_user: dict = Depends(login_requir
         session["quote_status"] = status
         session["quote_is_transferred"] = is_transferred
 
-    results, total = get_quote_list(page=page, page_size=page_size, search_kw=search, start_date=start_date, end_date=end_date, cli_id=cli_id, status=status, is_transferred=is_transferred)
+    results, total = await run_db(get_quote_list, page=page, page_size=page_size, search_kw=search, start_date=start_date, end_date=end_date, cli_id=cli_id, status=status, is_transferred=is_transferred)
     total_pages = (total + page_size - 1) // page_size
-    cli_list, _ = get_cli_list(page=1, page_size=1000)
+    cli_list, _ = await run_db(get_cli_list, page=1, page_size=1000)
     cli_list = sorted(cli_list, key=lambda x: x.get('cli_name', ''))
     return templates.TemplateResponse("quote.html", {
         "request": request,
@@ -820,7 +913,7 @@ async def quote_add(request: Request, current_user: dict = Depends(login_require
 async def quote_import_text(batch_text: str = Form(...), current_user: dict = Depends(login_required)):
     if current_user['rule'] not in ['3', '0']:
         return RedirectResponse(url="/quote", status_code=303)
-    success_count, errors = batch_import_quote_text(batch_text)
+    success_count, errors = await run_db_bulk(batch_import_quote_text, batch_text)
     err_msg = ""
     if errors:
         import urllib.parse
@@ -938,7 +1031,7 @@ async def quote_import_csv(csv_file: UploadFile = File(...), current_user: dict
         rows_data = list(reader)
 
     # 调用导入函数
-    success_count, errors = batch_import_quote_from_rows(rows_data)
+    success_count, errors = await run_db_bulk(batch_import_quote_from_rows, rows_data)
     err_msg = ""
     if errors:
         import urllib.parse
@@ -1100,12 +1193,12 @@ async def offer_page(request: Request, current_user: dict = Depends(login_requir
     # is_transferred 空字符串表示"全部"，直接传递给查询层处理
     # 首次访问时 session 默认为"未转"，用户选择"全部"后 session 保存空字符串
     query_is_transferred = is_transferred
-    results, total = get_offer_list(page=page, page_size=page_size, search_kw=search, start_date=start_date, end_date=end_date, cli_id=cli_id, is_transferred=query_is_transferred)
+    results, total = await run_db(get_offer_list, page=page, page_size=page_size, search_kw=search, start_date=start_date, end_date=end_date, cli_id=cli_id, is_transferred=query_is_transferred)
     total_pages = (total + page_size - 1) // page_size
     from Sills.base import get_paginated_list
-    vendor_data = get_paginated_list('uni_vendor', page=1, page_size=1000)
+    vendor_data = await run_db(get_paginated_list, 'uni_vendor', page=1, page_size=1000)
     vendor_list = vendor_data['items']
-    cli_data = get_paginated_list('uni_cli', page=1, page_size=1000)
+    cli_data = await run_db(get_paginated_list, 'uni_cli', page=1, page_size=1000)
     cli_list = sorted(cli_data['items'], key=lambda x: x.get('cli_name', ''))
     return templates.TemplateResponse("offer.html", {
         "request": request,
@@ -1160,7 +1253,7 @@ async def offer_add_route(request: Request, current_user: dict = Depends(login_r
 async def offer_import_text(batch_text: str = Form(...), current_user: dict = Depends(login_required)):
     if current_user['rule'] not in ['3', '0']:
         return RedirectResponse(url="/offer", status_code=303)
-    success_count, errors = batch_import_offer_text(batch_text, current_user['emp_id'])
+    success_count, errors = await run_db_bulk(batch_import_offer_text, batch_text, current_user['emp_id'])
     err_msg = ""
     if errors:
         import urllib.parse
@@ -1178,7 +1271,7 @@ async def offer_import_csv(csv_file: UploadFile = File(...), current_user: dict
         text = content.decode('gbk', errors='replace').strip()
         
     # Pass full text to sill
-    success_count, errors = batch_import_offer_text(text, current_user['emp_id'])
+    success_count, errors = await run_db_bulk(batch_import_offer_text, text, current_user['emp_id'])
     err_msg = ""
     if errors:
         import urllib.parse
@@ -1254,6 +1347,20 @@ async def get_server_memory_api():
     except Exception as e:
         return {"success": False, "message": str(e)}
 
+@app.get("/api/server/db_pool")
+async def get_db_pool_api():
+    """获取数据库连接池状态（使用中、等待中、已创建、已回收）、SQL 翻译缓存、行数缓存、主数据缓存命中率及启动耗时"""
+    from Sills.base import get_pool_stats, get_sql_cache_stats, get_count_cache_stats
+    from Sills.db_async import get_db_executor_stats
+    from Sills.db_migrations import get_startup_stats
+    from Sills.entity_cache import get_entity_cache_stats
+    result = {"success": True, "pool": get_pool_stats(), "executors": get_db_executor_stats(),
+              "count_cache": get_count_cache_stats(), "entity_cache": get_entity_cache_stats(),
+              "startup": get_startup_stats()}
+    if is_postgresql():
+        result["sql_cache"] = get_sql_cache_stats()
+    return result
+
 @app.post("/api/offer/update")
 async def offer_update_api(offer_id: str = Form(...), field: str = Form(...), value: str = Form(...), current_user: dict = Depends(login_required)):
     if current_user['rule'] not in ['3', '0']:
@@ -1294,7 +1401,7 @@ async def offer_batch_delete_api(request: Request, current_user: dict = Depends(
 
 @app.post("/api/offer/batch_price_increase")
 async def offer_batch_price_increase_api(request: Request, current_user: dict = Depends(login_required)):
-    """按比例加价：新报价RMB = 成本价 × (1 + 比例%)，同时更新KWR和USD"""
+    """按比例加价：新报价RMB = 成本价 × (1 + 比例%)，同时按最新汇率更新KWR和USD"""
     if current_user['rule'] != '3' and current_user['rule'] != '0':
         return {"success": False, "message": "无权限执行此操作"}
 
@@ -1305,40 +1412,38 @@ async def offer_batch_price_increase_api(request: Request, current_user: dict =
     if not ids:
         return {"success": False, "message": "未选择任何记录"}
 
-    from Sills.base import get_db_connection
-
-    updated_count = 0
-    with get_db_connection() as conn:
-        # 获取最新汇率
-        try:
-            krw_row = conn.execute("SELECT exchange_rate FROM uni_daily WHERE currency_code=2 ORDER BY record_date DESC LIMIT 1").fetchone()
-            usd_row = conn.execute("SELECT exchange_rate FROM uni_daily WHERE currency_code=1 ORDER BY record_date DESC LIMIT 1").fetchone()
-            krw_rate = float(krw_row[0]) if krw_row else 180.0
-            usd_rate = float(usd_row[0]) if usd_row else 7.0
-        except:
-            krw_rate = 180.0
-            usd_rate = 7.0
-
-        # 批量更新：新报价RMB = 成本价 × (1 + ratio/100)
-        for offer_id in ids:
-            # 获取当前记录的成本价
-            row = conn.execute("SELECT cost_price_rmb FROM uni_offer WHERE offer_id=?", (offer_id,)).fetchone()
-            if row and row[0]:
-                cost_price = float(row[0])
-                new_offer_rmb = cost_price * (1 + ratio / 100)
-                new_price_kwr = round(new_offer_rmb * krw_rate, 1)  # KWR保留1位小数
-                new_price_usd = round(new_offer_rmb * usd_rate, 3)  # USD保留3位小数
-
-                conn.execute("""
-                    UPDATE uni_offer
-                    SET offer_price_rmb=?, price_kwr=?, price_usd=?
-                    WHERE offer_id=?
-                """, (new_offer_rmb, new_price_kwr, new_price_usd, offer_id))
-                updated_count += 1
+    result = await run_db_bulk(reprice, 'offer', ids=ids, margin_pct=float(ratio), dry_run=False)
+    updated_count = result["changed"]
+    return {"success": True, "updated_count": updated_count, "message": f"成功更新 {updated_count} 条报价"}
 
-        conn.commit()
+@app.post("/api/reprice")
+async def reprice_api(request: Request, current_user: dict = Depends(login_required)):
+    """
+    按汇率批量重算报价/销售订单价格
+    JSON: table(offer/order), ids, start_date, end_date, cli_id, is_transferred, margin_pct, as_of, dry_run(默认 true)
+    """
+    if current_user['rule'] not in ['3', '0']:
+        return {"success": False, "message": "无权限执行此操作"}
 
-    return {"success": True, "updated_count": updated_count, "message": f"成功更新 {updated_count} 条报价"}
+    data = await request.json()
+    margin_pct = data.get("margin_pct")
+    try:
+        result = await run_db_bulk(
+            reprice,
+            data.get("table", "offer"),
+            ids=data.get("ids") or None,
+            start_date=data.get("start_date", ""),
+            end_date=data.get("end_date", ""),
+            cli_id=data.get("cli_id", ""),
+            is_transferred=data.get("is_transferred", ""),
+            margin_pct=float(margin_pct) if margin_pct not in (None, "") else None,
+            as_of=data.get("as_of") or None,
+            dry_run=data.get("dry_run", True) is not False,
+        )
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    action = "将更新" if result["dry_run"] else "已更新"
+    return {"success": True, "message": f"{action} {result['changed']} 条记录", **result}
 
 @app.post("/api/offer/batch_send_email")
 async def offer_batch_send_email_api(request: Request, current_user: dict = Depends(login_required)):
@@ -1352,10 +1457,7 @@ async def offer_batch_send_email_api(request: Request, current_user: dict = Depe
     placeholders = ','.join(['?'] * len(ids))
     with get_db_connection() as conn:
         # Get KRW rate for calculation
-        try:
-            rate_row = conn.execute("SELECT exchange_rate FROM uni_daily WHERE currency_code=2 ORDER BY record_date DESC LIMIT 1").fetchone()
-            krw_rate = float(rate_row[0]) if rate_row else 180.0
-        except: krw_rate = 180.0
+        krw_rate, _ = get_exchange_rates()
 
         query = f"""
             SELECT o.*, v.vendor_name, c.cli_name
@@ -1459,6 +1561,23 @@ Remark: {r['remark']}
     except Exception as e:
         return {"success": False, "message": f"邮件发送失败: {str(e)}"}
 
+def _export_response(table, fmt, filters):
+    """按列表页筛选条件流式导出（见 Sills/db_export.py）"""
+    from fastapi.responses import StreamingResponse
+    try:
+        chunks, media_type = stream_export(table, fmt, **filters)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    filename = f"{table}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+@app.get("/api/offer/export")
+async def offer_export(format: str = "csv", search: str = "", start_date: str = "", end_date: str = "", cli_id: str = "",
+                       is_transferred: str = "", status: str = "", current_user: dict = Depends(login_required)):
+    return _export_response('offer', format, dict(search_kw=search, start_date=start_date, end_date=end_date,
+                                                  cli_id=cli_id, is_transferred=is_transferred, status=status))
+
 @app.post("/api/offer/export_csv")
 async def offer_export_csv(request: Request, current_user: dict = Depends(login_required)):
     data = await request.json()
@@ -1480,9 +1599,6 @@ async def offer_export_csv(request: Request, current_user: dict = Depends(login_
         """
         rows = conn.execute(query, ids).fetchall()
 
-    # 获取汇率
-    krw_rate, usd_rate = get_exchange_rates()
-
     # CSV 头部 - 与页面展示一致
     headers = ['日期', '报价编号', '客户名称', '需求编号', '询价型号', '报价型号', '需求品牌', '报价品牌',
                '需求数量(pcs)', '报价数量(pcs)', '成本价', '报价(RMB)', '报价(KWR)', '报价(USD)',
@@ -1493,7 +1609,8 @@ async def offer_export_csv(request: Request, current_user: dict = Depends(login_
     for row_data in rows:
         r = dict(row_data)
 
-        # 计算价格
+        # 计算价格（按报价日期的汇率）
+        krw_rate, usd_rate = get_exchange_rates(r.get('offer_date'))
         offer_price_rmb = float(r.get('offer_price_rmb') or 0)
         cost_price_rmb = float(r.get('cost_price_rmb') or 0)
         quoted_qty = int(r.get('quoted_qty') or 0)
@@ -1632,13 +1749,13 @@ async def offer_generate_koquote(request: Request, current_user: dict = Depends(
 async def order_page(request: Request, current_user: dict = Depends(login_required), page: int = 1, page_size: int = 20, search: str = "", cli_id: str = "", start_date: str = "", end_date: str = "", is_finished: str = "", is_transferred: str = ""):
     # 日期默认不选择，保持为空
     # is_finished 为空表示"全部状态"，不做强制设置
-    results, total = get_order_list(page=page, page_size=page_size, search_kw=search, cli_id=cli_id, start_date=start_date, end_date=end_date, is_finished=is_finished, is_transferred=is_transferred)
+    results, total = await run_db(get_order_list, page=page, page_size=page_size, search_kw=search, cli_id=cli_id, start_date=start_date, end_date=end_date, is_finished=is_finished, is_transferred=is_transferred)
     total_pages = (total + page_size - 1) // page_size
     from Sills.db_cli import get_cli_list
     from Sills.base import get_paginated_list
-    cli_list, _ = get_cli_list(page=1, page_size=1000)
+    cli_list, _ = await run_db(get_cli_list, page=1, page_size=1000)
     cli_list = sorted(cli_list, key=lambda x: x.get('cli_name', ''))
-    vendor_data = get_paginated_list('uni_vendor', page=1, page_size=1000)
+    vendor_data = await run_db(get_paginated_list, 'uni_vendor', page=1, page_size=1000)
     vendor_list = vendor_data['items']
     return templates.TemplateResponse("order.html", {
         "request": request, "active_page": "order", "current_user": current_user,
@@ -1682,7 +1799,7 @@ async def order_import_text(batch_text: str = Form(None), csv_file: UploadFile =
     else:
         return RedirectResponse(url="/order?msg=未提供导入内容&success=0", status_code=303)
         
-    success_count, errors = batch_import_order(text, cli_id)
+    success_count, errors = await run_db_bulk(batch_import_order, text, cli_id)
     import urllib.parse
     err_msg = ""
     if errors: err_msg = "&msg=" + urllib.parse.quote(errors[0])
@@ -1720,6 +1837,12 @@ async def api_order_batch_delete(request: Request, current_user: dict = Depends(
     ok, msg = batch_delete_order(ids)
     return {"success": ok, "message": msg}
 
+@app.get("/api/order/export")
+async def order_export(format: str = "csv", search: str = "", cli_id: str = "", start_date: str = "", end_date: str = "",
+                       is_finished: str = "", is_transferred: str = "", current_user: dict = Depends(login_required)):
+    return _export_response('order', format, dict(search_kw=search, cli_id=cli_id, start_date=start_date, end_date=end_date,
+                                                  is_finished=is_finished, is_transferred=is_transferred))
+
 @app.post("/api/order/export_csv")
 async def order_export_csv(request: Request, current_user: dict = Depends(login_required)):
     data = await request.json()
@@ -1898,7 +2021,7 @@ async def api_import_history(
 ):
     import tempfile
     import os
-    from Sills.db_history_import import import_history_orders
+    from Sills.db_history_import import import_history_file
 
     # 检查文件类型
     if not file.filename.endswith(('.xlsx', '.xls')):
@@ -1913,8 +2036,7 @@ async def api_import_history(
     try:
         # 调用导入函数
         emp_id = current_user.get('emp_id', '')
-        success, skip, fail, errors = import_history_orders(tmp_path, emp_id)
-        return {"success": success, "skip": skip, "fail": fail, "errors": errors}
+        return await run_db_bulk(import_history_file, tmp_path, emp_id)
     finally:
         # 删除临时文件
         try:
@@ -2209,27 +2331,18 @@ async def api_order_manager_batch_to_purchase(request: Request, current_user: di
                     order_date = datetime.now().strftime("%Y-%m-%d")
 
                     # 生成递增的5位数销售订单编号
-                    last_order = conn.execute("SELECT order_id FROM uni_order WHERE order_id LIKE 'd%' ORDER BY order_id DESC LIMIT 1").fetchone()
-                    if last_order:
-                        try:
-                            last_num = int(last_order['order_id'][1:])
-                            new_num = last_num + 1
-                        except:
-                            new_num = 1
-                    else:
-                        new_num = 1
-                    order_id = f"d{new_num:05d}"
+                    order_id = next_id('order', conn)
 
                     conn.execute("""
                         INSERT INTO uni_order (
                             order_id, order_no, order_date, cli_id, offer_id,
-                            inquiry_mpn, inquiry_brand, price_rmb, price_kwr, price_usd,
+                            inquiry_mpn, mpn_norm, inquiry_brand, price_rmb, price_kwr, price_usd,
                             cost_price_rmb, is_finished, is_paid, paid_amount, return_status,
                             remark, is_transferred
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (
                         order_id, order_id, order_date, offer['cli_id'], offer_id,
-                        offer.get('inquiry_mpn'), '', offer.get('price_rmb', 0), 0, offer.get('price_usd', 0),
+                        offer.get('inquiry_mpn'), normalize_mpn(offer.get('inquiry_mpn')), '', offer.get('price_rmb', 0), 0, offer.get('price_usd', 0),
                         offer.get('cost_price_rmb', 0), 0, 0, 0.0, '正常',
                         '', '未转'
                     ))
@@ -2458,17 +2571,22 @@ async def api_order_manager_generate_pi_ci_us(request: Request, current_user: di
 
 # ============ 采购管理 ============
 
+def _buy_page_lookups():
+    """采购页下拉框：供应商（含地址）、销售订单、客户"""
+    with get_db_connection() as conn:
+        vendors = conn.execute("SELECT vendor_id, vendor_name, address FROM uni_vendor").fetchall()
+        orders = conn.execute("SELECT order_id, order_no FROM uni_order").fetchall()
+        clis = conn.execute("SELECT cli_id, cli_name FROM uni_cli ORDER BY cli_name").fetchall()
+    return vendors, orders, clis
+
 @app.get("/buy", response_class=HTMLResponse)
 async def buy_page(request: Request, current_user: dict = Depends(login_required), page: int = 1, page_size: int = 20, search: str = "", order_id: str = "", start_date: str = "", end_date: str = "", cli_id: str = "", is_shipped: str = ""):
     # 日期默认不选择，保持为空
     # is_shipped 为空表示"全部状态"，不做强制设置
-    results, total = get_buy_list(page=page, page_size=page_size, search_kw=search, order_id=order_id, start_date=start_date, end_date=end_date, cli_id=cli_id, is_shipped=is_shipped)
+    results, total = await run_db(get_buy_list, page=page, page_size=page_size, search_kw=search, order_id=order_id, start_date=start_date, end_date=end_date, cli_id=cli_id, is_shipped=is_shipped)
     total_pages = (total + page_size - 1) // page_size
-    with get_db_connection() as conn:
-        vendors = conn.execute("SELECT vendor_id, vendor_name, address FROM uni_vendor").fetchall()
-        orders = conn.execute("SELECT order_id, order_no FROM uni_order").fetchall()
-        clis = conn.execute("SELECT cli_id, cli_name FROM uni_cli ORDER BY cli_name").fetchall()
-        vendor_addresses = {str(v['vendor_id']): (v['address'] or "") for v in vendors}
+    vendors, orders, clis = await run_db(_buy_page_lookups)
+    vendor_addresses = {str(v['vendor_id']): (v['address'] or "") for v in vendors}
     return templates.TemplateResponse("buy.html", {
         "request": request, "active_page": "buy", "current_user": current_user,
         "items": results, "total": total, "page": page, "page_size": page_size,
@@ -2491,7 +2609,7 @@ async def buy_import_text(batch_text: str = Form(None), csv_file: UploadFile = F
     else:
         return RedirectResponse(url="/buy?import_success=0&errors=1&msg=未提供导入内容", status_code=303)
         
-    success_count, errors = batch_import_buy(text)
+    success_count, errors = await run_db_bulk(batch_import_buy, text)
     import urllib.parse
     err_msg = ""
     if errors: err_msg = "&msg=" + urllib.parse.quote(errors[0])
@@ -2549,6 +2667,12 @@ async def api_buy_batch_delete(request: Request, current_user: dict = Depends(lo
     ok, msg = batch_delete_buy(ids)
     return {"success": ok, "message": msg}
 
+@app.get("/api/buy/export")
+async def buy_export(format: str = "csv", search: str = "", order_id: str = "", start_date: str = "", end_date: str = "",
+                     cli_id: str = "", is_shipped: str = "", current_user: dict = Depends(login_required)):
+    return _export_response('buy', format, dict(search_kw=search, order_id=order_id, start_date=start_date, end_date=end_date,
+                                                cli_id=cli_id, is_shipped=is_shipped))
+
 @app.post("/api/buy/export_csv")
 async def buy_export_csv(request: Request, current_user: dict = Depends(login_required)):
     data = await request.json()
@@ -2620,7 +2744,7 @@ async def api_quote_batch_to_offer(data: dict, current_user: dict = Depends(logi
     ids = data.get('ids', [])
     if not ids: return {"success": False, "message": "未选中记录"}
     try:
-        ok, msg = batch_convert_from_quote(ids, current_user['emp_id'])
+        ok, msg = await run_db_bulk(batch_convert_from_quote, ids, current_user['emp_id'])
         return {"success": ok, "message": msg}
     except Exception as e:
         return {"success": False, "message": str(e)}
@@ -2631,7 +2755,7 @@ async def api_offer_batch_to_order(data: dict, current_user: dict = Depends(logi
     cli_id = data.get('cli_id')
     if not ids: return {"success": False, "message": "未选中记录"}
     try:
-        ok, msg = batch_convert_from_offer(ids, cli_id)
+        ok, msg = await run_db_bulk(batch_convert_from_offer, ids, cli_id)
         return {"success": ok, "message": msg}
     except Exception as e:
         return {"success": False, "message": str(e)}
@@ -2641,7 +2765,7 @@ async def api_order_batch_to_buy(data: dict, current_user: dict = Depends(login_
     ids = data.get('ids', [])
     if not ids: return {"success": False, "message": "未选中记录"}
     try:
-        ok, msg = batch_convert_from_order(ids)
+        ok, msg = await run_db_bulk(batch_convert_from_order, ids)
         return {"success": ok, "message": msg}
     except Exception as e:
         return {"success": False, "message": str(e)}
@@ -3018,6 +3142,11 @@ async def api_backup_restore(backup_path: str = Form(...), current_user: dict =
         if restored_count == 0:
             return {"success": False, "message": "备份目录中没有找到数据库文件"}
 
+        # 邮件 blob 按内容寻址，合并到当前 blob 目录即可（同名文件内容相同）
+        blob_backup = os.path.join(backup_path, "mail_blobs")
+        if os.path.isdir(blob_backup):
+            shutil.copytree(blob_backup, blob_dir(), dirs_exist_ok=True)
+
         # 再次清除缓存
         clear_cache()
 
@@ -3085,16 +3214,20 @@ async def api_mail_list(
     page: int = 1,
     page_size: int = 20,
     search: str = None,
+    after: str = None,
     current_user: dict = Depends(login_required)
 ):
-    """获取邮件列表（用户隔离）"""
+    """获取邮件列表（用户隔离）；传 after 使用游标分页，返回 next_cursor"""
     # 限制每页数量在1-1000之间
     page_size = max(1, min(1000, page_size))
     is_sent = 1 if folder == "sent" else 0
     # 获取当前邮件账户ID
     config = get_mail_config()
     account_id = config.get('id') if config else None
-    result = get_mail_list(page=page, limit=page_size, is_sent=is_sent, search=search, account_id=account_id)
+    try:
+        result = await run_db(get_mail_list, page=page, limit=page_size, is_sent=is_sent, search=search, account_id=account_id, after=after)
+    except ValueError as e:
+        return {"success": False, "message": str(e), "items": []}
     return result
 
 
@@ -3270,23 +3403,25 @@ async def api_mail_refresh(current_user: dict = Depends(login_required)):
 
 
 @app.post("/api/mail/sync-new")
-async def api_mail_sync_new(current_user: dict = Depends(login_required)):
-    """增量同步：只获取新邮件"""
+async def api_mail_sync_new(exclude_inbox: bool = False, current_user: dict = Depends(login_required)):
+    """增量同步：只获取新邮件（exclude_inbox=true 时跳过由 IDLE 推送同步的收件箱）"""
     from Sills.mail_service import sync_new_emails_async
     if is_sync_locked():
         return {"success": False, "message": "同步任务正在进行中，请稍后"}
 
-    result = sync_new_emails_async()
+    result = sync_new_emails_async(exclude_inbox)
     return {"success": True, "message": "增量同步任务已启动"}
 
 
 @app.get("/api/mail/sync/status")
 async def api_mail_sync_status(current_user: dict = Depends(login_required)):
-    """获取同步状态和进度"""
+    """获取同步状态和进度（含当前账户的 IDLE 推送监听状态）"""
     progress = get_sync_progress()
+    config = await run_db(get_mail_config)
     return {
         "success": True,
-        **progress
+        **progress,
+        "idle": get_idle_status(config['id']) if config else None
     }
 
 
@@ -3368,6 +3503,9 @@ async def api_mail_config_batch(
         data = await request.json()
         batch_size = data.get('batch_size', 100)
         pause_seconds = data.get('pause_seconds', 1.0)
+        connections = data.get('connections')
+        headers_first = data.get('headers_first')
+        idle = data.get('idle')
 
         # 获取当前账户
         config = get_mail_config()
@@ -3379,8 +3517,12 @@ async def api_mail_config_batch(
         # 更新配置
         update_mail_account(account_id, {
             'sync_batch_size': batch_size,
-            'sync_pause_seconds': pause_seconds
+            'sync_pause_seconds': pause_seconds,
+            'sync_connections': connections,
+            'sync_headers_first': None if headers_first is None else int(bool(headers_first)),
+            'sync_idle': None if idle is None else int(bool(idle))
         })
+        await run_db(start_idle_watchers, account_id)
 
         return {"success": True, "message": f"分批配置已保存"}
     except Exception as e:
@@ -3725,6 +3867,7 @@ async def api_mail_account_add(
                 return {"success": False, "message": f"IMAP连接验证失败: {str(e)}"}
 
         account_id = add_mail_account(data)
+        await run_db(start_idle_watchers)
         return {
             "success": True,
             "message": "账户添加成功",
@@ -3774,6 +3917,7 @@ async def api_mail_account_update(
 
         result = update_mail_account(account_id, data)
         if result:
+            await run_db(start_idle_watchers, account_id)
             return {"success": True, "message": "账户更新成功"}
         else:
             return {"success": False, "message": "更新失败"}
@@ -3816,6 +3960,7 @@ async def api_mail_account_delete(
     try:
         result = delete_mail_account(account_id)
         if result.get('success'):
+            await run_db(start_idle_watchers)
             return {"success": True, "message": result.get('message', '删除成功')}
         else:
             return {"success": False, "message": result.get('message', '删除失败')}
@@ -4217,6 +4362,22 @@ async def api_remove_blacklist(blacklist_id: int, current_user: dict = Depends(l
     return {"success": success}
 
 
+@app.get("/api/mail/blob/{blob_hash}")
+async def api_mail_blob(blob_hash: str, current_user: dict = Depends(login_required)):
+    """邮件内嵌图片 / 超大正文（按 SHA-256 寻址，内容不变，允许浏览器长期缓存）"""
+    from fastapi.responses import FileResponse
+    blob = await run_db(get_blob, blob_hash)
+    if not blob:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    headers = {"Cache-Control": "private, max-age=31536000, immutable", "ETag": f'"{blob_hash}"',
+               "X-Content-Type-Options": "nosniff", "Content-Security-Policy": "sandbox"}
+    if is_inline_image(blob['content_type']):
+        return FileResponse(blob['path'], media_type=blob['content_type'], headers=headers)
+    # SVG、正文等不在页面中打开（正文由 get_mail_by_id 在服务端读取）
+    headers["Content-Disposition"] = f'attachment; filename="{blob_hash}"'
+    return FileResponse(blob['path'], media_type="application/octet-stream", headers=headers)
+
+
 @app.get("/api/mail/{mail_id}")
 async def api_mail_detail(mail_id: int, current_user: dict = Depends(login_required)):
     """获取邮件详情"""
@@ -4224,6 +4385,11 @@ async def api_mail_detail(mail_id: int, current_user: dict = Depends(login_requi
     if not email:
         raise HTTPException(status_code=404, detail="邮件不存在")
 
+    # 只同步了邮件头的邮件，打开时下载正文
+    if email.get('body_state') == 'pending':
+        from Sills.mail_service import ensure_mail_body
+        email = await run_db_bulk(ensure_mail_body, email)
+
     # 获取关联信息
     relations = get_mail_relations(mail_id)
 
@@ -4411,9 +4577,10 @@ async def api_contact_list(
     is_bounced: int = None,
     is_read: int = None,
     has_sent: int = None,
+    after: str = None,
     current_user: dict = Depends(login_required)
 ):
-    """获取联系人列表"""
+    """获取联系人列表；传 after 使用游标分页，返回 next_cursor"""
     from Sills.db_contact import get_contact_list
     filters = {}
     if cli_id:
@@ -4427,12 +4594,19 @@ async def api_contact_list(
     if has_sent is not None:
         filters['has_sent'] = has_sent
 
-    items, total = get_contact_list(
-        page=page,
-        page_size=page_size,
-        search_kw=search or "",
-        filters=filters if filters else None
-    )
+    try:
+        items, total = await run_db(
+            get_contact_list,
+            page=page,
+            page_size=page_size,
+            search_kw=search or "",
+            filters=filters if filters else None,
+            after=after
+        )
+    except ValueError as e:
+        return {"success": False, "message": str(e), "items": []}
+    if after is not None:
+        return {"items": items, "next_cursor": total, "page_size": page_size}
     return {"items": items, "total": total, "page": page, "page_size": page_size}
 
 
@@ -4623,7 +4797,7 @@ async def api_contact_import(request: Request, current_user: dict = Depends(logi
     if not contacts:
         return {"success": False, "message": "未提供数据"}
 
-    success_count, errors, new_clients = batch_import_contacts(contacts, auto_create_cli)
+    success_count, errors, new_clients = await run_db_bulk(batch_import_contacts, contacts, auto_create_cli)
     return {
         "success": True,
         "imported": success_count,
@@ -4688,7 +4862,7 @@ async def api_contact_import_file(request: Request, current_user: dict = Depends
             return {"success": False, "message": "文件中没有有效数据"}
 
         print("调用 batch_import_contacts...")
-        success_count, errors, new_clients = batch_import_contacts(contacts, False)
+        success_count, errors, new_clients = await run_db_bulk(batch_import_contacts, contacts, False)
         print(f"导入结果: 成功={success_count}, 错误={errors}, 新客户={new_clients}")
         print("===== 联系人文件导入结束 =====")
         return {
@@ -5457,7 +5631,7 @@ async def api_datacenter_execute(request: Request, current_user: dict = Depends(
     if not sql:
         return {"success": False, "message": "SQL 不能为空", "data": []}
 
-    success, result, message = execute_sql(sql)
+    success, result, message = await run_db_bulk(execute_sql, sql)
     return {"success": success, "data": result if success else [], "message": message, "error": "" if success else str(result)}
 
 
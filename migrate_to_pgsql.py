@@ -89,9 +89,15 @@ def get_pg_connection():
 def get_table_list(sqlite_conn):
     """获取 SQLite 中的所有表名"""
     cursor = sqlite_conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        "SELECT name, sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
     )
-    return [row['name'] for row in cursor.fetchall()]
+    rows = cursor.fetchall()
+    # 跳过 FTS5 搜索索引（虚拟表及其影子表），PostgreSQL 端使用 pg_trgm 索引
+    virtual = [row['name'] for row in rows if (row['sql'] or '').upper().startswith('CREATE VIRTUAL TABLE')]
+    # schema_version 由目标库自己的迁移记录维护；uni_sequence 在 PostgreSQL 端为原生序列，启动时按表中最大编号对齐
+    return [row['name'] for row in rows
+            if row['name'] not in ('schema_version', 'uni_sequence')
+            and row['name'] not in virtual and not any(row['name'].startswith(v + '_') for v in virtual)]
 
 
 def get_table_schema(sqlite_conn, table_name):
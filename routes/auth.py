@@ -6,7 +6,10 @@ from fastapi import APIRouter, Request, Form, Depends, HTTPException, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
 from typing import Optional
 
+from datetime import datetime
+
 from Sills.base import get_db_connection
+from Sills.db_sales_cube import query_sales_cube
 from Sills.db_emp import verify_login, change_password, hash_password
 
 router = APIRouter(tags=["auth"])
@@ -59,7 +62,11 @@ async def index(request: Request, current_user: dict = Depends(get_current_user)
     with get_db_connection() as conn:
         cli_count = conn.execute("SELECT COUNT(*) FROM uni_cli").fetchone()[0]
         emp_count = conn.execute("SELECT COUNT(*) FROM uni_emp").fetchone()[0]
-        order_sum = conn.execute("SELECT COALESCE(SUM(paid_amount), 0) FROM uni_order").fetchone()[0]
+    # 本月销售额、毛利取自销售汇总表
+    # 非管理员只统计自己的订单（与 /api/report/sales 一致）
+    own_emp_id = current_user['emp_id'] if current_user['rule'] not in ['3', '0'] else ""
+    month_total = query_sales_cube(start_date=datetime.now().strftime("%Y-%m-01"), group_by="",
+                                   emp_id=own_emp_id)["total"]
 
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
@@ -68,7 +75,8 @@ async def index(request: Request, current_user: dict = Depends(get_current_user)
         "stats": {
             "cli_count": cli_count,
             "emp_count": emp_count,
-            "order_sum": order_sum
+            "order_sum": month_total["revenue_rmb"],
+            "profit_sum": month_total["profit_rmb"]
         }
     })
 
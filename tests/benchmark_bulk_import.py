@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+批量导入吞吐测试
+在临时 SQLite 数据库上导入 N 行需求，对比逐行 add_quote 与 batch_import_quote_from_rows（单事务批量写入），
+并测量导入的需求依次全部转报价、转销售订单、转采购（batch_convert_from_quote/offer/order）的耗时。
+最后一行输出 JSON，便于 CI 采集。
+
+运行方式：
+  python tests/benchmark_bulk_import.py [--rows N] [--clients N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Sills.base as base
+from Sills.db_buy import batch_convert_from_order
+from Sills.db_offer import batch_convert_from_quote
+from Sills.db_order import batch_convert_from_offer
+from Sills.db_quote import add_quote, batch_import_quote_from_rows
+
+
+def make_rows(n, clients):
+    return [["2026-01-15", f"客户{i % clients}", f"MPN{i:06d}/TR", "", "TI", str(100 + i), "1.5", "", "", "", "询价中", ""]
+            for i in range(n)]
+
+
+def setup_db(path, clients):
+    base.DB_PATH = path
+    base.init_db()
+    with base.get_db_connection() as conn:
+        conn.executemany("INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES (?, ?, '000')",
+                         [(f"C{i + 1:03d}", f"客户{i}") for i in range(clients)])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--legacy-rows', type=int, default=500, help="逐行 add_quote 的行数（较慢，按比例折算）")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.clients)
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_db(os.path.join(tmp, "bulk_bench.db"), args.clients)
+        start = time.perf_counter()
+        ok, errors = batch_import_quote_from_rows(rows)
+        bulk_s = time.perf_counter() - start
+        assert ok == args.rows and not errors, errors[:5]
+        convert = {}
+        for name, table, key, func in [('quote_to_offer_s', 'uni_quote', 'quote_id', lambda ids: batch_convert_from_quote(ids, '000')),
+                                       ('offer_to_order_s', 'uni_offer', 'offer_id', batch_convert_from_offer),
+                                       ('order_to_buy_s', 'uni_order', 'order_id', batch_convert_from_order)]:
+            with base.get_db_connection() as conn:
+                ids = [r[0] for r in conn.execute(f"SELECT {key} FROM {table}").fetchall()]
+            start = time.perf_counter()
+            ok, msg = func(ids)
+            convert[name] = round(time.perf_counter() - start, 3)
+            assert ok and '失败' not in msg, msg
+        base.close_all_connections()
+
+        setup_db(os.path.join(tmp, "legacy_bench.db"), args.clients)
+        start = time.perf_counter()
+        for i in range(args.legacy_rows):
+            add_quote({"cli_id": f"C{i % args.clients + 1:03d}", "inquiry_mpn": f"MPN{i:06d}", "inquiry_qty": 100})
+        legacy_s = time.perf_counter() - start
+        base.close_all_connections()
+
+    result = {
+        'rows': args.rows,
+        'bulk_s': round(bulk_s, 3),
+        'bulk_rows_per_s': round(args.rows / bulk_s),
+        'legacy_rows_per_s': round(args.legacy_rows / legacy_s),
+        **convert,
+    }
+    result['speedup'] = round(result['bulk_rows_per_s'] / max(result['legacy_rows_per_s'], 1), 1)
+    print("=" * 60)
+    print(f"批量导入 {args.rows} 行: {result['bulk_s']} s ({result['bulk_rows_per_s']} 行/秒)，"
+          f"逐行 add_quote: {result['legacy_rows_per_s']} 行/秒，提升 {result['speedup']}x")
+    print(f"{args.rows} 行 需求转报价: {result['quote_to_offer_s']} s  报价转订单: {result['offer_to_order_s']} s  "
+          f"订单转采购: {result['order_to_buy_s']} s")
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
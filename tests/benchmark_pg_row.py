@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL 结果行包装性能测试
+对比旧版逐行定义 _Row(dict) 与共享列映射的 _PgRow 的吞吐量（rows/sec）和内存（bytes/row）
+不需要 PostgreSQL：使用模拟游标返回与 psycopg2 相同形状的元组
+
+运行方式：
+  python tests/benchmark_pg_row.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Sills.base import _DictCursorWrapper
+
+# 测试配置
+BENCH_CONFIG = {
+    'row_count': 50000,     # 每轮行数（相当于一大页 uni_offer）
+    'rounds': 3,            # 取最好成绩
+}
+
+# uni_offer 列（与 get_offer_list 的 SELECT 大致相当）
+COLUMNS = [
+    'offer_id', 'offer_date', 'quote_id', 'cli_id', 'inquiry_mpn', 'quoted_mpn',
+    'inquiry_brand', 'quoted_brand', 'inquiry_qty', 'actual_qty', 'quoted_qty',
+    'cost_price_rmb', 'offer_price_rmb', 'price_kwr', 'price_usd', 'platform',
+    'vendor_id', 'date_code', 'delivery_date', 'emp_id', 'offer_statement',
+    'remark', 'status', 'target_price_rmb', 'is_transferred', 'created_at',
+]
+
+
+class _FakeCursor:
+    """模拟 psycopg2 默认游标"""
+
+    def __init__(self, rows):
+        self.description = [(c, None, None, None, None, None, None) for c in COLUMNS]
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _LegacyDictCursorWrapper:
+    """旧版实现（每行定义一个 dict 子类，并复制一份值列表）"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._columns = None
+
+    def _get_columns(self):
+        if self._columns is None and self._cursor.description:
+            self._columns = [desc[0] for desc in self._cursor.description]
+        return self._columns
+
+    def _wrap_row(self, row):
+        columns = self._get_columns()
+        if isinstance(row, dict):
+            values = list(row.values())
+            data = row.copy()
+        else:
+            values = list(row)
+            data = {columns[i]: row[i] for i in range(len(columns))}
+
+        class _Row(dict):
+            def __init__(inner_self, d, vals):
+                super().__init__(d)
+                inner_self._values = vals
+
+            def __getitem__(inner_self, key):
+                if isinstance(key, int):
+                    return inner_self._values[key]
+                return super().__getitem__(key)
+
+        return _Row(data, values)
+
+    def fetchall(self):
+        return [self._wrap_row(r) for r in self._cursor.fetchall()]
+
+
+def make_rows(n):
+    return [
+        (f"b{i:05d}", "2026-03-01", f"x{i:05d}", "C001", f"LM{i}T", f"LM{i}T/NOPB",
+         "TI", "TI", 1000, 1000, 1000, 1.23, 1.5, 280.5, 0.21, "", "V001",
+         "2612+", "1~3days", "000", "", "", "询价中", None, "未转", "2026-03-01 10:00:00")
+        for i in range(n)
+    ]
+
+
+def measure(wrapper_cls, rows):
+    """返回 (rows/sec, bytes/row)"""
+    best = float('inf')
+    for _ in range(BENCH_CONFIG['rounds']):
+        start = time.perf_counter()
+        wrapped = wrapper_cls(_FakeCursor(rows)).fetchall()
+        # 模拟列表页的典型访问：按列名和下标各读一次
+        for r in wrapped:
+            r['offer_id']
+            r[12]
+        best = min(best, time.perf_counter() - start)
+        del wrapped
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    wrapped = wrapper_cls(_FakeCursor(rows)).fetchall()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del wrapped
+    return len(rows) / best, (after - before) / len(rows)
+
+
+def main():
+    rows = make_rows(BENCH_CONFIG['row_count'])
+    print("=" * 60)
+    print("PostgreSQL 结果行包装性能测试")
+    print("=" * 60)
+    print(f"行数: {len(rows)}, 列数: {len(COLUMNS)}, 轮数: {BENCH_CONFIG['rounds']}\n")
+
+    legacy_rps, legacy_bpr = measure(_LegacyDictCursorWrapper, rows)
+    new_rps, new_bpr = measure(_DictCursorWrapper, rows)
+
+    print(f"{'实现':<12} {'rows/sec':>14} {'bytes/row':>12}")
+    print("-" * 40)
+    print(f"{'旧 _Row':<12} {legacy_rps:>14,.0f} {legacy_bpr:>12,.0f}")
+    print(f"{'新 _PgRow':<12} {new_rps:>14,.0f} {new_bpr:>12,.0f}")
+    print("-" * 40)
+    print(f"吞吐提升: {new_rps / legacy_rps:.1f}x, 内存节省: {(1 - new_bpr / legacy_bpr) * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+列表搜索索引性能测试
+在临时 SQLite 数据库中生成 uni_offer 合成数据（默认 50 万行），对比：
+  - 旧版：LIKE '%kw%' 全表扫描（原 get_offer_list 的 WHERE 条件）
+  - 新版：get_offer_list（FTS5 trigram + 关联名称外键匹配）
+每个关键词测量 “COUNT + 第一页” 的耗时，并校验两者结果一致。
+
+运行方式：
+  python tests/benchmark_search_index.py [行数]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Sills.base as base
+from Sills.db_search import ensure_search_indexes
+
+# 测试配置
+BENCH_CONFIG = {
+    'row_count': 500000,
+    'rounds': 3,            # 取最好成绩
+    'page_size': 20,
+    'keywords': ['LM358', 'x00123', 'STM32F4', 'Arrow', 'b012345'],
+}
+
+SCHEMA = """
+CREATE TABLE uni_cli (cli_id TEXT PRIMARY KEY, cli_name TEXT, margin_rate REAL, created_at DATETIME);
+CREATE TABLE uni_emp (emp_id TEXT PRIMARY KEY, emp_name TEXT);
+CREATE TABLE uni_vendor (vendor_id TEXT PRIMARY KEY, vendor_name TEXT, created_at DATETIME);
+CREATE TABLE uni_quote (quote_id TEXT PRIMARY KEY, cli_id TEXT, inquiry_mpn TEXT, created_at DATETIME);
+CREATE TABLE uni_order (order_id TEXT PRIMARY KEY, cli_id TEXT, inquiry_mpn TEXT, created_at DATETIME);
+CREATE TABLE uni_buy (buy_id TEXT PRIMARY KEY, vendor_id TEXT, buy_mpn TEXT, created_at DATETIME);
+CREATE TABLE uni_offer (
+    offer_id TEXT PRIMARY KEY, offer_date TEXT, quote_id TEXT, cli_id TEXT, inquiry_mpn TEXT, quoted_mpn TEXT,
+    inquiry_brand TEXT, quoted_brand TEXT, inquiry_qty INTEGER, quoted_qty INTEGER, cost_price_rmb REAL,
+    offer_price_rmb REAL, price_kwr REAL, price_usd REAL, vendor_id TEXT, date_code TEXT, delivery_date TEXT,
+    emp_id TEXT, remark TEXT, status TEXT, target_price_rmb REAL, is_transferred TEXT, created_at DATETIME
+);
+CREATE INDEX idx_offer_date ON uni_offer(offer_date);
+CREATE INDEX idx_offer_vendor ON uni_offer(vendor_id);
+CREATE INDEX idx_quote_cli ON uni_quote(cli_id);
+CREATE TABLE uni_daily (record_date TEXT, currency_code INTEGER, exchange_rate REAL);
+"""
+
+LEGACY_WHERE = "(o.inquiry_mpn LIKE ? OR o.offer_id LIKE ? OR v.vendor_name LIKE ? OR e.emp_name LIKE ? OR c.cli_name LIKE ?)"
+LEGACY_FROM = """
+FROM uni_offer o
+LEFT JOIN uni_vendor v ON o.vendor_id = v.vendor_id
+LEFT JOIN uni_emp e ON o.emp_id = e.emp_id
+LEFT JOIN uni_quote q ON o.quote_id = q.quote_id
+LEFT JOIN uni_cli c ON COALESCE(o.cli_id, q.cli_id) = c.cli_id
+"""
+
+MPN_PREFIXES = ['LM', 'STM32F', 'TPS', 'AD', 'MAX', 'NE', 'SN74HC', 'ATMEGA', 'IRF', 'BSS']
+VENDORS = ['Arrow', 'Avnet', 'Mouser', 'Digikey', 'Future', 'TTI', 'Rochester', 'WPG']
+
+
+def build_db(path, rows):
+    rnd = random.Random(42)
+    base.DB_PATH = path
+    with base.get_db_connection() as conn:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO uni_cli VALUES (?, ?, 0.1, '2026-01-01')",
+                         [(f"C{i:03d}", f"Client {i}") for i in range(200)])
+        conn.executemany("INSERT INTO uni_emp VALUES (?, ?)", [(f"{i:03d}", f"Emp {i}") for i in range(20)])
+        conn.executemany("INSERT INTO uni_vendor VALUES (?, ?, '2026-01-01')",
+                         [(f"V{i:03d}", VENDORS[i % len(VENDORS)] + f" {i}") for i in range(80)])
+        conn.executemany("INSERT INTO uni_quote VALUES (?, ?, ?, '2026-01-01')",
+                         [(f"x{i:05d}", f"C{i % 200:03d}", "") for i in range(rows // 10)])
+        batch = []
+        for i in range(rows):
+            mpn = f"{rnd.choice(MPN_PREFIXES)}{rnd.randint(1, 9999)}{rnd.choice(['', 'T', 'DR', 'N'])}"
+            batch.append((f"b{i:06d}", f"2026-{1 + i % 12:02d}-01", f"x{i % (rows // 10):05d}", None, mpn, mpn,
+                          'TI', 'TI', 1000, 1000, 1.0, 1.2, 0, 0, f"V{i % 80:03d}", '2612+', '1~3days',
+                          f"{i % 20:03d}", '', '询价中', 0, '未转', f"2026-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}"))
+            if len(batch) == 50000:
+                conn.executemany(f"INSERT INTO uni_offer VALUES ({', '.join(['?'] * 23)})", batch)
+                batch = []
+        if batch:
+            conn.executemany(f"INSERT INTO uni_offer VALUES ({', '.join(['?'] * 23)})", batch)
+    start = time.perf_counter()
+    ensure_search_indexes()
+    elapsed = time.perf_counter() - start
+    base.refresh_table_stats()  # 与 init_db 一致
+    return elapsed
+
+
+def legacy_search(kw, page_size):
+    params = [f"%{kw}%"] * 5
+    with base.get_db_connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) {LEGACY_FROM} WHERE {LEGACY_WHERE}", params).fetchone()[0]
+        rows = conn.execute(f"SELECT o.offer_id {LEGACY_FROM} WHERE {LEGACY_WHERE} "
+                            f"ORDER BY o.offer_date DESC, o.created_at DESC LIMIT ?", params + [page_size]).fetchall()
+    return total, [r[0] for r in rows]
+
+
+def indexed_search(kw, page_size):
+    from Sills.db_offer import get_offer_list
+    base.clear_cache()  # 排除行数缓存的影响
+    items, total = get_offer_list(page=1, page_size=page_size, search_kw=kw)
+    return total, [r['offer_id'] for r in items]
+
+
+def best_time(func, *args):
+    best, result = float('inf'), None
+    for _ in range(BENCH_CONFIG['rounds']):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else BENCH_CONFIG['row_count']
+    page_size = BENCH_CONFIG['page_size']
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search_bench.db")
+        print("=" * 70)
+        print("列表搜索索引性能测试 (uni_offer)")
+        print("=" * 70)
+        start = time.perf_counter()
+        index_time = build_db(path, rows)
+        print(f"行数: {rows:,}  生成数据: {time.perf_counter() - start:.1f}s  建立 FTS 索引: {index_time:.1f}s")
+        print(f"数据库大小: {os.path.getsize(path) / 1024 / 1024:.0f} MB\n")
+
+        print(f"{'关键词':<10} {'匹配行数':>10} {'LIKE(ms)':>12} {'索引(ms)':>12} {'提升':>8}")
+        print("-" * 58)
+        for kw in BENCH_CONFIG['keywords']:
+            legacy_t, (legacy_total, legacy_ids) = best_time(legacy_search, kw, page_size)
+            index_t, (index_total, index_ids) = best_time(indexed_search, kw, page_size)
+            assert legacy_total == index_total, (kw, legacy_total, index_total)
+            assert len(legacy_ids) == len(index_ids), (kw, len(legacy_ids), len(index_ids))
+            print(f"{kw:<10} {index_total:>10,} {legacy_t * 1000:>12.1f} {index_t * 1000:>12.1f} {legacy_t / index_t:>7.1f}x")
+        base.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
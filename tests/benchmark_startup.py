@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+启动耗时测试（CI 跟踪用）
+在临时 SQLite 数据库上测量 init_db：
+  - 冷启动：空库，执行全部迁移
+  - 热启动：已是最新版本，只查询 schema_version
+最后一行输出 JSON，便于 CI 采集；指定 --max-warm-ms 时热启动超出阈值返回非零退出码。
+
+运行方式：
+  python tests/benchmark_startup.py [--rounds N] [--max-warm-ms MS]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Sills.base as base
+from Sills.db_migrations import SCHEMA_VERSION
+
+
+def timed_init():
+    start = time.perf_counter()
+    base.init_db()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--max-warm-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base.DB_PATH = os.path.join(tmp, "startup_bench.db")
+        cold_ms = timed_init()
+        warm = []
+        for _ in range(args.rounds):
+            base.close_all_connections()  # 模拟新进程：重新建立连接
+            warm.append(timed_init())
+        base.close_all_connections()
+
+    result = {
+        'schema_version': SCHEMA_VERSION,
+        'cold_ms': round(cold_ms, 1),
+        'warm_ms': round(min(warm), 1),
+        'warm_max_ms': round(max(warm), 1),
+    }
+    print("=" * 60)
+    print(f"冷启动 init_db: {result['cold_ms']} ms   热启动 init_db: {result['warm_ms']} ms (最慢 {result['warm_max_ms']} ms)")
+    print(json.dumps(result))
+    if args.max_warm_ms is not None and result['warm_ms'] > args.max_warm_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
 """
 测试配置文件
 
-提供共享的 fixtures 和配置。
+提供共享的 fixtures 和配置：
+- server：启动测试服务器（端到端测试）
+- temp_db：临时 SQLite 数据库（不需要启动服务器）
 """
 
 import pytest
@@ -14,6 +16,9 @@ import os
 # 添加项目根目录
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import Sills.base as base
+from Sills.entity_cache import invalidate_entities
+
 
 def wait_for_server(host, port, timeout=30):
     """等待服务器启动"""
@@ -56,4 +61,35 @@ def server():
 
     yield
 
-    # 服务器会随线程结束而关闭
\ No newline at end of file
+    # 服务器会随线程结束而关闭
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """
+    临时 SQLite 数据库工厂：temp_db(seed_sql=None, init=True)
+
+    切换到 tmp_path 下的新数据库文件（同一测试中多次调用时每次一个新文件）；init=True 时执行全部迁移建表，
+    seed_sql（可含多条语句）写入测试数据，随后清空查询缓存和主数据缓存。
+    返回数据库文件路径，邮件 blob 目录也在其旁边。测试结束时关闭连接池中的连接。
+    """
+    monkeypatch.delenv('MAIL_BLOB_PATH', raising=False)
+    created = []
+
+    def make_db(seed_sql=None, init=True):
+        if created:
+            base.close_all_connections()
+        db_path = str(tmp_path / f"test_{len(created)}.db")
+        created.append(db_path)
+        monkeypatch.setattr(base, "DB_PATH", db_path)
+        if init:
+            base.init_db()
+        if seed_sql:
+            with base.get_db_connection() as conn:
+                conn.executescript(seed_sql)
+        base.clear_cache()
+        invalidate_entities()
+        return db_path
+
+    yield make_db
+    base.close_all_connections()
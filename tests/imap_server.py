@@ -0,0 +1,250 @@
+"""
+本地 IMAP 测试服务器
+
+只实现邮件同步用到的命令（CAPABILITY / LOGIN / ID / LIST / STATUS / SELECT / SEARCH / FETCH /
+UID SEARCH / UID FETCH / IDLE / CLOSE / LOGOUT），不校验密码、不解析搜索条件（只支持 UID n:m，其余返回文件夹全部邮件）。
+FETCH 支持 UID、RFC822、BODY.PEEK[] 和 BODY.PEEK[HEADER.FIELDS (...)]（返回全部邮件头）；
+condstore=True 时声明 CONDSTORE，STATUS 返回 HIGHESTMODSEQ，支持 UID FETCH ... (FLAGS) (CHANGEDSINCE n)；
+idle=True 时声明 IDLE，add_message 向正在该文件夹 IDLE 的连接推送 EXISTS。
+delay 为每次 SELECT、FETCH 前注入的延迟（秒），用于模拟远程服务器的往返耗时；
+commands 按顺序记录收到的命令名（UID 命令记为 "UID SEARCH" 等）。
+
+用法：
+    server = FakeIMAPServer({'INBOX': [(101, raw_bytes), ...], 'Sent': [...]}, delay=0.2)
+    server.start()   # server.port 为监听端口
+    ...
+    server.stop()
+
+测试中修改邮箱内容用 add_message / expunge / set_flags，UIDVALIDITY 直接改 server.uid_validity[文件夹]，
+drop_connections() 模拟网络中断（断开所有客户端连接）。
+"""
+
+import socket
+import socketserver
+import threading
+import time
+
+
+def make_message(subject, message_id, sender="sender@example.com", date="Mon, 05 Oct 2026 10:00:00 +0800"):
+    """构造一封简单的纯文本邮件（bytes）"""
+    return (f"From: {sender}\r\nTo: me@example.com\r\nSubject: {subject}\r\nDate: {date}\r\n"
+            f"Message-ID: <{message_id}>\r\nContent-Type: text/plain; charset=utf-8\r\n\r\n"
+            f"{subject} body\r\n").encode('utf-8')
+
+
+def _uid_set(spec, uids):
+    """解析 1,3,5:7 / 102:* 形式的集合"""
+    wanted = set()
+    top = max(uids) if uids else 0
+    for part in spec.split(','):
+        if ':' in part:
+            lo, hi = part.split(':')
+            lo = int(lo)
+            hi = top if hi == '*' else int(hi)
+            wanted.update(u for u in uids if min(lo, hi) <= u <= max(lo, hi))
+        else:
+            wanted.add(int(part))
+    return wanted
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def send(self, line):
+        self.wfile.write(line if isinstance(line, bytes) else line.encode('utf-8'))
+
+    def handle(self):
+        server = self.server.owner
+        server._connected(self, 1)
+        selected = None
+        try:
+            self.send("* OK IMAP4rev1 test server ready\r\n")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+                tag, _, rest = line.decode('utf-8').rstrip('\r\n').partition(' ')
+                command, _, args = rest.partition(' ')
+                command = command.upper()
+                use_uid = command == 'UID'
+                if use_uid:
+                    command, _, args = args.partition(' ')
+                    command = command.upper()
+                server.commands.append(f"UID {command}" if use_uid else command)
+
+                if command == 'CAPABILITY':
+                    extra = (' CONDSTORE' if server.condstore else '') + (' IDLE' if server.idle else '')
+                    self.send(f"* CAPABILITY IMAP4rev1 AUTH=PLAIN{extra}\r\n")
+                elif command in ('LOGIN', 'ID', 'NOOP'):
+                    pass
+                elif command == 'LIST':
+                    for name in server.folders:
+                        self.send(f'* LIST (\\HasNoChildren) "/" "{name}"\r\n')
+                elif command == 'STATUS':
+                    name = args.rsplit(' (', 1)[0].strip('"')
+                    if name not in server.folders:
+                        self.send(f"{tag} NO no such folder\r\n")
+                        continue
+                    items = (f"MESSAGES {len(server.folders[name])} UIDNEXT {server.uid_next(name)} "
+                             f"UIDVALIDITY {server.uid_validity.get(name, 1)}")
+                    if server.condstore and 'HIGHESTMODSEQ' in args.upper():
+                        items += f" HIGHESTMODSEQ {server.highest_modseq(name)}"
+                    self.send(f'* STATUS "{name}" ({items})\r\n')
+                elif command in ('SELECT', 'EXAMINE'):
+                    time.sleep(server.delay)
+                    name = args.strip('"')
+                    if name not in server.folders:
+                        self.send(f"{tag} NO no such folder\r\n")
+                        continue
+                    selected = name
+                    server.selects.append(name)
+                    self.send(f"* {len(server.folders[name])} EXISTS\r\n"
+                              f"* OK [UIDVALIDITY {server.uid_validity.get(name, 1)}] ok\r\n")
+                elif command == 'SEARCH':
+                    messages = server.folders[selected]
+                    if use_uid:
+                        criteria = args.split()
+                        uids = [uid for uid, _ in messages]
+                        if len(criteria) == 2 and criteria[0].upper() == 'UID':
+                            uids = sorted(_uid_set(criteria[1], uids))
+                        self.send(f"* SEARCH {' '.join(map(str, uids))}\r\n")
+                    else:
+                        self.send(f"* SEARCH {' '.join(str(i + 1) for i in range(len(messages)))}\r\n")
+                elif command == 'FETCH':
+                    time.sleep(server.delay)
+                    spec, _, items = args.partition(' ')
+                    messages = server.folders[selected]
+                    wanted = _uid_set(spec, [u for u, _ in messages] if use_uid else list(range(1, len(messages) + 1)))
+                    for seq, (uid, raw) in enumerate(messages, 1):
+                        if (uid if use_uid else seq) not in wanted:
+                            continue
+                        upper = items.upper()
+                        if 'CHANGEDSINCE' in upper:
+                            since = int(upper.split('CHANGEDSINCE')[1].strip(' )'))
+                            modseq = server.modseq.get((selected, uid), 1)
+                            if modseq > since:
+                                flags = ' '.join(sorted(server.flags.get((selected, uid), ())))
+                                self.send(f"* {seq} FETCH (UID {uid} FLAGS ({flags}) MODSEQ ({modseq}))\r\n")
+                            continue
+                        if 'HEADER.FIELDS' in upper:
+                            name, data = 'BODY[HEADER.FIELDS]', raw.split(b'\r\n\r\n', 1)[0] + b'\r\n\r\n'
+                        elif 'BODY.PEEK[]' in upper or 'BODY[]' in upper:
+                            name, data = 'BODY[]', raw
+                        elif 'RFC822' in upper:
+                            name, data = 'RFC822', raw
+                        else:
+                            self.send(f"* {seq} FETCH (UID {uid})\r\n")
+                            continue
+                        server.fetched_bytes += len(data)
+                        self.send(f"* {seq} FETCH (UID {uid} {name} {{{len(data)}}}\r\n".encode('utf-8') + data + b")\r\n")
+                elif command == 'IDLE' and server.idle:
+                    self.send("+ idling\r\n")
+                    with server._lock:
+                        server.idlers[self] = selected
+                    try:
+                        line = self.rfile.readline()
+                    finally:
+                        with server._lock:
+                            server.idlers.pop(self, None)
+                    if line.strip().upper() != b'DONE':
+                        break
+                elif command == 'CLOSE':
+                    selected = None
+                elif command == 'LOGOUT':
+                    self.send("* BYE\r\n")
+                    self.send(f"{tag} OK LOGOUT completed\r\n")
+                    break
+                else:
+                    self.send(f"{tag} BAD unknown command\r\n")
+                    continue
+                self.send(f"{tag} OK {command} completed\r\n")
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            server._connected(self, -1)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeIMAPServer:
+    """多线程的本地 IMAP 服务器，记录同时在线的最大连接数"""
+
+    def __init__(self, folders, delay=0.0, condstore=False, idle=False):
+        self.folders = folders  # 文件夹名 -> [(uid, 原始邮件), ...]
+        self.delay = delay
+        self.condstore = condstore
+        self.idle = idle
+        self.idlers = {}  # 正在 IDLE 的连接 -> 所选文件夹
+        self.handlers = set()
+        self.uid_validity = {}  # 文件夹名 -> UIDVALIDITY（默认 1）
+        self.flags = {}  # (文件夹名, uid) -> 标记集合
+        self.modseq = {}  # (文件夹名, uid) -> MODSEQ（默认 1）
+        self._modseq = 1
+        self._uid_next = {}
+        self.selects = []
+        self.commands = []
+        self.fetched_bytes = 0  # FETCH 返回的邮件数据字节数
+        self.connections = 0
+        self.max_connections = 0
+        self._lock = threading.Lock()
+        self._server = _TCPServer(('127.0.0.1', 0), _Handler)
+        self._server.owner = self
+        self.port = self._server.server_address[1]
+
+    def _connected(self, handler, n):
+        with self._lock:
+            (self.handlers.add if n > 0 else self.handlers.discard)(handler)
+            self.connections += n
+            self.max_connections = max(self.max_connections, self.connections)
+
+    def uid_next(self, folder):
+        """下一个UID：只增不减（删除最大UID的邮件后也不回退）"""
+        uids = [uid for uid, _ in self.folders[folder]]
+        self._uid_next[folder] = max(self._uid_next.get(folder, 1), max(uids, default=0) + 1)
+        return self._uid_next[folder]
+
+    def highest_modseq(self, folder):
+        return max((self.modseq.get((folder, uid), 1) for uid, _ in self.folders[folder]), default=1)
+
+    def add_message(self, folder, raw):
+        """新邮件到达，返回分配的UID"""
+        uid = self.uid_next(folder)
+        self.folders[folder].append((uid, raw))
+        self._uid_next[folder] = uid + 1
+        with self._lock:
+            for handler, name in self.idlers.items():
+                if name == folder:
+                    try:
+                        handler.send(f"* {len(self.folders[folder])} EXISTS\r\n")
+                    except OSError:
+                        pass  # 连接已断开，处理线程随后退出
+        return uid
+
+    def drop_connections(self):
+        with self._lock:
+            handlers = list(self.handlers)
+            self.idlers.clear()  # 已断开的连接不再接收推送
+        for handler in handlers:
+            try:
+                handler.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def expunge(self, folder, uid):
+        self.uid_next(folder)
+        self.folders[folder] = [(u, raw) for u, raw in self.folders[folder] if u != uid]
+
+    def set_flags(self, folder, uid, flags):
+        self._modseq += 1
+        self.flags[(folder, uid)] = set(flags)
+        self.modseq[(folder, uid)] = self._modseq
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -552,6 +552,27 @@ class TestDatabase:
             assert result[0] == 1
         test_results.add_result("数据库", "外键约束启用", "PASS")
 
+    def test_connection_pool_reuse(self):
+        """测试连接池复用物理连接，归还时回滚未提交事务"""
+        from Sills.base import get_pool_stats
+        with get_db_connection() as conn:
+            conn.execute("SELECT 1").fetchone()
+        created = get_pool_stats()["created"]
+        for _ in range(20):
+            with get_db_connection() as conn:
+                conn.execute("SELECT 1").fetchone()
+        stats = get_pool_stats()
+        assert stats["created"] == created
+        assert stats["in_use"] == 0
+
+        conn = get_db_connection()
+        conn.execute("UPDATE uni_emp SET remark = 'pool-uncommitted' WHERE emp_id = '000'")
+        conn.close()
+        with get_db_connection() as conn:
+            row = conn.execute("SELECT remark FROM uni_emp WHERE emp_id = '000'").fetchone()
+            assert row is None or row[0] != 'pool-uncommitted'
+        test_results.add_result("数据库", "连接池复用", "PASS")
+
 
 # ============================================================
 # 12. 业务流程测试
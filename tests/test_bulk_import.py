@@ -0,0 +1,117 @@
+"""
+批量导入测试
+
+验证需求批量导入：客户名解析、编号连续分配、错误行不影响其他行、营销状态同步；
+需求批量转报价：按客户利润率计价、重复转换报错；报价转订单、订单转采购的集合转换。
+"""
+
+import pytest
+
+import Sills.base as base
+from Sills.db_buy import batch_convert_from_order
+from Sills.db_offer import _insert_offers, batch_convert_from_quote, batch_import_offer_text
+from Sills.db_order import batch_convert_from_offer
+from Sills.db_quote import batch_add_quotes, batch_import_quote_from_rows, batch_import_quote_text
+
+SEED_SQL = """
+    INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES ('C001', '甲公司', '000'), ('C002', '乙公司', '000');
+    UPDATE uni_cli SET margin_rate = 0 WHERE cli_id = 'C002';
+    INSERT INTO uni_daily (record_date, currency_code, exchange_rate) VALUES ('2026-01-01', 2, 200);
+"""
+
+
+def fetch(sql, params=()):
+    with base.get_db_connection() as conn:
+        return [tuple(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def test_import_rows(temp_db):
+    temp_db(SEED_SQL)
+    rows = [
+        ["日期", "客户名", "询价型号"],
+        ["2026-01-15", "甲公司", "LM317T/TR", "", "TI", "100", "1.5"],
+        ["C002", "NE555", "", "ST", "2.0"],
+        ["2026-01-15", "不存在的客户", "X1"],
+        ["2026-01-15", "甲公司", "X2", "", "", "abc"],
+        ["C001", ""],
+    ]
+    ok, errors = batch_import_quote_from_rows(rows)
+    assert ok == 2
+    assert len(errors) == 3
+    assert fetch("SELECT quote_id, cli_id, quoted_mpn, mpn_norm, inquiry_qty, actual_qty FROM uni_quote ORDER BY quote_id") == [
+        ("x00001", "C001", "LM317T/TR", "LM317T", 100, 100),
+        ("x00002", "C002", "NE555", "NE555", 2, 2),
+    ]
+    assert fetch("SELECT cli_id, has_inquiry FROM uni_cli ORDER BY cli_id") == [("C001", 1), ("C002", 1)]
+
+
+def test_text_and_skill_paths(temp_db):
+    temp_db(SEED_SQL)
+    assert batch_import_quote_text("客户编号,询价型号\nC001,A1\nC002,A2") == (2, [])
+    ok, errors, ids = batch_add_quotes([{"cli_id": "C001", "inquiry_mpn": "B1"}, {"cli_id": "C001"}])
+    assert (ok, ids) == (1, ["x00003"])
+    assert errors == ["缺少询价型号"]
+
+
+def test_convert_quotes_to_offers(temp_db):
+    temp_db(SEED_SQL)
+    batch_import_quote_text("C001,A1,,,10,,8\nC002,A2,,,5,,4")
+    ok, msg = batch_convert_from_quote(["x00001", "x00002"], "000")
+    assert ok, msg
+    assert fetch("SELECT offer_id, quote_id, cli_id, quoted_qty, offer_price_rmb, price_kwr FROM uni_offer ORDER BY offer_id") == [
+        ("b00001", "x00001", "C001", 10, pytest.approx(8.8), pytest.approx(1760.0)),
+        ("b00002", "x00002", "C002", 5, 4.0, 800.0),
+    ]
+    assert fetch("SELECT DISTINCT is_transferred, status FROM uni_quote") == [("已转", "已报价")]
+
+    ok, msg = batch_convert_from_quote(["x00001"], "000")
+    assert not ok and "已转换过报价 (b00001)" in msg
+    assert batch_convert_from_quote(["x00001"], "999") == (False, "员工编号 999 不存在")
+
+
+def test_repeated_quote_in_batch(temp_db):
+    temp_db(SEED_SQL)
+    batch_import_quote_text("C001,A1,,,10,,8")
+    items = [(f"第 {i} 行", {'quote_id': 'x00001', 'inquiry_mpn': 'A1'}) for i in range(1, 4)]
+    with base.get_db_connection() as conn:
+        created, errors = _insert_offers(conn, items, "000")
+        conn.commit()
+    assert len(created) == 1
+    assert errors == ["第 2 行: 该需求 x00001 在同一批次中重复", "第 3 行: 该需求 x00001 在同一批次中重复"]
+
+
+def test_import_offer_text(temp_db):
+    temp_db(SEED_SQL)
+    text = "日期,询价型号\n2026-01-15,M1,,TI,,100,,,2,,甲公司\n2026-01-16,,,,\n2026-01-16,M2,,,,1,,,,,未知客户"
+    ok, errors = batch_import_offer_text(text, "000")
+    assert ok == 2 and errors == ["第 3 行: 缺少型号信息"]
+    assert fetch("SELECT offer_id, cli_id, offer_date, offer_price_rmb FROM uni_offer ORDER BY offer_id") == [
+        ("b00001", "C001", "2026-01-15", 2.0),
+        ("b00002", None, "2026-01-16", 0.0),
+    ]
+
+
+def test_offer_order_buy_chain(temp_db):
+    temp_db(SEED_SQL)
+    batch_import_quote_text("C001,A1,,,10,,8\nC002,A2,,,5,,4")
+    batch_convert_from_quote(["x00001", "x00002"], "000")
+    batch_import_offer_text("2026-01-15,M3,,,,1,,,2", "000")  # 没有关联需求，无法确定客户
+
+    ok, msg = batch_convert_from_offer(["b00001", "b00002", "b00003"])
+    assert (ok, msg) == (True, "成功转换 2 条记录 (失败 1 条)")
+    assert fetch("SELECT order_id, order_no, cli_id, offer_id, inquiry_mpn, price_rmb FROM uni_order ORDER BY order_id") == [
+        ("d00001", "d00001", "C001", "b00001", "A1", pytest.approx(8.8)),
+        ("d00002", "d00002", "C002", "b00002", "A2", 4.0),
+    ]
+    assert fetch("SELECT offer_id FROM uni_offer WHERE is_transferred = '已转' ORDER BY offer_id") == [("b00001",), ("b00002",)]
+    assert batch_convert_from_offer(["b00001"]) == (False, "b00001: 已存在销售订单")
+    assert batch_convert_from_offer(["b00003"], cli_id="C002") == (True, "成功转换 1 条记录")
+
+    ok, msg = batch_convert_from_order(["d00001", "d00002"])
+    assert (ok, msg) == (True, "成功转换 2 条记录")
+    assert fetch("SELECT buy_id, order_id, buy_qty, buy_price_rmb, sales_price_rmb, total_amount FROM uni_buy ORDER BY buy_id") == [
+        ("c00001", "d00001", 10, 8.0, pytest.approx(8.8), 80.0),
+        ("c00002", "d00002", 5, 4.0, 4.0, 20.0),
+    ]
+    assert batch_convert_from_order(["d00002"]) == (False, "d00002: 已存在采购记录")
+    assert fetch("SELECT COUNT(*) FROM uni_order WHERE is_transferred = '已转'") == [(2,)]
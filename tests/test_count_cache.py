@@ -0,0 +1,68 @@
+"""
+列表行数缓存测试
+
+验证 COUNT(*) 缓存按表写版本失效（提交后失效、回滚不失效、关联表写入也失效），
+以及大表无筛选时使用 sqlite_stat1 估算总数。
+"""
+
+import Sills.base as base
+from Sills.base import count_rows, get_count_cache_stats, get_table_versions
+
+COUNT_SQL = "SELECT COUNT(*) FROM uni_buy b LEFT JOIN uni_vendor v ON b.vendor_id = v.vendor_id WHERE v.vendor_name LIKE ?"
+
+SEED_SQL = """
+    CREATE TABLE uni_vendor (vendor_id TEXT PRIMARY KEY, vendor_name TEXT);
+    CREATE TABLE uni_buy (buy_id TEXT PRIMARY KEY, vendor_id TEXT);
+    INSERT INTO uni_vendor VALUES ('V001', 'Arrow');
+    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < 29)
+    INSERT INTO uni_buy SELECT printf('c%05d', i), 'V001' FROM n;
+"""
+
+
+def _count():
+    with base.get_db_connection() as conn:
+        return count_rows(conn, COUNT_SQL, ["%Arrow%"])
+
+
+def test_cached_until_commit(temp_db):
+    temp_db(SEED_SQL, init=False)
+    assert _count() == 30
+    hits = get_count_cache_stats()["hits"]
+    assert _count() == 30
+    assert get_count_cache_stats()["hits"] == hits + 1
+
+    # 回滚的写入不改变版本
+    versions = get_table_versions(("uni_buy",))
+    conn = base.get_db_connection()
+    conn.execute("DELETE FROM uni_buy")
+    conn.rollback()
+    conn.close()
+    assert get_table_versions(("uni_buy",)) == versions
+    assert _count() == 30
+
+    with base.get_db_connection() as conn:
+        conn.execute("INSERT INTO uni_buy VALUES ('c99999', 'V001')")
+    assert _count() == 31
+
+
+def test_joined_table_write_invalidates(temp_db):
+    temp_db(SEED_SQL, init=False)
+    assert _count() == 30
+    with base.get_db_connection() as conn:
+        conn.execute("UPDATE uni_vendor SET vendor_name = 'Avnet'")
+    assert _count() == 0
+
+
+def test_approximate_count(temp_db, monkeypatch):
+    temp_db(SEED_SQL, init=False)
+    with base.get_db_connection() as conn:
+        # 从未 ANALYZE：没有统计信息，回退到精确计数
+        assert base.approximate_count(conn, "uni_buy") is None
+    base.refresh_table_stats()
+    monkeypatch.setattr(base, "COUNT_APPROX_MIN_ROWS", 10)
+    with base.get_db_connection() as conn:
+        assert base.approximate_count(conn, "uni_buy") == 30
+        assert count_rows(conn, "SELECT COUNT(*) FROM uni_buy", approx_table="uni_buy") == 30
+    monkeypatch.setattr(base, "COUNT_APPROX_MIN_ROWS", 1000)
+    with base.get_db_connection() as conn:
+        assert base.approximate_count(conn, "uni_buy") is None
@@ -0,0 +1,86 @@
+"""
+异步数据库访问层测试
+
+验证长时间导入在 bulk 线程池中执行时，列表查询仍能在 query 线程池中及时返回，
+并且事件循环本身不会被阻塞。
+"""
+
+import asyncio
+import time
+
+import Sills.base as base
+from Sills.db_async import run_db, run_db_bulk, get_db_executor_stats
+
+SLOW_IMPORT_SECONDS = 1.0
+
+# 只包含一张简单的询价表
+SEED_SQL = """
+    CREATE TABLE uni_quote (quote_id TEXT PRIMARY KEY, inquiry_mpn TEXT);
+    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < 99)
+    INSERT INTO uni_quote SELECT printf('x%05d', i), 'MPN' || i FROM n;
+"""
+
+
+def slow_import(rows):
+    """模拟大导入：在一个事务中逐行写入并持有连接"""
+    with base.get_db_connection() as conn:
+        for i in range(rows):
+            conn.execute("INSERT INTO uni_quote VALUES (?, ?)", (f"y{i:05d}", f"IMP{i}"))
+            time.sleep(SLOW_IMPORT_SECONDS / rows)
+    return rows, []
+
+
+def list_quotes():
+    with base.get_db_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM uni_quote WHERE quote_id LIKE 'x%'").fetchone()[0]
+
+
+def test_query_not_blocked_by_bulk_import(temp_db):
+    temp_db(SEED_SQL, init=False)
+
+    async def scenario():
+        start = time.perf_counter()
+        import_task = asyncio.ensure_future(run_db_bulk(slow_import, 50))
+        await asyncio.sleep(0.05)
+
+        # 导入进行中，并发发起多个列表请求
+        counts = await asyncio.gather(*[run_db(list_quotes) for _ in range(5)])
+        query_elapsed = time.perf_counter() - start
+        import_pending = not import_task.done()
+
+        success_count, errors = await import_task
+        return counts, query_elapsed, import_pending, success_count, errors
+
+    counts, query_elapsed, import_pending, success_count, errors = asyncio.run(scenario())
+
+    assert counts == [100] * 5
+    assert import_pending
+    assert query_elapsed < SLOW_IMPORT_SECONDS / 2
+    assert success_count == 50 and errors == []
+
+
+def test_event_loop_stays_responsive(temp_db):
+    temp_db(SEED_SQL, init=False)
+
+    async def scenario():
+        import_task = asyncio.ensure_future(run_db_bulk(slow_import, 20))
+        # 事件循环上的定时任务应按时被调度
+        ticks = 0
+        start = time.perf_counter()
+        while not import_task.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        await import_task
+        return ticks, time.perf_counter() - start
+
+    ticks, elapsed = asyncio.run(scenario())
+    assert ticks >= elapsed / 0.01 * 0.5
+
+
+def test_executor_stats(temp_db):
+    temp_db(SEED_SQL, init=False)
+    asyncio.run(run_db(list_quotes))
+    stats = get_db_executor_stats()
+    assert set(stats) == {"query", "bulk"}
+    assert stats["query"]["completed"] >= 1
+    assert stats["query"]["active"] == 0
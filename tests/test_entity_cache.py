@@ -0,0 +1,75 @@
+"""
+主数据缓存测试
+
+验证按编号/名称查询、命中率统计、db_cli 等写入后失效、直接 SQL 写入按表写版本失效，
+营销状态未变化时同步不使客户缓存失效。
+"""
+
+import Sills.base as base
+from Sills.db_cli import add_cli, sync_cli_marketing_status, update_cli
+from Sills.db_order import add_order
+from Sills.entity_cache import entity_exists, entity_name_map, find_entity_id, get_entity, get_entity_cache_stats
+
+SEED_SQL = """
+    INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES ('C001', 'Alpha Corp', '000');
+    INSERT INTO uni_vendor (vendor_id, vendor_name) VALUES ('V001', '供应商甲');
+"""
+
+
+def test_lookups_and_stats(temp_db):
+    temp_db(SEED_SQL)
+    before = get_entity_cache_stats()['cli']
+    assert find_entity_id('cli', 'Alpha Corp') == 'C001'
+    assert find_entity_id('cli', 'alphacorp') is None
+    assert find_entity_id('cli', ' ALPHA corp', loose=True) == 'C001'
+    assert get_entity('cli', 'C001')['cli_name'] == 'Alpha Corp'
+    assert entity_exists('vendor', 'V001') and not entity_exists('vendor', 'V999')
+    assert 'password' not in get_entity('emp', '000')
+
+    stats = get_entity_cache_stats()['cli']
+    assert stats['loads'] - before['loads'] == 1
+    assert stats['hits'] - before['hits'] == 3
+    assert stats['rows'] == 1
+
+
+def test_invalidation(temp_db):
+    temp_db(SEED_SQL)
+    assert entity_name_map('cli') == {'Alpha Corp': 'C001'}
+    ok, _ = add_cli({'cli_id': 'C002', 'cli_name': 'Beta', 'emp_id': '000'})
+    assert ok and find_entity_id('cli', 'Beta')
+    assert update_cli('C001', {'cli_name': 'Alpha Ltd'})[0]
+    assert get_entity('cli', 'C001')['cli_name'] == 'Alpha Ltd'
+
+    # 不经过 db_cli 的写入按表写版本失效
+    with base.get_db_connection() as conn:
+        conn.execute("DELETE FROM uni_cli WHERE cli_name = 'Beta'")
+    assert entity_name_map('cli') == {'Alpha Ltd': 'C001'}
+
+
+def test_miss_falls_back_to_caller_connection(temp_db):
+    temp_db(SEED_SQL)
+    assert not entity_exists('cli', 'C009')
+    with base.get_db_connection() as conn:
+        # 同一事务中刚插入、尚未提交的客户只在调用方连接上可见
+        conn.execute("INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES ('C009', 'Gamma', '000')")
+        assert not entity_exists('cli', 'C009')
+        assert entity_exists('cli', 'C009', conn)
+        assert get_entity('cli', 'C009', conn)['cli_name'] == 'Gamma'
+        assert not entity_exists('cli', 'C404', conn)
+        ok, msg = add_order({'cli_id': 'C009', 'inquiry_mpn': 'LM358'}, conn)
+        assert ok, msg
+
+
+def test_unchanged_marketing_status_keeps_cache(temp_db):
+    temp_db(SEED_SQL)
+    with base.get_db_connection() as conn:
+        conn.execute("INSERT INTO uni_quote (quote_id, cli_id, inquiry_mpn) VALUES ('x00001', 'C001', 'LM358')")
+    assert sync_cli_marketing_status('C001')[0]
+    assert get_entity('cli', 'C001')['has_inquiry'] == 1
+    loads = get_entity_cache_stats()['cli']['loads']
+
+    with base.get_db_connection() as conn:
+        conn.execute("INSERT INTO uni_quote (quote_id, cli_id, inquiry_mpn) VALUES ('x00002', 'C001', 'LM317')")
+    assert sync_cli_marketing_status('C001')[0]
+    assert get_entity('cli', 'C001')['has_inquiry'] == 1
+    assert get_entity_cache_stats()['cli']['loads'] == loads
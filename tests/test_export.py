@@ -0,0 +1,55 @@
+"""
+按筛选条件导出测试
+
+验证导出使用列表页的筛选条件、CSV 分块输出可还原为完整文件、KRW/USD 为空时按汇率补算，
+以及 XLSX 只写模式导出（需要 openpyxl）。
+"""
+
+import csv
+import io
+
+import pytest
+
+import Sills.db_export as db_export
+from Sills.db_export import iter_export_rows, stream_export
+
+# 4000 条订单：KRW 隔行为空，第 1 条备注含逗号和换行
+SEED_SQL = """
+    INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES ('C001', '甲公司', '000');
+    INSERT INTO uni_daily (record_date, currency_code, exchange_rate) VALUES ('2026-01-01', 1, 0.14), ('2026-01-01', 2, 200);
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 4000)
+    INSERT INTO uni_order (order_id, order_no, order_date, cli_id, inquiry_mpn, price_rmb, price_kwr, cost_price_rmb, remark)
+    SELECT printf('d%05d', i), printf('d%05d', i), printf('2026-01-%02d', i % 28 + 1), 'C001', 'MPN' || i, 10.0,
+           CASE WHEN i % 2 THEN NULL ELSE 2100.0 END, 8.0, CASE WHEN i = 1 THEN '含,逗号' || char(10) || '换行' ELSE '' END
+    FROM n;
+"""
+
+
+def test_filtered_csv(temp_db, monkeypatch):
+    temp_db(SEED_SQL)
+    rows = list(iter_export_rows('order', start_date="2026-01-02", end_date="2026-01-03"))
+    assert rows[0][:3] == ['订单日期', '订单编号', '客户']
+    assert {r[0] for r in rows[1:]} == {"2026-01-02", "2026-01-03"}
+    by_no = {r[1]: r for r in rows[1:]}
+    assert by_no["d00001"][7:9] == [2000.0, 1.4]  # KRW 为空，按汇率补算
+    assert by_no["d00001"][-1] == "含,逗号\n换行"
+    assert by_no["d00002"][7] == 2100.0
+
+    monkeypatch.setattr(db_export, "BATCH_SIZE", 500)
+    chunks, media_type = stream_export('order', 'csv', search_kw="")
+    chunks = list(chunks)
+    assert media_type.startswith("text/csv") and len(chunks) > 1
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode('utf-8-sig'))))
+    assert len(parsed) == 4001
+    assert parsed[1][0] == "2026-01-28"  # 列表页排序：订单日期倒序
+
+    with pytest.raises(ValueError):
+        stream_export('order', 'pdf')
+
+
+def test_xlsx(temp_db):
+    temp_db(SEED_SQL)
+    openpyxl = pytest.importorskip("openpyxl")
+    chunks, _ = stream_export('order', 'xlsx', cli_id="C001")
+    ws = openpyxl.load_workbook(io.BytesIO(b"".join(chunks)), read_only=True).active
+    assert sum(1 for _ in ws.iter_rows()) == 4001  # 只写模式不记录 dimension，需逐行计数
@@ -0,0 +1,89 @@
+"""
+历史订单导入测试
+
+验证客户按名称匹配/批量创建、已导入型号和同批重复型号跳过、数量与价格的默认值和格式错误、
+汇率计价，以及订单汇总随导入更新。
+"""
+
+import pandas as pd
+
+import Sills.base as base
+from Sills.db_history_import import import_history_frame, parse_excel
+
+COLUMNS = ['客户订单号', '客户名称', '订单日期', '型号', '品牌', '数量', '单价(RMB)', '成本价(RMB)']
+
+SEED_SQL = """
+    INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES ('C900', 'Alpha Corp', '000');
+    INSERT INTO uni_daily (record_date, currency_code, exchange_rate) VALUES ('2026-01-01', 1, 0.14), ('2026-01-01', 2, 200);
+"""
+
+
+def test_import(temp_db):
+    temp_db(SEED_SQL)
+    df = pd.DataFrame([
+        [1001, 'alpha corp', '2025-03-01', 'LM317', 'TI', 10, 2.5, 2.0],
+        [1001, 'alpha corp', '2025-03-01', 'LM317', 'TI', 10, 2.5, 2.0],   # 同批重复
+        [1001, 'alpha corp', '2025-03-01', 'NE555', '', None, None, None],  # 数量默认 1，价格默认 0
+        ['A-2', 'Beta Ltd', '坏日期', 'BAV99', 'NXP', 'x', 1, 1],            # 数量格式错误
+        ['A-2', 'Beta Ltd', '坏日期', 'BAT54', 'NXP', 5, 1, 1],
+        ['A-3', 'BETA ltd', None, '', '', 1, 1, 1],                          # 型号为空
+        ['A-4', None, None, 'X1', '', 1, 1, 1],                              # 客户为空
+    ], columns=COLUMNS)
+    result = import_history_frame(df, '000')
+    assert (result['success'], result['skip'], result['fail']) == (3, 2, 2), result['errors']
+    assert set(result['timings']) == {'normalize', 'resolve', 'insert', 'total'}
+
+    with base.get_db_connection() as conn:
+        managers = {r['customer_order_no']: dict(r) for r in conn.execute("SELECT * FROM uni_order_manager").fetchall()}
+        assert managers['1001']['cli_id'] == 'C900' and managers['1001']['order_date'] == '2025-03-01'
+        assert managers['1001']['model_count'] == 2
+        beta = conn.execute("SELECT cli_id, emp_id FROM uni_cli WHERE cli_name = 'Beta Ltd'").fetchone()
+        assert managers['A-2']['cli_id'] == beta['cli_id'] and beta['emp_id'] == '000'
+        assert conn.execute("SELECT COUNT(*) FROM uni_cli").fetchone()[0] == 2  # BETA ltd 与 Beta Ltd 为同一客户
+        offers = {r['inquiry_mpn']: dict(r) for r in conn.execute("SELECT * FROM uni_offer").fetchall()}
+        assert offers['LM317']['price_kwr'] == 500.0 and offers['LM317']['price_usd'] == 0.35
+        assert offers['NE555']['inquiry_qty'] == 1 and offers['NE555']['offer_price_rmb'] == 0
+
+    # 再次导入：已导入的型号全部跳过，新型号加入已有订单
+    df.loc[2, '型号'] = 'NE556'
+    again = import_history_frame(df, '000')
+    assert again['success'] == 1 and again['skip'] == 4, again['errors']
+    with base.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM uni_order_manager").fetchone()[0] == 3  # 1001、A-2、A-3（A-3 型号为空也建立订单）
+
+
+def order_dates():
+    with base.get_db_connection() as conn:
+        return {r[0]: r[1] for r in conn.execute("SELECT customer_order_no, order_date FROM uni_order_manager").fetchall()}
+
+
+def test_excel_date_cells(temp_db, tmp_path):
+    temp_db(SEED_SQL)
+    # 日期单元格经 read_excel 读回为 datetime64 列
+    path = tmp_path / "history.xlsx"
+    pd.DataFrame([
+        ['D-1', 'Alpha Corp', pd.Timestamp('2024-05-06'), 'LM317', 'TI', 1, 1, 1],
+        ['D-2', 'Alpha Corp', pd.NaT, 'NE555', 'TI', 1, 1, 1],
+    ], columns=COLUMNS).to_excel(path, index=False)
+    df = parse_excel(path)
+    assert pd.api.types.is_datetime64_any_dtype(df['订单日期'])
+    result = import_history_frame(df, '000')
+    assert result['success'] == 2, result['errors']
+    today = pd.Timestamp.now().strftime('%Y-%m-%d')
+    assert order_dates() == {'D-1': '2024-05-06', 'D-2': today}
+
+
+def test_empty_and_mixed_date_columns(temp_db):
+    temp_db(SEED_SQL)
+    today = pd.Timestamp.now().strftime('%Y-%m-%d')
+    empty = pd.DataFrame([['E-1', 'Alpha Corp', None, 'LM317', 'TI', 1, 1, 1]], columns=COLUMNS)
+    empty['订单日期'] = empty['订单日期'].astype(float)  # 整列为空时 read_excel 返回浮点列
+    assert import_history_frame(empty, '000')['success'] == 1
+
+    mixed = pd.DataFrame([
+        ['M-1', 'Alpha Corp', pd.Timestamp('2023-01-02'), 'BAV99', 'NXP', 1, 1, 1],
+        ['M-2', 'Alpha Corp', ' 2023-02-03 ', 'BAT54', 'NXP', 1, 1, 1],
+        ['M-3', 'Alpha Corp', 45000, 'BC847', 'NXP', 1, 1, 1],  # 数字不当作日期
+    ], columns=COLUMNS)
+    assert import_history_frame(mixed, '000')['success'] == 3
+    assert order_dates() == {'E-1': today, 'M-1': '2023-01-02', 'M-2': '2023-02-03', 'M-3': today}
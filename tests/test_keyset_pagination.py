@@ -0,0 +1,76 @@
+"""
+游标（keyset）分页测试
+
+验证 after=<created_at,id> 游标逐页遍历不重不漏（含 created_at 相同的行），
+并且查询走 (created_at, 主键) 复合索引。
+"""
+
+import pytest
+
+import Sills.base as base
+from Sills.base import get_paginated_list, parse_keyset_cursor
+
+ROW_COUNT = 95
+
+# 每 4 行共用一个 created_at，验证同一时间戳内按主键继续翻页
+SEED_SQL = f"""
+    CREATE TABLE uni_vendor (vendor_id TEXT PRIMARY KEY, vendor_name TEXT, created_at DATETIME);
+    CREATE INDEX idx_vendor_created_id ON uni_vendor(created_at DESC, vendor_id DESC);
+    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {ROW_COUNT - 1})
+    INSERT INTO uni_vendor SELECT printf('V%04d', i), 'Vendor ' || i, printf('2026-01-01 10:%02d:%02d', i / 4 / 60, i / 4 % 60) FROM n;
+"""
+
+
+def test_keyset_walk_matches_offset(temp_db):
+    temp_db(SEED_SQL, init=False)
+    seen = []
+    after = ""
+    pages = 0
+    while after is not None:
+        result = get_paginated_list("uni_vendor", page_size=10, after=after)
+        assert result["total_count"] is None
+        seen.extend(item["vendor_id"] for item in result["items"])
+        after = result["next_cursor"]
+        pages += 1
+
+    assert pages == 10
+    assert len(seen) == len(set(seen)) == ROW_COUNT
+    assert seen == [f"V{i:04d}" for i in range(ROW_COUNT - 1, -1, -1)]
+
+
+def test_keyset_with_search(temp_db):
+    temp_db(SEED_SQL, init=False)
+    first = get_paginated_list("uni_vendor", page_size=3, search_kwargs={"vendor_name": "Vendor 1"}, after="")
+    second = get_paginated_list("uni_vendor", page_size=3, search_kwargs={"vendor_name": "Vendor 1"},
+                                after=first["next_cursor"])
+    ids = [i["vendor_id"] for i in first["items"] + second["items"]]
+    assert len(set(ids)) == 6
+    assert all(i["vendor_name"].startswith("Vendor 1") for i in first["items"] + second["items"])
+
+
+def test_offset_mode_unchanged(temp_db):
+    temp_db(SEED_SQL, init=False)
+    result = get_paginated_list("uni_vendor", page=2, page_size=10)
+    assert result["total_count"] == ROW_COUNT
+    assert result["total_pages"] == 10
+    assert len(result["items"]) == 10
+
+
+def test_parse_cursor():
+    assert parse_keyset_cursor("") is None
+    assert parse_keyset_cursor(None) is None
+    assert parse_keyset_cursor("2026-01-01 10:00:00,V0001") == ("2026-01-01 10:00:00", "V0001")
+    with pytest.raises(ValueError):
+        parse_keyset_cursor("2026-01-01")
+
+
+def test_keyset_uses_index(temp_db):
+    temp_db(SEED_SQL, init=False)
+    with base.get_db_connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM uni_vendor WHERE created_at <= ? AND (created_at < ? OR vendor_id < ?) "
+            "ORDER BY created_at DESC, vendor_id DESC LIMIT 11",
+            ["2026-01-01 10:00:05", "2026-01-01 10:00:05", "V0020"]).fetchall()
+    detail = " ".join(row[3] for row in plan)
+    assert "idx_vendor_created_id" in detail
+    assert "TEMP B-TREE" not in detail
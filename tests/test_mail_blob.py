@@ -0,0 +1,93 @@
+"""
+邮件内容寻址存储测试
+
+验证内嵌图片写入 blob 并在 HTML 中引用 blob 地址（多封邮件同一图片只存一份）、
+超大正文存 blob 且读取邮件时还原（只有位图图片可在页面中直接显示），以及旧邮件 data URI / 超大正文的一次性转存。
+blob 目录在临时数据库文件旁。
+"""
+
+import base64
+import os
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import Sills.base as base
+from Sills.db_mail import save_email, get_mail_by_id
+from Sills.mail_blob import MAIL_BODY_BLOB_THRESHOLD, blob_dir, get_blob, is_inline_image, migrate_mail_blobs
+from Sills.mail_service import IMAPClient
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+
+
+def inline_image_mail(message_id):
+    msg = MIMEMultipart('related')
+    msg['Subject'] = 'Datasheet'
+    msg['From'] = 'vendor@example.com'
+    msg['Message-ID'] = f'<{message_id}>'
+    msg.attach(MIMEText('<p>Logo</p><img src="cid:logo@example">', 'html'))
+    image = MIMEImage(PNG, 'png')
+    image.add_header('Content-ID', '<logo@example>')
+    msg.attach(image)
+    return msg.as_bytes()
+
+
+def blob_files():
+    return [name for _, _, files in os.walk(blob_dir()) for name in files]
+
+
+def test_inline_images_and_large_bodies(temp_db):
+    temp_db()
+    client = IMAPClient({'imap_server': 'unused'})
+    ids = []
+    for i in range(2):
+        parsed = client._parse_email(inline_image_mail(f'img-{i}@test'))
+        assert 'base64' not in parsed['html_content'] and '/api/mail/blob/' in parsed['html_content']
+        ids.append(save_email(parsed))
+    assert len(blob_files()) == 1  # 两封邮件同一图片只存一份
+
+    blob_hash = parsed['html_content'].split('/api/mail/blob/')[1][:64]
+    blob = get_blob(blob_hash)
+    assert blob['content_type'] == 'image/png' and open(blob['path'], 'rb').read() == PNG
+    assert get_blob('../' + blob_hash[3:]) is None and get_blob('0' * 64) is None
+    assert is_inline_image(blob['content_type'])
+
+    html = '<p>' + 'x' * MAIL_BODY_BLOB_THRESHOLD + '</p>'
+    mail_id = save_email({'subject': 'Big', 'from_addr': 'a@example.com', 'to_addr': 'me@example.com', 'message_id': '<big@test>',
+                          'content': 'short', 'html_content': html})
+    with base.get_db_connection() as conn:
+        row = conn.execute("SELECT content, html_content, html_blob FROM uni_mail WHERE id = ?", (mail_id,)).fetchone()
+    assert row[0] == 'short' and row[1] == '' and row[2]
+    mail = get_mail_by_id(mail_id)
+    assert mail['html_content'] == html and mail['content'] == 'short'
+    # 正文和 SVG 不在页面中直接打开
+    assert not is_inline_image(get_blob(row[2])['content_type'])
+    assert not is_inline_image('image/svg+xml') and not is_inline_image(None)
+
+
+def test_migrate_existing_rows(temp_db):
+    temp_db()
+    data_uri = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+    big_text = 'y' * (MAIL_BODY_BLOB_THRESHOLD + 1)
+    with base.get_db_connection() as conn:
+        conn.executemany("INSERT INTO uni_mail (subject, from_addr, to_addr, content, html_content) "
+                         "VALUES (?, 'a@example.com', 'me@example.com', ?, ?)", [
+            ('inline', '', f'<img src="{data_uri}"><img src=\'{data_uri}\'>'),
+            ('big', big_text, ''),
+            ('plain', 'hello', '<p>hello</p>'),
+        ])
+        conn.execute("DELETE FROM global_settings WHERE key = 'mail_blob_backfill'")
+        conn.commit()
+
+    assert migrate_mail_blobs(batch_size=2) == 2
+    assert migrate_mail_blobs() == 0  # 已完成，不再扫描
+
+    with base.get_db_connection() as conn:
+        rows = {r[0]: r[1:] for r in conn.execute(
+            "SELECT subject, id, content, html_content, content_blob, html_blob FROM uni_mail").fetchall()}
+        assert conn.execute("SELECT value FROM global_settings WHERE key = 'mail_blob_backfill'").fetchone()[0] == 'done'
+    assert 'base64' not in rows['inline'][2] and rows['inline'][2].count('/api/mail/blob/') == 2
+    assert rows['big'][1] == '' and rows['big'][3]
+    assert rows['plain'][1:] == ('hello', '<p>hello</p>', None, None)
+    assert get_mail_by_id(rows['big'][0])['content'] == big_text
+    assert len(blob_files()) == 2
@@ -0,0 +1,74 @@
+"""
+先同步邮件头、正文延迟下载测试
+
+使用本地 IMAP 测试服务器，验证同步只下载邮件头（body_state='pending'，传输量远小于整封邮件）、
+打开邮件时下载单封正文、后台任务补全其余正文，服务器上已删除的邮件标记为 missing，
+选择文件夹失败时邮件保持 pending。
+"""
+
+import pytest
+
+import Sills.base as base
+import Sills.mail_service as mail_service
+from imap_server import FakeIMAPServer, make_message
+
+
+@pytest.fixture
+def synced(temp_db, monkeypatch):
+    folders = {'INBOX': [], 'Sent': []}
+    for i in range(10):
+        raw = make_message(f"询价 {i}", f"m{i}@test").replace(b" body\r\n", b" body " + b"x" * 20000 + b"\r\n")
+        folders['INBOX' if i < 8 else 'Sent'].append((100 + i, raw))
+    server = FakeIMAPServer(folders).start()
+
+    temp_db(f"""
+        INSERT INTO mail_config (imap_server, imap_port, username, password, use_tls, sync_pause_seconds, is_current)
+        VALUES ('127.0.0.1', {server.port}, 'me@example.com', 'secret', 0, 0.01, 1);
+    """)
+    started = []
+    monkeypatch.setattr(mail_service, "start_body_download", started.append)
+
+    result = mail_service.sync_new_emails()
+    assert result['status'] == 'completed' and result['new_count'] == 10
+    assert started == [1]  # 同步完成后启动后台补全
+    yield server
+    server.stop()
+
+
+def mails():
+    with base.get_db_connection() as conn:
+        return {r['subject']: dict(r) for r in conn.execute("SELECT * FROM uni_mail").fetchall()}
+
+
+def test_headers_then_bodies(synced):
+    rows = mails()
+    assert {r['body_state'] for r in rows.values()} == {'pending'}
+    assert rows['询价 9']['is_sent'] == 1 and rows['询价 9']['from_addr'] == 'sender@example.com'
+    assert not rows['询价 0']['content']
+    assert synced.fetched_bytes < 10 * 20000 // 20  # 只传输了邮件头
+
+    # 打开邮件时下载正文
+    opened = mail_service.ensure_mail_body(rows['询价 0'])
+    assert opened['body_state'] == 'full' and opened['content'].startswith('询价 0 body xxx')
+    assert mails()['询价 0']['body_state'] == 'full'
+
+    # 后台补全其余正文；服务器上已删除的邮件不再重试
+    del synced.folders['INBOX'][-1]
+    assert mail_service.download_pending_bodies() == 9
+    rows = mails()
+    assert rows['询价 7']['body_state'] == 'missing'
+    assert {r['body_state'] for s, r in rows.items() if s != '询价 7'} == {'full'}
+    assert len(rows['询价 9']['content']) > 20000
+    assert mail_service.download_pending_bodies() == 0
+
+
+def test_select_failure_keeps_pending(synced):
+    # 文件夹暂时无法选择（SELECT 返回 NO）：不能当作邮件已删除
+    sent = synced.folders.pop('Sent')
+    mail_service.download_pending_bodies()
+    rows = mails()
+    assert {rows[f'询价 {i}']['body_state'] for i in (8, 9)} == {'pending'}
+
+    synced.folders['Sent'] = sent
+    mail_service.download_pending_bodies()
+    assert {r['body_state'] for r in mails().values()} == {'full'}
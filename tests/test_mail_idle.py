@@ -0,0 +1,86 @@
+"""
+IMAP IDLE 推送监听测试
+
+使用本地 IMAP 测试服务器（tests/imap_server.py，开启 IDLE），验证：
+服务器推送 EXISTS 后几秒内只同步收件箱新邮件（不列文件夹）、断线后退避重连并补同步断线期间的邮件、
+停止后线程退出，以及服务器不支持 IDLE 时监听退出为 unsupported。
+"""
+
+import time
+
+import pytest
+
+import Sills.base as base
+import Sills.mail_service as mail_service
+from Sills.mail_idle import IdleWatcher
+from imap_server import FakeIMAPServer, make_message
+
+
+def make_server(temp_db, idle=True):
+    folders = {'INBOX': [(100 + i, make_message(f"Inquiry {i}", f"INBOX-{i}@test")) for i in range(3)], 'Sent': []}
+    server = FakeIMAPServer(folders, idle=idle).start()
+    temp_db(f"""
+        INSERT INTO mail_config (imap_server, imap_port, username, password, use_tls, sync_pause_seconds,
+                                 sync_headers_first, is_current)
+        VALUES ('127.0.0.1', {server.port}, 'me@example.com', 'secret', 0, 0.01, 0, 1);
+    """)
+    with base.get_db_connection() as conn:
+        account_id = conn.execute("SELECT id FROM mail_config WHERE is_current = 1").fetchone()[0]
+    return server, account_id
+
+
+@pytest.fixture
+def imap_server(temp_db):
+    server, account_id = make_server(temp_db)
+    assert mail_service.sync_new_emails()['new_count'] == 3
+    yield server, account_id
+    server.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def saved(message_id):
+    with base.get_db_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM uni_mail WHERE message_id = ?", (message_id,)).fetchone()[0]
+
+
+def test_push_reconnect_and_stop(imap_server):
+    server, account_id = imap_server
+    watcher = IdleWatcher(account_id, min_backoff=0.1).start()
+    try:
+        assert wait_for(lambda: server.idlers)
+
+        server.commands.clear()
+        start = time.monotonic()
+        server.add_message('INBOX', make_message("New inquiry", "push-1@test"))
+        assert wait_for(lambda: saved('<push-1@test>') == 1)
+        assert time.monotonic() - start < 2
+        assert wait_for(lambda: server.idlers) and watcher.status()['new_count'] == 1
+        assert 'LIST' not in server.commands and server.commands[-1] == 'IDLE'  # 只同步收件箱后重新 IDLE
+
+        # 断线期间到达的邮件在重连后补同步
+        server.drop_connections()
+        assert wait_for(lambda: watcher.reconnects == 1)
+        server.add_message('INBOX', make_message("While offline", "push-2@test"))
+        assert wait_for(lambda: server.idlers and saved('<push-2@test>') == 1)
+        assert watcher.status()['new_count'] == 2 and watcher.status()['error'] is None
+    finally:
+        watcher.stop()
+    assert not watcher.is_alive() and watcher.state == 'stopped'
+
+
+def test_server_without_idle(temp_db):
+    server, account_id = make_server(temp_db, idle=False)
+    try:
+        watcher = IdleWatcher(account_id).start()
+        assert wait_for(lambda: not watcher.is_alive())
+        assert watcher.state == 'unsupported'
+    finally:
+        server.stop()
@@ -0,0 +1,92 @@
+"""
+邮件多连接并发同步测试
+
+使用本地 IMAP 测试服务器（tests/imap_server.py，每次 SELECT/FETCH 注入延迟），验证：
+多连接同步结果与单连接一致、同一封邮件出现在多个文件夹时只保存一份、
+进度按全部文件夹累计到总数、并发连接数不超过账户设置，且多文件夹时明显快于单连接；
+网络中断（连接全部断开且无法重连）时任务出错返回而不是一直等待。
+"""
+
+import threading
+import time
+
+import pytest
+
+import Sills.base as base
+import Sills.mail_service as mail_service
+from imap_server import FakeIMAPServer, make_message
+
+FOLDERS = ['INBOX', 'Sent', 'Drafts', 'Junk', 'Archive', 'Projects', 'Customers', 'Vendors']
+PER_FOLDER = 5
+DELAY = 0.08
+
+
+@pytest.fixture
+def imap_server():
+    folders = {name: [(100 + i, make_message(f"{name} {i}", f"{name}-{i}@test")) for i in range(PER_FOLDER)]
+               for name in FOLDERS}
+    folders['Archive'].append((200, make_message("INBOX 0 副本", "INBOX-0@test")))  # 与收件箱同一封邮件
+    server = FakeIMAPServer(folders, delay=DELAY).start()
+    yield server
+    server.stop()
+
+
+def run_sync(temp_db, monkeypatch, server, connections):
+    temp_db(f"""
+        INSERT INTO mail_config (imap_server, imap_port, username, password, use_tls, sync_pause_seconds,
+                                 sync_connections, sync_headers_first, is_current)
+        VALUES ('127.0.0.1', {server.port}, 'me@example.com', 'secret', 0, 0.01, {connections}, 0, 1);
+    """)
+    server.max_connections = 0
+
+    calls = []
+    update = mail_service.update_sync_progress
+    monkeypatch.setattr(mail_service, "update_sync_progress", lambda *a, **kw: (calls.append((a, kw)), update(*a, **kw)))
+
+    start = time.perf_counter()
+    result = mail_service.sync_new_emails()
+    elapsed = time.perf_counter() - start
+
+    with base.get_db_connection() as conn:
+        saved = {(r[0], r[1]) for r in conn.execute("SELECT message_id, is_sent FROM uni_mail").fetchall()}
+    synced = [kw['synced_emails'] for _, kw in calls if kw.get('synced_emails') is not None]
+    return result, saved, synced, elapsed
+
+
+def test_parallel_matches_serial(temp_db, monkeypatch, imap_server):
+    total = len(FOLDERS) * PER_FOLDER + 1
+
+    serial, serial_saved, _, serial_s = run_sync(temp_db, monkeypatch, imap_server, 1)
+    assert imap_server.max_connections == 1
+
+    result, saved, synced, parallel_s = run_sync(temp_db, monkeypatch, imap_server, 4)
+    assert result['status'] == serial['status'] == 'completed'
+    assert result['new_count'] == serial['new_count'] == total
+    assert saved == serial_saved and len(saved) == total - 1
+    assert ('<Sent-0@test>', 1) in saved
+    assert 1 < imap_server.max_connections <= 4
+    assert synced[-1] == total and synced == sorted(synced)
+    assert parallel_s < serial_s * 0.6, (serial_s, parallel_s)
+
+
+def test_network_drop_does_not_hang(monkeypatch, imap_server):
+    monkeypatch.setattr(mail_service, "MAIL_SYNC_ACQUIRE_POLL_SECONDS", 0.05)
+    pool = mail_service.FolderSyncPool({'imap_server': '127.0.0.1', 'imap_port': imap_server.port,
+                                        'username': 'me@example.com', 'password': 'secret', 'use_tls': 0}, size=3)
+    pool.open()
+    # 网络中断：已有连接断开，新连接被拒绝
+    imap_server.stop()
+    imap_server.drop_connections()
+
+    def fetch(client, folder):
+        time.sleep(0.1)  # 让其他任务先进入等待
+        return client.client.select(folder)
+
+    results = []
+    worker = threading.Thread(target=lambda: results.extend(pool.map(fetch, FOLDERS)), daemon=True)
+    worker.start()
+    worker.join(10)
+    pool.close()
+    assert not worker.is_alive(), "同步任务在连接全部断开后仍在等待"
+    assert len(results) == len(FOLDERS) and all(isinstance(r, Exception) for r in results)
+    assert any(isinstance(r, ConnectionError) for r in results)
@@ -0,0 +1,101 @@
+"""
+邮件文件夹同步状态测试
+
+使用本地 IMAP 测试服务器（tests/imap_server.py，开启 CONDSTORE），验证：
+没有变化时每个文件夹只发一条 STATUS；新邮件、已读标记变化（HIGHESTMODSEQ）和服务器删除都按增量同步；
+UIDVALIDITY 变化时重新完整对比且不产生重复邮件；收件箱由 IDLE 推送时定时同步只轮询其他文件夹。
+"""
+
+import pytest
+
+import Sills.base as base
+import Sills.mail_service as mail_service
+from imap_server import FakeIMAPServer, make_message
+
+FOLDERS = ['INBOX', 'Sent']
+MAILBOX_COMMANDS = {'STATUS', 'SELECT', 'EXAMINE', 'SEARCH', 'FETCH', 'UID SEARCH', 'UID FETCH'}
+
+
+@pytest.fixture
+def imap_server(temp_db):
+    folders = {name: [(100 + i, make_message(f"{name} {i}", f"{name}-{i}@test")) for i in range(3)]
+               for name in FOLDERS}
+    server = FakeIMAPServer(folders, condstore=True).start()
+    temp_db(f"""
+        INSERT INTO mail_config (imap_server, imap_port, username, password, use_tls, sync_pause_seconds,
+                                 sync_connections, sync_headers_first, is_current)
+        VALUES ('127.0.0.1', {server.port}, 'me@example.com', 'secret', 0, 0.01, 2, 0, 1);
+    """)
+    yield server
+    server.stop()
+
+
+def sync(server, fn=mail_service.sync_new_emails):
+    server.commands.clear()
+    result = fn()
+    assert result['status'] == 'completed', result
+    return result, [c for c in server.commands if c in MAILBOX_COMMANDS]
+
+
+def mails():
+    with base.get_db_connection() as conn:
+        return {r[0]: (r[1], r[2]) for r in conn.execute(
+            "SELECT message_id, imap_uid, is_read FROM uni_mail").fetchall()}
+
+
+def test_unchanged_folders_cost_one_status(imap_server):
+    result, _ = sync(imap_server)
+    assert result['new_count'] == 6
+
+    for fn in (mail_service.sync_new_emails, mail_service.refresh_emails):
+        result, commands = sync(imap_server, fn)
+        assert result['new_count'] == 0
+        assert commands == ['STATUS'] * len(FOLDERS)
+
+
+def test_new_mail_flags_and_expunge_are_deltas(imap_server):
+    sync(imap_server)
+
+    uid = imap_server.add_message('INBOX', make_message("INBOX new", "INBOX-new@test"))
+    imap_server.set_flags('INBOX', 101, {'\\Seen'})
+    imap_server.expunge('Sent', 102)
+
+    result, commands = sync(imap_server)
+    assert result['new_count'] == 1
+    assert 'UID FETCH' in commands and 'SEARCH' not in commands
+    saved = mails()
+    assert saved['<INBOX-new@test>'] == (uid, 0)
+    assert saved['<INBOX-1@test>'][1] == 1 and saved['<INBOX-0@test>'][1] == 0
+    assert saved['<Sent-2@test>'][0] is None and saved['<Sent-1@test>'][0] == 101
+
+    # 标记改回未读
+    imap_server.set_flags('INBOX', 101, set())
+    result, commands = sync(imap_server, mail_service.refresh_emails)
+    assert result['new_count'] == 0 and mails()['<INBOX-1@test>'][1] == 0
+    _, commands = sync(imap_server)
+    assert commands == ['STATUS'] * len(FOLDERS)
+
+
+def test_uidvalidity_change_rescans_without_duplicates(imap_server):
+    sync(imap_server)
+
+    imap_server.uid_validity['INBOX'] = 2
+    imap_server.folders['INBOX'] = [(uid + 10, raw) for uid, raw in imap_server.folders['INBOX']]
+
+    sync(imap_server)
+    saved = mails()
+    assert len(saved) == 6
+    assert saved['<INBOX-0@test>'][0] == 110 and saved['<Sent-0@test>'][0] == 100
+    _, commands = sync(imap_server)
+    assert commands == ['STATUS'] * len(FOLDERS)
+
+
+def test_exclude_inbox_polls_other_folders(imap_server):
+    sync(imap_server)
+
+    imap_server.add_message('INBOX', make_message("INBOX new", "INBOX-new@test"))
+    imap_server.add_message('Sent', make_message("Sent new", "Sent-new@test"))
+    result, commands = sync(imap_server, lambda: mail_service.sync_new_emails(exclude_inbox=True))
+    assert result['new_count'] == 1 and commands.count('STATUS') == len(FOLDERS) - 1
+    saved = mails()
+    assert '<Sent-new@test>' in saved and '<INBOX-new@test>' not in saved
@@ -0,0 +1,61 @@
+"""
+客户订单汇总测试
+
+验证关联/移除报价、修改报价价格数量、删除报价时汇总字段由触发器同步，
+以及 recalculate_all_managers 修复被改乱的汇总。
+"""
+
+import Sills.base as base
+from Sills.db_offer import update_offer
+from Sills.db_order_manager import add_offer_to_manager, recalculate_all_managers, remove_offer_from_manager
+
+SEED_SQL = """
+    INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES ('C001', '甲公司', '000');
+    INSERT INTO uni_offer (offer_id, inquiry_mpn, quoted_qty, offer_price_rmb, price_kwr, price_usd, cost_price_rmb, emp_id)
+    VALUES ('b00001', 'A', 10, 2.0, 400.0, 0.3, 1.5, '000'),
+           ('b00002', 'B', NULL, 5.0, 1000.0, 0.7, 4.0, '000');
+    INSERT INTO uni_order_manager (manager_id, customer_order_no, order_date, cli_id)
+    VALUES ('M1', 'PO-1', '2026-01-01', 'C001'), ('M2', 'PO-2', '2026-01-01', 'C001');
+"""
+
+
+def totals(manager_id="M1"):
+    with base.get_db_connection() as conn:
+        row = conn.execute("""
+            SELECT total_price_rmb, total_price_kwr, total_price_usd, total_cost_rmb, profit_rmb, model_count, total_qty
+            FROM uni_order_manager WHERE manager_id = ?
+        """, (manager_id,)).fetchone()
+    return tuple(row)
+
+
+def test_rel_and_offer_changes(temp_db):
+    temp_db(SEED_SQL)
+    assert add_offer_to_manager("M1", "b00001")[0]
+    assert totals() == (20.0, 4000.0, 3.0, 15.0, 5.0, 1, 10)
+    assert add_offer_to_manager("M1", "b00002")[0]  # 数量为空按 1 计
+    assert totals() == (25.0, 5000.0, 3.7, 19.0, 6.0, 2, 11)
+
+    with base.get_db_connection() as conn:
+        conn.execute("UPDATE uni_offer SET offer_price_rmb = 3.0, price_kwr = 600.0, quoted_qty = 20 WHERE offer_id = 'b00001'")
+    assert totals() == (65.0, 13000.0, 6.7, 34.0, 31.0, 2, 21)
+    ok, _ = update_offer("b00001", {"remark": "改备注"})  # 不涉及价格的修改不影响汇总
+    assert ok and totals() == (65.0, 13000.0, 6.7, 34.0, 31.0, 2, 21)
+    assert totals("M2") == (0, 0, 0, 0, 0, 0, 0)
+
+    assert remove_offer_from_manager("M1", "b00002")[0]
+    assert totals() == (60.0, 12000.0, 6.0, 30.0, 30.0, 1, 20)
+
+    with base.get_db_connection() as conn:
+        conn.execute("DELETE FROM uni_offer WHERE offer_id = 'b00001'")
+    assert totals() == (0, 0, 0, 0, 0, 0, 0)
+
+
+def test_recalculate_all_managers(temp_db):
+    temp_db(SEED_SQL)
+    add_offer_to_manager("M1", "b00001")
+    add_offer_to_manager("M2", "b00002")
+    with base.get_db_connection() as conn:
+        conn.execute("UPDATE uni_order_manager SET total_price_rmb = 999, model_count = 7")
+    assert recalculate_all_managers() == 2
+    assert totals("M1") == (20.0, 4000.0, 3.0, 15.0, 5.0, 1, 10)
+    assert totals("M2") == (5.0, 1000.0, 0.7, 4.0, 1.0, 1, 1)
@@ -0,0 +1,48 @@
+"""
+数据库版本迁移测试
+
+验证空 SQLite 库可以完整初始化（含此前新库缺失的列），
+重复启动只查询 schema_version，不再执行迁移。
+"""
+
+import Sills.base as base
+import Sills.db_migrations as db_migrations
+
+
+def columns(table):
+    with base.get_db_connection() as conn:
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def test_fresh_database(temp_db):
+    temp_db(init=False)
+    applied = db_migrations.run_migrations()
+    assert applied == [v for v, _, _ in db_migrations.MIGRATIONS]
+    assert {"actual_qty", "mpn_norm"} <= columns("uni_quote")
+    assert {"is_draft", "is_blacklisted", "mail_type", "original_recipient"} <= columns("uni_mail")
+    with base.get_db_connection() as conn:
+        assert db_migrations.get_schema_version(conn) == db_migrations.SCHEMA_VERSION
+        assert conn.execute("SELECT emp_id FROM uni_emp").fetchone()[0] == "000"
+
+
+def test_up_to_date_skips_migrations(temp_db, monkeypatch):
+    temp_db()
+
+    def fail():
+        raise AssertionError("不应重复执行迁移")
+
+    monkeypatch.setattr(db_migrations, "MIGRATIONS", [(v, n, fail) for v, n, _ in db_migrations.MIGRATIONS])
+    assert db_migrations.run_migrations() == []
+    assert db_migrations.get_startup_stats()["applied"] == []
+
+
+def test_new_migration_applied_once(temp_db, monkeypatch):
+    temp_db()
+    calls = []
+    new_version = db_migrations.SCHEMA_VERSION + 1
+    monkeypatch.setattr(db_migrations, "MIGRATIONS",
+                        db_migrations.MIGRATIONS + [(new_version, "test", lambda: calls.append(1))])
+    monkeypatch.setattr(db_migrations, "SCHEMA_VERSION", new_version)
+    assert db_migrations.run_migrations() == [new_version]
+    assert db_migrations.run_migrations() == []
+    assert calls == [1]
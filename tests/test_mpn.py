@@ -0,0 +1,79 @@
+"""
+型号规范化与精确查找测试
+
+验证 normalize_mpn 对常见写法的归一、mpn_norm 列/索引的迁移、历史数据回填，
+以及按规范型号的查找走 mpn_norm 索引。
+"""
+
+import pytest
+
+import Sills.base as base
+from Sills.db_mpn import backfill_mpn_norm, ensure_mpn_columns, lookup_mpn, normalize_mpn, with_mpn_norm
+
+SEED_SQL = """
+CREATE TABLE uni_cli (cli_id TEXT PRIMARY KEY, cli_name TEXT);
+CREATE TABLE uni_vendor (vendor_id TEXT PRIMARY KEY, vendor_name TEXT);
+CREATE TABLE uni_quote (quote_id TEXT PRIMARY KEY, quote_date TEXT, cli_id TEXT, inquiry_mpn TEXT, quoted_mpn TEXT,
+    inquiry_brand TEXT, inquiry_qty INTEGER, target_price_rmb REAL, cost_price_rmb REAL, status TEXT, created_at DATETIME);
+CREATE TABLE uni_offer (offer_id TEXT PRIMARY KEY, offer_date TEXT, quote_id TEXT, cli_id TEXT, inquiry_mpn TEXT,
+    quoted_mpn TEXT, quoted_brand TEXT, quoted_qty INTEGER, cost_price_rmb REAL, offer_price_rmb REAL,
+    vendor_id TEXT, status TEXT, created_at DATETIME);
+CREATE TABLE uni_order (order_id TEXT PRIMARY KEY, order_date TEXT, cli_id TEXT, offer_id TEXT, inquiry_mpn TEXT,
+    inquiry_brand TEXT, price_rmb REAL, cost_price_rmb REAL, created_at DATETIME);
+CREATE TABLE uni_buy (buy_id TEXT PRIMARY KEY, buy_date TEXT, order_id TEXT, vendor_id TEXT, buy_mpn TEXT,
+    buy_brand TEXT, buy_price_rmb REAL, buy_qty INTEGER, created_at DATETIME);
+INSERT INTO uni_cli VALUES ('C001', 'Samsung');
+INSERT INTO uni_quote (quote_id, cli_id, inquiry_mpn, created_at) VALUES
+    ('x00001', 'C001', 'LM317T', '2026-01-01'),
+    ('x00002', 'C001', 'lm317-t', '2026-01-02'),
+    ('x00003', 'C001', 'LM317 T/NOPB', '2026-01-03'),
+    ('x00004', 'C001', 'LM358DR', '2026-01-04');
+INSERT INTO uni_buy (buy_id, buy_mpn, created_at) VALUES ('c00001', 'LM317T-TR', '2026-01-05');
+"""
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("LM317T", "LM317T"),
+    ("lm317-t", "LM317T"),
+    ("LM317 T/NOPB", "LM317T"),
+    ("AD8605ARTZ-REEL7", "AD8605ARTZ"),
+    ("TPS54331DR_TRPBF", "TPS54331DR"),
+    ("74HC595D,118", "74HC595D"),
+    ("STM32F103C8T6 (TRAY)", "STM32F103C8T6"),
+    ("LM358DR", "LM358DR"),
+    ("", ""),
+    (None, ""),
+])
+def test_normalize(raw, expected):
+    assert normalize_mpn(raw) == expected
+
+
+def test_with_mpn_norm():
+    assert with_mpn_norm("uni_buy", {"buy_mpn": "lm317-t"})["mpn_norm"] == "LM317T"
+    assert "mpn_norm" not in with_mpn_norm("uni_buy", {"remark": "x"})
+
+
+def test_backfill_and_lookup(temp_db):
+    temp_db(SEED_SQL, init=False)
+    ensure_mpn_columns()
+    assert backfill_mpn_norm(batch_size=2) == 5
+    assert backfill_mpn_norm() == 0
+
+    result = lookup_mpn("LM317T/NOPB")
+    assert result["mpn_norm"] == "LM317T"
+    assert [r["quote_id"] for r in result["quote"]] == ["x00003", "x00002", "x00001"]
+    assert result["quote"][0]["cli_name"] == "Samsung"
+    assert [r["buy_id"] for r in result["buy"]] == ["c00001"]
+    assert result["offer"] == [] and result["order"] == []
+
+
+def test_lookup_uses_index(temp_db):
+    temp_db(SEED_SQL, init=False)
+    ensure_mpn_columns()
+    with base.get_db_connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT quote_id FROM uni_quote WHERE mpn_norm = ? ORDER BY created_at DESC LIMIT 50",
+            ["LM317T"]).fetchall()
+    detail = " ".join(row[3] for row in plan)
+    assert "idx_quote_mpn_norm" in detail
+    assert "TEMP B-TREE" not in detail
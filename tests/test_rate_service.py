@@ -0,0 +1,51 @@
+"""
+汇率服务测试
+
+验证按日期二分查找汇率、db_daily 写入后立即失效，以及没有记录时的默认值。
+"""
+
+import Sills.base as base
+from Sills.db_daily import add_daily, update_daily
+from Sills.rate_service import CURRENCY_KRW, CURRENCY_USD, DEFAULT_RATES, rate_as_of, rates_as_of
+
+SEED_SQL = f"""
+    CREATE TABLE uni_daily (id INTEGER PRIMARY KEY AUTOINCREMENT, record_date TEXT NOT NULL,
+        currency_code INTEGER NOT NULL, exchange_rate REAL NOT NULL, UNIQUE(record_date, currency_code));
+    INSERT INTO uni_daily (record_date, currency_code, exchange_rate) VALUES
+        ('2026-01-01', {CURRENCY_KRW}, 190.0),
+        ('2026-02-01', {CURRENCY_KRW}, 195.0),
+        ('2026-2-15', {CURRENCY_KRW}, 197.0),  -- 月份未补零的旧数据
+        ('2026-03-01', {CURRENCY_KRW}, 200.0),
+        ('2026-01-01', {CURRENCY_USD}, 0.138);
+"""
+
+
+def test_rate_as_of(temp_db):
+    temp_db(SEED_SQL, init=False)
+    assert rate_as_of(CURRENCY_KRW) == 200.0
+    assert rate_as_of(CURRENCY_KRW, "2026-02-01") == 195.0
+    assert rate_as_of(CURRENCY_KRW, "2026-02-20 15:30:00") == 197.0
+    assert rate_as_of(CURRENCY_KRW, "2026-2-10") == 195.0
+    assert rate_as_of(CURRENCY_KRW, "2025-12-31") == 190.0  # 早于第一条记录
+    assert rates_as_of("2026-01-15") == (190.0, 0.138)
+
+
+def test_invalidated_on_write(temp_db):
+    temp_db(SEED_SQL, init=False)
+    assert rate_as_of(CURRENCY_KRW) == 200.0
+    ok, _ = add_daily("2026-04-01", CURRENCY_KRW, 205.0)
+    assert ok
+    assert rate_as_of(CURRENCY_KRW) == 205.0
+    with base.get_db_connection() as conn:
+        row_id = conn.execute("SELECT id FROM uni_daily WHERE record_date = '2026-04-01'").fetchone()[0]
+    update_daily(row_id, 210.0)
+    assert rate_as_of(CURRENCY_KRW) == 210.0
+    assert rate_as_of(CURRENCY_KRW, "2026-03-15") == 200.0
+
+
+def test_defaults_without_rates(temp_db):
+    temp_db(SEED_SQL, init=False)
+    with base.get_db_connection() as conn:
+        conn.execute("DELETE FROM uni_daily")
+    assert rate_as_of(CURRENCY_KRW) == DEFAULT_RATES[CURRENCY_KRW]
+    assert base.get_exchange_rates() == (DEFAULT_RATES[CURRENCY_KRW], DEFAULT_RATES[CURRENCY_USD])
@@ -0,0 +1,58 @@
+"""
+批量重算价格测试
+
+验证预览不写入且与实际更新结果一致、只更新价格变化的行、按利润率重算 RMB，
+以及重算销售订单时销售汇总表随之更新。
+"""
+
+import pytest
+
+import Sills.base as base
+from Sills.db_reprice import reprice
+from Sills.db_sales_cube import query_sales_cube
+
+SEED_SQL = """
+    INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES ('C001', '甲公司', '000');
+    INSERT INTO uni_daily (record_date, currency_code, exchange_rate) VALUES ('2026-01-01', 1, 0.14), ('2026-01-01', 2, 200);
+    INSERT INTO uni_offer (offer_id, offer_date, cli_id, inquiry_mpn, offer_price_rmb, price_kwr, price_usd, cost_price_rmb, emp_id) VALUES
+        ('b00001', '2026-01-10', 'C001', 'A', 10.0, 1900.0, 1.3, 8.0, '000'),
+        ('b00002', '2026-01-20', 'C001', 'B', 5.0, 1000.0, 0.7, NULL, '000'),
+        ('b00003', '2026-02-01', 'C001', 'C', 4.0, 600.0, 0.5, 2.0, '000');
+    INSERT INTO uni_order (order_id, order_no, order_date, cli_id, offer_id, price_rmb, price_kwr, price_usd, cost_price_rmb)
+    VALUES ('d00001', 'd00001', '2026-01-15', 'C001', 'b00001', 10.0, 1900.0, 1.3, 8.0);
+"""
+
+
+def fetch(sql, params=()):
+    with base.get_db_connection() as conn:
+        return [tuple(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def test_preview_then_apply(temp_db):
+    temp_db(SEED_SQL)
+    before = fetch("SELECT * FROM uni_offer ORDER BY offer_id")
+    preview = reprice('offer', start_date="2026-01-01", end_date="2026-01-31")
+    assert fetch("SELECT * FROM uni_offer ORDER BY offer_id") == before
+    assert preview["changed"] == 1  # b00002 已是最新汇率
+    assert preview["preview"] == [{"id": "b00001", "old_rmb": 10.0, "old_kwr": 1900.0, "old_usd": 1.3,
+                                   "new_rmb": 10.0, "new_kwr": 2000.0, "new_usd": 1.4}]
+    assert preview["delta"] == {"price_rmb": 0, "price_kwr": 100.0, "price_usd": pytest.approx(0.1)}
+
+    applied = reprice('offer', start_date="2026-01-01", end_date="2026-01-31", dry_run=False)
+    assert applied["changed"] == 1
+    assert fetch("SELECT offer_id, price_kwr, price_usd FROM uni_offer ORDER BY offer_id") == [
+        ("b00001", 2000.0, 1.4), ("b00002", 1000.0, 0.7), ("b00003", 600.0, 0.5)]
+    assert reprice('offer', start_date="2026-01-01", end_date="2026-01-31")["changed"] == 0
+
+
+def test_margin_and_orders(temp_db):
+    temp_db(SEED_SQL)
+    result = reprice('offer', ids=["b00001", "b00002", "b00003"], margin_pct=50, dry_run=False)
+    assert result["changed"] == 2  # b00002 没有成本价，不处理
+    assert fetch("SELECT offer_id, offer_price_rmb, price_kwr, price_usd FROM uni_offer ORDER BY offer_id") == [
+        ("b00001", 12.0, 2400.0, 1.68), ("b00002", 5.0, 1000.0, 0.7), ("b00003", 3.0, 600.0, 0.42)]
+
+    assert reprice('order', cli_id="C001", dry_run=False)["changed"] == 1
+    assert query_sales_cube(group_by="")["total"]["revenue_kwr"] == 2000.0
+    with pytest.raises(ValueError):
+        reprice('buy')
@@ -0,0 +1,57 @@
+"""
+销售汇总表测试
+
+验证销售订单新增/修改/删除、关联报价数量和负责员工修改后汇总表同步，
+按月/客户/员工分组查询，以及全量重建结果与增量维护一致。
+"""
+
+import pytest
+
+import Sills.base as base
+from Sills.db_sales_cube import query_sales_cube, rebuild_sales_cube
+
+SEED_SQL = """
+    INSERT INTO uni_emp (emp_id, emp_name, account, password, rule) VALUES ('001', '张三', 'zs', 'x', '1');
+    INSERT INTO uni_cli (cli_id, cli_name, emp_id) VALUES ('C001', '甲公司', '000'), ('C002', '乙公司', '000');
+    INSERT INTO uni_offer (offer_id, inquiry_mpn, quoted_qty, emp_id) VALUES ('b00001', 'A', 10, '001'), ('b00002', 'A', NULL, '000');
+    INSERT INTO uni_order (order_id, order_date, cli_id, offer_id, price_rmb, price_kwr, price_usd, cost_price_rmb) VALUES
+        ('d00001', '2026-01-05', 'C001', 'b00001', 2.0, 400.0, 0.3, 1.5),
+        ('d00002', '2026-01-20', 'C002', 'b00002', 5.0, 1000.0, 0.7, 4.0),
+        ('d00003', '2026-02-01', 'C001', NULL, 1.0, 200.0, 0.1, 0.5);
+"""
+
+
+def cube_rows():
+    with base.get_db_connection() as conn:
+        return sorted(tuple(r) for r in conn.execute(
+            "SELECT day, cli_id, emp_id, revenue_rmb, cost_rmb, qty, order_count FROM uni_sales_cube WHERE order_count <> 0").fetchall())
+
+
+def test_incremental_matches_rebuild(temp_db):
+    temp_db(SEED_SQL)
+    result = query_sales_cube(group_by="month")
+    assert [(r['month'], r['revenue_rmb'], r['profit_rmb'], r['qty'], r['order_count']) for r in result['rows']] == [
+        ("2026-01", 25.0, 6.0, 11, 2), ("2026-02", 1.0, 0.5, 1, 1)]
+    assert result['total']['revenue_kwr'] == 5200.0
+
+    with base.get_db_connection() as conn:
+        conn.execute("UPDATE uni_offer SET quoted_qty = 20, emp_id = '000' WHERE offer_id = 'b00001'")
+        conn.execute("UPDATE uni_order SET price_rmb = 6.0, order_date = '2026-02-10' WHERE order_id = 'd00002'")
+        conn.execute("UPDATE uni_order SET remark = '不影响汇总' WHERE order_id = 'd00003'")
+        conn.execute("DELETE FROM uni_order WHERE order_id = 'd00003'")
+    incremental = cube_rows()
+    assert incremental == [("2026-01-05", "C001", "000", 40.0, 30.0, 20, 1), ("2026-02-10", "C002", "000", 6.0, 4.0, 1, 1)]
+    rebuild_sales_cube()
+    assert cube_rows() == incremental
+
+
+def test_group_by_and_filters(temp_db):
+    temp_db(SEED_SQL)
+    result = query_sales_cube("2026-01-01", "2026-01-31", group_by="cli,emp")
+    assert [(r['cli'], r['cli_name'], r['emp'], r['emp_name'], r['revenue_rmb']) for r in result['rows']] == [
+        ("C001", "甲公司", "001", "张三", 20.0), ("C002", "乙公司", "000", "超级管理员", 5.0)]
+    assert query_sales_cube(emp_id="001", group_by="")['total']['order_count'] == 1
+    empty = query_sales_cube(start_date="2099-01-01", group_by="")  # 只要总计：不生成无 GROUP BY 的 HAVING
+    assert empty['rows'] == [] and empty['total']['revenue_rmb'] == 0
+    with pytest.raises(ValueError):
+        query_sales_cube(group_by="vendor")
@@ -0,0 +1,106 @@
+"""
+列表搜索索引测试
+
+验证 FTS5 trigram 索引由触发器保持同步（插入/修改/删除），
+搜索结果与原 LIKE '%kw%' 条件一致，短关键词和通配符退回 LIKE，
+业务表 rowid 变化（VACUUM）后结果不变，旧版按 rowid 对应的索引升级时重建。
+"""
+
+import Sills.base as base
+from Sills.db_search import build_search_condition, ensure_search_indexes, rebuild_search_index, text_match_sql
+
+SEED_SQL = """
+CREATE TABLE uni_cli (cli_id TEXT PRIMARY KEY, cli_name TEXT);
+CREATE TABLE uni_quote (quote_id TEXT PRIMARY KEY, cli_id TEXT, inquiry_mpn TEXT);
+CREATE TABLE uni_offer (offer_id TEXT PRIMARY KEY, quote_id TEXT, cli_id TEXT, emp_id TEXT, inquiry_mpn TEXT);
+CREATE TABLE uni_order (order_id TEXT PRIMARY KEY, cli_id TEXT, inquiry_mpn TEXT);
+CREATE TABLE uni_buy (buy_id TEXT PRIMARY KEY, vendor_id TEXT, buy_mpn TEXT);
+INSERT INTO uni_cli VALUES ('C001', 'Samsung'), ('C002', 'LG Display');
+INSERT INTO uni_quote VALUES ('x00001', 'C001', 'LM358DR'), ('x00002', 'C002', 'STM32F103C8T6'), ('x00003', 'C001', 'lm317t');
+"""
+
+RELATED = ["SELECT quote_id FROM uni_quote WHERE cli_id IN (SELECT cli_id FROM uni_cli WHERE cli_name LIKE ?)"]
+
+
+def search(kw):
+    sql, params = build_search_condition("uni_quote", "q", kw, related=RELATED)
+    with base.get_db_connection() as conn:
+        rows = conn.execute(f"SELECT q.quote_id FROM uni_quote q WHERE {sql} ORDER BY q.quote_id", params).fetchall()
+    return [r[0] for r in rows]
+
+
+def legacy_search(kw):
+    with base.get_db_connection() as conn:
+        rows = conn.execute(
+            "SELECT q.quote_id FROM uni_quote q LEFT JOIN uni_cli c ON q.cli_id = c.cli_id "
+            "WHERE (q.inquiry_mpn LIKE ? OR q.quote_id LIKE ? OR c.cli_name LIKE ?) ORDER BY q.quote_id",
+            [f"%{kw}%"] * 3).fetchall()
+    return [r[0] for r in rows]
+
+
+def test_matches_legacy_like(temp_db):
+    temp_db(SEED_SQL, init=False)
+    ensure_search_indexes()
+    for kw in ["LM3", "lm358", "32F1", "x00002", "Samsung", "Display", "LM", "x", "M3_8", "nothing", ""]:
+        assert search(kw) == legacy_search(kw), kw
+
+
+def test_uses_fts_for_long_keywords(temp_db):
+    temp_db(SEED_SQL, init=False)
+    ensure_search_indexes()
+    sql, params = text_match_sql("uni_quote", "LM358")
+    assert "uni_quote_fts MATCH" in sql
+    sql, params = text_match_sql("uni_quote", "LM")
+    assert "LIKE" in sql
+
+
+def test_triggers_keep_index_in_sync(temp_db):
+    temp_db(SEED_SQL, init=False)
+    ensure_search_indexes()
+    with base.get_db_connection() as conn:
+        conn.execute("INSERT INTO uni_quote VALUES ('x00004', 'C002', 'TPS54331DR')")
+    assert search("54331") == ["x00004"]
+
+    with base.get_db_connection() as conn:
+        conn.execute("UPDATE uni_quote SET inquiry_mpn = 'TPS7A4700' WHERE quote_id = 'x00004'")
+    assert search("54331") == []
+    assert search("7A47") == ["x00004"]
+
+    with base.get_db_connection() as conn:
+        conn.execute("DELETE FROM uni_quote WHERE quote_id = 'x00004'")
+    assert search("7A47") == []
+
+
+def test_rebuild(temp_db):
+    temp_db(SEED_SQL, init=False)
+    ensure_search_indexes()
+    rebuild_search_index("uni_quote")
+    assert search("LM358") == ["x00001"]
+
+
+def test_rowid_change_keeps_matches(temp_db):
+    temp_db(SEED_SQL, init=False)
+    ensure_search_indexes()
+    with base.get_db_connection() as conn:
+        # VACUUM 可能重新编号 TEXT 主键表的隐式 rowid，且不触发任何触发器
+        conn.execute("UPDATE uni_quote SET rowid = rowid + 10")
+        conn.execute("UPDATE uni_quote SET rowid = 14 - rowid")
+    for kw in ["LM317", "32F1", "LM358"]:
+        assert search(kw) == legacy_search(kw), kw
+
+
+def test_upgrade_rowid_index(temp_db):
+    temp_db(SEED_SQL + """
+    CREATE VIRTUAL TABLE uni_quote_fts USING fts5(
+        quote_id, inquiry_mpn, content='uni_quote', content_rowid='rowid', tokenize='trigram');
+    INSERT INTO uni_quote_fts(uni_quote_fts) VALUES ('rebuild');
+    CREATE TRIGGER uni_quote_fts_ai AFTER INSERT ON uni_quote BEGIN
+        INSERT INTO uni_quote_fts(rowid, quote_id, inquiry_mpn) VALUES (new.rowid, new.quote_id, new.inquiry_mpn);
+    END;
+    """, init=False)
+    ensure_search_indexes()
+    with base.get_db_connection() as conn:
+        conn.execute("INSERT INTO uni_quote VALUES ('x00004', 'C002', 'TPS54331DR')")
+        assert conn.execute("SELECT COUNT(*) FROM uni_quote_fts_key").fetchone()[0] == 4
+    assert search("54331") == ["x00004"]
+    assert search("LM358") == ["x00001"]
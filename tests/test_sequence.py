@@ -0,0 +1,68 @@
+"""
+单据编号分配测试
+
+验证序列按表中现有最大编号对齐、批量分配连续编号、编号格式不变、
+回滚时编号一起回滚，以及多线程并发分配不重复。
+"""
+
+import threading
+
+import Sills.base as base
+from Sills.db_sequence import allocate_ids, next_id, sync_sequences
+
+SEED_SQL = """
+    CREATE TABLE uni_quote (quote_id TEXT PRIMARY KEY);
+    CREATE TABLE uni_offer (offer_id TEXT PRIMARY KEY);
+    CREATE TABLE uni_order (order_id TEXT PRIMARY KEY);
+    CREATE TABLE uni_buy (buy_id TEXT PRIMARY KEY);
+    CREATE TABLE uni_cli (cli_id TEXT PRIMARY KEY);
+    INSERT INTO uni_order VALUES ('d00001'), ('d00007');
+    INSERT INTO uni_cli VALUES ('C012');
+"""
+
+
+def test_seeded_from_existing_ids(temp_db):
+    temp_db(SEED_SQL, init=False)
+    sync_sequences()
+    assert next_id("order") == "d00008"
+    assert next_id("quote") == "x00001"
+    assert next_id("cli") == "C013"
+    assert next_id("contact").startswith("CT") and len(next_id("contact")) == 20
+
+
+def test_lazy_seed_and_block(temp_db):
+    temp_db(SEED_SQL, init=False)
+    # 没有执行迁移时首次分配自动建序列
+    assert allocate_ids("order", 3) == ["d00008", "d00009", "d00010"]
+    assert allocate_ids("order", 0) == []
+    assert next_id("order") == "d00011"
+
+
+def test_rollback_returns_ids(temp_db):
+    temp_db(SEED_SQL, init=False)
+    sync_sequences()
+    conn = base.get_db_connection()
+    assert next_id("buy", conn) == "c00001"
+    conn.rollback()
+    conn.close()
+    assert next_id("buy") == "c00001"
+
+
+def test_concurrent_allocation_unique(temp_db):
+    temp_db(SEED_SQL, init=False)
+    sync_sequences()
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        ids = [next_id("offer") for _ in range(20)] + allocate_ids("offer", 5)
+        with lock:
+            results.extend(ids)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == len(set(results)) == 200
+    assert max(results) == "b00200"